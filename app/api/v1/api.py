@@ -2,13 +2,33 @@
 
 from fastapi import APIRouter
 
+from app.config import settings
+
 from .health import router as health_router
+from .internal import router as internal_router  # служебные эндпоинты
 from .leads import router as leads_router  # роутер для лидов
+from .leads_async import router as leads_async_router  # async-версия (DB_ASYNC)
+
+
+def build_api_router(db_async: bool) -> APIRouter:
+    """
+    Собрать роутер API v1.
+
+    Маршруты лидов подключаю из одного роутера: async-версии (DB_ASYNC) или
+    синхронной. Пути у них одинаковые, и второй роутер только дублировал бы
+    операции в OpenAPI-схеме.
+    """
+    router = APIRouter()
+
+    # Подключаю модуль health под /health
+    router.include_router(health_router, prefix="/health", tags=["health"])
+
+    # Служебные эндпоинты (пул соединений и т.п.) — под /internal, вне OpenAPI-схемы
+    router.include_router(internal_router, prefix="/internal", include_in_schema=False)
 
-api_router = APIRouter()
+    # Подключаю модуль leads под /leads
+    router.include_router(leads_async_router if db_async else leads_router, prefix="/leads", tags=["leads"])
+    return router
 
-# Подключаю модуль health под /health
-api_router.include_router(health_router, prefix="/health", tags=["health"])
 
-# Подключаю модуль leads под /leads
-api_router.include_router(leads_router, prefix="/leads", tags=["leads"])
+api_router = build_api_router(settings.db_async)
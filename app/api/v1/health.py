@@ -1,6 +1,9 @@
-# app/api/v1/health.py — базовый health‑чек приложения
+# app/api/v1/health.py — health-чеки приложения: базовый, liveness и readiness
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.services.health import health_monitor
 
 router = APIRouter()
 
@@ -11,10 +14,42 @@ async def health_root():
     Простейший health‑эндпоинт.
 
     На этом уровне я проверяю только то, что приложение запущено
-    и обрабатывает HTTP‑запросы. Позже сюда добавлю проверки БД, брокера и т.п.
+    и обрабатывает HTTP‑запросы. Зависимости проверяет /health/ready.
     """
     return {
         "status": "ok",
         "service": "skatinov-leadlab",
         "details": "base app is up",
     }
+
+
+@router.get("/live", summary="Liveness-проба")
+async def health_live():
+    """
+    Процесс жив и event loop отвечает.
+
+    Зависимости здесь намеренно не проверяю: если упадёт БД, перезапуск
+    подов не поможет, а liveness-проба их перезапустит. refresh_age_s —
+    сколько секунд назад фоновая задача обновляла проверки готовности.
+    """
+    age = health_monitor.age()
+    return {
+        "status": "alive",
+        "refresh_age_s": round(age, 3) if age is not None else None,
+    }
+
+
+@router.get(
+    "/ready",
+    summary="Readiness-проба: БД, пул соединений, миграции, брокер",
+    responses={503: {"description": "Сервис не готов принимать трафик"}},
+)
+async def health_ready():
+    """
+    Готовность принимать трафик: 200 или 503 с результатами проверок.
+
+    Проба отдаёт кэш фоновых проверок (см. app/services/health.py) и сама
+    в БД и брокер не ходит; у каждой проверки в ответе статус и latency_ms.
+    """
+    ready, report = await health_monitor.readiness()
+    return JSONResponse(status_code=200 if ready else 503, content=report)
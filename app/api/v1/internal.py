@@ -0,0 +1,56 @@
+# app/api/v1/internal.py — служебные эндпоинты для эксплуатации (не для клиентов).
+
+from anyio import to_thread
+from fastapi import APIRouter
+
+from app.config import settings
+from app.db.database import async_engine, engine
+from app.db.pool import pool_status
+from app.db.replicas import replica_set
+from app.services.lead_cache import lead_cache
+
+router = APIRouter()
+
+
+@router.get("/pool", summary="Состояние и статистика пула соединений с БД")
+async def pool_endpoint():
+    """
+    Эндпоинт для подбора размера пула под число воркеров uvicorn.
+
+    Цифры относятся к одному процессу (воркеру), который ответил на запрос.
+    Если wait_ms_p95 заметно больше нуля или растёт timeouts, пулу не хватает
+    соединений. Синхронные маршруты держат соединение, пока ждут поток из
+    threadpool, поэтому pool_size + max_overflow меньше threadpool_size
+    означает очередь за пулом при пиковой нагрузке.
+    """
+    per_worker = settings.db_pool_size + settings.db_max_overflow
+    data = {
+        "sync": pool_status(engine),
+        "sizing": {
+            "workers": settings.web_concurrency,
+            "threadpool_size": int(to_thread.current_default_thread_limiter().total_tokens),
+            "max_connections_per_worker": per_worker,
+            "max_connections_total": per_worker * settings.web_concurrency,
+        },
+    }
+    if async_engine is not None:
+        data["async"] = pool_status(async_engine.sync_engine)
+    for replica in replica_set.replicas:
+        data[replica.name] = pool_status(replica.engine)
+    return data
+
+
+@router.get("/replicas", summary="Реплики БД: ротация и отставание")
+async def replicas_endpoint():
+    """Эндпоинт с результатом последней проверки реплик: доступность, отставание, ошибка."""
+    return {
+        "max_lag_s": settings.replica_max_lag,
+        "sticky_s": settings.replica_sticky_seconds,
+        "replicas": replica_set.status(),
+    }
+
+
+@router.get("/cache", summary="Счётчики кэша карточек лидов")
+async def cache_endpoint():
+    """Эндпоинт со статистикой кэша GET /leads/{id}: hits/misses/evictions и т.д."""
+    return {"leads": lead_cache.stats()}
@@ -2,20 +2,99 @@
 
 """Маршруты FastAPI для работы с лидами (CRUD)."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from app.config import settings
+from app.core.timing import TimedRoute
 from app.db.database import get_db  # зависимость для получения сессии БД
-from app.schemas.leads import LeadCreate, LeadUpdate, LeadOut, LeadList
+from app.db.replicas import get_read_db  # сессия для чтения: реплика или primary
+from app.schemas.leads import (
+    ExportFormat,
+    LeadBatch,
+    LeadBatchGet,
+    LeadBulkResult,
+    LeadBulkUpdate,
+    LeadBulkUpdateResult,
+    LeadChanges,
+    LeadFilters,
+    LeadCreate,
+    LeadUpdate,
+    LeadOut,
+    LeadList,
+    LeadSearchResult,
+    LeadSortField,
+    LeadStats,
+    SortOrder,
+    CountStrategy,
+)
+from app.services.changes import stream_changes, wait_for_changes
+from app.services.archive import LeadArchived
+from app.services.conditional import LeadPreconditionFailed, lead_version
+from app.models.idempotency import SCOPE_LEAD_BULK, SCOPE_LEAD_CREATE
+from app.services.export import MEDIA_TYPES, iter_leads_export
+from app.services.idempotency import IdempotencyKeyMismatch, claim_idempotency_key, request_fingerprint
+from app.services.pagination import InvalidCursorError
 from app.services.leads import (
+    bulk_create_leads,
+    bulk_update_leads,
     create_lead,
     get_lead,
-    get_leads,
+    get_lead_changes,
+    get_leads_by_ids,
+    get_leads_version,
+    get_leads_with_version,
     update_lead,
     delete_lead,
 )
+from app.services.search import MIN_QUERY_LENGTH, SearchQueryTooShortError, SearchTimeoutError, search_leads
+from app.services.stats import get_lead_stats
+
+from .utils import (
+    ARCHIVED_RESPONSES,
+    BULK_REQUEST_BODY,
+    BULK_UPDATE_RESPONSES,
+    CHANGES_MAX_WAIT,
+    CHANGES_RESPONSES,
+    EXPORT_RESPONSES,
+    FIELDS_DESCRIPTION,
+    FIELDS_RESPONSES,
+    IDEMPOTENCY_RESPONSES,
+    NOT_MODIFIED_RESPONSES,
+    PRECONDITION_RESPONSES,
+    SSE_HEADERS,
+    SSE_MEDIA_TYPE,
+    accepts_gzip,
+    batch_get_ids,
+    changes_cursor,
+    check_bulk_update,
+    IdempotentResponse,
+    export_headers,
+    gzip_stream,
+    idempotency_key,
+    idempotency_key_reused,
+    if_match_versions,
+    is_not_modified,
+    lead_fields,
+    lead_archived,
+    lead_headers,
+    model_response,
+    not_modified_response,
+    parse_bulk_body,
+    precondition_failed,
+    replayed_response,
+    sse_stream,
+    version_headers,
+    wants_event_stream,
+    wants_revalidation,
+)
 
-router = APIRouter(prefix="/leads", tags=["leads"])
+# TimedRoute добавляет к ответам заголовок Server-Timing (db, validation, serialization)
+router = APIRouter(prefix="/leads", tags=["leads"], route_class=TimedRoute)
 
 
 @router.post(
@@ -23,71 +102,413 @@ router = APIRouter(prefix="/leads", tags=["leads"])
     response_model=LeadOut,
     status_code=status.HTTP_201_CREATED,
     summary="Создать новый лид",
+    responses=IDEMPOTENCY_RESPONSES,
+)
+def create_lead_endpoint(lead_in: LeadCreate, request: Request, db: Session = Depends(get_db)):
+    """
+    Эндпоинт для создания нового лида.
+
+    С заголовком Idempotency-Key повтор запроса (ретрай вебхука по таймауту)
+    получает сохранённый ответ первой попытки и не создаёт дубль; тот же ключ
+    с другим телом — 422.
+    """
+    key = idempotency_key(request.headers)
+    if key is None:
+        lead = create_lead(db=db, lead_in=lead_in)
+        headers = lead_headers(lead)
+        return model_response(lead, status_code=status.HTTP_201_CREATED, headers=headers)
+
+    fingerprint = request_fingerprint(lead_in.model_dump_json().encode())
+    try:
+        claim = claim_idempotency_key(db, SCOPE_LEAD_CREATE, key, fingerprint)
+    except IdempotencyKeyMismatch:
+        raise idempotency_key_reused()
+    if claim.replay is not None:
+        # валидаторы — той версии лида, что в сохранённом теле
+        replayed = LeadOut.model_validate_json(claim.replay.body)
+        return replayed_response(claim.replay, headers=lead_headers(replayed))
+    respond = IdempotentResponse(claim, status.HTTP_201_CREATED)
+    lead = create_lead(db=db, lead_in=lead_in, before_commit=respond)
+    return respond.response(headers=lead_headers(lead))
+
+
+@router.post(
+    "/bulk",
+    response_model=LeadBulkResult,
+    summary="Пакетно создать лидов (JSON-массив или NDJSON)",
+    openapi_extra=BULK_REQUEST_BODY,
+    responses=IDEMPOTENCY_RESPONSES,
+)
+async def bulk_create_leads_endpoint(
+    request: Request,
+    chunk_size: Optional[int] = Query(None, ge=1, le=5000),
+    db: Session = Depends(get_db),
+):
+    """
+    Эндпоинт для пакетной загрузки лидов от вебхуков и партнёрских фидов.
+
+    Тело разбираю и валидирую за один проход; невалидные элементы не мешают
+    остальным — по каждому элементу возвращается свой результат.
+    Вставка идёт порциями многострочных INSERT (см. bulk_create_leads).
+    Idempotency-Key работает как в POST /leads: повтор того же тела получает
+    сохранённый ответ, лиды второй раз не создаются.
+    """
+    body = await request.body()
+    batch = parse_bulk_body(body, request.headers.get("content-type", ""))
+    key = idempotency_key(request.headers)
+    respond = None
+    if key is not None:
+        try:
+            claim = await run_in_threadpool(
+                claim_idempotency_key, db, SCOPE_LEAD_BULK, key, request_fingerprint(body)
+            )
+        except IdempotencyKeyMismatch:
+            raise idempotency_key_reused()
+        if claim.replay is not None:
+            return replayed_response(claim.replay)
+        respond = IdempotentResponse(claim, status.HTTP_200_OK, build=batch.apply_outcomes)
+
+    outcomes = await run_in_threadpool(
+        bulk_create_leads,
+        db,
+        batch.valid_leads,
+        chunk_size or settings.bulk_insert_chunk_size,
+        respond,
+    )
+    if respond is not None:
+        return respond.response()
+    return model_response(batch.apply_outcomes(outcomes))
+
+
+@router.post(
+    "/bulk-update",
+    response_model=LeadBulkUpdateResult,
+    summary="Массово изменить лидов по фильтру (переназначение, смена статуса)",
+    responses=BULK_UPDATE_RESPONSES,
 )
-def create_lead_endpoint(lead_in: LeadCreate, db: Session = Depends(get_db)):
-    """Эндпоинт для создания нового лида."""
-    return create_lead(db=db, lead_in=lead_in)
+def bulk_update_leads_endpoint(
+    bulk: LeadBulkUpdate,
+    dry_run: bool = False,
+    chunk_size: Optional[int] = Query(None, ge=1, le=5000),
+    db: Session = Depends(get_db),
+):
+    """
+    Эндпоинт для массовых изменений: например, передать лидов ушедшего менеджера.
+
+    {"filter": {"assigned_to": "anna", "status": "in_progress"}, "patch": {"assigned_to": "boris"}}
+    Фильтр — поля фильтров списка и/или ids (через AND), патч — как у PATCH.
+    Вместо цикла PATCH — set-based UPDATE порциями по chunk_size лидов,
+    каждая в своей короткой транзакции (см. bulk_update_leads); в ответе —
+    сколько лидов изменено. С dry_run=true только считаю, сколько изменилось бы.
+    """
+    check_bulk_update(bulk)
+    result = bulk_update_leads(
+        db,
+        bulk.filter,
+        bulk.patch,
+        chunk_size or settings.bulk_update_chunk_size,
+        dry_run,
+    )
+    return model_response(result)
+
+
+@router.post(
+    "/batch-get",
+    response_model=LeadBatch,
+    summary="Получить лидов по списку ID",
+    responses={**FIELDS_RESPONSES, 413: {"description": "ID больше, чем BATCH_GET_MAX_IDS"}},
+)
+def batch_get_leads_endpoint(
+    batch: LeadBatchGet,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Эндпоинт для канбана: карточки лидов по списку ID одним запросом в БД.
+
+    Лиды возвращаются в порядке ids, ненайденные ID перечислены в missing
+    (без 404). С fields=name,status в ответе только эти поля и id, и из БД
+    читаются только их колонки.
+    """
+    leads = get_leads_by_ids(db=db, ids=batch_get_ids(batch), fields=lead_fields(fields))
+    return model_response(leads)
 
 
 @router.get(
     "",
     response_model=LeadList,
     summary="Получить список лидов",
+    responses={**NOT_MODIFIED_RESPONSES, **FIELDS_RESPONSES},
 )
 def list_leads_endpoint(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    total_strategy: CountStrategy = CountStrategy.EXACT,
+    filters: LeadFilters = Depends(),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Эндпоинт для получения списка лидов с пагинацией и фильтрами.
+
+    Фильтры (status, source, assigned_to, диапазоны created_*/updated_*)
+    применяются и к странице, и к total. Сценарий «мои лиды в работе,
+    сначала новые»: ?assigned_to=anna&status=in_progress&sort=created_at&order=desc.
+
+    Для глубоких страниц лучше использовать cursor из next_cursor предыдущего
+    ответа (keyset-режим): его стоимость не растёт с номером страницы.
+    Дашбордам, которые часто опрашивают список, стоит брать total_strategy=estimated
+    или none — точный COUNT(*) по большой таблице дороже самой страницы.
+    С fields=name,status в лидах только эти поля и id, и из БД читаются
+    только их колонки (и служебные для курсора и ETag).
+
+    Ответ несёт ETag и Last-Modified. С If-None-Match сначала считается
+    только версия страницы (агрегат по окну), и если она не изменилась —
+    304 без чтения строк и без тела.
+    """
+    projection = lead_fields(fields)
+    page = dict(
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        order=order,
+        total_strategy=total_strategy,
+        filters=filters,
+    )
+    try:
+        if wants_revalidation(request.headers):
+            version = get_leads_version(db=db, **page)
+            if is_not_modified(request.headers, version):
+                return not_modified_response(version)
+        leads, version = get_leads_with_version(db=db, fields=projection, **page)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return model_response(leads, headers=version_headers(version))
+
+
+@router.get(
+    "/export",
+    summary="Потоковая выгрузка лидов в CSV или NDJSON",
+    response_class=StreamingResponse,
+    responses=EXPORT_RESPONSES,
+)
+def export_leads_endpoint(
+    request: Request,
+    format: ExportFormat = ExportFormat.CSV,
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    filters: LeadFilters = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Эндпоинт для выгрузки лидов одним потоком.
+
+    Фильтры — те же, что у списка (status, source, assigned_to, диапазоны
+    created_*/updated_*): ?format=csv&status=won выгрузит только выигранных.
+    Строки идут с серверного курсора порциями, поэтому память не зависит
+    от размера таблицы. Если клиент принимает gzip, поток сжимается на лету.
+    """
+    chunks = iter_leads_export(
+        db,
+        format,
+        sort=sort,
+        order=order,
+        batch_size=settings.export_batch_size,
+        filters=filters,
+    )
+    gzip = accepts_gzip(request.headers.get("accept-encoding", ""))
+    if gzip:
+        chunks = gzip_stream(chunks)
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers=export_headers(format, gzip),
+    )
+
+
+@router.get(
+    "/search",
+    response_model=LeadSearchResult,
+    summary="Поиск лидов по фрагменту имени или email",
+    responses={503: {"description": "Поиск не уложился в бюджет времени"}},
+)
+def search_leads_endpoint(
+    q: str = Query(..., min_length=MIN_QUERY_LENGTH, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Эндпоинт поиска для поддержки: подстрока (и на Postgres — опечатки) в name/email.
+
+    Запрос ограничен SEARCH_BUDGET_MS: если БД не успела, отвечаю 503,
+    чтобы слишком общий запрос не занимал соединение — стоит уточнить фрагмент.
+    """
+    try:
+        leads = search_leads(db=db, q=q, limit=limit, budget_ms=settings.search_budget_ms)
+    except SearchQueryTooShortError as exc:
+        # Query(min_length) проверяет q до обрезки пробелов по краям
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(exc))
+    except SearchTimeoutError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+    return model_response(LeadSearchResult(query=q, leads=leads))
+
+
+@router.get(
+    "/stats",
+    response_model=LeadStats,
+    summary="Счётчики лидов по статусу, источнику и менеджеру",
+)
+def lead_stats_endpoint(db: Session = Depends(get_read_db)):
+    """
+    Эндпоинт для дашборда воронки.
+
+    Числа читаются из поддерживаемой триггерами таблицы lead_stats,
+    поэтому стоимость запроса не зависит от числа лидов.
+    """
+    return model_response(get_lead_stats(db))
+
+
+@router.get(
+    "/changes",
+    response_model=LeadChanges,
+    summary="Лента изменений лидов (long-poll или SSE)",
+    responses=CHANGES_RESPONSES,
+)
+async def lead_changes_endpoint(
+    request: Request,
+    since: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=CHANGES_MAX_WAIT),
     db: Session = Depends(get_db),
 ):
-    """Эндпоинт для получения списка лидов с пагинацией."""
-    return get_leads(db=db, skip=skip, limit=limit)
+    """
+    Эндпоинт для потребителей, которым нужны новые и изменённые лиды.
+
+    Отдаёт лидов после курсора since в порядке (updated_at, id), а в removed —
+    удалённых и перенесённых в архив в порядке ухода из списка; next_cursor
+    ответа — since следующего запроса, так что после обрыва лента продолжается
+    с того же места. С wait > 0 пустой ответ ждёт изменений до wait секунд
+    (long-poll); с Accept: text/event-stream ответ — бесконечный SSE-поток,
+    курсор в id событий, при переподключении берётся из Last-Event-ID.
+
+    Ожидание не опрашивает БД и не держит соединение из пула: изменения
+    приходят через LISTEN/NOTIFY (см. app/services/changes.py). Читаю с
+    primary: отстающая реплика могла бы пропустить изменения за курсором.
+    """
+    since = changes_cursor(since, request.headers)
+    settle = settings.changes_settle_seconds
+
+    def fetch_changes(cursor: Optional[str]):
+        try:
+            return get_lead_changes(db, cursor, limit, settle)
+        finally:
+            # соединение возвращается в пул до следующего чтения
+            db.close()
+
+    async def fetch(cursor: Optional[str]):
+        return await run_in_threadpool(fetch_changes, cursor)
+
+    if wants_event_stream(request.headers):
+        events = stream_changes(fetch, since, settings.changes_heartbeat, settle)
+        return StreamingResponse(sse_stream(events), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+    return model_response(await wait_for_changes(fetch, since, wait, settle))
 
 
 @router.get(
     "/{lead_id}",
     response_model=LeadOut,
     summary="Получить лид по ID",
+    responses=NOT_MODIFIED_RESPONSES,
 )
-def get_lead_endpoint(lead_id: int, db: Session = Depends(get_db)):
-    """Эндпоинт для получения одного лида по его ID."""
+def get_lead_endpoint(lead_id: int, request: Request, db: Session = Depends(get_read_db)):
+    """
+    Эндпоинт для получения одного лида по его ID.
+
+    Отдаёт ETag и Last-Modified; если версия из If-None-Match/If-Modified-Since
+    не изменилась — 304 без тела.
+    """
     lead = get_lead(db=db, lead_id=lead_id)
     if not lead:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Лид не найден")
-    return lead
+    version = lead_version(lead.id, lead.version, lead.updated_at)
+    if is_not_modified(request.headers, version):
+        return not_modified_response(version)
+    return model_response(lead, headers=version_headers(version))
 
 
 @router.put(
     "/{lead_id}",
     response_model=LeadOut,
     summary="Полное обновление лида по ID",
+    responses={**PRECONDITION_RESPONSES, **ARCHIVED_RESPONSES},
 )
 def update_lead_put_endpoint(
     lead_id: int,
     lead_update: LeadUpdate,
+    request: Request,
     db: Session = Depends(get_db),
 ):
-    """Эндпоинт для полного обновления лида по ID."""
-    updated = update_lead(db=db, lead_id=lead_id, lead_update=lead_update)
+    """
+    Эндпоинт для полного обновления лида по ID.
+
+    С If-Match изменение применяется, только если лид всё ещё в той версии,
+    что видел клиент, иначе 412 (оптимистичная блокировка). Лид из архива
+    не меняется — 409 (см. app/services/archive.py).
+    """
+    try:
+        updated = update_lead(
+            db=db,
+            lead_id=lead_id,
+            lead_update=lead_update,
+            if_match=if_match_versions(request.headers, lead_id),
+        )
+    except LeadArchived:
+        raise lead_archived()
+    except LeadPreconditionFailed:
+        raise precondition_failed()
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Лид не найден")
-    return updated
+    return model_response(updated, headers=lead_headers(updated))
 
 
 @router.patch(
     "/{lead_id}",
     response_model=LeadOut,
     summary="Частичное обновление лида по ID",
+    responses={**PRECONDITION_RESPONSES, **ARCHIVED_RESPONSES},
 )
 def update_lead_patch_endpoint(
     lead_id: int,
     lead_update: LeadUpdate,
+    request: Request,
     db: Session = Depends(get_db),
 ):
-    """Эндпоинт для частичного обновления лида по ID."""
-    updated = update_lead(db=db, lead_id=lead_id, lead_update=lead_update)
+    """
+    Эндпоинт для частичного обновления лида по ID.
+
+    С If-Match изменение применяется, только если лид всё ещё в той версии,
+    что видел клиент, иначе 412 (оптимистичная блокировка). Лид из архива
+    не меняется — 409 (см. app/services/archive.py).
+    """
+    try:
+        updated = update_lead(
+            db=db,
+            lead_id=lead_id,
+            lead_update=lead_update,
+            if_match=if_match_versions(request.headers, lead_id),
+        )
+    except LeadArchived:
+        raise lead_archived()
+    except LeadPreconditionFailed:
+        raise precondition_failed()
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Лид не найден")
-    return updated
+    return model_response(updated, headers=lead_headers(updated))
 
 
 @router.delete(
@@ -96,7 +517,7 @@ def update_lead_patch_endpoint(
     summary="Удалить (временно — физически) лида по ID",
 )
 def delete_lead_endpoint(lead_id: int, db: Session = Depends(get_db)):
-    """Эндпоинт для удаления лида по ID (пока без мягкого удаления)."""
+    """Эндпоинт для удаления лида по ID (пока без мягкого удаления), в том числе архивного."""
     deleted = delete_lead(db=db, lead_id=lead_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Лид не найден")
@@ -0,0 +1,427 @@
+# app/api/v1/leads_async.py — асинхронные API-маршруты для лидов (режим DB_ASYNC).
+
+"""
+Асинхронные маршруты FastAPI для лидов.
+
+Повторяют пути и контракты app/api/v1/leads.py, но работают через AsyncSession
+и не занимают потоки threadpool. Подключаются вместо синхронных при DB_ASYNC=true
+(см. app/api/v1/api.py); маршруты, которых здесь нет, обслуживает синхронный роутер.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.timing import TimedRoute
+from app.db.database import get_async_db
+from app.db.replicas import get_async_read_db
+from app.schemas.leads import (
+    CountStrategy,
+    ExportFormat,
+    LeadBatch,
+    LeadBatchGet,
+    LeadBulkResult,
+    LeadBulkUpdate,
+    LeadBulkUpdateResult,
+    LeadChanges,
+    LeadCreate,
+    LeadFilters,
+    LeadList,
+    LeadSearchResult,
+    LeadOut,
+    LeadSortField,
+    LeadStats,
+    LeadUpdate,
+    SortOrder,
+)
+from app.models.idempotency import SCOPE_LEAD_BULK, SCOPE_LEAD_CREATE
+from app.services import leads_async
+from app.services.changes import stream_changes, wait_for_changes
+from app.services.archive import LeadArchived
+from app.services.conditional import LeadPreconditionFailed, lead_version
+from app.services.export import MEDIA_TYPES
+from app.services.idempotency import IdempotencyKeyMismatch, request_fingerprint
+from app.services.pagination import InvalidCursorError
+from app.services.search import MIN_QUERY_LENGTH, SearchQueryTooShortError, SearchTimeoutError
+
+from .utils import (
+    ARCHIVED_RESPONSES,
+    BULK_REQUEST_BODY,
+    BULK_UPDATE_RESPONSES,
+    CHANGES_MAX_WAIT,
+    CHANGES_RESPONSES,
+    EXPORT_RESPONSES,
+    FIELDS_DESCRIPTION,
+    FIELDS_RESPONSES,
+    IDEMPOTENCY_RESPONSES,
+    NOT_MODIFIED_RESPONSES,
+    PRECONDITION_RESPONSES,
+    SSE_HEADERS,
+    SSE_MEDIA_TYPE,
+    accepts_gzip,
+    batch_get_ids,
+    changes_cursor,
+    check_bulk_update,
+    IdempotentResponse,
+    export_headers,
+    gzip_stream_async,
+    idempotency_key,
+    idempotency_key_reused,
+    if_match_versions,
+    is_not_modified,
+    lead_fields,
+    lead_archived,
+    lead_headers,
+    model_response,
+    not_modified_response,
+    parse_bulk_body,
+    precondition_failed,
+    replayed_response,
+    sse_stream,
+    version_headers,
+    wants_event_stream,
+    wants_revalidation,
+)
+
+# TimedRoute добавляет к ответам заголовок Server-Timing (db, validation, serialization)
+router = APIRouter(prefix="/leads", tags=["leads"], route_class=TimedRoute)
+
+
+@router.post(
+    "",
+    response_model=LeadOut,
+    status_code=status.HTTP_201_CREATED,
+    summary="Создать новый лид",
+    responses=IDEMPOTENCY_RESPONSES,
+)
+async def create_lead_async_endpoint(
+    lead_in: LeadCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Эндпоинт для создания нового лида (Idempotency-Key — как в синхронной версии)."""
+    key = idempotency_key(request.headers)
+    if key is None:
+        lead = await leads_async.create_lead(db=db, lead_in=lead_in)
+        headers = lead_headers(lead)
+        return model_response(lead, status_code=status.HTTP_201_CREATED, headers=headers)
+
+    fingerprint = request_fingerprint(lead_in.model_dump_json().encode())
+    try:
+        claim = await leads_async.claim_idempotency_key(db, SCOPE_LEAD_CREATE, key, fingerprint)
+    except IdempotencyKeyMismatch:
+        raise idempotency_key_reused()
+    if claim.replay is not None:
+        # валидаторы — той версии лида, что в сохранённом теле
+        replayed = LeadOut.model_validate_json(claim.replay.body)
+        return replayed_response(claim.replay, headers=lead_headers(replayed))
+    respond = IdempotentResponse(claim, status.HTTP_201_CREATED)
+    lead = await leads_async.create_lead(db=db, lead_in=lead_in, before_commit=respond)
+    return respond.response(headers=lead_headers(lead))
+
+
+@router.post(
+    "/bulk",
+    response_model=LeadBulkResult,
+    summary="Пакетно создать лидов (JSON-массив или NDJSON)",
+    openapi_extra=BULK_REQUEST_BODY,
+    responses=IDEMPOTENCY_RESPONSES,
+)
+async def bulk_create_leads_async_endpoint(
+    request: Request,
+    chunk_size: Optional[int] = Query(None, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Эндпоинт для пакетной загрузки лидов (см. синхронную версию)."""
+    body = await request.body()
+    batch = parse_bulk_body(body, request.headers.get("content-type", ""))
+    key = idempotency_key(request.headers)
+    respond = None
+    if key is not None:
+        try:
+            claim = await leads_async.claim_idempotency_key(
+                db, SCOPE_LEAD_BULK, key, request_fingerprint(body)
+            )
+        except IdempotencyKeyMismatch:
+            raise idempotency_key_reused()
+        if claim.replay is not None:
+            return replayed_response(claim.replay)
+        respond = IdempotentResponse(claim, status.HTTP_200_OK, build=batch.apply_outcomes)
+
+    outcomes = await leads_async.bulk_create_leads(
+        db,
+        batch.valid_leads,
+        chunk_size or settings.bulk_insert_chunk_size,
+        respond,
+    )
+    if respond is not None:
+        return respond.response()
+    return model_response(batch.apply_outcomes(outcomes))
+
+
+@router.post(
+    "/bulk-update",
+    response_model=LeadBulkUpdateResult,
+    summary="Массово изменить лидов по фильтру (переназначение, смена статуса)",
+    responses=BULK_UPDATE_RESPONSES,
+)
+async def bulk_update_leads_async_endpoint(
+    bulk: LeadBulkUpdate,
+    dry_run: bool = False,
+    chunk_size: Optional[int] = Query(None, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Эндпоинт для массового изменения лидов по фильтру (см. синхронную версию)."""
+    check_bulk_update(bulk)
+    result = await leads_async.bulk_update_leads(
+        db,
+        bulk.filter,
+        bulk.patch,
+        chunk_size or settings.bulk_update_chunk_size,
+        dry_run,
+    )
+    return model_response(result)
+
+
+@router.post(
+    "/batch-get",
+    response_model=LeadBatch,
+    summary="Получить лидов по списку ID",
+    responses={**FIELDS_RESPONSES, 413: {"description": "ID больше, чем BATCH_GET_MAX_IDS"}},
+)
+async def batch_get_leads_async_endpoint(
+    batch: LeadBatchGet,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Эндпоинт для пакетного чтения лидов по ID (см. синхронную версию)."""
+    leads = await leads_async.get_leads_by_ids(db=db, ids=batch_get_ids(batch), fields=lead_fields(fields))
+    return model_response(leads)
+
+
+@router.get(
+    "",
+    response_model=LeadList,
+    summary="Получить список лидов",
+    responses={**NOT_MODIFIED_RESPONSES, **FIELDS_RESPONSES},
+)
+async def list_leads_async_endpoint(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    total_strategy: CountStrategy = CountStrategy.EXACT,
+    filters: LeadFilters = Depends(),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Эндпоинт для получения списка лидов с пагинацией (ETag и 304 — как в синхронной версии)."""
+    projection = lead_fields(fields)
+    page = dict(
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        order=order,
+        total_strategy=total_strategy,
+        filters=filters,
+    )
+    try:
+        if wants_revalidation(request.headers):
+            version = await leads_async.get_leads_version(db=db, **page)
+            if is_not_modified(request.headers, version):
+                return not_modified_response(version)
+        leads, version = await leads_async.get_leads_with_version(db=db, fields=projection, **page)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return model_response(leads, headers=version_headers(version))
+
+
+@router.get(
+    "/export",
+    summary="Потоковая выгрузка лидов в CSV или NDJSON",
+    response_class=StreamingResponse,
+    responses=EXPORT_RESPONSES,
+)
+async def export_leads_async_endpoint(
+    request: Request,
+    format: ExportFormat = ExportFormat.CSV,
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    filters: LeadFilters = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Эндпоинт для выгрузки лидов одним потоком (фильтры — как у списка)."""
+    chunks = leads_async.iter_leads_export(
+        db,
+        format,
+        sort=sort,
+        order=order,
+        batch_size=settings.export_batch_size,
+        filters=filters,
+    )
+    gzip = accepts_gzip(request.headers.get("accept-encoding", ""))
+    if gzip:
+        chunks = gzip_stream_async(chunks)
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers=export_headers(format, gzip),
+    )
+
+
+@router.get(
+    "/search",
+    response_model=LeadSearchResult,
+    summary="Поиск лидов по фрагменту имени или email",
+    responses={503: {"description": "Поиск не уложился в бюджет времени"}},
+)
+async def search_leads_async_endpoint(
+    q: str = Query(..., min_length=MIN_QUERY_LENGTH, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Эндпоинт поиска лидов по фрагменту имени или email."""
+    try:
+        leads = await leads_async.search_leads(
+            db=db, q=q, limit=limit, budget_ms=settings.search_budget_ms
+        )
+    except SearchQueryTooShortError as exc:
+        # Query(min_length) проверяет q до обрезки пробелов по краям
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(exc))
+    except SearchTimeoutError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+    return model_response(LeadSearchResult(query=q, leads=leads))
+
+
+@router.get(
+    "/stats",
+    response_model=LeadStats,
+    summary="Счётчики лидов по статусу, источнику и менеджеру",
+)
+async def lead_stats_async_endpoint(db: AsyncSession = Depends(get_async_read_db)):
+    """Эндпоинт для дашборда воронки (счётчики из lead_stats)."""
+    return model_response(await leads_async.get_lead_stats(db))
+
+
+@router.get(
+    "/changes",
+    response_model=LeadChanges,
+    summary="Лента изменений лидов (long-poll или SSE)",
+    responses=CHANGES_RESPONSES,
+)
+async def lead_changes_async_endpoint(
+    request: Request,
+    since: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=CHANGES_MAX_WAIT),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Эндпоинт ленты изменений (long-poll и SSE — как в синхронной версии)."""
+    since = changes_cursor(since, request.headers)
+    settle = settings.changes_settle_seconds
+
+    async def fetch(cursor: Optional[str]):
+        try:
+            return await leads_async.get_lead_changes(db, cursor, limit, settle)
+        finally:
+            # соединение возвращается в пул до следующего чтения
+            await db.close()
+
+    if wants_event_stream(request.headers):
+        events = stream_changes(fetch, since, settings.changes_heartbeat, settle)
+        return StreamingResponse(sse_stream(events), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+    return model_response(await wait_for_changes(fetch, since, wait, settle))
+
+
+@router.get(
+    "/{lead_id}",
+    response_model=LeadOut,
+    summary="Получить лид по ID",
+    responses=NOT_MODIFIED_RESPONSES,
+)
+async def get_lead_async_endpoint(lead_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    """Эндпоинт для получения одного лида по его ID (с ETag и 304)."""
+    lead = await leads_async.get_lead(db=db, lead_id=lead_id)
+    if not lead:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Лид не найден")
+    version = lead_version(lead.id, lead.version, lead.updated_at)
+    if is_not_modified(request.headers, version):
+        return not_modified_response(version)
+    return model_response(lead, headers=version_headers(version))
+
+
+@router.put(
+    "/{lead_id}",
+    response_model=LeadOut,
+    summary="Полное обновление лида по ID",
+    responses={**PRECONDITION_RESPONSES, **ARCHIVED_RESPONSES},
+)
+async def update_lead_put_async_endpoint(
+    lead_id: int,
+    lead_update: LeadUpdate,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Эндпоинт для полного обновления лида по ID (If-Match и 409 для архивного — как в синхронной версии)."""
+    try:
+        updated = await leads_async.update_lead(
+            db=db,
+            lead_id=lead_id,
+            lead_update=lead_update,
+            if_match=if_match_versions(request.headers, lead_id),
+        )
+    except LeadArchived:
+        raise lead_archived()
+    except LeadPreconditionFailed:
+        raise precondition_failed()
+    if not updated:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Лид не найден")
+    return model_response(updated, headers=lead_headers(updated))
+
+
+@router.patch(
+    "/{lead_id}",
+    response_model=LeadOut,
+    summary="Частичное обновление лида по ID",
+    responses={**PRECONDITION_RESPONSES, **ARCHIVED_RESPONSES},
+)
+async def update_lead_patch_async_endpoint(
+    lead_id: int,
+    lead_update: LeadUpdate,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Эндпоинт для частичного обновления лида по ID (If-Match и 409 для архивного — как в синхронной версии)."""
+    try:
+        updated = await leads_async.update_lead(
+            db=db,
+            lead_id=lead_id,
+            lead_update=lead_update,
+            if_match=if_match_versions(request.headers, lead_id),
+        )
+    except LeadArchived:
+        raise lead_archived()
+    except LeadPreconditionFailed:
+        raise precondition_failed()
+    if not updated:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Лид не найден")
+    return model_response(updated, headers=lead_headers(updated))
+
+
+@router.delete(
+    "/{lead_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Удалить (временно — физически) лида по ID",
+)
+async def delete_lead_async_endpoint(lead_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Эндпоинт для удаления лида по ID (пока без мягкого удаления), в том числе архивного."""
+    deleted = await leads_async.delete_lead(db=db, lead_id=lead_id)
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Лид не найден")
+    # 204 без тела ответа
@@ -0,0 +1,506 @@
+# app/api/v1/utils.py — общие помощники для синхронных и асинхронных маршрутов лидов.
+
+"""
+Помощники маршрутов лидов, которые не зависят от режима БД.
+
+Разбор тела пакетной загрузки, сборка ответа по элементам, gzip для выгрузки,
+быстрый JSON-ответ из готовой схемы, условные запросы (ETag, 304, 412),
+Idempotency-Key, SSE ленты изменений и разбор fields= нужны и синхронным (leads.py),
+и асинхронным (leads_async.py) маршрутам.
+"""
+
+import json
+import time
+import zlib
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Iterator, Mapping, Optional, Sequence, Union
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from app.config import settings
+from app.core.timing import record_serialization
+from app.schemas.leads import (
+    ExportFormat,
+    LeadBulkItemResult,
+    LeadBatchGet,
+    LeadBulkResult,
+    LeadBulkUpdate,
+    LeadChanges,
+    LeadCreate,
+    LeadOut,
+    LeadSortField,
+    SortOrder,
+)
+from app.services.conditional import Version, lead_version, parse_lead_etags
+from app.services.export import MEDIA_TYPES
+from app.services.pagination import InvalidCursorError, decode_cursor
+from app.services.projection import LEAD_FIELDS, Fields, InvalidFieldsError, parse_fields
+from app.services.idempotency import (
+    MAX_KEY_LENGTH,
+    IdempotencyClaim,
+    StoredResponse,
+    store_idempotent_response,
+)
+
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+class ModelJSONResponse(JSONResponse):
+    """
+    JSON-ответ из уже провалидированной pydantic-схемы.
+
+    Если эндпоинт возвращает схему, FastAPI ещё раз валидирует её по
+    response_model и сериализует через jsonable_encoder — для страницы из сотни
+    LeadOut это основная работа CPU в запросе. Сервисы и так отдают готовые
+    LeadOut/LeadList, поэтому маршруты лидов возвращают этот ответ: схема сразу
+    сериализуется в байты закэшированным TypeAdapter (dump_json).
+    response_model в декораторах остаётся — по нему строится OpenAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return render_model(content)
+        return super().render(content)
+
+
+def render_model(content: BaseModel) -> bytes:
+    """Тело JSON-ответа из схемы (время идёт в serialization заголовка Server-Timing)."""
+    started = time.perf_counter()
+    body = _adapter(type(content)).dump_json(content, by_alias=True)
+    record_serialization(time.perf_counter() - started)
+    return body
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: type[BaseModel]) -> TypeAdapter:
+    """TypeAdapter схемы ответа: сериализатор компилируется один раз на тип."""
+    return TypeAdapter(model)
+
+
+def model_response(
+    content: BaseModel,
+    status_code: int = status.HTTP_200_OK,
+    headers: Optional[Mapping[str, str]] = None,
+) -> ModelJSONResponse:
+    """Ответ маршрута лидов из готовой схемы (без повторной валидации)."""
+    return ModelJSONResponse(content, status_code=status_code, headers=headers)
+
+
+# Ответы условных запросов для OpenAPI
+NOT_MODIFIED_RESPONSES = {304: {"description": "Не изменилось с версии из If-None-Match / If-Modified-Since"}}
+PRECONDITION_RESPONSES = {412: {"description": "Лид изменён после получения ETag из If-Match"}}
+
+# Изменение архивного лида (см. app/services/archive.py)
+ARCHIVED_RESPONSES = {409: {"description": "Лид перенесён в архив: изменять его нельзя"}}
+
+
+def version_headers(version: Version) -> dict[str, str]:
+    """
+    ETag и Last-Modified ответа.
+
+    Cache-Control: no-cache — браузер хранит ответ, но перед использованием
+    переспрашивает сервер; без него он мог бы эвристически считать ответ
+    свежим по Last-Modified и показывать устаревшие данные без запроса.
+    """
+    headers = {"ETag": version.etag, "Cache-Control": "no-cache"}
+    if version.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(version.last_modified, usegmt=True)
+    return headers
+
+
+def lead_headers(lead: LeadOut) -> dict[str, str]:
+    """ETag и Last-Modified карточки лида."""
+    return version_headers(lead_version(lead.id, lead.version, lead.updated_at))
+
+
+def wants_revalidation(headers: Mapping[str, str]) -> bool:
+    """Есть ли в запросе условие, ради которого стоит сначала посчитать версию."""
+    return "if-none-match" in headers or "if-modified-since" in headers
+
+
+def is_not_modified(headers: Mapping[str, str], version: Version) -> bool:
+    """
+    Можно ли ответить 304 (RFC 9110, 13.1.2–13.1.3).
+
+    If-None-Match сравнивается слабо (W/ не важен); если он есть,
+    If-Modified-Since игнорируется. Last-Modified в HTTP — с точностью до секунды.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        return version.etag in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or version.last_modified is None:
+        return False
+    since = _parse_http_date(if_modified_since)
+    return since is not None and version.last_modified.replace(microsecond=0) <= since
+
+
+def not_modified_response(version: Version) -> Response:
+    """304 без тела, с теми же валидаторами."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=version_headers(version))
+
+
+def if_match_versions(headers: Mapping[str, str], lead_id: int) -> Optional[list[int]]:
+    """Версии лида из If-Match для update_lead (None — заголовка нет или он "*")."""
+    if_match = headers.get("if-match")
+    if if_match is None:
+        return None
+    return parse_lead_etags(if_match, lead_id)
+
+
+def precondition_failed() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Лид изменён другим запросом: перечитайте его и повторите изменение",
+    )
+
+
+def lead_archived() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Лид перенесён в архив: изменять его нельзя, только читать или удалить",
+    )
+
+
+# Ответы POST с Idempotency-Key для OpenAPI (422 при повторе ключа с другим телом
+# не описываю: своя запись 422 заменила бы стандартную схему ошибки валидации)
+IDEMPOTENCY_RESPONSES = {400: {"description": "Некорректный Idempotency-Key"}}
+
+
+def idempotency_key(headers: Mapping[str, str]) -> Optional[str]:
+    """Ключ из заголовка Idempotency-Key (None — заголовка нет); 400 при некорректном ключе."""
+    key = headers.get("idempotency-key")
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH or not key.isascii() or not key.isprintable():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key: от 1 до {MAX_KEY_LENGTH} печатных ASCII-символов",
+        )
+    return key
+
+
+def idempotency_key_reused() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+        detail="Idempotency-Key уже использован с другим телом запроса",
+    )
+
+
+def replayed_response(stored: StoredResponse, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Сохранённый ответ на повтор запроса с тем же ключом (headers — его валидаторы)."""
+    return Response(
+        content=stored.body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={**(headers or {}), "Idempotent-Replayed": "true"},
+    )
+
+
+class IdempotentResponse:
+    """
+    before_commit для сервисов создания: собирает тело ответа и пишет его
+    в строку ключа той же транзакцией, что и лидов; потом отдаёт то же тело.
+
+    build превращает результат сервиса в схему ответа (по умолчанию — он сам).
+    """
+
+    def __init__(
+        self,
+        claim: IdempotencyClaim,
+        status_code: int,
+        build: Callable[[Any], BaseModel] = lambda result: result,
+    ):
+        self.claim = claim
+        self.status_code = status_code
+        self.build = build
+        self.body = b""
+
+    def __call__(self, db, result: Any) -> None:
+        self.body = render_model(self.build(result))
+        store_idempotent_response(db, self.claim, self.status_code, self.body)
+
+    def response(self, headers: Optional[Mapping[str, str]] = None) -> Response:
+        return Response(
+            content=self.body,
+            status_code=self.status_code,
+            media_type="application/json",
+            headers=headers,
+        )
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    # дата без зоны в заголовке — не по стандарту, такое условие игнорирую
+    return parsed if parsed.tzinfo is not None else None
+
+
+# Описание тела POST /leads/bulk для OpenAPI (тело читаю вручную, FastAPI его не видит)
+BULK_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"type": "array", "items": {"$ref": "#/components/schemas/LeadCreate"}},
+            },
+            "application/x-ndjson": {
+                "schema": {"type": "string", "description": "Один LeadCreate в JSON на строку"},
+            },
+        },
+    },
+}
+
+# Описание ответа выгрузки для OpenAPI
+EXPORT_RESPONSES = {
+    200: {
+        "content": {media_type: {} for media_type in MEDIA_TYPES.values()},
+        "description": "Все лиды в выбранном формате",
+    },
+}
+
+
+class BulkBatch:
+    """Разобранный и провалидированный пакет: ошибки по индексам и валидные лиды."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.results: dict[int, LeadBulkItemResult] = {}
+        self.valid_indexes: list[int] = []
+        self.valid_leads: list[LeadCreate] = []
+
+    def fail(self, index: int, errors: list[dict[str, Any]]) -> None:
+        self.results[index] = LeadBulkItemResult(index=index, ok=False, errors=errors)
+
+    def apply_outcomes(self, outcomes: Sequence[Union[LeadOut, str]]) -> LeadBulkResult:
+        """Приложить результаты вставки к валидным элементам и собрать ответ по порядку входа."""
+        for index, outcome in zip(self.valid_indexes, outcomes):
+            if isinstance(outcome, LeadOut):
+                self.results[index] = LeadBulkItemResult(index=index, ok=True, lead=outcome)
+            else:
+                self.fail(index, [{"type": "db_error", "msg": outcome}])
+
+        ordered = [self.results[index] for index in range(self.size)]
+        created = sum(1 for result in ordered if result.ok)
+        return LeadBulkResult(created=created, failed=len(ordered) - created, results=ordered)
+
+
+def parse_bulk_body(body: bytes, content_type: str) -> BulkBatch:
+    """
+    Разобрать тело пакетной загрузки (JSON-массив или NDJSON) и провалидировать элементы.
+
+    Всё делается за один проход: битые строки NDJSON и невалидные элементы
+    попадают в ошибки по своему индексу и не мешают остальным.
+    """
+    media_type = content_type.split(";", 1)[0].strip().lower()
+
+    if media_type in NDJSON_MEDIA_TYPES:
+        lines = [line for line in body.splitlines() if line.strip()]
+        _check_batch_size(len(lines))
+        batch = BulkBatch(len(lines))
+        for index, line in enumerate(lines):
+            try:
+                item = json.loads(line)
+            except ValueError as exc:
+                batch.fail(index, [{"type": "json_invalid", "msg": str(exc)}])
+                continue
+            _validate_item(batch, index, item)
+        return batch
+
+    try:
+        items = json.loads(body)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Некорректный JSON: {exc}")
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ожидается JSON-массив лидов или NDJSON",
+        )
+    _check_batch_size(len(items))
+    batch = BulkBatch(len(items))
+    for index, item in enumerate(items):
+        _validate_item(batch, index, item)
+    return batch
+
+
+BULK_UPDATE_RESPONSES = {413: {"description": "В filter.ids больше BULK_MAX_ITEMS ID"}}
+
+
+def check_bulk_update(bulk: LeadBulkUpdate) -> None:
+    """Список filter.ids массового изменения — не длиннее предела пакетной загрузки (413)."""
+    if bulk.filter.ids is not None:
+        _check_batch_size(len(bulk.filter.ids))
+
+
+def _check_batch_size(size: int) -> None:
+    if size > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Не больше {settings.bulk_max_items} лидов за запрос",
+        )
+
+
+def _validate_item(batch: BulkBatch, index: int, item: Any) -> None:
+    try:
+        batch.valid_leads.append(LeadCreate.model_validate(item))
+        batch.valid_indexes.append(index)
+    except ValidationError as exc:
+        batch.fail(
+            index,
+            exc.errors(include_url=False, include_context=False, include_input=False),
+        )
+
+
+def export_headers(export_format: ExportFormat, gzip: bool) -> dict[str, str]:
+    """Заголовки ответа выгрузки."""
+    headers = {
+        "Content-Disposition": f'attachment; filename="leads.{export_format.value}"',
+        "Vary": "Accept-Encoding",
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return headers
+
+
+def _coding_weight(params: Sequence[str]) -> float:
+    """Вес q из параметров одной кодировки Accept-Encoding (по умолчанию 1)."""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value.strip())
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Принимает ли клиент gzip (по заголовку Accept-Encoding).
+
+    Учитываются веса: gzip;q=0 — явный отказ от gzip, даже если в заголовке
+    есть *. Без явного gzip решает *: «*;q=0» отказ, «*» — согласие.
+    """
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        if coding:
+            weights[coding] = _coding_weight(params)
+    for coding in ("gzip", "x-gzip"):
+        if coding in weights:
+            return weights[coding] > 0
+    return weights.get("*", 0.0) > 0
+
+
+def _gzip_compressor():
+    return zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 — формат gzip
+
+
+def gzip_stream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Сжать поток кусков в gzip, не накапливая его в памяти."""
+    compressor = _gzip_compressor()
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def gzip_stream_async(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Асинхронный вариант gzip_stream."""
+    compressor = _gzip_compressor()
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+# Проекция полей: query-параметр fields= у списка и пакетного чтения
+FIELDS_DESCRIPTION = (
+    "Только эти поля лида через запятую (id есть всегда), например name,status. "
+    f"Доступны: {', '.join(LEAD_FIELDS)}"
+)
+FIELDS_RESPONSES = {400: {"description": "Неизвестное поле в fields"}}
+
+
+def lead_fields(fields: Optional[str]) -> Fields:
+    """Набор полей из fields= (None — все поля); неизвестное поле — 400."""
+    try:
+        return parse_fields(fields)
+    except InvalidFieldsError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+def batch_get_ids(batch: LeadBatchGet) -> list[int]:
+    """ID пакетного чтения с проверкой предела BATCH_GET_MAX_IDS (413 при превышении)."""
+    if len(batch.ids) > settings.batch_get_max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Не больше {settings.batch_get_max_ids} ID за запрос",
+        )
+    return batch.ids
+
+
+# Лента изменений: предел ожидания long-poll и SSE-поток по Accept: text/event-stream
+CHANGES_MAX_WAIT = 60.0
+SSE_MEDIA_TYPE = "text/event-stream"
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+CHANGES_RESPONSES = {
+    200: {
+        "content": {"application/json": {}, SSE_MEDIA_TYPE: {}},
+        "description": "Порция ленты (JSON) или поток событий leads (SSE, id события — курсор)",
+    },
+    400: {"description": "Некорректный курсор"},
+}
+
+
+def changes_cursor(since: Optional[str], headers: Mapping[str, str]) -> Optional[str]:
+    """
+    Курсор ленты: since или Last-Event-ID, который EventSource шлёт при переподключении.
+
+    Курсор проверяю сразу: посреди SSE-потока ответить 400 уже нельзя.
+    """
+    cursor = since or headers.get("last-event-id") or None
+    if cursor is not None:
+        try:
+            decode_cursor(cursor, LeadSortField.UPDATED_AT, SortOrder.ASC)
+        except InvalidCursorError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return cursor
+
+
+def wants_event_stream(headers: Mapping[str, str]) -> bool:
+    """Клиент просит SSE-поток (Accept: text/event-stream)."""
+    return SSE_MEDIA_TYPE in headers.get("accept", "")
+
+
+async def sse_stream(events: AsyncIterator[Optional[LeadChanges]]) -> AsyncIterator[bytes]:
+    """
+    События SSE из порций ленты: event: leads, id — курсор после порции.
+
+    None из потока — комментарий-heartbeat, чтобы прокси не закрыли тихое соединение.
+    """
+    yield f"retry: {int(settings.changes_poll_interval * 1000)}\n\n".encode()
+    async for changes in events:
+        if changes is None:
+            yield b": keep-alive\n\n"
+            continue
+        yield (
+            f"id: {changes.next_cursor}\nevent: leads\ndata: ".encode()
+            + changes.model_dump_json().encode()
+            + b"\n\n"
+        )
@@ -0,0 +1,232 @@
+# app/core/admission.py — контроль допуска запросов (load shedding).
+
+"""
+Контроль допуска: не пускать в приложение больше запросов, чем оно успевает обработать.
+
+Когда БД тормозит, запросы копятся в очереди threadpool, каждый держит
+соединение и память, и задержка растёт у всех сразу. Это middleware
+отвечает отказом до того, как запрос дойдёт до маршрута и займёт
+поток или соединение с БД:
+
+- rate limit: token bucket на клиента — ключ из заголовка API-ключа
+  (ADMISSION_API_KEY_HEADER), иначе IP. Пустой бакет — 429 и Retry-After
+  через сколько появится токен;
+- лимит одновременных запросов: у маршрутов из ADMISSION_ROUTE_LIMITS
+  свой лимит, остальные делят общий ADMISSION_MAX_CONCURRENCY. Сверх
+  лимита запрос ждёт в ограниченной очереди (ADMISSION_MAX_QUEUE) не дольше
+  ADMISSION_QUEUE_TIMEOUT; очередь полна или время вышло — 503 и Retry-After.
+
+Маршрут определяю по пути до маршрутизации FastAPI: шаблоны из настроек
+компилируются так же, как пути Starlette. health и /metrics исключены
+(ADMISSION_EXEMPT_PATHS): под перегрузкой они должны отвечать сразу.
+Лимиты действуют на процесс, при нескольких воркерах — на каждый отдельно.
+"""
+
+import asyncio
+import math
+import re
+import time
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.metrics import ADMISSION_QUEUED, ADMISSION_REJECTED
+
+
+# Имя общего лимита (маршруты без своего лимита) в метриках
+DEFAULT_LIMITER = "default"
+
+
+class ConcurrencyLimiter:
+    """
+    Лимит одновременных запросов с ограниченной очередью ожидания.
+
+    Очередь — ожидающие asyncio.Semaphore (FIFO): новые запросы не обгоняют
+    ждущих. Всё работает в одном event loop процесса, поэтому счётчики без блокировок.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+        self._queued = ADMISSION_QUEUED.labels(name)
+
+    async def acquire(self) -> Optional[str]:
+        """Занять место; None — допущен, иначе причина отказа (queue_full | queue_timeout)."""
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return None
+        if self.waiting >= self.max_queue:
+            return "queue_full"
+
+        self.waiting += 1
+        self._queued.inc()
+        try:
+            async with asyncio.timeout(self.timeout):
+                await self._semaphore.acquire()
+            return None
+        except TimeoutError:
+            return "queue_timeout"
+        finally:
+            self.waiting -= 1
+            self._queued.dec()
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+
+class TokenBucket:
+    """
+    Token bucket на клиента: rate токенов в секунду, не больше burst в запасе.
+
+    Бакеты клиентов хранятся в памяти процесса. Когда клиентов больше
+    max_clients, выбрасываю полные бакеты (клиент давно не заходил —
+    новый бакет будет таким же полным), а если не помогло — все.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10_000):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def take(self, key: str) -> float:
+        """Взять токен; 0 — запрос допущен, иначе сколько секунд ждать следующего токена."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._evict(now)
+        return wait
+
+    def _evict(self, now: float) -> None:
+        self._buckets = {
+            key: (tokens, updated)
+            for key, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * self.rate < self.burst
+        }
+        if len(self._buckets) > self.max_clients:
+            self._buckets.clear()
+
+
+def parse_route_limits(value: str) -> list[tuple[str, str, int]]:
+    """
+    Разобрать ADMISSION_ROUTE_LIMITS: "GET /path/{id}=4;POST /other=2".
+
+    Метод * подходит к любому методу. Возвращаю (метод, шаблон пути, лимит).
+    """
+    limits = []
+    for item in value.split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        route, _, limit = item.rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        if not path or not limit.strip().isdigit():
+            raise ValueError(f"Некорректный лимит маршрута '{item}': ожидается 'METHOD /path=N'")
+        limits.append((method.upper(), path.strip(), int(limit)))
+    return limits
+
+
+class AdmissionControlMiddleware:
+    """ASGI-middleware контроля допуска (см. описание модуля)."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_concurrency: int = 64,
+        route_limits: str = "",
+        max_queue: int = 64,
+        queue_timeout: float = 1.0,
+        rate_limit: float = 0.0,
+        rate_burst: int = 50,
+        api_key_header: str = "X-API-Key",
+        exempt_paths: str = "",
+        retry_after: int = 1,
+    ):
+        self.app = app
+        self.exempt_paths = tuple(path.strip() for path in exempt_paths.split(",") if path.strip())
+        self.api_key_header = api_key_header.lower().encode("latin-1")
+        self.retry_after = retry_after
+        self.rate_limiter = TokenBucket(rate_limit, rate_burst) if rate_limit > 0 else None
+
+        self.routes: list[tuple[str, re.Pattern, ConcurrencyLimiter]] = []
+        for method, path, limit in parse_route_limits(route_limits):
+            path_regex, _, _ = compile_path(path)
+            limiter = ConcurrencyLimiter(f"{method} {path}", limit, max_queue, queue_timeout)
+            self.routes.append((method, path_regex, limiter))
+        self.default_limiter = (
+            ConcurrencyLimiter(DEFAULT_LIMITER, max_concurrency, max_queue, queue_timeout)
+            if max_concurrency > 0
+            else None
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        if self.rate_limiter is not None:
+            wait = self.rate_limiter.take(self._client_key(scope))
+            if wait:
+                ADMISSION_REJECTED.labels("rate", "rate_limited").inc()
+                await self._reject(scope, receive, send, 429, "Слишком много запросов", math.ceil(wait))
+                return
+
+        limiter = self._limiter_for(scope)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await limiter.acquire()
+        if reason is not None:
+            ADMISSION_REJECTED.labels(limiter.name, reason).inc()
+            await self._reject(
+                scope, receive, send, 503, "Сервис перегружен, повторите запрос позже", self.retry_after
+            )
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    def _limiter_for(self, scope: Scope) -> Optional[ConcurrencyLimiter]:
+        method, path = scope["method"], scope["path"]
+        for route_method, path_regex, limiter in self.routes:
+            if route_method in ("*", method) and path_regex.match(path):
+                return limiter
+        return self.default_limiter
+
+    def _client_key(self, scope: Scope) -> str:
+        for name, value in scope["headers"]:
+            if name == self.api_key_header:
+                return "key:" + value.decode("latin-1")
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    async def _reject(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        status_code: int,
+        detail: str,
+        retry_after: int,
+    ) -> None:
+        response = JSONResponse(
+            status_code=status_code,
+            content={"detail": detail},
+            headers={"Retry-After": str(max(retry_after, 1))},
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,110 @@
+# app/core/metrics.py — метрики HTTP-запросов в формате Prometheus.
+
+"""
+Метрики HTTP-слоя для Prometheus.
+
+Метки route — шаблон маршрута (/api/v1/leads/leads/{lead_id}), а не сырой путь:
+иначе каждый id давал бы новый временной ряд. Запросы, не попавшие ни в один
+маршрут (404 на произвольный путь), собираются под route="unmatched".
+
+Несколько воркеров uvicorn/gunicorn: если задана переменная окружения
+PROMETHEUS_MULTIPROC_DIR, prometheus_client пишет значения в mmap-файлы этого
+каталога, а /metrics собирает их со всех процессов через MultiProcessCollector.
+Каталог должен быть пустым при старте сервиса (его очищает скрипт запуска),
+а при gunicorn хук child_exit должен вызывать multiprocess.mark_process_dead(pid),
+чтобы gauge запросов в обработке не учитывал умершие воркеры.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Метка route для запросов, которые не совпали ни с одним маршрутом
+UNMATCHED_ROUTE = "unmatched"
+
+# Границы корзин задержки: от быстрых чтений из кэша до медленных выгрузок
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+DB_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+DB_STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUEST_DURATION = Histogram(
+    "leadlab_http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_TOTAL = Counter(
+    "leadlab_http_requests",
+    "HTTP-запросы по маршруту и коду ответа",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "leadlab_http_requests_in_progress",
+    "HTTP-запросы в обработке",
+    ["method"],
+    # в multiprocess-режиме суммирую значения живых процессов
+    multiprocess_mode="livesum",
+)
+REQUEST_DB_DURATION = Histogram(
+    "leadlab_http_request_db_duration_seconds",
+    "Суммарное время SQL-запросов одного HTTP-запроса",
+    ["method", "route"],
+    buckets=DB_LATENCY_BUCKETS,
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    "leadlab_http_request_db_statements",
+    "Число SQL-запросов одного HTTP-запроса",
+    ["method", "route"],
+    buckets=DB_STATEMENT_BUCKETS,
+)
+ADMISSION_REJECTED = Counter(
+    "leadlab_admission_rejected",
+    "Запросы, отклонённые контролем допуска",
+    ["limiter", "reason"],
+)
+ADMISSION_QUEUED = Gauge(
+    "leadlab_admission_queued",
+    "Запросы, ждущие места у лимита одновременных запросов",
+    ["limiter"],
+    multiprocess_mode="livesum",
+)
+READ_ROUTED = Counter(
+    "leadlab_db_reads_routed",
+    "Чтения лидов по месту выполнения: реплика, primary или primary после записи клиента",
+    ["target"],
+)
+REPLICA_LAG = Gauge(
+    "leadlab_db_replica_lag_seconds",
+    "Отставание реплики БД при последней проверке",
+    ["replica"],
+    multiprocess_mode="max",
+)
+
+
+def observe_request(method: str, route: str, status: int, duration: float, query_stats=None) -> None:
+    """Записать метрики одного завершённого HTTP-запроса."""
+    REQUEST_DURATION.labels(method, route).observe(duration)
+    REQUESTS_TOTAL.labels(method, route, str(status)).inc()
+    if query_stats is not None:
+        REQUEST_DB_DURATION.labels(method, route).observe(query_stats.duration)
+        REQUEST_DB_STATEMENTS.labels(method, route).observe(query_stats.statements)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Текст метрик для /metrics и его Content-Type."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # реестр собираю на каждый запрос — так рекомендует prometheus_client
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,123 @@
+# app/core/middleware.py — ASGI-middleware логирования и метрик запросов.
+
+"""
+Логирование и метрики HTTP-запросов.
+
+Middleware написано на чистом ASGI, а не через @app.middleware("http"):
+BaseHTTPMiddleware оборачивает каждый ответ в дополнительный поток и задачу,
+а здесь нужен только код ответа — его я беру из сообщения http.response.start.
+"""
+
+import logging
+import time
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.core.metrics import REQUESTS_IN_PROGRESS, UNMATCHED_ROUTE, observe_request
+from app.db.database import begin_query_stats, end_query_stats
+
+
+logger = logging.getLogger("skatinov_leadlab")
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Шаблон маршрута, который обработал запрос (например, /api/v1/leads/leads/{lead_id}).
+
+    Вложенные роутеры FastAPI кладут в scope["route"] маршрут с локальным путём,
+    а полный шаблон с префиксами — в scope["fastapi"]["effective_route_context"].
+    В старых версиях FastAPI маршрут из scope["route"] уже содержит полный путь.
+    """
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    template = getattr(context, "path_format", None)
+    if template is None:
+        template = getattr(scope.get("route"), "path_format", None)
+    return template or UNMATCHED_ROUTE
+
+
+class RequestMetricsMiddleware:
+    """
+    Логирование и метрики каждого HTTP-запроса.
+
+    Я логирую метод, путь, код ответа и время обработки, а в Prometheus
+    записываю задержку и код ответа по шаблону маршрута, число запросов
+    в обработке и время/число SQL-запросов (см. app/core/metrics.py).
+    Если задан SQL_STATEMENT_BUDGET, предупреждаю о запросах, которые выполнили
+    больше SQL-операторов, — так в отладке видно N+1.
+
+    Тела запросов и ответов не читаю, чтобы не светить секреты и не замедлять обработку.
+    """
+
+    def __init__(self, app: ASGIApp, metrics_enabled: bool = True):
+        self.app = app
+        self.metrics_enabled = metrics_enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        path = scope["path"]
+        status_code = 500
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_started = True
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method) if self.metrics_enabled else None
+        if in_progress is not None:
+            in_progress.inc()
+        query_stats, token = begin_query_stats()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status_code = 500
+            logger.exception(
+                "Unhandled error: %s %s (%.3f s)",
+                method,
+                path,
+                time.perf_counter() - start_time,
+            )
+            if response_started:
+                raise
+            response = JSONResponse(
+                status_code=500,
+                content={"detail": "Internal server error"},
+            )
+            await response(scope, receive, send)
+        else:
+            logger.info(
+                "%s %s -> %s (%.3f s)",
+                method,
+                path,
+                status_code,
+                time.perf_counter() - start_time,
+            )
+        finally:
+            end_query_stats(token)
+            budget = settings.sql_statement_budget
+            if budget and query_stats.statements > budget:
+                logger.warning(
+                    "SQL statement budget exceeded: %s %s -> %d statements (budget %d)",
+                    method,
+                    path,
+                    query_stats.statements,
+                    budget,
+                )
+            if in_progress is not None:
+                in_progress.dec()
+                observe_request(
+                    method,
+                    route_template(scope),
+                    status_code,
+                    time.perf_counter() - start_time,
+                    query_stats,
+                )
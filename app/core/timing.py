@@ -0,0 +1,134 @@
+# app/core/timing.py — разбивка времени запроса для заголовка Server-Timing.
+
+"""
+Заголовок Server-Timing для маршрутов API.
+
+TimedRoute засекает четыре точки: вход в обработчик маршрута FastAPI, начало и
+конец эндпоинта, готовый ответ. Отсюда фазы заголовка:
+- validation — чтение тела, разбор и валидация параметров, зависимости;
+- app — сам эндпоинт (вместе с SQL);
+- db — время и число SQL-запросов (счётчик из app/db/database.py);
+- serialization — проверка ответа по response_model и сборка JSON.
+
+Если эндпоинт сам собирает тело ответа (ModelJSONResponse в маршрутах лидов),
+время сборки переносится из app в serialization через record_serialization.
+Для синхронных эндпоинтов в validation попадает и ожидание потока из threadpool.
+"""
+
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from app.config import settings
+from app.db.database import current_query_stats
+
+
+class EndpointTiming:
+    """Отметки времени одного вызова маршрута (perf_counter)."""
+
+    __slots__ = ("started", "endpoint_started", "endpoint_finished", "rendering")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.endpoint_started = started
+        self.endpoint_finished = started
+        # сколько секунд эндпоинт потратил на сборку тела ответа
+        self.rendering = 0.0
+
+
+_endpoint_timing: ContextVar[Optional[EndpointTiming]] = ContextVar("endpoint_timing", default=None)
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    """Обернуть эндпоинт, чтобы отметить его начало и конец (сигнатура сохраняется)."""
+    if getattr(endpoint, "__timed__", False):
+        return endpoint
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            timing = _endpoint_timing.get()
+            if timing is None:
+                return await endpoint(*args, **kwargs)
+            timing.endpoint_started = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                timing.endpoint_finished = time.perf_counter()
+
+    else:
+
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            # выполняется в threadpool, но контекст (и timing) копируется туда же
+            timing = _endpoint_timing.get()
+            if timing is None:
+                return endpoint(*args, **kwargs)
+            timing.endpoint_started = time.perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                timing.endpoint_finished = time.perf_counter()
+
+    wrapper.__timed__ = True
+    return wrapper
+
+
+def record_serialization(seconds: float) -> None:
+    """Учесть сборку тела ответа внутри эндпоинта как serialization."""
+    timing = _endpoint_timing.get()
+    if timing is not None:
+        timing.rendering += seconds
+
+
+def server_timing_header(timing: EndpointTiming, finished: float, query_stats=None) -> str:
+    """Значение Server-Timing (длительности в миллисекундах)."""
+    metrics = [
+        f"validation;dur={(timing.endpoint_started - timing.started) * 1000:.2f}",
+        f"app;dur={(timing.endpoint_finished - timing.endpoint_started - timing.rendering) * 1000:.2f}",
+    ]
+    if query_stats is not None:
+        metrics.append(
+            f'db;dur={query_stats.duration * 1000:.2f};desc="{query_stats.statements} stmt"'
+        )
+        budget = settings.sql_statement_budget
+        if budget and query_stats.statements > budget:
+            metrics.append(f'sql-budget;desc="exceeded {query_stats.statements}>{budget}"')
+    serialization = finished - timing.endpoint_finished + timing.rendering
+    metrics.append(f"serialization;dur={serialization * 1000:.2f}")
+    return ", ".join(metrics)
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute, который добавляет к ответу заголовок Server-Timing.
+
+    Подключается к роутеру через APIRouter(route_class=TimedRoute).
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            timing = EndpointTiming(time.perf_counter())
+            token = _endpoint_timing.set(timing)
+            try:
+                response = await handler(request)
+            finally:
+                _endpoint_timing.reset(token)
+            response.headers.append(
+                "Server-Timing",
+                server_timing_header(timing, time.perf_counter(), current_query_stats()),
+            )
+            return response
+
+        return timed_handler
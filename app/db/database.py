@@ -5,21 +5,50 @@
 
 Здесь настраивается SQLAlchemy engine, фабрика сессий и Base,
 от которого будут наследоваться все модели БД.
+
+Кроме синхронного пути есть асинхронный (AsyncSession): он включается
+настройкой DB_ASYNC, а драйвер подбирается по DATABASE_URL.
+
+Параметры пула соединений (DB_POOL_*) берутся из настроек, а сам пул
+собирает статистику ожидания соединений (см. app/db/pool.py).
+
+События engine считают SQL-запросы и их суммарное время в рамках одного
+HTTP-запроса: счётчик живёт в contextvar, который ставит middleware
+(см. app/core/middleware.py), поэтому запросы разных HTTP-запросов не смешиваются.
+Запросы дольше SLOW_QUERY_MS пишутся в лог skatinov_leadlab.slow_query
+(значения параметров не логируются).
 """
 
-from sqlalchemy import create_engine
+import logging
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from app.config import settings  # берём DATABASE_URL из настроек
+from app.db.pool import pool_options
+
 
+slow_query_logger = logging.getLogger("skatinov_leadlab.slow_query")
 
 # URL базы данных берётся из конфигурации (dev/test/prod)
 DATABASE_URL = settings.database_url
 
+# Асинхронные драйверы для диалектов, которые мы используем
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
 # Создаём движок SQLAlchemy
 engine = create_engine(
     DATABASE_URL,
     echo=False,  # можно включить True, чтобы видеть SQL-запросы в консоли
+    **pool_options(DATABASE_URL, settings),
 )
 
 # Фабрика сессий для работы с базой (через зависимости в FastAPI)
@@ -29,6 +58,119 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def make_async_url(url: str) -> str:
+    """
+    Превратить синхронный URL БД в URL с асинхронным драйвером.
+
+    postgresql:// и postgresql+psycopg2:// → postgresql+asyncpg://,
+    sqlite:// → sqlite+aiosqlite://. Уже асинхронный URL возвращается как есть.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"Нет асинхронного драйвера для базы '{backend}'")
+    if parsed.get_driver_name() == driver:
+        return url
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str, **kwargs) -> AsyncEngine:
+    """Создать асинхронный engine для URL из настроек (драйвер подбирается автоматически)."""
+    return create_async_engine(make_async_url(url), echo=False, **kwargs)
+
+
+# Асинхронный движок создаю только в async-режиме: иначе asyncpg/aiosqlite
+# не обязаны быть установлены
+async_engine = (
+    create_async_db_engine(DATABASE_URL, **pool_options(DATABASE_URL, settings, async_mode=True))
+    if settings.db_async
+    else None
+)
+
+AsyncSessionLocal = (
+    async_sessionmaker(bind=async_engine, autoflush=False) if async_engine is not None else None
+)
+
+
+class QueryStats:
+    """Сколько SQL-запросов выполнил один HTTP-запрос и сколько времени они заняли."""
+
+    __slots__ = ("statements", "duration")
+
+    def __init__(self):
+        self.statements = 0
+        self.duration = 0.0
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def begin_query_stats() -> tuple[QueryStats, Token]:
+    """Начать учёт SQL для текущего контекста (HTTP-запроса)."""
+    stats = QueryStats()
+    return stats, _query_stats.set(stats)
+
+
+def end_query_stats(token: Token) -> None:
+    """Закончить учёт SQL, начатый begin_query_stats."""
+    _query_stats.reset(token)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Счётчик SQL текущего HTTP-запроса (None — учёт не ведётся)."""
+    return _query_stats.get()
+
+
+def _redact_parameters(parameters):
+    """Параметры запроса для лога: только их число/имена, без значений (там ПДн лидов)."""
+    if isinstance(parameters, dict):
+        return {key: "?" for key in parameters}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"<{len(parameters)} rows>"  # executemany
+        return ["?"] * len(parameters)
+    return parameters
+
+
+# Слушатели вешаю на класс Engine: так учитываются и engine из настроек,
+# и async_engine (его sync_engine), и engine из бенчмарков/подменённых зависимостей.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if settings.slow_query_ms or _query_stats.get() is not None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started_at")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.duration += elapsed
+
+    if settings.slow_query_ms and elapsed * 1000 >= settings.slow_query_ms:
+        slow_query_logger.warning(
+            "Slow query (%.1f ms): %s; params=%s",
+            elapsed * 1000,
+            " ".join(statement.split()),
+            _redact_parameters(parameters),
+        )
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # упавший запрос не дойдёт до after_cursor_execute — убираю его отметку времени
+    connection = exception_context.connection
+    started = connection.info.get("query_started_at") if connection is not None else None
+    if started:
+        started.pop()
+
+
 def get_db():
     """Зависимость FastAPI для получения сессии БД."""
     db = SessionLocal()
@@ -36,3 +178,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Зависимость FastAPI для получения асинхронной сессии БД (режим DB_ASYNC)."""
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Асинхронный режим БД выключен (DB_ASYNC=false)")
+    async with AsyncSessionLocal() as db:
+        yield db
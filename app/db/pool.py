@@ -0,0 +1,149 @@
+# app/db/pool.py — пул соединений с метриками ожидания.
+
+"""
+Инструментированный пул соединений SQLAlchemy.
+
+Стандартный QueuePool умеет отдавать только текущее состояние (size/overflow/
+checkedout). Чтобы подбирать размер пула под число воркеров uvicorn, мне нужно
+видеть ещё и историю: сколько было выдач соединений, сколько запрос ждал
+свободное соединение и сколько раз ожидание закончилось таймаутом.
+Эти цифры собирает PoolStats, а читаются они через /api/v1/internal/pool.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolStats:
+    """
+    Накопительная статистика выдачи соединений из пула.
+
+    Время ожидания храню в кольцевом буфере последних выдач: по нему считаю
+    перцентили, а общие счётчики копятся с момента старта процесса.
+    """
+
+    def __init__(self, window: int = 1024):
+        self._lock = threading.Lock()
+        self._waits: deque = deque(maxlen=window)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.max_in_use = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_checkout(self, wait: float, in_use: int) -> None:
+        """Учесть успешную выдачу соединения, которая заняла wait секунд."""
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.max_in_use = max(self.max_in_use, in_use)
+            self._waits.append(wait)
+
+    def record_timeout(self, wait: float) -> None:
+        """Учесть запрос, который не дождался соединения за pool_timeout."""
+        with self._lock:
+            self.timeouts += 1
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Снимок счётчиков; время ожидания — в миллисекундах."""
+        with self._lock:
+            waits = sorted(self._waits)
+            checkouts = self.checkouts
+            data = {
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "max_in_use": self.max_in_use,
+                "wait_ms_mean": _ms(self.total_wait / checkouts) if checkouts else 0.0,
+                "wait_ms_max": _ms(self.max_wait),
+            }
+        for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            data[f"wait_ms_{name}"] = _ms(waits[min(len(waits) - 1, int(q * len(waits)))]) if waits else 0.0
+        return data
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+class _InstrumentedPoolMixin:
+    """
+    Примесь к QueuePool: засекает время _do_get, т.е. ожидание свободного
+    соединения (или открытия нового в пределах max_overflow).
+    """
+
+    stats: PoolStats
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_timeout(time.perf_counter() - start)
+            raise
+        self.stats.record_checkout(time.perf_counter() - start, self.checkedout())
+        return record
+
+    def recreate(self):
+        # engine.dispose() пересоздаёт пул — статистику переношу в новый
+        new_pool = super().recreate()
+        new_pool.stats = self.stats
+        return new_pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool со статистикой ожидания (синхронный engine)."""
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool со статистикой ожидания (AsyncEngine)."""
+
+
+def pool_options(url: str, settings, async_mode: bool = False) -> dict[str, Any]:
+    """
+    Аргументы пула для create_engine/create_async_engine из настроек.
+
+    SQLite в памяти работает на SingletonThreadPool/StaticPool, у которых нет
+    размера и таймаута, — для неё оставляю пул SQLAlchemy по умолчанию.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if async_mode else InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def pool_status(engine: Engine) -> dict[str, Any]:
+    """Текущее состояние пула engine плюс накопленная статистика (если есть)."""
+    pool: Pool = engine.pool
+    status: dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            timeout_s=pool.timeout(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    stats: Optional[PoolStats] = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
@@ -0,0 +1,334 @@
+# app/db/replicas.py — чтение лидов с реплик БД.
+
+"""
+Маршрутизация чтений на реплики Postgres.
+
+Списки и карточки лидов читаются намного чаще, чем пишутся, и на primary
+конкурируют с записью вебхуков. Если задан DATABASE_REPLICA_URLS (URL через
+запятую), маршруты чтения берут сессию через get_read_db/get_async_read_db:
+она открывается на одной из реплик по кругу. Запись по-прежнему идёт
+через get_db, то есть на primary.
+
+Чтобы клиент сразу видел свои изменения (read-your-writes), после запроса,
+который закоммитил транзакцию на primary, ReadYourWritesMiddleware ставит
+cookie: пока она жива (REPLICA_STICKY_SECONDS), чтения этого клиента идут
+на primary.
+
+Отставание каждой реплики проверяю раз в REPLICA_CHECK_INTERVAL секунд
+(фоновая задача в lifespan приложения). Реплика, которая отстала больше
+REPLICA_MAX_LAG секунд или не ответила, выводится из ротации до следующей
+удачной проверки; если годных реплик нет, чтения идут на primary.
+
+Кэши лидов заполняются только чтениями с primary: иначе строка с
+отстающей реплики могла бы вернуться в кэш сразу после инвалидации записью.
+"""
+
+import asyncio
+import itertools
+import logging
+import math
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.core.metrics import READ_ROUTED, REPLICA_LAG
+from app.db.database import async_engine, create_async_db_engine, engine, get_async_db, get_db
+from app.db.pool import pool_options
+
+
+logger = logging.getLogger("skatinov_leadlab.replicas")
+
+# Ключ в Session.info, по которому сервисы узнают сессию реплики
+REPLICA_SESSION_KEY = "replica"
+
+# Cookie read-your-writes: до какого момента (unix time) читать с primary
+STICKY_COOKIE = "leadlab_primary_until"
+
+# Отставание реплики Postgres в секундах. Если всё полученное WAL уже
+# применено, реплика догнала primary (время последней транзакции при этом
+# может быть старым — на primary просто нет записи)
+PG_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+class Replica:
+    """Реплика: свой engine и фабрики сессий, результат последней проверки отставания."""
+
+    def __init__(self, name: str, url: str, async_mode: bool = False):
+        self.name = name
+        self.url = url
+        self.engine = create_engine(url, echo=False, **pool_options(url, settings))
+        self.session_factory = sessionmaker(
+            bind=self.engine, autocommit=False, autoflush=False, info={REPLICA_SESSION_KEY: name}
+        )
+        self.async_session_factory = None
+        if async_mode:
+            self.async_session_factory = async_sessionmaker(
+                bind=create_async_db_engine(url, **pool_options(url, settings, async_mode=True)),
+                autoflush=False,
+                info={REPLICA_SESSION_KEY: name},
+            )
+        self.lag: Optional[float] = None
+        self.available = True
+        self.error: Optional[str] = None
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "url": make_url(self.url).render_as_string(hide_password=True),
+            "available": self.available,
+            "lag_s": round(self.lag, 3) if self.lag is not None else None,
+            "error": self.error,
+        }
+
+
+def measure_lag(connection: Connection) -> float:
+    """Отставание реплики в секундах; у баз без репликации (SQLite на стендах) — 0."""
+    if connection.dialect.name == "postgresql":
+        return float(connection.execute(PG_LAG_SQL).scalar() or 0.0)
+    connection.execute(text("SELECT 1"))
+    return 0.0
+
+
+class ReplicaSet:
+    """Реплики в ротации: выбор по кругу среди тех, что не отстали, и проверка отставания."""
+
+    def __init__(self, replicas: list[Replica], max_lag: float = 5.0, check_interval: float = 2.0):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.checked_at: Optional[float] = None
+        self._cycle = itertools.count()
+        self._check_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    # --- выбор реплики ---
+
+    def choose(self) -> Optional[Replica]:
+        """Следующая реплика в ротации (None — годных нет, читать с primary)."""
+        available = [replica for replica in self.replicas if replica.available]
+        if not available:
+            return None
+        return available[next(self._cycle) % len(available)]
+
+    def route(self, request: Request) -> Optional[Replica]:
+        """Реплика для чтения в этом запросе или None, если читать нужно с primary."""
+        if not self.replicas:
+            return None
+        if sticky_to_primary(request):
+            READ_ROUTED.labels("primary_sticky").inc()
+            return None
+        replica = self.choose()
+        READ_ROUTED.labels(replica.name if replica is not None else "primary").inc()
+        return replica
+
+    # --- проверка отставания ---
+
+    def check_due(self) -> bool:
+        """
+        Нужна ли проверка прямо в запросе: фоновой задачи нет (приложение без
+        lifespan), а последней проверке больше интервала или её не было.
+        """
+        if not self.replicas or self._task is not None:
+            return False
+        return self.checked_at is None or time.monotonic() - self.checked_at > self.check_interval
+
+    def check_lag(self) -> None:
+        """Проверить отставание всех реплик и обновить ротацию (блокирующий вызов)."""
+        with self._check_lock:
+            for replica in self.replicas:
+                was_available = replica.available
+                try:
+                    with replica.engine.connect() as connection:
+                        replica.lag = measure_lag(connection)
+                except Exception as exc:
+                    replica.available = False
+                    replica.error = f"{type(exc).__name__}: {exc}"[:300]
+                else:
+                    REPLICA_LAG.labels(replica.name).set(replica.lag)
+                    replica.available = replica.lag <= self.max_lag
+                    replica.error = None if replica.available else f"lag {replica.lag:.1f} s > {self.max_lag:g} s"
+                if replica.available != was_available:
+                    if replica.available:
+                        logger.info("Replica %s is back in rotation", replica.name)
+                    else:
+                        logger.warning("Replica %s is out of rotation: %s", replica.name, replica.error)
+            self.checked_at = time.monotonic()
+
+    def start(self) -> None:
+        """Запустить фоновую проверку отставания (вызывается в lifespan приложения)."""
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="replica-lag-check")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.check_lag)
+            except Exception:
+                logger.exception("Replica lag check failed")
+            await asyncio.sleep(self.check_interval)
+
+    def status(self) -> list[dict[str, Any]]:
+        return [replica.status() for replica in self.replicas]
+
+
+def build_replica_set(urls: str) -> ReplicaSet:
+    """Реплики из DATABASE_REPLICA_URLS (URL через запятую; пусто — реплик нет)."""
+    replicas = [
+        Replica(f"replica-{number}", url.strip(), async_mode=settings.db_async)
+        for number, url in enumerate((url for url in urls.split(",") if url.strip()), start=1)
+    ]
+    return ReplicaSet(
+        replicas,
+        max_lag=settings.replica_max_lag,
+        check_interval=settings.replica_check_interval,
+    )
+
+
+replica_set = build_replica_set(settings.database_replica_urls)
+
+
+def is_replica_session(db: Session) -> bool:
+    """Сессия открыта на реплике (get_read_db), а не на primary."""
+    return db.info.get(REPLICA_SESSION_KEY) is not None
+
+
+# --- read-your-writes ---
+
+
+class _PrimaryWrites:
+    """Отметка, что текущий HTTP-запрос закоммитил транзакцию на primary."""
+
+    __slots__ = ("committed",)
+
+    def __init__(self):
+        self.committed = False
+
+
+_primary_writes: ContextVar[Optional[_PrimaryWrites]] = ContextVar("primary_writes", default=None)
+
+
+def _mark_primary_commit(connection: Connection) -> None:
+    writes = _primary_writes.get()
+    if writes is not None:
+        writes.committed = True
+
+
+# Коммит слушаю на engine primary: чтения транзакций не коммитят, так что
+# отметку ставят только запросы, которые действительно что-то записали
+for _primary in (engine, async_engine.sync_engine if async_engine is not None else None):
+    if _primary is not None:
+        event.listen(_primary, "commit", _mark_primary_commit)
+
+
+def sticky_to_primary(request: Request) -> bool:
+    """Клиент недавно писал: его cookie read-your-writes ещё жива."""
+    value = request.cookies.get(STICKY_COOKIE)
+    if not value:
+        return False
+    try:
+        until = float(value)
+    except ValueError:
+        return False
+    now = time.time()
+    # срок из cookie не дальше окна: подделанная cookie не привяжет клиента к primary навсегда
+    return now < until <= now + settings.replica_sticky_seconds
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI-middleware read-your-writes: после коммита на primary ставит cookie,
+    по которой следующие чтения клиента идут на primary (см. описание модуля).
+    """
+
+    def __init__(self, app: ASGIApp, sticky_seconds: float = 5.0):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        writes = _PrimaryWrites()
+        token = _primary_writes.set(writes)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and writes.committed:
+                until = time.time() + self.sticky_seconds
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{STICKY_COOKIE}={until:.3f}; Max-Age={math.ceil(self.sticky_seconds)}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _primary_writes.reset(token)
+
+
+# --- зависимости FastAPI ---
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """
+    Зависимость FastAPI: сессия для чтения — на реплике или на primary.
+
+    Сессия primary из get_db соединение не берёт, пока её не используют,
+    а через неё чтения работают и с подменённой get_db (тесты, бенчмарки).
+    """
+    if replica_set.check_due():
+        replica_set.check_lag()
+    replica = replica_set.route(request)
+    if replica is None:
+        yield db
+        return
+    replica_db = replica.session_factory()
+    try:
+        yield replica_db
+    finally:
+        replica_db.close()
+
+
+async def get_async_read_db(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Зависимость FastAPI: асинхронная сессия для чтения (режим DB_ASYNC), см. get_read_db."""
+    if replica_set.check_due():
+        await asyncio.to_thread(replica_set.check_lag)
+    replica = replica_set.route(request)
+    if replica is None or replica.async_session_factory is None:
+        yield db
+        return
+    async with replica.async_session_factory() as replica_db:
+        yield replica_db
@@ -0,0 +1 @@
+# app/jobs/__init__.py — пакет для фоновых и служебных джоб (запускаются через python -m).
@@ -0,0 +1,86 @@
+# app/jobs/archive_leads.py — перенос закрытых лидов в leads_archive.
+
+"""
+Джоба архивации закрытых лидов.
+
+Переносит лидов в статусах ARCHIVE_STATUSES (по умолчанию won, lost), которые
+не менялись дольше ARCHIVE_AFTER_DAYS дней, из leads в leads_archive
+порциями по --batch-size строк (см. app/services/archive.py). Каждая порция —
+своя короткая транзакция, между порциями --pause секунд: перенос не держит
+долгих блокировок, не раздувает WAL одним огромным оператором и не отнимает
+базу у вебхуков. --max-seconds ограничивает один запуск (например, окном
+обслуживания) — остальное перенесёт следующий запуск с того же места.
+
+Джоба возобновляемая: перенесённые лиды из выборки уходят, поэтому после
+остановки или сбоя её достаточно запустить снова. Запускать по cron,
+например раз в сутки. Место в индексах leads освобождает autovacuum; после
+первого большого переноса на Postgres стоит выполнить VACUUM ANALYZE leads.
+
+Запуск (из корня проекта):
+    python -m app.jobs.archive_leads --dry-run
+    python -m app.jobs.archive_leads --batch-size 1000 --pause 0.1 --max-seconds 600
+"""
+
+import argparse
+import logging
+import time
+from typing import Optional, Sequence
+
+from app.config import settings
+from app.db.database import SessionLocal
+from app.services.archive import archive_batch, archive_cutoff, count_archivable
+
+
+logger = logging.getLogger("skatinov_leadlab.jobs")
+
+
+def archive_leads(
+    statuses: Sequence[str],
+    after_days: float,
+    batch_size: int,
+    pause: float = 0.0,
+    max_seconds: Optional[float] = None,
+) -> int:
+    """Перенести подходящих лидов в архив порциями; общее число перенесённых."""
+    cutoff = archive_cutoff(after_days)
+    started = time.monotonic()
+    total = 0
+    last_id = 0
+    with SessionLocal() as db:
+        while True:
+            moved = archive_batch(db, statuses, cutoff, batch_size=batch_size, after_id=last_id)
+            if not moved:
+                return total
+            total += len(moved)
+            last_id = moved[-1]
+            logger.info("leads_archive: %d leads moved (up to id=%d)", total, last_id)
+            if max_seconds is not None and time.monotonic() - started >= max_seconds:
+                logger.info("leads_archive: time limit reached, the next run moves the rest")
+                return total
+            if pause:
+                time.sleep(pause)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Перенести закрытых лидов в leads_archive")
+    parser.add_argument("--statuses", default=settings.archive_statuses, help="статусы через запятую")
+    parser.add_argument("--after-days", type=float, default=settings.archive_after_days)
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    parser.add_argument("--pause", type=float, default=settings.archive_pause, help="пауза между порциями, с")
+    parser.add_argument("--max-seconds", type=float, default=None, help="ограничение одного запуска, с")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать лидов под перенос")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    statuses = [status.strip() for status in args.statuses.split(",") if status.strip()]
+    if args.dry_run:
+        with SessionLocal() as db:
+            count = count_archivable(db, statuses, archive_cutoff(args.after_days))
+        logger.info("Leads eligible for archiving: %d", count)
+        return
+    moved = archive_leads(statuses, args.after_days, args.batch_size, args.pause, args.max_seconds)
+    logger.info("Archiving finished, %d leads moved", moved)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# app/jobs/outbox_dispatcher.py — фоновый процесс отправки событий outbox в RabbitMQ.
+
+"""
+Диспетчер outbox как отдельный процесс.
+
+Читает таблицу outbox и публикует события лидов в брокер из RABBITMQ_URL
+(exchange OUTBOX_EXCHANGE, routing key = тип события). Работает, пока не
+получит SIGINT/SIGTERM; с --once отправляет всё готовое и завершается.
+Логика прохода — в app/services/outbox_dispatcher.py.
+
+Запуск (из корня проекта):
+    python -m app.jobs.outbox_dispatcher
+    python -m app.jobs.outbox_dispatcher --once --batch-size 1000
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.config import settings
+from app.db.database import SessionLocal
+from app.services.broker import create_broker
+from app.services.outbox_dispatcher import OutboxDispatcher
+
+
+logger = logging.getLogger("skatinov_leadlab.jobs")
+
+
+async def run(once: bool, batch_size: int) -> None:
+    broker = create_broker(settings.rabbitmq_url, settings.outbox_exchange)
+    await broker.connect()
+    dispatcher = OutboxDispatcher(
+        SessionLocal,
+        broker,
+        batch_size=batch_size,
+        retry_base=settings.outbox_retry_base,
+        retry_max=settings.outbox_retry_max,
+        poll_interval=settings.outbox_poll_interval,
+    )
+    try:
+        if once:
+            published = await dispatcher.drain()
+            logger.info("Outbox drained: %d events published", published)
+            return
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        logger.info("Outbox dispatcher started (batch size %d)", batch_size)
+        await dispatcher.run(stop)
+        logger.info(
+            "Outbox dispatcher stopped: %d published, %d failed attempts",
+            dispatcher.published,
+            dispatcher.failed,
+        )
+    finally:
+        await broker.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Отправлять события лидов из outbox в брокер")
+    parser.add_argument("--once", action="store_true", help="отправить готовые события и выйти")
+    parser.add_argument("--batch-size", type=int, default=settings.outbox_batch_size)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(run(args.once, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
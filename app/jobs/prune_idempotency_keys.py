@@ -0,0 +1,54 @@
+# app/jobs/prune_idempotency_keys.py — чистка просроченных ключей Idempotency-Key.
+
+"""
+Джоба чистки idempotency_keys.
+
+Удаляет ключи с истёкшим expires_at (срок задаёт IDEMPOTENCY_KEY_TTL)
+порциями по --batch-size строк, каждая порция — отдельная короткая
+транзакция по индексу expires_at. Так чистка не держит длинных блокировок
+и не раздувает WAL одним огромным DELETE; --pause даёт базе передышку
+между порциями. Запускать по cron, например раз в час.
+
+Запуск (из корня проекта):
+    python -m app.jobs.prune_idempotency_keys --batch-size 1000 --pause 0.1
+"""
+
+import argparse
+import logging
+import time
+
+from app.config import settings
+from app.db.database import SessionLocal
+from app.services.idempotency import prune_expired_keys
+
+
+logger = logging.getLogger("skatinov_leadlab.jobs")
+
+
+def prune_idempotency_keys(batch_size: int, pause: float = 0.0) -> int:
+    """Удалить все просроченные ключи порциями; общее число удалённых строк."""
+    total = 0
+    with SessionLocal() as db:
+        while True:
+            deleted = prune_expired_keys(db, batch_size=batch_size)
+            total += deleted
+            if deleted < batch_size:
+                return total
+            logger.info("idempotency_keys: %d expired keys deleted so far", total)
+            if pause:
+                time.sleep(pause)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Удалить просроченные ключи Idempotency-Key")
+    parser.add_argument("--batch-size", type=int, default=settings.idempotency_cleanup_batch_size)
+    parser.add_argument("--pause", type=float, default=0.0, help="пауза между порциями, с")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    deleted = prune_idempotency_keys(args.batch_size, args.pause)
+    logger.info("idempotency_keys pruned: %d keys deleted", deleted)
+
+
+if __name__ == "__main__":
+    main()
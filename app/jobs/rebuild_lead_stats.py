@@ -0,0 +1,114 @@
+# app/jobs/rebuild_lead_stats.py — пересборка lead_stats с нуля (сверка счётчиков).
+
+"""
+Джоба сверки: пересчитать lead_stats по таблицам leads и leads_archive.
+
+Нужна после ручных правок в БД в обход триггеров (TRUNCATE, восстановление
+из бэкапа и т.п.) или просто для периодической проверки. Таблицы читаю порциями
+по диапазонам id, поэтому ни один запрос не строит GROUP BY по всей таблице.
+
+Чтобы пересчёт не разошёлся с параллельными записями, вся пересборка идёт
+в одной транзакции, которая сначала блокирует lead_stats: триггеры пишущих
+транзакций ждут её окончания и применяют свои дельты уже поверх новых чисел.
+Пока джоба работает, запись лидов притормаживает — запускать лучше в тихие часы.
+
+Запуск (из корня проекта):
+    python -m app.jobs.rebuild_lead_stats --batch-size 50000
+"""
+
+import argparse
+import logging
+from collections import Counter
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.models.lead import Lead
+from app.models.lead_archive import LeadArchive
+from app.models.lead_stat import EMPTY_VALUE, STATS_DIMENSIONS, LeadStat
+
+
+logger = logging.getLogger("skatinov_leadlab.jobs")
+
+
+def rebuild_lead_stats(db: Session, batch_size: int = 50_000) -> int:
+    """
+    Пересобрать lead_stats и закоммитить результат.
+
+    Возвращаю число счётчиков, которые разошлись с пересчитанными значениями
+    (0 — статистика была точной).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE lead_stats IN SHARE ROW EXCLUSIVE MODE"))
+
+    current = {
+        (dimension, value): count
+        for dimension, value, count in db.execute(
+            select(LeadStat.dimension, LeadStat.value, LeadStat.count)
+        )
+    }
+    # на SQLite первая запись берёт блокировку базы на запись до конца транзакции
+    db.execute(delete(LeadStat))
+
+    counts: Counter = Counter()
+    # счётчики считают и лидов в архиве (см. app/models/lead_stat.py)
+    for model in (Lead, LeadArchive):
+        _count_table(db, model, counts, batch_size)
+
+    if counts:
+        db.execute(
+            insert(LeadStat),
+            [
+                {"dimension": dimension, "value": value, "count": count}
+                for (dimension, value), count in sorted(counts.items())
+            ],
+        )
+    db.commit()
+
+    drift = sum(
+        1
+        for key in set(current) | set(counts)
+        if current.get(key, 0) != counts.get(key, 0)
+    )
+    return drift
+
+
+def _count_table(db: Session, model, counts: Counter, batch_size: int) -> None:
+    """Добавить в counts лидов таблицы model, читая её порциями по диапазонам id."""
+    table = model.__tablename__
+    last_id = 0
+    while True:
+        upper_id = db.scalar(
+            select(model.id).where(model.id > last_id).order_by(model.id).offset(batch_size - 1).limit(1)
+        )
+        condition = model.id > last_id
+        if upper_id is not None:
+            condition = condition & (model.id <= upper_id)
+        rows = db.execute(
+            select(model.status, model.source, model.assigned_to, func.count())
+            .where(condition)
+            .group_by(model.status, model.source, model.assigned_to)
+        )
+        for *values, count in rows:
+            for dimension, value in zip(STATS_DIMENSIONS, values):
+                counts[(dimension, EMPTY_VALUE if value is None else value)] += count
+        logger.info("lead_stats: %s counted up to id=%s", table, upper_id if upper_id is not None else "end")
+        if upper_id is None:
+            break
+        last_id = upper_id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пересобрать lead_stats из таблиц leads и leads_archive")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    with SessionLocal() as db:
+        drift = rebuild_lead_stats(db, batch_size=args.batch_size)
+    logger.info("lead_stats rebuilt, %d counters corrected", drift)
+
+
+if __name__ == "__main__":
+    main()
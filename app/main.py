@@ -1,17 +1,34 @@
 # app/main.py — точка входа FastAPI-приложения
 
-import time
-import logging
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1 import api_router as api_v1_router
 from app.config.settings import settings  # глобальные настройки проекта
+from app.core.admission import AdmissionControlMiddleware
+from app.core.metrics import render_metrics
+from app.core.middleware import RequestMetricsMiddleware
+from app.db.replicas import ReadYourWritesMiddleware, replica_set
+from app.services.changes import change_notifier
+from app.services.health import health_monitor
 
 
-logger = logging.getLogger("skatinov_leadlab")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Фоновые задачи живут столько же, сколько приложение: проверки готовности
+    и отставания реплик; слушатель ленты изменений стартует с первым подписчиком.
+    """
+    health_monitor.start()
+    replica_set.start()
+    try:
+        yield
+    finally:
+        await change_notifier.stop()
+        await replica_set.stop()
+        await health_monitor.stop()
 
 
 def create_app() -> FastAPI:
@@ -20,8 +37,12 @@ def create_app() -> FastAPI:
 
     Здесь я:
     - подтягиваю конфигурацию из settings,
-    - регистрирую middleware (логирование, CORS),
-    - подключаю версионированные роутеры /api/v1/*.
+    - регистрирую middleware (контроль допуска, read-your-writes для реплик,
+      логирование и метрики, CORS),
+    - подключаю версионированные роутеры /api/v1/*,
+    - отдаю метрики Prometheus на /metrics (если METRICS_ENABLED),
+    - в lifespan запускаю фоновые проверки готовности для /health/ready
+      и отставания реплик БД.
     """
     app = FastAPI(
         title="Skatinov LeadLab",
@@ -32,47 +53,39 @@ def create_app() -> FastAPI:
             "Серьёзный FastAPI‑проект для лидогенерации.",
         ),
         debug=getattr(settings, "DEBUG", True),
+        lifespan=lifespan,
     )
 
-    # ---------- Middleware логирования ----------
-
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        """
-        Простое HTTP‑middleware для логирования.
-
-        Я логирую:
-        - метод и путь запроса,
-        - код ответа,
-        - время обработки.
-
-        Тела запросов и ответов не читаю, чтобы не светить секреты и не замедлять обработку.
-        """
-        start_time = time.time()
-        try:
-            response = await call_next(request)
-        except Exception as exc:
-            process_time = time.time() - start_time
-            logger.exception(
-                "Unhandled error: %s %s (%.3f s)",
-                request.method,
-                request.url.path,
-                process_time,
-            )
-            return JSONResponse(
-                status_code=500,
-                content={"detail": "Internal server error"},
-            )
-
-        process_time = time.time() - start_time
-        logger.info(
-            "%s %s -> %s (%.3f s)",
-            request.method,
-            request.url.path,
-            response.status_code,
-            process_time,
+    # ---------- Контроль допуска (load shedding) ----------
+
+    # Самый внутренний слой: отказы 503/429 проходят через логирование, метрики и CORS,
+    # но до маршрута, threadpool и соединения с БД отклонённый запрос не доходит
+    if settings.admission_enabled:
+        app.add_middleware(
+            AdmissionControlMiddleware,
+            max_concurrency=settings.admission_max_concurrency,
+            route_limits=settings.admission_route_limits,
+            max_queue=settings.admission_max_queue,
+            queue_timeout=settings.admission_queue_timeout,
+            rate_limit=settings.admission_rate_limit,
+            rate_burst=settings.admission_rate_burst,
+            api_key_header=settings.admission_api_key_header,
+            exempt_paths=settings.admission_exempt_paths,
+            retry_after=settings.admission_retry_after,
         )
-        return response
+
+    # ---------- Read-your-writes для реплик БД ----------
+
+    # Нужно только при заданных DATABASE_REPLICA_URLS: после коммита на primary
+    # ставит cookie, по которой чтения клиента какое-то время идут на primary
+    if replica_set:
+        app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=settings.replica_sticky_seconds)
+
+    # ---------- Middleware логирования и метрик ----------
+
+    # Добавляю до CORS: add_middleware ставит новое middleware снаружи,
+    # так что CORS остаётся внешним слоем, а контроль допуска — внутренним
+    app.add_middleware(RequestMetricsMiddleware, metrics_enabled=settings.metrics_enabled)
 
     # ---------- CORS для фронтенда ----------
 
@@ -95,6 +108,16 @@ def create_app() -> FastAPI:
     # Подключаю роутер версии API v1 с префиксом /api/v1
     app.include_router(api_v1_router, prefix="/api/v1")
 
+    # ---------- Метрики Prometheus ----------
+
+    if settings.metrics_enabled:
+
+        @app.get("/metrics", include_in_schema=False)
+        def metrics():
+            """Метрики в текстовом формате Prometheus (для всех воркеров в multiprocess-режиме)."""
+            body, content_type = render_metrics()
+            return Response(content=body, media_type=content_type)
+
     return app
 
 
@@ -0,0 +1,55 @@
+"""
+Ключи идемпотентности для создания лидов (заголовок Idempotency-Key).
+
+Вебхуки партнёров агрессивно повторяют запрос по таймауту, и каждый повтор
+POST /leads создавал дубль лида. Теперь клиент может прислать ключ: первая
+попытка вставляет строку сюда в той же транзакции, что и лида, и перед
+коммитом записывает в неё готовый ответ. Повтор с тем же ключом получает
+сохранённый ответ и не трогает таблицу leads.
+
+Одновременные дубли сериализуются уникальным ограничением (scope, key):
+вторая вставка ждёт завершения транзакции первой и затем видит её строку
+(блокировок в коде нет). Ключ живёт до expires_at, просроченные строки
+удаляет джоба app/jobs/prune_idempotency_keys.py.
+"""
+
+from sqlalchemy import BigInteger, Column, Index, Integer, LargeBinary, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+from app.models.lead import Timestamp
+
+
+# Области ключей: один и тот же ключ для разных эндпоинтов — разные записи
+SCOPE_LEAD_CREATE = "lead.create"
+SCOPE_LEAD_BULK = "lead.bulk"
+
+
+class IdempotencyKey(Base):
+    """Ключ идемпотентности и сохранённый ответ на первый запрос с ним."""
+
+    __tablename__ = "idempotency_keys"
+
+    # Суррогатный ключ — по нему джоба чистки удаляет строки порциями
+    id = Column(BigInteger().with_variant(Integer(), "sqlite"), primary_key=True, autoincrement=True)
+
+    # Эндпоинт (SCOPE_*) и ключ из заголовка Idempotency-Key
+    scope = Column(String(50), nullable=False)
+    key = Column(String(255), nullable=False)
+
+    # sha256 тела запроса: тот же ключ с другим телом — ошибка клиента
+    request_hash = Column(String(64), nullable=False)
+
+    # Сохранённый ответ (пусто, пока транзакция первого запроса не дошла до коммита)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+
+    created_at = Column(Timestamp, nullable=False, server_default=func.now())
+
+    # После этого момента ключ можно использовать заново, строку удалит джоба
+    expires_at = Column(Timestamp, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
@@ -6,17 +6,31 @@
 - источник (откуда пришёл лид: сайт, реклама, офлайн);
 - статус (новый, в работе, завершён и т.д.);
 - ответственный менеджер;
-- даты создания и обновления записи.
+- даты создания и обновления записи;
+- номер версии записи (для ETag и If-Match).
 """
 
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, DDL, Integer, String, DateTime, Index, event
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 
 from app.db.database import Base
 
 
+# SQLite хранит CURRENT_TIMESTAMP строкой "YYYY-MM-DD HH:MM:SS" без микросекунд,
+# а SQLAlchemy по умолчанию пишет параметры с микросекундами. Строки сравниваются
+# посимвольно, поэтому значение, прочитанное из БД, переставало быть равным самому себе
+# в WHERE (это ломает keyset-курсоры). Привожу формат параметров к формату БД.
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d",
+    ),
+    "sqlite",
+)
+
+
 class Lead(Base):
     """Модель лида. Каждая запись — один потенциальный клиент."""
 
@@ -42,15 +56,50 @@ class Lead(Base):
 
     # Время создания записи
     created_at = Column(
-        DateTime(timezone=True),
+        Timestamp,
         nullable=False,
         server_default=func.now(),
     )
 
     # Время последнего обновления записи
     updated_at = Column(
-        DateTime(timezone=True),
+        Timestamp,
         nullable=False,
         server_default=func.now(),
         onupdate=func.now(),
     )
+
+    # Номер версии: 1 у нового лида, каждый UPDATE прибавляет единицу.
+    # updated_at для этого не годится — на SQLite у него точность до секунды
+    version = Column(Integer, nullable=False, server_default="1")
+
+    __table_args__ = (
+        # Индексы под keyset-пагинацию: сортировка по дате + id как тай-брейкер
+        Index("ix_leads_created_at_id", "created_at", "id"),
+        Index("ix_leads_updated_at_id", "updated_at", "id"),
+        # Составные индексы под фильтры списка: равенства, затем дата сортировки и id
+        Index("ix_leads_assigned_status_created", "assigned_to", "status", "created_at", "id"),
+        Index("ix_leads_status_updated", "status", "updated_at", "id"),
+        Index("ix_leads_source_created", "source", "created_at", "id"),
+        # На SQLite без AUTOINCREMENT id самого нового лида после его удаления
+        # или переноса в архив выдаётся заново — и сталкивается с leads_archive,
+        # надгробиями и событиями outbox. На Postgres id и так из последовательности
+        {"sqlite_autoincrement": True},
+    )
+
+
+# Канал LISTEN/NOTIFY ленты изменений лидов (см. app/services/changes.py).
+# Триггер уровня оператора шлёт пустое уведомление на каждую вставку и изменение;
+# одинаковые уведомления одной транзакции Postgres доставляет один раз
+LEAD_CHANGES_CHANNEL = "lead_changes"
+
+PG_CHANGES_DDL = (
+    "CREATE OR REPLACE FUNCTION lead_changes_notify() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    f"BEGIN PERFORM pg_notify('{LEAD_CHANGES_CHANNEL}', ''); RETURN NULL; END $$",
+    "DROP TRIGGER IF EXISTS trg_lead_changes_notify ON leads",
+    "CREATE TRIGGER trg_lead_changes_notify AFTER INSERT OR UPDATE ON leads "
+    "FOR EACH STATEMENT EXECUTE FUNCTION lead_changes_notify()",
+)
+
+for _ddl in PG_CHANGES_DDL:
+    event.listen(Lead.__table__, "after_create", DDL(_ddl).execute_if(dialect="postgresql"))
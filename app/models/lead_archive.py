@@ -0,0 +1,46 @@
+"""
+Архив закрытых лидов.
+
+Выигранные и проигранные лиды (won/lost) каждый день почти никто не читает,
+но в leads они остаются навсегда и раздувают все её индексы: страницы
+списка, COUNT(*) и вставки вебхуков платят за строки, которые не нужны.
+Джоба app/jobs/archive_leads.py переносит сюда закрытые лиды старше
+ARCHIVE_AFTER_DAYS — порциями, каждая порция в своей транзакции.
+
+Строка архива — та же карточка лида с тем же id и момент переноса. id
+не пересекаются, потому что leads никогда не выдаёт id повторно: на Postgres
+он берётся из последовательности, на SQLite таблица leads объявлена
+с AUTOINCREMENT (без него SQLite снова выдал бы id последнего лида после его
+переноса в архив).
+Индексов, кроме первичного ключа, нет: архив читается только по id
+(get_lead ищет лида сначала в leads, затем здесь) и почти не пишется.
+Архивные лиды только читаются: PATCH/PUT отвечают на них 409, а DELETE
+удаляет лида из архива (см. app/services/archive.py).
+"""
+
+from sqlalchemy import Column, Integer, String
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+from app.models.lead import Timestamp
+
+
+class LeadArchive(Base):
+    """Перенесённый в архив лид (колонки — как у Lead, плюс archived_at)."""
+
+    __tablename__ = "leads_archive"
+
+    # id лида из leads — не генерируется заново
+    id = Column(Integer, primary_key=True, autoincrement=False)
+
+    name = Column(String(200), nullable=False)
+    email = Column(String(255), nullable=False)
+    status = Column(String(50), nullable=False)
+    source = Column(String(100), nullable=True)
+    assigned_to = Column(String(100), nullable=True)
+    created_at = Column(Timestamp, nullable=False)
+    updated_at = Column(Timestamp, nullable=False)
+    version = Column(Integer, nullable=False, server_default="1")
+
+    # Когда лид перенесён в архив
+    archived_at = Column(Timestamp, nullable=False, server_default=func.now())
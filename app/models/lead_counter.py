@@ -0,0 +1,42 @@
+"""
+Счётчики строк, которые поддерживает сама база.
+
+На SQLite нет статистики планировщика, по которой можно быстро оценить размер
+таблицы, поэтому число лидов я держу в отдельной строке lead_counters,
+а обновляют её триггеры на INSERT/DELETE в leads — в той же транзакции, что и запись.
+
+На Postgres таблица тоже создаётся, но триггеров там нет: одна «горячая» строка
+счётчика стала бы точкой конкуренции для всех пишущих транзакций, а оценку
+там дают pg_class.reltuples и EXPLAIN.
+"""
+
+from sqlalchemy import Column, BigInteger, DDL, String, event
+
+from app.db.database import Base
+
+
+LEADS_COUNTER = "leads"
+
+
+class LeadCounter(Base):
+    """Именованный счётчик (сейчас один — общее число лидов)."""
+
+    __tablename__ = "lead_counters"
+
+    # Имя счётчика
+    name = Column(String(50), primary_key=True)
+
+    # Текущее значение
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+# Триггеры и начальное значение счётчика для SQLite. Вешаю на metadata, а не на
+# таблицу: к этому моменту create_all уже создал и leads, и lead_counters.
+for _ddl in (
+    "INSERT OR IGNORE INTO lead_counters (name, value) SELECT 'leads', count(*) FROM leads",
+    "CREATE TRIGGER IF NOT EXISTS trg_leads_counter_insert AFTER INSERT ON leads "
+    "BEGIN UPDATE lead_counters SET value = value + 1 WHERE name = 'leads'; END",
+    "CREATE TRIGGER IF NOT EXISTS trg_leads_counter_delete AFTER DELETE ON leads "
+    "BEGIN UPDATE lead_counters SET value = value - 1 WHERE name = 'leads'; END",
+):
+    event.listen(Base.metadata, "after_create", DDL(_ddl).execute_if(dialect="sqlite"))
@@ -0,0 +1,68 @@
+"""
+Поисковые структуры для подстрочного поиска лидов по имени и email.
+
+B-tree индексы ix_leads_name/ix_leads_email не помогают запросам вида
+ILIKE '%фрагмент%', поэтому поиск опирается на триграммы:
+- Postgres — GIN-индексы pg_trgm по name и email (обслуживают и ILIKE,
+  и нечёткое сравнение оператором %);
+- SQLite — теневая FTS5-таблица leads_fts с токенайзером trigram, которую
+  синхронизируют триггеры на leads.
+
+Это не ORM-модели: DDL вешается на metadata (как счётчик в lead_counter.py),
+а Alembic-миграция 7d2f4a6c8b10 повторяет его для рабочих баз.
+"""
+
+from sqlalchemy import DDL, event
+
+from app.db.database import Base
+
+
+LEADS_FTS_TABLE = "leads_fts"
+
+# Имена триграммных индексов Postgres — их нет в metadata, и Alembic
+# не должен предлагать их удалить (см. include_object в migrations/env.py)
+PG_TRGM_INDEXES = ("ix_leads_name_trgm", "ix_leads_email_trgm")
+
+# На Postgres расширение pg_trgm может быть недоступно (урезанная сборка,
+# managed-база без прав на CREATE EXTENSION) — тогда индексы не создаю,
+# а поиск работает через ILIKE без индекса (см. app/services/search.py).
+PG_TRGM_DDL = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS ix_leads_name_trgm ON leads USING gin (name gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS ix_leads_email_trgm ON leads USING gin (email gin_trgm_ops);
+    ELSE
+        RAISE NOTICE 'pg_trgm недоступно: поиск лидов будет работать без индекса';
+    END IF;
+END
+$$
+"""
+
+SQLITE_FTS_DDL = (
+    # external content: текст хранится только в leads, в leads_fts — лишь индекс
+    "CREATE VIRTUAL TABLE IF NOT EXISTS leads_fts USING fts5("
+    "name, email, content='leads', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS trg_leads_fts_insert AFTER INSERT ON leads BEGIN "
+    "INSERT INTO leads_fts (rowid, name, email) VALUES (new.id, new.name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS trg_leads_fts_delete AFTER DELETE ON leads BEGIN "
+    "INSERT INTO leads_fts (leads_fts, rowid, name, email) "
+    "VALUES ('delete', old.id, old.name, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS trg_leads_fts_update AFTER UPDATE OF name, email ON leads BEGIN "
+    "INSERT INTO leads_fts (leads_fts, rowid, name, email) "
+    "VALUES ('delete', old.id, old.name, old.email); "
+    "INSERT INTO leads_fts (rowid, name, email) VALUES (new.id, new.name, new.email); END",
+    # проиндексировать строки, которые уже есть в leads
+    "INSERT INTO leads_fts (leads_fts) VALUES ('rebuild')",
+)
+
+
+def is_search_object(name: str) -> bool:
+    """Объект БД относится к поиску (FTS5-таблица с теневыми таблицами или trgm-индекс)."""
+    return name.startswith(LEADS_FTS_TABLE) or name in PG_TRGM_INDEXES
+
+
+event.listen(Base.metadata, "after_create", DDL(PG_TRGM_DDL).execute_if(dialect="postgresql"))
+for _ddl in SQLITE_FTS_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_ddl).execute_if(dialect="sqlite"))
@@ -0,0 +1,146 @@
+"""
+Сводная статистика лидов для дашборда воронки.
+
+Таблица lead_stats хранит готовые счётчики лидов по статусу, источнику и
+ответственному менеджеру: одна строка — одно значение одного измерения.
+GROUP BY по всей таблице leads на каждое обновление дашборда слишком дорог,
+поэтому счётчики поддерживаются инкрементально — триггерами на leads,
+в той же транзакции, что и сама запись (create/update/delete, пакетная
+загрузка, любые будущие массовые операции).
+
+- SQLite: построчные триггеры с UPSERT (писатель в SQLite один, гонок нет).
+- Postgres: триггеры на уровне оператора с transition-таблицами. Дельты
+  одного оператора сворачиваются в одну вставку ON CONFLICT, а строки
+  счётчиков блокируются в порядке (dimension, value), поэтому конкурентные
+  писатели не теряют обновления. Строка популярного значения (например,
+  status=new) становится точкой сериализации пишущих транзакций — это
+  цена точных счётчиков без GROUP BY.
+
+Счётчики считают и архивных лидов (leads_archive, см. app/models/lead_archive.py):
+такие же триггеры висят на архиве, поэтому перенос лида в архив (DELETE из
+leads + INSERT в архив в одной транзакции) воронку на дашборде не меняет.
+
+Пустое значение измерения (лид без источника или менеджера) хранится как ''
+— колонка value входит в первичный ключ. Полностью пересобрать таблицу
+можно джобой app/jobs/rebuild_lead_stats.py.
+"""
+
+from sqlalchemy import BigInteger, Column, DDL, String, event
+
+from app.db.database import Base
+from app.models import lead_archive  # noqa: F401  # триггеры ниже висят и на leads_archive
+
+
+# Измерения статистики — колонки leads, по которым считаются счётчики
+STATS_DIMENSIONS = ("status", "source", "assigned_to")
+
+# Чем в lead_stats заменяется NULL (value входит в первичный ключ)
+EMPTY_VALUE = ""
+
+
+class LeadStat(Base):
+    """Счётчик лидов для одного значения одного измерения."""
+
+    __tablename__ = "lead_stats"
+
+    # Измерение: status, source или assigned_to
+    dimension = Column(String(20), primary_key=True)
+
+    # Значение измерения ('' — не задано)
+    value = Column(String(100), primary_key=True)
+
+    # Сколько лидов сейчас имеют это значение
+    count = Column(BigInteger, nullable=False, default=0)
+
+
+def _sqlite_upsert(row: str, delta: int) -> str:
+    """UPSERT дельты по всем измерениям для строки new/old в триггере SQLite."""
+    values = ", ".join(
+        f"('{dim}', coalesce({row}.{dim}, ''), {delta})" for dim in STATS_DIMENSIONS
+    )
+    return (
+        f"INSERT INTO lead_stats (dimension, value, count) VALUES {values} "
+        "ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count;"
+    )
+
+
+SQLITE_STATS_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS trg_lead_stats_insert AFTER INSERT ON leads "
+    f"BEGIN {_sqlite_upsert('new', 1)} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_lead_stats_delete AFTER DELETE ON leads "
+    f"BEGIN {_sqlite_upsert('old', -1)} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_lead_stats_update "
+    "AFTER UPDATE OF status, source, assigned_to ON leads "
+    f"BEGIN {_sqlite_upsert('old', -1)} {_sqlite_upsert('new', 1)} END",
+)
+
+
+def _pg_apply(changed: str) -> str:
+    """Свернуть дельты изменённых строк и применить их к lead_stats одним оператором."""
+    dimensions = ", ".join(
+        f"('{dim}', coalesce(changed.{dim}, ''))" for dim in STATS_DIMENSIONS
+    )
+    return (
+        "INSERT INTO lead_stats (dimension, value, count) "
+        "SELECT d.dimension, d.value, sum(changed.delta) "
+        f"FROM ({changed}) AS changed "
+        f"CROSS JOIN LATERAL (VALUES {dimensions}) AS d(dimension, value) "
+        "GROUP BY d.dimension, d.value "
+        "HAVING sum(changed.delta) <> 0 "
+        "ORDER BY d.dimension, d.value "
+        "ON CONFLICT (dimension, value) DO UPDATE SET count = lead_stats.count + EXCLUDED.count;"
+    )
+
+
+_PG_NEW_ROWS = "SELECT status, source, assigned_to, 1 AS delta FROM new_rows"
+_PG_OLD_ROWS = "SELECT status, source, assigned_to, -1 AS delta FROM old_rows"
+
+PG_STATS_DDL = (
+    "CREATE OR REPLACE FUNCTION lead_stats_apply() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    "BEGIN "
+    f"IF TG_OP = 'INSERT' THEN {_pg_apply(_PG_NEW_ROWS)} "
+    f"ELSIF TG_OP = 'DELETE' THEN {_pg_apply(_PG_OLD_ROWS)} "
+    f"ELSE {_pg_apply(_PG_NEW_ROWS + ' UNION ALL ' + _PG_OLD_ROWS)} "
+    "END IF; "
+    "RETURN NULL; "
+    "END $$",
+    "DROP TRIGGER IF EXISTS trg_lead_stats_insert ON leads",
+    "CREATE TRIGGER trg_lead_stats_insert AFTER INSERT ON leads "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION lead_stats_apply()",
+    "DROP TRIGGER IF EXISTS trg_lead_stats_update ON leads",
+    "CREATE TRIGGER trg_lead_stats_update AFTER UPDATE ON leads "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION lead_stats_apply()",
+    "DROP TRIGGER IF EXISTS trg_lead_stats_delete ON leads",
+    "CREATE TRIGGER trg_lead_stats_delete AFTER DELETE ON leads "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION lead_stats_apply()",
+)
+
+
+# Архив: строки в нём только появляются и исчезают (перенос и возврат)
+SQLITE_ARCHIVE_STATS_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS trg_lead_archive_stats_insert AFTER INSERT ON leads_archive "
+    f"BEGIN {_sqlite_upsert('new', 1)} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_lead_archive_stats_delete AFTER DELETE ON leads_archive "
+    f"BEGIN {_sqlite_upsert('old', -1)} END",
+)
+
+PG_ARCHIVE_STATS_DDL = (
+    "DROP TRIGGER IF EXISTS trg_lead_archive_stats_insert ON leads_archive",
+    "CREATE TRIGGER trg_lead_archive_stats_insert AFTER INSERT ON leads_archive "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION lead_stats_apply()",
+    "DROP TRIGGER IF EXISTS trg_lead_archive_stats_delete ON leads_archive",
+    "CREATE TRIGGER trg_lead_archive_stats_delete AFTER DELETE ON leads_archive "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION lead_stats_apply()",
+)
+
+
+# Триггеры вешаю на metadata: к этому моменту create_all создал leads, leads_archive и lead_stats
+for _ddl in SQLITE_STATS_DDL + SQLITE_ARCHIVE_STATS_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_ddl).execute_if(dialect="sqlite"))
+for _ddl in PG_STATS_DDL + PG_ARCHIVE_STATS_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_ddl).execute_if(dialect="postgresql"))
@@ -0,0 +1,95 @@
+"""
+Надгробия лидов для ленты изменений.
+
+Лента /leads/changes читает строки leads, поэтому удалённый или перенесённый
+в архив лид из неё просто пропадал — потребитель ленты об этом не узнавал.
+Теперь каждый уход строки из leads оставляет здесь запись: id лида, момент
+и причина (deleted — удалён, archived — перенесён в leads_archive и по-прежнему
+читается через GET /leads/{id}). Лента отдаёт их в поле removed.
+
+Пишет надгробия триггер AFTER DELETE на leads, в той же транзакции, что и
+удаление, — так их не пропустит ни delete_lead, ни джоба архивации, ни
+ручной DELETE. Причину триггер узнаёт по leads_archive: архивация вставляет
+строку в архив до удаления из leads. Такой же триггер висит на leads_archive:
+удалённый из архива лид (DELETE /leads/{id}) меняет причину на deleted.
+
+removed_at ставится временем транзакции, как updated_at лидов, и лента
+читает надгробия тем же курсором (время, id).
+"""
+
+from sqlalchemy import Column, DDL, Index, Integer, String, event
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+from app.models import lead_archive  # noqa: F401  # триггер ниже смотрит в leads_archive
+from app.models.lead import Timestamp
+
+
+# Причины ухода лида из leads
+REMOVED_DELETED = "deleted"
+REMOVED_ARCHIVED = "archived"
+
+
+class LeadTombstone(Base):
+    """Лид, которого больше нет в leads."""
+
+    __tablename__ = "lead_tombstones"
+
+    # id лида из leads — не генерируется заново
+    id = Column(Integer, primary_key=True, autoincrement=False)
+
+    # Когда лид ушёл из leads (время транзакции)
+    removed_at = Column(Timestamp, nullable=False, server_default=func.now())
+
+    # REMOVED_DELETED или REMOVED_ARCHIVED
+    reason = Column(String(20), nullable=False)
+
+    __table_args__ = (
+        # Keyset ленты изменений: (removed_at, id), как (updated_at, id) у leads
+        Index("ix_lead_tombstones_removed_at_id", "removed_at", "id"),
+    )
+
+
+def _reason(row: str) -> str:
+    return (
+        f"CASE WHEN EXISTS (SELECT 1 FROM leads_archive WHERE leads_archive.id = {row}.id) "
+        f"THEN '{REMOVED_ARCHIVED}' ELSE '{REMOVED_DELETED}' END"
+    )
+
+
+SQLITE_TOMBSTONE_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS trg_lead_tombstones AFTER DELETE ON leads "
+    f"BEGIN INSERT OR REPLACE INTO lead_tombstones (id, reason) VALUES (old.id, {_reason('old')}); END",
+    "CREATE TRIGGER IF NOT EXISTS trg_lead_archive_tombstones AFTER DELETE ON leads_archive "
+    f"BEGIN INSERT OR REPLACE INTO lead_tombstones (id, reason) VALUES (old.id, {_reason('old')}); END",
+)
+
+# На Postgres — триггер уровня оператора: одна вставка на порцию архивации
+PG_TOMBSTONE_DDL = (
+    "CREATE OR REPLACE FUNCTION lead_tombstones_add() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    "BEGIN "
+    f"INSERT INTO lead_tombstones (id, reason) SELECT old_rows.id, {_reason('old_rows')} "
+    "FROM old_rows ORDER BY old_rows.id "
+    "ON CONFLICT (id) DO UPDATE SET removed_at = EXCLUDED.removed_at, reason = EXCLUDED.reason; "
+    "RETURN NULL; "
+    "END $$",
+    "DROP TRIGGER IF EXISTS trg_lead_tombstones ON leads",
+    "CREATE TRIGGER trg_lead_tombstones AFTER DELETE ON leads "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION lead_tombstones_add()",
+    # удалённых строк архива функция в leads_archive уже не видит — причина deleted
+    "DROP TRIGGER IF EXISTS trg_lead_archive_tombstones ON leads_archive",
+    "CREATE TRIGGER trg_lead_archive_tombstones AFTER DELETE ON leads_archive "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION lead_tombstones_add()",
+    # надгробие — тоже изменение ленты: будит её слушателей (см. app/services/changes.py)
+    "DROP TRIGGER IF EXISTS trg_lead_tombstones_notify ON lead_tombstones",
+    "CREATE TRIGGER trg_lead_tombstones_notify AFTER INSERT OR UPDATE ON lead_tombstones "
+    "FOR EACH STATEMENT EXECUTE FUNCTION lead_changes_notify()",
+)
+
+# Вешаю на metadata: к этому моменту create_all создал leads, leads_archive и эту таблицу
+for _ddl in SQLITE_TOMBSTONE_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_ddl).execute_if(dialect="sqlite"))
+for _ddl in PG_TOMBSTONE_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_ddl).execute_if(dialect="postgresql"))
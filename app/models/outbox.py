@@ -0,0 +1,53 @@
+"""
+Transactional outbox: события по лидам, которые ещё не ушли в брокер.
+
+Сервисы лидов пишут строку сюда в той же транзакции, что и сам лид, поэтому
+событие не теряется и не публикуется для откатившейся записи. Диспетчер
+(app/jobs/outbox_dispatcher.py) читает таблицу по порядку id, публикует
+события в RabbitMQ и удаляет опубликованные строки — в таблице живут только
+ожидающие отправки события.
+
+Порядок событий одного лида совпадает с порядком id: запись события идёт после
+записи самого лида, а конкурентные изменения одного лида сериализуются
+блокировкой его строки.
+"""
+
+from sqlalchemy import JSON, BigInteger, Column, Integer, String, Text
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+from app.models.lead import Timestamp
+
+
+# Типы событий (они же routing key в брокере)
+LEAD_CREATED = "lead.created"
+LEAD_UPDATED = "lead.updated"
+LEAD_DELETED = "lead.deleted"
+
+
+class OutboxEvent(Base):
+    """Событие, ожидающее публикации в брокер."""
+
+    __tablename__ = "outbox"
+
+    # Порядковый номер события (SQLite автоинкрементит только INTEGER PRIMARY KEY)
+    id = Column(BigInteger().with_variant(Integer(), "sqlite"), primary_key=True, autoincrement=True)
+
+    # ID лида, к которому относится событие
+    aggregate_id = Column(Integer, nullable=False)
+
+    # Тип события: lead.created, lead.updated или lead.deleted
+    event_type = Column(String(50), nullable=False)
+
+    # Тело события (JSON)
+    payload = Column(JSON, nullable=False)
+
+    # Когда событие записано
+    created_at = Column(Timestamp, nullable=False, server_default=func.now())
+
+    # Неудачные попытки публикации и время следующей (бэкофф)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(Timestamp, nullable=True)
+
+    # Текст последней ошибки публикации
+    last_error = Column(Text, nullable=True)
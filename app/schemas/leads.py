@@ -2,9 +2,36 @@
 
 """Схемы Pydantic для лидов — валидация входных/выходных данных."""
 
-from pydantic import BaseModel, Field
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Any, Optional
+from datetime import datetime, timezone
+from enum import Enum
+
+
+class LeadSortField(str, Enum):
+    """Поля, по которым можно стабильно сортировать список лидов."""
+    ID = "id"
+    CREATED_AT = "created_at"
+    UPDATED_AT = "updated_at"
+
+
+class SortOrder(str, Enum):
+    """Направление сортировки."""
+    ASC = "asc"
+    DESC = "desc"
+
+
+class CountStrategy(str, Enum):
+    """Как считать total в списке лидов."""
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+    NONE = "none"
+
+
+class ExportFormat(str, Enum):
+    """Формат потоковой выгрузки лидов."""
+    CSV = "csv"
+    NDJSON = "ndjson"
 
 
 class LeadCreate(BaseModel):
@@ -35,12 +62,160 @@ class LeadOut(BaseModel):
     assigned_to: Optional[str]
     created_at: datetime
     updated_at: datetime
+    version: int
 
     class Config:
         from_attributes = True  # для совместимости с SQLAlchemy
 
 
+class LeadFilters(BaseModel):
+    """
+    Фильтры списка лидов (query-параметры GET /leads).
+
+    Все фильтры необязательны и объединяются через AND.
+    Диапазоны дат полуоткрытые: from включительно, to — не включая.
+    """
+    status: Optional[str] = Field(None, max_length=50, description="Статус лида")
+    source: Optional[str] = Field(None, max_length=100, description="Источник лида")
+    assigned_to: Optional[str] = Field(None, max_length=100, description="Ответственный менеджер")
+    created_from: Optional[datetime] = Field(None, description="created_at >= created_from")
+    created_to: Optional[datetime] = Field(None, description="created_at < created_to")
+    updated_from: Optional[datetime] = Field(None, description="updated_at >= updated_from")
+    updated_to: Optional[datetime] = Field(None, description="updated_at < updated_to")
+
+    @field_validator("created_from", "created_to", "updated_from", "updated_to")
+    @classmethod
+    def to_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        """
+        Привести дату с часовым поясом к UTC.
+
+        В SQLite даты лежат строками в UTC без пояса, и сравнение идёт посимвольно,
+        поэтому 12:00+03:00 нужно превратить в 09:00 до того, как оно попадёт в запрос.
+        Дата без пояса считается UTC.
+        """
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value
+
+
+class LeadBulkFilter(LeadFilters):
+    """
+    Какие лиды менять в POST /leads/bulk-update: фильтры списка и/или список ID.
+
+    Условия объединяются через AND, как у фильтров списка.
+    """
+    ids: Optional[list[int]] = Field(None, min_length=1, description="Только лиды с этими ID")
+
+
+class LeadBulkUpdate(BaseModel):
+    """Массовое изменение лидов: фильтр и патч (поля как в PATCH /leads/{id})."""
+    filter: LeadBulkFilter
+    patch: LeadUpdate
+
+    @model_validator(mode="after")
+    def check_not_empty(self) -> "LeadBulkUpdate":
+        """Пустой фильтр изменил бы всех лидов, а пустой патч — никого; оба отклоняю."""
+        if not self.filter.model_dump(exclude_none=True):
+            raise ValueError("Пустой фильтр: укажите ids или хотя бы одно условие")
+        if not self.patch.model_dump(exclude_unset=True):
+            raise ValueError("Пустой патч: нечего менять")
+        return self
+
+
+class LeadBulkUpdateResult(BaseModel):
+    """Итог массового изменения лидов."""
+    updated: int = Field(..., description="Сколько лидов изменено (при dry_run — изменилось бы)")
+    chunks: int = Field(..., description="Сколько порций (транзакций) понадобилось")
+    dry_run: bool = False
+
+
 class LeadList(BaseModel):
     """Схема для списка лидов."""
     leads: list[LeadOut]
+    total: Optional[int] = Field(
+        ...,
+        description="Общее число лидов (None при total_strategy=none)",
+    )
+    total_strategy: CountStrategy = Field(
+        CountStrategy.EXACT,
+        description="Стратегия, которой получен total",
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Курсор следующей страницы (None, если страница последняя)",
+    )
+
+
+class LeadSearchResult(BaseModel):
+    """Результат поиска лидов по фрагменту имени или email (лучшие совпадения первыми)."""
+    query: str
+    leads: list[LeadOut]
+
+
+class LeadBatchGet(BaseModel):
+    """Запрос пакетного чтения лидов по ID (POST /leads/batch-get)."""
+    ids: list[int] = Field(..., min_length=1, description="ID лидов; порядок ответа — как здесь")
+
+
+class LeadBatch(BaseModel):
+    """Лиды по списку ID в порядке запроса и ID, которых нет."""
+    leads: list[LeadOut]
+    missing: list[int] = Field(
+        default_factory=list,
+        description="ID из запроса, для которых лид не найден (в порядке запроса)",
+    )
+
+
+class LeadRemoved(BaseModel):
+    """Лид, которого больше нет в списке: удалён или перенесён в архив."""
+    id: int
+    removed_at: datetime
+    reason: str = Field(
+        description="deleted — лид удалён; archived — перенесён в архив (читается через GET /leads/{id})",
+    )
+
+
+class LeadChanges(BaseModel):
+    """Порция ленты изменений лидов в порядке (updated_at, id)."""
+    leads: list[LeadOut]
+    removed: list[LeadRemoved] = Field(
+        default_factory=list,
+        description="Лиды, удалённые или перенесённые в архив (по моменту ухода из списка)",
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Курсор для продолжения ленты (since следующего запроса)",
+    )
+    has_more: bool = Field(
+        False,
+        description="За этой порцией уже есть изменения — запросить сразу, не дожидаясь новых",
+    )
+
+
+class LeadStatsBucket(BaseModel):
+    """Число лидов с одним значением измерения (value=None — значение не задано)."""
+    value: Optional[str]
+    count: int
+
+
+class LeadStats(BaseModel):
+    """Сводка для дашборда воронки: счётчики по статусу, источнику и менеджеру."""
     total: int
+    status: list[LeadStatsBucket]
+    source: list[LeadStatsBucket]
+    assigned_to: list[LeadStatsBucket]
+
+
+class LeadBulkItemResult(BaseModel):
+    """Результат по одному элементу пакетной загрузки."""
+    index: int = Field(..., description="Позиция элемента во входном массиве/NDJSON")
+    ok: bool
+    lead: Optional[LeadOut] = None
+    errors: Optional[list[dict[str, Any]]] = None
+
+
+class LeadBulkResult(BaseModel):
+    """Итог пакетной загрузки лидов (частичные ошибки не отменяют остальные элементы)."""
+    created: int
+    failed: int
+    results: list[LeadBulkItemResult]
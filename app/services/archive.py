@@ -0,0 +1,143 @@
+# app/services/archive.py — перенос закрытых лидов в leads_archive.
+
+"""
+Архивация закрытых лидов (см. app/models/lead_archive.py).
+
+Порция переноса — одна транзакция из двух операторов:
+INSERT INTO leads_archive SELECT … FROM leads WHERE <статус закрытый и лид
+давно не менялся> ORDER BY id LIMIT n FOR UPDATE SKIP LOCKED RETURNING id,
+затем DELETE из leads по вернувшимся id. Лид в любой момент лежит ровно
+в одной из таблиц, поэтому после сбоя джобу можно просто запустить снова:
+перенесённые порции из выборки пропали, и она продолжит с оставшихся.
+Строки, занятые чужой транзакцией (SKIP LOCKED на Postgres), перенос не
+ждёт — их заберёт следующая порция или следующий запуск.
+
+Из архива лидов читают get_lead и пакетное чтение get_leads_by_ids:
+lead_or_archived() и leads_or_archived() ищут id и в leads, и в архиве,
+и всё это одним запросом.
+
+Архивный лид закрыт для изменений: PATCH/PUT отвечают на него 409
+(LeadArchived), а не 404 — GET ведь его отдаёт. Вернуть лида в работу
+можно только новым лидом. DELETE же удаляет его и из архива
+(delete_archived): удаление — единственная запись, которой архиву не нужно.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+
+from sqlalchemy import Select, delete, func, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+from app.models.lead import Lead
+from app.models.lead_archive import LeadArchive
+from app.services.counting import lead_count_cache
+
+
+class LeadArchived(Exception):
+    """Лид перенесён в архив: изменять его нельзя."""
+
+
+# Колонки карточки лида — общие у leads и leads_archive, в порядке Lead
+LEAD_COLUMNS: tuple[str, ...] = tuple(column.name for column in Lead.__table__.c)
+
+
+def archive_cutoff(after_days: float, now: Optional[datetime] = None) -> datetime:
+    """Момент (UTC), раньше которого закрытый лид должен был измениться в последний раз."""
+    return (now or datetime.now(timezone.utc)) - timedelta(days=after_days)
+
+
+def _archivable(statuses: Sequence[str], cutoff: datetime) -> list:
+    return [Lead.status.in_(statuses), Lead.updated_at < cutoff]
+
+
+def count_archivable(db: Session, statuses: Sequence[str], cutoff: datetime) -> int:
+    """Сколько лидов сейчас подходит под перенос (для --dry-run)."""
+    return db.scalar(select(func.count()).select_from(Lead).where(*_archivable(statuses, cutoff)))
+
+
+def archive_batch(
+    db: Session,
+    statuses: Sequence[str],
+    cutoff: datetime,
+    batch_size: int = 1000,
+    after_id: int = 0,
+) -> list[int]:
+    """
+    Перенести одну порцию лидов с id > after_id в архив и закоммитить.
+
+    Возвращает id перенесённых лидов (пустой список — переносить больше нечего).
+    """
+    candidates = (
+        select(*(getattr(Lead, name) for name in LEAD_COLUMNS))
+        .where(*_archivable(statuses, cutoff), Lead.id > after_id)
+        .order_by(Lead.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    moved = db.scalars(
+        insert(LeadArchive).from_select(LEAD_COLUMNS, candidates).returning(LeadArchive.id)
+    ).all()
+    if moved:
+        db.execute(
+            delete(Lead)
+            .where(Lead.id.in_(moved))
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    if moved:
+        # карточки в lead_cache остаются верными (лид читается из архива),
+        # а счётчики списка — нет; веб-процессы сбросят свои по TTL
+        lead_count_cache.invalidate()
+    return sorted(moved)
+
+
+def lead_or_archived(lead_id: int) -> Select:
+    """
+    SELECT карточки лида из leads, а если его там нет — из leads_archive.
+
+    UNION ALL с LIMIT 1 останавливается на первой найденной строке: для
+    живого лида архив не читается, а промах — по-прежнему один запрос.
+    """
+    archived = LeadArchive.__table__.c
+    return (
+        select(*Lead.__table__.c)
+        .where(Lead.id == lead_id)
+        .union_all(select(*(archived[name] for name in LEAD_COLUMNS)).where(archived.id == lead_id))
+        .limit(1)
+    )
+
+
+def leads_or_archived(lead_ids: Sequence[int], columns: Sequence[ColumnElement]) -> Select:
+    """
+    SELECT колонок columns (колонок Lead) лидов lead_ids из leads и leads_archive.
+
+    UNION ALL двух выборок по первичным ключам. id в таблицах не пересекаются
+    (см. app/models/lead_archive.py), так что каждый лид вернётся один раз.
+    """
+    archived = LeadArchive.__table__.c
+    return (
+        select(*columns)
+        .where(Lead.id.in_(lead_ids))
+        .union_all(select(*(archived[column.key] for column in columns)).where(archived.id.in_(lead_ids)))
+    )
+
+
+def is_archived(db: Session, lead_id: int) -> bool:
+    """Лежит ли лид в архиве (для ответа на изменение, не нашедшее его в leads)."""
+    return db.scalar(select(LeadArchive.id).where(LeadArchive.id == lead_id)) is not None
+
+
+def delete_archived(db: Session, lead_id: int) -> Optional[int]:
+    """
+    Удалить лида из архива одним DELETE … RETURNING id (без коммита).
+
+    Возвращает id удалённого лида или None, если в архиве его нет. Надгробие
+    с причиной deleted пишет триггер на leads_archive (см. lead_tombstone.py).
+    """
+    return db.execute(
+        delete(LeadArchive)
+        .where(LeadArchive.id == lead_id)
+        .returning(LeadArchive.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
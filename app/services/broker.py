@@ -0,0 +1,140 @@
+# app/services/broker.py — публикация событий в брокер (RabbitMQ или память процесса).
+
+"""
+Брокеры событий для диспетчера outbox.
+
+Интерфейс один: connect/close и publish(message), который возвращается только
+после подтверждения брокером (publisher confirms) и бросает PublishError,
+если сообщение не принято. Диспетчер публикует пачку сообщений конкурентно —
+на одном канале AMQP они уходят подряд, а подтверждения приходят асинхронно.
+
+- RabbitMQBroker — aio-pika, topic-exchange, routing key = тип события;
+- InMemoryBroker — стенд для тестов и бенчмарков: складывает сообщения
+  в список, умеет имитировать задержку подтверждения и отказы.
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+
+class PublishError(Exception):
+    """Брокер не подтвердил сообщение."""
+
+
+@dataclass
+class EventMessage:
+    """Сообщение для брокера: id события outbox используется как message_id."""
+
+    event_id: int
+    event_type: str
+    aggregate_id: int
+    payload: dict
+    created_at: Optional[str] = None
+    headers: dict = field(default_factory=dict)
+
+    def body(self) -> bytes:
+        return json.dumps(
+            {
+                "id": self.event_id,
+                "type": self.event_type,
+                "lead_id": self.aggregate_id,
+                "created_at": self.created_at,
+                "data": self.payload,
+            },
+            ensure_ascii=False,
+        ).encode()
+
+
+class Broker:
+    """Базовый брокер."""
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def publish(self, message: EventMessage) -> None:
+        raise NotImplementedError
+
+
+class InMemoryBroker(Broker):
+    """
+    Брокер в памяти процесса.
+
+    confirm_delay — имитация задержки подтверждения (секунды);
+    fail — функция message -> bool: True означает «брокер отверг сообщение».
+    """
+
+    def __init__(self, confirm_delay: float = 0.0, fail: Optional[Callable[[EventMessage], bool]] = None):
+        self.confirm_delay = confirm_delay
+        self.fail = fail
+        self.messages: list[EventMessage] = []
+        self.rejected = 0
+
+    async def publish(self, message: EventMessage) -> None:
+        if self.confirm_delay:
+            await asyncio.sleep(self.confirm_delay)
+        if self.fail is not None and self.fail(message):
+            self.rejected += 1
+            raise PublishError(f"Событие {message.event_id} отвергнуто брокером")
+        self.messages.append(message)
+
+
+class RabbitMQBroker(Broker):
+    """
+    RabbitMQ через aio-pika с publisher confirms.
+
+    Сообщения персистентные, с mandatory: сообщение без подходящей очереди
+    брокер вернёт, и публикация считается неудачной (событие останется в outbox,
+    пока потребитель не привяжет очередь). Пакет aio-pika нужен
+    только здесь, поэтому импортирую его при подключении.
+    """
+
+    def __init__(self, url: str, exchange: str):
+        self.url = url
+        self.exchange_name = exchange
+        self._connection = None
+        self._exchange = None
+        self._aio_pika = None
+
+    async def connect(self) -> None:
+        try:
+            import aio_pika
+        except ImportError as exc:
+            raise RuntimeError("Для публикации в RabbitMQ нужен пакет aio-pika (pip install aio-pika)") from exc
+        self._aio_pika = aio_pika
+        self._connection = await aio_pika.connect_robust(self.url)
+        channel = await self._connection.channel(publisher_confirms=True, on_return_raises=True)
+        self._exchange = await channel.declare_exchange(
+            self.exchange_name, aio_pika.ExchangeType.TOPIC, durable=True
+        )
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def publish(self, message: EventMessage) -> None:
+        aio_pika = self._aio_pika
+        amqp_message = aio_pika.Message(
+            body=message.body(),
+            content_type="application/json",
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            message_id=str(message.event_id),
+            type=message.event_type,
+            headers={"lead_id": message.aggregate_id, **message.headers},
+        )
+        try:
+            await self._exchange.publish(amqp_message, routing_key=message.event_type, mandatory=True)
+        except aio_pika.exceptions.DeliveryError as exc:
+            raise PublishError(f"Событие {message.event_id} не подтверждено: {exc}") from exc
+
+
+def create_broker(url: str, exchange: str) -> Broker:
+    """Брокер по URL. memory:// — InMemoryBroker (для тестов без RabbitMQ)."""
+    if url.startswith("memory://"):
+        return InMemoryBroker()
+    return RabbitMQBroker(url, exchange)
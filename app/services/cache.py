@@ -0,0 +1,286 @@
+# app/services/cache.py — бэкенды кэша для горячих чтений (LRU в памяти, Redis).
+
+"""
+Кэш-слой для горячих чтений.
+
+Бэкенды взаимозаменяемы и умеют одно и то же: get/set/delete/clear и
+счётчики hits/misses/evictions. По умолчанию используется LRUTTLCache в памяти
+процесса; RedisCache нужен, если кэш должен быть общим для воркеров
+(для тестов и локальной разработки у него есть FakeRedis без сервера).
+
+Чтобы чтение не положило в кэш устаревшее значение, наполнение идёт через
+«эпоху»: перед походом в БД я беру токен begin_fill(), а set() с этим токеном
+ничего не сделает, если за это время в процессе была хоть одна инвалидация.
+
+Вызовы бэкенда синхронные. У бэкенда с сетевым вводом-выводом blocking=True:
+асинхронный код вызывает его через asyncio.to_thread, чтобы не останавливать
+event loop на ответе Redis (см. app/services/leads_async.py).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Hashable, Optional
+
+
+class CacheBackend:
+    """Базовый класс бэкенда кэша: эпоха инвалидаций и счётчики."""
+
+    name = "base"
+    # Вызовы ходят по сети (в async-коде — только через asyncio.to_thread)
+    blocking = False
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.skipped_fills = 0
+
+    # --- эпоха инвалидаций ---
+
+    def begin_fill(self) -> int:
+        """Токен для set(): запомнить эпоху перед чтением значения из БД."""
+        return self._epoch
+
+    def _bump_epoch(self) -> None:
+        with self._stats_lock:
+            self._epoch += 1
+            self.invalidations += 1
+
+    def _fill_allowed(self, token: Optional[int]) -> bool:
+        if token is None or token == self._epoch:
+            return True
+        with self._stats_lock:
+            self.skipped_fills += 1
+        return False
+
+    def _count(self, counter: str) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    # --- интерфейс бэкенда ---
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any, token: Optional[int] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: Hashable) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def size(self) -> Optional[int]:
+        """Сколько записей сейчас в кэше (None — бэкенд этого не знает)."""
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        """Снимок счётчиков для служебного эндпоинта."""
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.name,
+                "size": self.size(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "skipped_fills": self.skipped_fills,
+            }
+
+
+class NullCache(CacheBackend):
+    """Кэш выключен: всегда промах, set ничего не запоминает."""
+
+    name = "none"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        self._count("misses")
+        return None
+
+    def set(self, key: Hashable, value: Any, token: Optional[int] = None) -> None:
+        return None
+
+    def delete(self, key: Hashable) -> None:
+        self._bump_epoch()
+
+    def clear(self) -> None:
+        self._bump_epoch()
+
+
+class LRUTTLCache(CacheBackend):
+    """
+    Потокобезопасный LRU-кэш в памяти процесса с TTL на запись.
+
+    При переполнении вытесняется самая давно использованная запись,
+    просроченные записи удаляются при обращении к ним.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 30.0):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self._count("hits" if entry is not None else "misses")
+        return entry[1] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any, token: Optional[int] = None) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        evicted = 0
+        with self._lock:
+            # проверку эпохи делаю под тем же замком, что и запись:
+            # иначе инвалидация может проскочить между проверкой и вставкой
+            if not self._fill_allowed(token):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            with self._stats_lock:
+                self.evictions += evicted
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._bump_epoch()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bump_epoch()
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+
+class FakeRedis:
+    """
+    Минимальная замена клиента redis в памяти — для тестов и локальной разработки.
+
+    Поддерживает только то, что нужно RedisCache: get, set с ex, delete, scan_iter.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: dict[str, tuple[Optional[float], bytes]] = {}
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name: str, value, ex: Optional[float] = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode()
+        with self._lock:
+            self._data[name] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def scan_iter(self, match: str = "*"):
+        with self._lock:
+            keys = [key for key in self._data if fnmatchcase(key, match)]
+        return iter(keys)
+
+
+class RedisCache(CacheBackend):
+    """
+    Общий для всех воркеров кэш в Redis.
+
+    Значения хранятся строками: как превратить объект в строку и обратно,
+    задают dumps/loads. Инвалидация удаляет ключ в Redis, поэтому после
+    записи устаревшее значение не увидит ни один воркер.
+    """
+
+    name = "redis"
+    blocking = True
+
+    def __init__(
+        self,
+        client,
+        dumps: Callable[[Any], str],
+        loads: Callable[[bytes], Any],
+        prefix: str = "cache:",
+        ttl: float = 30.0,
+    ):
+        super().__init__()
+        self.client = client
+        self.dumps = dumps
+        self.loads = loads
+        self.prefix = prefix
+        self.ttl = ttl
+        self._write_lock = threading.Lock()
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.prefix}{key}"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        raw = self.client.get(self._key(key))
+        self._count("hits" if raw is not None else "misses")
+        return self.loads(raw) if raw is not None else None
+
+    def set(self, key: Hashable, value: Any, token: Optional[int] = None) -> None:
+        if self.ttl <= 0:
+            return
+        payload = self.dumps(value)
+        with self._write_lock:
+            if self._fill_allowed(token):
+                self.client.set(self._key(key), payload, ex=max(1, int(self.ttl)))
+
+    def delete(self, key: Hashable) -> None:
+        with self._write_lock:
+            self.client.delete(self._key(key))
+            self._bump_epoch()
+
+    def clear(self) -> None:
+        with self._write_lock:
+            keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+            if keys:
+                self.client.delete(*keys)
+            self._bump_epoch()
+
+
+def redis_client(url: str):
+    """
+    Клиент Redis по URL. memory:// — FakeRedis в памяти процесса.
+
+    Пакет redis нужен только для настоящего сервера, поэтому импортирую его здесь.
+    """
+    if url.startswith("memory://"):
+        return FakeRedis()
+    try:
+        import redis
+    except ImportError as exc:
+        raise RuntimeError("Для кэша в Redis нужен пакет redis (pip install redis)") from exc
+    return redis.Redis.from_url(url)
@@ -0,0 +1,237 @@
+# app/services/changes.py — уведомления об изменениях лидов для ленты /leads/changes.
+
+"""
+Лента изменений лидов: ожидание новых изменений без опроса БД каждым клиентом.
+
+Подписчики ленты (long-poll и SSE) не опрашивают БД по таймеру, а ждут
+ChangeNotifier — один на процесс. Он узнаёт об изменениях так:
+- Postgres (psycopg2): одно отдельное соединение вне пула делает
+  LISTEN lead_changes, а триггеры на leads и lead_tombstones шлют NOTIFY
+  при каждой вставке, изменении и удалении лида (уведомления одной
+  транзакции Postgres сворачивает в одно).
+  Сокет соединения слушает event loop, поток не занимается;
+- остальные базы (SQLite на стендах): раз в CHANGES_POLL_INTERVAL секунд
+  один запрос max(updated_at), max(id) лидов и число надгробий на весь процесс.
+
+Уведомление будит всех ждущих сразу, и каждый перечитывает ленту со своего
+курсора, так что N простаивающих подписчиков не стоят БД ничего.
+Слушатель запускается при первом подписчике. Если соединение LISTEN оборвалось,
+переподключаюсь и на всякий случай бужу всех: пока его не было,
+уведомления могли потеряться.
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.db.database import engine
+from app.models.lead import LEAD_CHANGES_CHANNEL, Lead
+from app.models.lead_tombstone import LeadTombstone
+from app.schemas.leads import LeadChanges
+
+
+logger = logging.getLogger("skatinov_leadlab.changes")
+
+# Порция ленты с курсора: (изменения, есть ли ещё не отстоявшиеся изменения)
+FetchChanges = Callable[[Optional[str]], Awaitable[tuple[LeadChanges, bool]]]
+
+
+class ChangeNotifier:
+    """
+    Счётчик версий изменений и ожидание его смены.
+
+    Подписчик запоминает version до чтения ленты и ждёт wait(version):
+    изменение, случившееся между чтением и ожиданием, не потеряется.
+    """
+
+    def __init__(self, engine: Engine, poll_interval: float = 1.0):
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        """Разбудить всех подписчиков."""
+        self.version += 1
+        if self._event is not None:
+            self._event.set()
+            self._event = asyncio.Event()
+
+    async def wait(self, version: int, timeout: float) -> int:
+        """Дождаться версии новее version (не дольше timeout); текущая версия."""
+        self._ensure_started()
+        if self.version != version:
+            return self.version
+        event = self._event
+        try:
+            async with asyncio.timeout(timeout):
+                await event.wait()
+        except TimeoutError:
+            pass
+        return self.version
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None:
+            return
+        # новый event loop (например, другой TestClient) — состояние старого ему не годится
+        self._loop = loop
+        self._event = asyncio.Event()
+        self._task = loop.create_task(self._listen(), name="lead-change-notifier")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+
+    async def _listen(self) -> None:
+        if self.engine.dialect.name == "postgresql" and self.engine.dialect.driver == "psycopg2":
+            await self._listen_postgres()
+        else:
+            await self._poll()
+
+    async def _listen_postgres(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                connection = await asyncio.to_thread(self._connect_listener)
+            except Exception as exc:
+                logger.warning("LISTEN %s: connection failed: %s", LEAD_CHANGES_CHANNEL, exc)
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            lost = loop.create_future()
+
+            def on_readable() -> None:
+                try:
+                    connection.poll()
+                except Exception as exc:
+                    if not lost.done():
+                        lost.set_result(exc)
+                    return
+                if connection.notifies:
+                    connection.notifies.clear()
+                    self.notify()
+
+            fd = connection.fileno()
+            loop.add_reader(fd, on_readable)
+            # пока слушателя не было, изменения могли пройти мимо
+            self.notify()
+            try:
+                exc = await lost
+                logger.warning("LISTEN %s: connection lost: %s", LEAD_CHANGES_CHANNEL, exc)
+            finally:
+                loop.remove_reader(fd)
+                connection.close()
+            await asyncio.sleep(self.poll_interval)
+
+    def _connect_listener(self):
+        """Отдельное DBAPI-соединение psycopg2 вне пула с LISTEN на канал изменений."""
+        dialect = self.engine.dialect
+        args, kwargs = dialect.create_connect_args(self.engine.url)
+        connection = dialect.loaded_dbapi.connect(*args, **kwargs)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {LEAD_CHANGES_CHANNEL}")
+        return connection
+
+    async def _poll(self) -> None:
+        marker = None
+        stmt = select(
+            func.max(Lead.updated_at),
+            func.max(Lead.id),
+            select(func.count()).select_from(LeadTombstone).scalar_subquery(),
+        )
+        while True:
+            try:
+                current = await asyncio.to_thread(self._read_marker, stmt)
+            except Exception as exc:
+                logger.warning("Lead change poll failed: %s", exc)
+            else:
+                if current != marker:
+                    marker = current
+                    self.notify()
+            await asyncio.sleep(self.poll_interval)
+
+    def _read_marker(self, stmt) -> tuple:
+        with self.engine.connect() as connection:
+            return tuple(connection.execute(stmt).one())
+
+
+change_notifier = ChangeNotifier(engine, poll_interval=settings.changes_poll_interval)
+
+
+def is_empty(changes: LeadChanges) -> bool:
+    """В порции нет ни изменённых, ни ушедших из списка лидов."""
+    return not changes.leads and not changes.removed
+
+
+async def wait_for_changes(
+    fetch: FetchChanges,
+    since: Optional[str],
+    wait: float,
+    settle_seconds: float,
+) -> LeadChanges:
+    """
+    Long-poll: порция ленты, а если она пуста — ждать изменений до wait секунд.
+
+    Не отстоявшиеся изменения (см. leads.get_lead_changes) перечитываю через
+    settle_seconds, новые — по уведомлению.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        version = change_notifier.version
+        changes, pending = await _fetch(fetch, since)
+        remaining = deadline - loop.time()
+        if not is_empty(changes) or remaining <= 0:
+            return changes
+        await change_notifier.wait(version, min(remaining, settle_seconds) if pending else remaining)
+
+
+async def stream_changes(
+    fetch: FetchChanges,
+    since: Optional[str],
+    heartbeat: float,
+    settle_seconds: float,
+) -> AsyncIterator[Optional[LeadChanges]]:
+    """
+    SSE: бесконечный поток порций ленты с курсора since.
+
+    None вместо порции — heartbeat: за heartbeat секунд изменений не было.
+    По heartbeat лента тоже перечитывается — страховка от потерянного уведомления.
+    """
+    cursor = since
+    while True:
+        version = change_notifier.version
+        changes, pending = await _fetch(fetch, cursor)
+        if not is_empty(changes):
+            cursor = changes.next_cursor
+            yield changes
+            if changes.has_more:
+                continue
+        current = await change_notifier.wait(version, settle_seconds if pending else heartbeat)
+        if current == version and not pending and is_empty(changes):
+            yield None
+
+
+async def _fetch(fetch: FetchChanges, cursor: Optional[str]) -> tuple[LeadChanges, bool]:
+    """
+    Прочитать порцию так, чтобы отключение клиента не прервало её посередине.
+
+    Отмена посреди запроса оставила бы в пуле asyncpg-соединение в неизвестном
+    состоянии; под shield чтение доходит до конца и возвращает соединение в пул.
+    """
+    return await asyncio.shield(fetch(cursor))
@@ -0,0 +1,118 @@
+# app/services/conditional.py — версии лидов и страниц для условных запросов (ETag).
+
+"""
+Валидаторы для условных запросов к лидам.
+
+Фронтенд CRM постоянно опрашивает карточку и список, и почти всегда ответ
+совпадает с прошлым. Поэтому я отдаю ETag и Last-Modified, а на повторный
+запрос с If-None-Match/If-Modified-Since отвечаю 304 без тела.
+
+- Лид: ETag строится из id и номера версии ("<id>.<version>"). version
+  растёт на каждом UPDATE лида, поэтому из ETag можно восстановить версию
+  и проверить If-Match прямо в WHERE UPDATE, без лишнего чтения.
+  Last-Modified — по-прежнему updated_at.
+- Страница списка: отпечаток окна страницы (число строк, max(updated_at),
+  сумма id, сумма version) плюс total. Его можно посчитать одним агрегатом
+  по тому же запросу, что выбирает страницу, — не читая и не сериализуя
+  сами строки.
+
+updated_at на SQLite хранится с точностью до секунды, поэтому в ETag его нет:
+два изменения лида за одну секунду дали бы одинаковый ETag.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+
+from app.schemas.leads import CountStrategy
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class LeadPreconditionFailed(Exception):
+    """Лид изменился после того, как клиент получил его ETag (If-Match не выполнен)."""
+
+
+@dataclass(frozen=True)
+class Version:
+    """Валидаторы ответа: ETag (в кавычках) и время последнего изменения."""
+
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def as_utc(value: datetime) -> datetime:
+    """SQLite отдаёт время без зоны (пишет его func.now() в UTC), Postgres — с зоной."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def lead_version(lead_id: int, version: int, updated_at: datetime) -> Version:
+    """Версия одного лида."""
+    return Version(etag=f'"{lead_id}.{version}"', last_modified=as_utc(updated_at))
+
+
+def parse_lead_etags(header: str, lead_id: int) -> Optional[list[int]]:
+    """
+    Разобрать If-Match для лида: список номеров версий, которые клиент считает текущими.
+
+    None — условия нет ("*" подходит к любой существующей версии).
+    Слабые ETag (W/…) и чужие или битые значения пропускаю: If-Match сравнивает
+    строго, такие метки совпасть не могут. Пустой список — ни одна метка не подошла.
+    """
+    versions = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return None
+        if not (len(tag) > 2 and tag[0] == tag[-1] == '"'):
+            continue
+        tag_id, _, version = tag[1:-1].partition(".")
+        if tag_id != str(lead_id) or not version.isdigit():
+            continue
+        versions.append(int(version))
+    return versions
+
+
+def page_version(
+    rows: int,
+    max_updated_at: Optional[datetime],
+    id_sum: Optional[int],
+    version_sum: Optional[int],
+    total: Optional[int],
+    total_strategy: CountStrategy,
+) -> Version:
+    """
+    Версия страницы списка по отпечатку её окна.
+
+    rows/max_updated_at/id_sum/version_sum считаются по окну из limit+1 строк
+    (строка сверх limit решает, будет ли next_cursor). Изменение лида в окне
+    увеличивает сумму version, удаление или вставка — меняют число строк и
+    сумму id, изменение вне окна — total.
+    """
+    last_modified = as_utc(max_updated_at) if max_updated_at is not None else None
+    stamp = (last_modified - EPOCH) // _MICROSECOND if last_modified is not None else ""
+    fingerprint = f"{rows}:{stamp}:{id_sum or 0}:{version_sum or 0}:{total}:{total_strategy.value}"
+    digest = hashlib.blake2b(fingerprint.encode(), digest_size=10).hexdigest()
+    return Version(etag=f'"p{digest}"', last_modified=last_modified)
+
+
+def page_version_of(
+    leads: Sequence,
+    total: Optional[int],
+    total_strategy: CountStrategy,
+) -> Version:
+    """Версия страницы по уже прочитанным строкам окна (то же, что агрегат в SQL)."""
+    max_updated_at = max((as_utc(lead.updated_at) for lead in leads), default=None)
+    return page_version(
+        len(leads),
+        max_updated_at,
+        sum(lead.id for lead in leads),
+        sum(lead.version for lead in leads),
+        total,
+        total_strategy,
+    )
@@ -0,0 +1,137 @@
+# app/services/counting.py — стратегии подсчёта total для списка лидов.
+
+"""
+Подсчёт общего числа лидов для списка.
+
+COUNT(*) по большой таблице стоит дороже самой страницы, поэтому клиент выбирает стратегию:
+- exact — точный COUNT(*), результат кэшируется на короткий TTL по набору фильтров;
+- estimated — оценка: статистика планировщика на Postgres, счётчик
+  из lead_counters на SQLite (если оценку получить нельзя — честный exact);
+- none — total не считается вообще.
+"""
+
+import json
+import threading
+import time
+from typing import Hashable, Optional, Sequence
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+from app.config import settings
+from app.db.replicas import is_replica_session
+from app.models.lead import Lead
+from app.models.lead_counter import LEADS_COUNTER, LeadCounter
+from app.schemas.leads import CountStrategy
+
+
+class CountCache:
+    """
+    Небольшой потокобезопасный TTL-кэш точных COUNT(*) в памяти процесса.
+
+    Ключ — набор фильтров списка. Любая вставка или удаление лида сбрасывает
+    кэш целиком: одна новая строка может изменить total для любого фильтра.
+    В нескольких воркерах у каждого свой кэш, расхождение ограничено TTL.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: dict[Hashable, tuple[float, int]] = {}
+
+    def get(self, key: Hashable) -> Optional[int]:
+        """Вернуть закэшированный total или None, если записи нет или она устарела."""
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: Hashable, value: int) -> None:
+        """Запомнить total для набора фильтров."""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self) -> None:
+        """Сбросить все закэшированные значения."""
+        with self._lock:
+            self._entries.clear()
+
+
+lead_count_cache = CountCache(ttl=settings.lead_count_cache_ttl)
+
+
+def count_leads(
+    db: Session,
+    strategy: CountStrategy = CountStrategy.EXACT,
+    where: Sequence[ColumnElement] = (),
+    cache_key: Hashable = (),
+) -> tuple[Optional[int], CountStrategy]:
+    """
+    Посчитать лидов по выбранной стратегии.
+
+    Возвращаю пару (total, стратегия, которая реально дала это число):
+    если оценку получить не удалось, стратегия в ответе будет exact.
+    """
+    if strategy == CountStrategy.NONE:
+        return None, CountStrategy.NONE
+
+    if strategy == CountStrategy.ESTIMATED:
+        estimate = _estimate_leads(db, where)
+        if estimate is not None:
+            return estimate, CountStrategy.ESTIMATED
+
+    total = lead_count_cache.get(cache_key)
+    if total is None:
+        total = db.scalar(select(func.count()).select_from(Lead).where(*where)) or 0
+        # счёт с реплики может отставать от записи, которая только что сбросила кэш
+        if not is_replica_session(db):
+            lead_count_cache.set(cache_key, total)
+    return total, CountStrategy.EXACT
+
+
+def _estimate_leads(db: Session, where: Sequence[ColumnElement]) -> Optional[int]:
+    """Оценка числа лидов без полного прохода по таблице (None — оценки нет)."""
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        if where:
+            return _pg_plan_rows(db, where)
+        # reltuples = -1, пока по таблице ни разу не прошёл ANALYZE/VACUUM
+        reltuples = db.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'leads'::regclass")
+        )
+        return reltuples if reltuples is not None and reltuples >= 0 else None
+
+    if dialect == "sqlite" and not where:
+        return db.scalar(select(LeadCounter.value).where(LeadCounter.name == LEADS_COUNTER))
+
+    return None
+
+
+def _pg_plan_rows(db: Session, where: Sequence[ColumnElement]) -> Optional[int]:
+    """Оценка планировщика Postgres для отфильтрованного списка (EXPLAIN без выполнения)."""
+    connection = db.connection()
+    compiled = select(Lead.id).where(*where).compile(dialect=connection.dialect)
+    params = compiled.params
+    if compiled.positiontup:
+        params = tuple(params[name] for name in compiled.positiontup)
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    try:
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,120 @@
+# app/services/export.py — потоковая выгрузка лидов в CSV/NDJSON.
+
+"""
+Потоковая выгрузка таблицы лидов.
+
+Выгрузка принимает те же фильтры, что и список (LeadFilters), и строит
+по ним те же условия WHERE (app/services/filters.py).
+
+Строки читаются серверным курсором порциями по batch_size (yield_per включает
+stream_results), каждая порция сразу кодируется в байты и отдаётся наружу.
+ORM-объекты и LeadOut не создаются, поэтому память не растёт с числом строк.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Optional, Sequence
+
+from sqlalchemy import Row, Select, select
+from sqlalchemy.orm import Session
+
+from app.models.lead import Lead
+from app.schemas.leads import ExportFormat, LeadFilters, LeadSortField, SortOrder
+from app.services.filters import lead_filter_conditions
+from app.services.pagination import apply_sort
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "name",
+    "email",
+    "status",
+    "source",
+    "assigned_to",
+    "created_at",
+    "updated_at",
+)
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+def export_statement(
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    batch_size: int = 1000,
+    filters: Optional[LeadFilters] = None,
+) -> Select:
+    """SELECT для выгрузки: только нужные колонки, фильтры списка и потоковое чтение порциями."""
+    columns = [getattr(Lead, name) for name in EXPORT_COLUMNS]
+    stmt = select(*columns)
+    if filters is not None:
+        stmt = stmt.where(*lead_filter_conditions(filters))
+    return apply_sort(stmt, sort, order).execution_options(yield_per=batch_size)
+
+
+def header_chunk(export_format: ExportFormat) -> Optional[bytes]:
+    """Первый кусок выгрузки (заголовок CSV) или None, если формату он не нужен."""
+    if export_format == ExportFormat.CSV:
+        return _csv_chunk([EXPORT_COLUMNS])
+    return None
+
+
+def encode_chunk(export_format: ExportFormat, rows: Sequence[Row]) -> bytes:
+    """Закодировать порцию строк в байты выбранного формата."""
+    if export_format == ExportFormat.CSV:
+        return _csv_chunk(_csv_values(row) for row in rows)
+    return _ndjson_chunk(rows)
+
+
+def iter_leads_export(
+    db: Session,
+    export_format: ExportFormat,
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    batch_size: int = 1000,
+    filters: Optional[LeadFilters] = None,
+) -> Iterator[bytes]:
+    """Генератор кусков выгрузки: по одному куску байт на порцию строк из БД."""
+    header = header_chunk(export_format)
+    if header is not None:
+        yield header
+
+    result = db.execute(export_statement(sort, order, batch_size, filters))
+    try:
+        for partition in result.partitions():
+            yield encode_chunk(export_format, partition)
+    finally:
+        result.close()
+
+
+def _export_value(value):
+    """Значение колонки в виде, пригодном для CSV/JSON."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_values(row: Row) -> list:
+    return ["" if value is None else _export_value(value) for value in row]
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_chunk(rows: Sequence[Row]) -> bytes:
+    lines = [
+        json.dumps(
+            {name: _export_value(value) for name, value in zip(EXPORT_COLUMNS, row)},
+            ensure_ascii=False,
+        )
+        for row in rows
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
@@ -0,0 +1,42 @@
+# app/services/filters.py — фильтры списка лидов → условия WHERE.
+
+"""
+Фильтры списка лидов.
+
+Превращаю LeadFilters в условия WHERE для select(Lead) и в ключ кэша
+точного COUNT(*). Под типичные комбинации фильтров есть составные индексы
+(см. миграцию 5e1a7c3b9d42): равенства идут первыми колонками индекса,
+дата сортировки — следующей, id — тай-брейкер для keyset-курсора.
+"""
+
+from typing import Hashable
+
+from sqlalchemy.sql import ColumnElement
+
+from app.models.lead import Lead
+from app.schemas.leads import LeadFilters
+
+
+def lead_filter_conditions(filters: LeadFilters) -> list[ColumnElement]:
+    """Условия WHERE для заданных фильтров (пустой список — без фильтрации)."""
+    conditions: list[ColumnElement] = []
+    if filters.status is not None:
+        conditions.append(Lead.status == filters.status)
+    if filters.source is not None:
+        conditions.append(Lead.source == filters.source)
+    if filters.assigned_to is not None:
+        conditions.append(Lead.assigned_to == filters.assigned_to)
+    if filters.created_from is not None:
+        conditions.append(Lead.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        conditions.append(Lead.created_at < filters.created_to)
+    if filters.updated_from is not None:
+        conditions.append(Lead.updated_at >= filters.updated_from)
+    if filters.updated_to is not None:
+        conditions.append(Lead.updated_at < filters.updated_to)
+    return conditions
+
+
+def lead_filters_cache_key(filters: LeadFilters) -> Hashable:
+    """Ключ кэша COUNT(*) для набора фильтров (незаданные фильтры не учитываются)."""
+    return tuple(sorted(filters.model_dump(exclude_none=True).items()))
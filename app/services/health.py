@@ -0,0 +1,259 @@
+# app/services/health.py — проверки зависимостей для readiness-пробы.
+
+"""
+Проверки готовности сервиса с фоновым обновлением.
+
+Оркестратор дёргает /health/ready часто и с каждого узла, поэтому сама
+проба ничего не проверяет — она отдаёт последний результат из кэша.
+Проверки выполняет HealthMonitor раз в HEALTH_CHECK_INTERVAL секунд
+(фоновая задача запускается в lifespan приложения), так что нагрузка на
+БД и брокер не зависит от частоты проб.
+
+Проверки (у каждой в ответе статус и latency_ms):
+- database — SELECT 1 через пул синхронного engine;
+- pool — доля занятых соединений от pool_size + max_overflow (порог
+  HEALTH_POOL_SATURATION) и таймауты ожидания соединения с прошлой проверки;
+- migrations — alembic_version в БД против head в migrations/versions;
+- broker — TCP-соединение с хостом из RABBITMQ_URL (memory:// — пропуск).
+
+Не готов сервис, если упала проверка из HEALTH_CHECKS_REQUIRED или если
+результат устарел: фоновая задача не обновляла его три интервала подряд.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import urlsplit
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.db.database import async_engine, engine
+from app.db.pool import pool_status
+
+
+logger = logging.getLogger("skatinov_leadlab.health")
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+
+STATUS_OK = "ok"
+STATUS_FAIL = "fail"
+STATUS_SKIPPED = "skipped"
+
+# Порты RabbitMQ по умолчанию для схем amqp/amqps
+AMQP_PORTS = {"amqp": 5672, "amqps": 5671}
+
+# Через сколько интервалов обновления результат считается устаревшим
+STALE_INTERVALS = 3
+
+
+class HealthMonitor:
+    """Кэш результатов проверок и фоновая задача, которая их обновляет."""
+
+    def __init__(
+        self,
+        interval: float = 5.0,
+        timeout: float = 2.0,
+        required: tuple[str, ...] = ("database", "pool", "migrations", "broker"),
+        pool_saturation: float = 0.9,
+        broker_url: str = "",
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self.required = required
+        self.pool_saturation = pool_saturation
+        self.broker_url = broker_url
+        self.report: Optional[dict[str, Any]] = None
+        self.updated_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._pool_timeouts: dict[str, int] = {}
+        self._heads: Optional[set[str]] = None
+
+    # --- жизненный цикл ---
+
+    def start(self) -> None:
+        """Запустить фоновое обновление (вызывается в lifespan приложения)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="health-monitor")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Health refresh failed")
+            await asyncio.sleep(self.interval)
+
+    # --- результат для проб ---
+
+    def age(self) -> Optional[float]:
+        """Сколько секунд назад обновлялся результат (None — ещё ни разу)."""
+        return time.monotonic() - self.updated_at if self.report is not None else None
+
+    async def readiness(self) -> tuple[bool, dict[str, Any]]:
+        """
+        Готовность и отчёт для /health/ready.
+
+        Пока первого результата нет (сразу после старта) или если фоновая
+        задача не запущена (приложение без lifespan, например TestClient
+        вне with), проверки выполняет сама проба, но не чаще раза в интервал:
+        одновременные пробы ждут один проход.
+        """
+        if self.report is None or (self._task is None and self.age() > self.interval):
+            await self.refresh()
+
+        age = self.age()
+        report = {**self.report, "age_s": round(age, 3)}
+        if age > STALE_INTERVALS * self.interval:
+            report["status"] = "stale"
+        return report["status"] == "ready", report
+
+    async def refresh(self) -> None:
+        """Выполнить все проверки и обновить кэш (параллельные вызовы ждут одного прохода)."""
+        requested = time.monotonic()
+        async with self._lock:
+            if self.updated_at > requested:
+                return
+            # пул смотрю до остальных проверок, чтобы не считать их собственные соединения
+            checks = {"pool": await self._timed(self.check_pool)}
+            names = ("database", "migrations", "broker")
+            results = await asyncio.gather(
+                self._timed(self.check_database),
+                self._timed(self.check_migrations),
+                self._timed(self.check_broker),
+            )
+            checks.update(zip(names, results))
+            failed = [name for name in self.required if checks.get(name, {}).get("status") == STATUS_FAIL]
+            if failed and (self.report is None or self.report["failed"] != failed):
+                logger.warning("Readiness checks failed: %s", ", ".join(failed))
+
+            self.report = {
+                "status": "not_ready" if failed else "ready",
+                "failed": failed,
+                "checked_at": datetime.now(timezone.utc).isoformat(),
+                "checks": checks,
+            }
+            self.updated_at = time.monotonic()
+
+    async def _timed(self, check: Callable[[], Awaitable[dict[str, Any]]]) -> dict[str, Any]:
+        """Выполнить проверку с таймаутом; к результату добавляется latency_ms."""
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                result = await check()
+        except TimeoutError:
+            result = {"status": STATUS_FAIL, "detail": f"timeout after {self.timeout:g} s"}
+        except Exception as exc:
+            result = {"status": STATUS_FAIL, "detail": f"{type(exc).__name__}: {exc}"[:300]}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    # --- проверки ---
+
+    async def check_database(self) -> dict[str, Any]:
+        """SELECT 1 через пул синхронного engine (им пользуются маршруты и джобы)."""
+
+        def probe() -> None:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+
+        await asyncio.to_thread(probe)
+        return {"status": STATUS_OK}
+
+    async def check_pool(self) -> dict[str, Any]:
+        """Насыщенность пулов синхронного и асинхронного engine."""
+        engines: dict[str, Engine] = {"sync": engine}
+        if async_engine is not None:
+            engines["async"] = async_engine.sync_engine
+
+        pools: dict[str, Any] = {}
+        problems = []
+        for name, pool_engine in engines.items():
+            status = pool_status(pool_engine)
+            if "size" not in status:
+                # у SQLite в памяти пул без размера — насыщаться нечему
+                continue
+            capacity = status["size"] + max(status["max_overflow"], 0)
+            saturation = status["checked_out"] / capacity if capacity else 0.0
+            timeouts = status.get("timeouts", 0)
+            new_timeouts = timeouts - self._pool_timeouts.get(name, timeouts)
+            self._pool_timeouts[name] = timeouts
+            pools[name] = {
+                "checked_out": status["checked_out"],
+                "capacity": capacity,
+                "saturation": round(saturation, 3),
+                "timeouts": new_timeouts,
+            }
+            if saturation >= self.pool_saturation:
+                problems.append(f"{name} pool {saturation:.0%} checked out")
+            if new_timeouts > 0:
+                problems.append(f"{name} pool: {new_timeouts} checkout timeouts")
+
+        if not pools:
+            return {"status": STATUS_SKIPPED, "detail": "pool has no size limit"}
+        result: dict[str, Any] = {"status": STATUS_FAIL if problems else STATUS_OK, "pools": pools}
+        if problems:
+            result["detail"] = "; ".join(problems)
+        return result
+
+    async def check_migrations(self) -> dict[str, Any]:
+        """Версия схемы в БД (alembic_version) совпадает с head миграций в коде."""
+
+        def current() -> set[str]:
+            with engine.connect() as connection:
+                return set(connection.execute(text("SELECT version_num FROM alembic_version")).scalars())
+
+        if self._heads is None:
+            self._heads = await asyncio.to_thread(_migration_heads)
+        database = await asyncio.to_thread(current)
+        result: dict[str, Any] = {
+            "status": STATUS_OK if database == self._heads else STATUS_FAIL,
+            "database": sorted(database),
+            "head": sorted(self._heads),
+        }
+        if result["status"] == STATUS_FAIL:
+            result["detail"] = "database schema is not at migration head"
+        return result
+
+    async def check_broker(self) -> dict[str, Any]:
+        """TCP-соединение с брокером: проверяю, что он слушает порт, без AMQP-рукопожатия."""
+        url = urlsplit(self.broker_url)
+        if url.scheme not in AMQP_PORTS:
+            return {"status": STATUS_SKIPPED, "detail": f"{url.scheme}:// broker"}
+        host, port = url.hostname or "localhost", url.port or AMQP_PORTS[url.scheme]
+        _, writer = await asyncio.open_connection(host, port)
+        writer.close()
+        await writer.wait_closed()
+        return {"status": STATUS_OK, "host": f"{host}:{port}"}
+
+
+def _migration_heads() -> set[str]:
+    """head-ревизии из migrations/versions (читаются один раз за процесс)."""
+    from alembic.script import ScriptDirectory
+
+    return set(ScriptDirectory(str(MIGRATIONS_DIR)).get_heads())
+
+
+# Общий монитор процесса: обновляется в lifespan, читается маршрутами /health
+health_monitor = HealthMonitor(
+    interval=settings.health_check_interval,
+    timeout=settings.health_check_timeout,
+    required=tuple(name.strip() for name in settings.health_checks_required.split(",") if name.strip()),
+    pool_saturation=settings.health_pool_saturation,
+    broker_url=settings.rabbitmq_url,
+)
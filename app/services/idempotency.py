@@ -0,0 +1,156 @@
+# app/services/idempotency.py — Idempotency-Key для создания лидов.
+
+"""
+Идемпотентное создание лидов.
+
+Запрос с заголовком Idempotency-Key проходит так:
+1. claim_idempotency_key вставляет строку (scope, key) через
+   INSERT … ON CONFLICT DO NOTHING — в ту же транзакцию, где потом
+   создаются лиды. Если такой ключ уже есть, вставка ничего не делает,
+   и я читаю сохранённый ответ (replay): таблица leads не затрагивается.
+2. Сервис создания вызывает before_commit, и маршрут записывает в строку
+   ключа готовый ответ (store_idempotent_response) — тем же коммитом,
+   что и лидов. Ответ не может потеряться отдельно от созданных лидов.
+
+Одновременные дубли сериализует уникальное ограничение: вставка второго
+запроса ждёт, пока транзакция первого закончится, и после коммита первого
+видит его строку с ответом, а после отката — вставляет свою. Блокировок
+в коде нет. Просроченный ключ удаляю и занимаю заново.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.idempotency import IdempotencyKey
+from app.services.conditional import as_utc
+
+
+# Длина колонки idempotency_keys.key
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyMismatch(Exception):
+    """Ключ уже использован с другим телом запроса."""
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    """Сохранённый ответ на первый запрос с ключом."""
+
+    status_code: int
+    body: bytes
+
+
+@dataclass(frozen=True)
+class IdempotencyClaim:
+    """
+    Результат claim_idempotency_key.
+
+    key_id — строка ключа, занятая этим запросом (ответ нужно сохранить);
+    replay — ответ первого запроса, если ключ уже был использован.
+    """
+
+    key_id: Optional[int] = None
+    replay: Optional[StoredResponse] = None
+
+
+def request_fingerprint(body: bytes) -> str:
+    """Отпечаток тела запроса для сверки повторов."""
+    return hashlib.sha256(body).hexdigest()
+
+
+def claim_idempotency_key(db: Session, scope: str, key: str, request_hash: str) -> IdempotencyClaim:
+    """
+    Занять ключ в текущей транзакции или вернуть сохранённый ответ.
+
+    IdempotencyKeyMismatch — ключ уже занят запросом с другим телом.
+    Транзакцию не коммичу: строка ключа должна уйти в БД тем же коммитом,
+    что и созданные лиды.
+    """
+    now = _utcnow()
+    for _ in range(2):
+        key_id = db.scalar(
+            _insert(db)
+            .values(
+                scope=scope,
+                key=key,
+                request_hash=request_hash,
+                expires_at=now + timedelta(seconds=settings.idempotency_key_ttl),
+            )
+            .on_conflict_do_nothing(index_elements=["scope", "key"])
+            .returning(IdempotencyKey.id)
+        )
+        if key_id is not None:
+            return IdempotencyClaim(key_id=key_id)
+
+        existing = db.execute(
+            select(
+                IdempotencyKey.id,
+                IdempotencyKey.request_hash,
+                IdempotencyKey.status_code,
+                IdempotencyKey.response_body,
+                IdempotencyKey.expires_at,
+            ).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        ).first()
+        if existing is None:
+            # строку успели удалить (чистка) между вставкой и чтением — пробую ещё раз
+            continue
+        if as_utc(existing.expires_at) <= now:
+            db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.id == existing.id,
+                    IdempotencyKey.expires_at <= now,
+                )
+            )
+            continue
+        if existing.request_hash != request_hash:
+            raise IdempotencyKeyMismatch(key)
+        # ответ пишется тем же коммитом, что и строка ключа, поэтому он уже есть
+        return IdempotencyClaim(replay=StoredResponse(existing.status_code, existing.response_body))
+
+    raise RuntimeError(f"Не удалось занять ключ идемпотентности '{key}'")
+
+
+def store_idempotent_response(db: Session, claim: IdempotencyClaim, status_code: int, body: bytes) -> None:
+    """Записать ответ в строку ключа (до коммита транзакции, которая создаёт лидов)."""
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.id == claim.key_id)
+        .values(status_code=status_code, response_body=body)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def prune_expired_keys(db: Session, batch_size: int = 1000) -> int:
+    """Удалить одну порцию просроченных ключей и закоммитить; число удалённых строк."""
+    expired = (
+        select(IdempotencyKey.id)
+        .where(IdempotencyKey.expires_at <= _utcnow())
+        .order_by(IdempotencyKey.expires_at)
+        .limit(batch_size)
+    )
+    result = db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.id.in_(expired.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def _insert(db: Session):
+    """INSERT с поддержкой ON CONFLICT для диалекта текущей сессии."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(IdempotencyKey)
+    return sqlite.insert(IdempotencyKey)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
@@ -0,0 +1,35 @@
+# app/services/lead_cache.py — кэш карточек лидов для GET /leads/{id}.
+
+"""
+Read-through кэш одиночных лидов.
+
+CRM постоянно перезапрашивает открытую карточку лида, поэтому get_lead сначала
+смотрит в кэш и только при промахе идёт в БД. Любое изменение лида
+(update/delete) сразу удаляет его запись: после ответа на PUT/PATCH/DELETE
+процесс уже не отдаст старую версию.
+Бэкенд выбирается настройкой LEAD_CACHE_BACKEND (memory | redis | none).
+"""
+
+from app.config import settings
+from app.schemas.leads import LeadOut
+from app.services.cache import CacheBackend, LRUTTLCache, NullCache, RedisCache, redis_client
+
+
+def build_lead_cache(backend: str) -> CacheBackend:
+    """Собрать кэш лидов для выбранного бэкенда."""
+    if backend == "memory":
+        return LRUTTLCache(max_entries=settings.lead_cache_max_entries, ttl=settings.lead_cache_ttl)
+    if backend == "redis":
+        return RedisCache(
+            redis_client(settings.lead_cache_redis_url),
+            dumps=LeadOut.model_dump_json,
+            loads=LeadOut.model_validate_json,
+            prefix="leadlab:lead:",
+            ttl=settings.lead_cache_ttl,
+        )
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Неизвестный бэкенд кэша лидов: '{backend}'")
+
+
+lead_cache = build_lead_cache(settings.lead_cache_backend)
@@ -2,69 +2,550 @@
 
 """Сервисы для CRUD операций с лидами — бизнес-логика."""
 
-from typing import Optional
+import heapq
+from datetime import timedelta
+from typing import Any, Callable, Optional, Sequence, Union
 
-from sqlalchemy import select, func
+from sqlalchemy import Select, delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
 
+from app.db.replicas import is_replica_session
 from app.models.lead import Lead  # модель лида
-from app.schemas.leads import LeadCreate, LeadUpdate, LeadOut, LeadList
+from app.models.lead_tombstone import LeadTombstone
+from app.schemas.leads import (
+    LeadBatch,
+    LeadBulkFilter,
+    LeadBulkUpdateResult,
+    LeadChanges,
+    LeadCreate,
+    LeadUpdate,
+    LeadOut,
+    LeadList,
+    LeadRemoved,
+    LeadFilters,
+    LeadSortField,
+    SortOrder,
+    CountStrategy,
+)
+from app.services.archive import LeadArchived, delete_archived, is_archived, lead_or_archived, leads_or_archived
+from app.services.conditional import LeadPreconditionFailed, Version, page_version, page_version_of
+from app.services.counting import count_leads, lead_count_cache
+from app.services.filters import lead_filter_conditions, lead_filters_cache_key
+from app.services.lead_cache import lead_cache
+from app.services.outbox import (
+    enqueue_lead_created,
+    enqueue_lead_deleted,
+    enqueue_lead_updated,
+    enqueue_leads_updated,
+)
+from app.services.pagination import apply_cursor, apply_sort, cursor_for, decode_cursor, encode_cursor
+from app.services.projection import Fields, lead_batch_model, lead_columns, lead_list_model, lead_model
 
 
-def create_lead(db: Session, lead_in: LeadCreate) -> LeadOut:
-    """Создать новый лид."""
+# Вызывается с сессией и результатом сервиса прямо перед коммитом: так маршрут
+# пишет в ту же транзакцию то, что должно появиться вместе с лидами (ответ для Idempotency-Key)
+BeforeCommit = Callable[[Session, Any], None]
+
+
+def create_lead(db: Session, lead_in: LeadCreate, before_commit: Optional[BeforeCommit] = None) -> LeadOut:
+    """Создать новый лид (и событие lead.created в outbox в той же транзакции)."""
     db_lead = Lead(**lead_in.model_dump())
     db.add(db_lead)
+    db.flush()
+    lead_out = LeadOut.model_validate(db_lead)
+    enqueue_lead_created(db, [lead_out])
+    if before_commit is not None:
+        before_commit(db, lead_out)
+    db.commit()
+    lead_count_cache.invalidate()
+    return lead_out
+
+
+def bulk_create_leads(
+    db: Session,
+    leads_in: Sequence[LeadCreate],
+    chunk_size: int = 500,
+    before_commit: Optional[BeforeCommit] = None,
+) -> list[Union[LeadOut, str]]:
+    """
+    Создать много лидов за минимальное число обращений к БД.
+
+    Каждая порция из chunk_size лидов — один многострочный INSERT … RETURNING
+    под SAVEPOINT. Если порция падает (например, на ограничении БД), я откатываю
+    только её и повторяю построчно, чтобы найти виновные строки.
+    Коммит один на весь пакет; события lead.created пишутся в outbox
+    одним INSERT на порцию.
+
+    Результат выровнен по входу: LeadOut для созданного лида или текст ошибки.
+    """
+    results: list[Union[LeadOut, str]] = []
+    for start in range(0, len(leads_in), chunk_size):
+        rows = [lead_in.model_dump() for lead_in in leads_in[start:start + chunk_size]]
+        try:
+            results.extend(_insert_rows(db, rows))
+        except DBAPIError:
+            for row in rows:
+                try:
+                    results.extend(_insert_rows(db, [row]))
+                except DBAPIError as exc:
+                    results.append(_db_error_message(exc))
+
+    if before_commit is not None:
+        before_commit(db, results)
     db.commit()
-    db.refresh(db_lead)
-    return LeadOut.model_validate(db_lead)
+    lead_count_cache.invalidate()
+    return results
+
+
+def _insert_rows(db: Session, rows: list[dict]) -> list[LeadOut]:
+    """Один многострочный INSERT … RETURNING (и события в outbox) под SAVEPOINT."""
+    stmt = insert(Lead).values(rows).returning(*Lead.__table__.c)
+    with db.begin_nested():
+        created = db.execute(stmt).all()
+        # id выдаются по порядку строк VALUES, так сопоставляю RETURNING с входом
+        created.sort(key=lambda row: row.id)
+        leads_out = [LeadOut.model_validate(row) for row in created]
+        enqueue_lead_created(db, leads_out)
+    return leads_out
+
+
+def _db_error_message(exc: DBAPIError) -> str:
+    """Короткое описание ошибки БД без SQL и параметров запроса."""
+    original = exc.orig if exc.orig is not None else exc
+    lines = str(original).strip().splitlines()
+    first_line = lines[0] if lines else ""
+    return f"{type(original).__name__}: {first_line}"
+
+
+def fetch_lead(db: Session, lead_id: int) -> Optional[LeadOut]:
+    """
+    Прочитать лид из БД мимо кэша — один запрос.
+
+    Лида, перенесённого в архив, нахожу в leads_archive тем же запросом
+    (см. archive.lead_or_archived) — для клиента он выглядит как обычный.
+    """
+    row = db.execute(lead_or_archived(lead_id)).first()
+    return LeadOut.model_validate(row) if row is not None else None
 
 
 def get_lead(db: Session, lead_id: int) -> Optional[LeadOut]:
-    """Получить лид по ID."""
-    stmt = select(Lead).where(Lead.id == lead_id)
-    db_lead = db.scalar(stmt)
-    if not db_lead:
-        return None
-    return LeadOut.model_validate(db_lead)
+    """
+    Получить лид по ID (read-through через lead_cache).
+
+    Токен эпохи беру до запроса в БД: если пока я читаю строку, лид успели
+    изменить, set() не положит в кэш уже устаревшую версию. Строку с реплики
+    в кэш не кладу: реплика может отставать от только что сделанной записи.
+    """
+    cached = lead_cache.get(lead_id)
+    if cached is not None:
+        return cached
+
+    token = lead_cache.begin_fill()
+    lead_out = fetch_lead(db, lead_id)
+    if lead_out is not None and not is_replica_session(db):
+        lead_cache.set(lead_id, lead_out, token)
+    return lead_out
+
+
+def get_leads(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    total_strategy: CountStrategy = CountStrategy.EXACT,
+    filters: Optional[LeadFilters] = None,
+    fields: Fields = None,
+) -> LeadList:
+    """
+    Получить список лидов с пагинацией и фильтрами.
+
+    Два режима:
+    - offset (skip/limit) — оставлен для обратной совместимости;
+    - keyset — если передан cursor, skip игнорируется, а страница выбирается
+      условием «после позиции курсора» (InvalidCursorError при битом курсоре).
+
+    В обоих режимах я выбираю на одну строку больше limit, чтобы понять,
+    есть ли следующая страница, и отдаю next_cursor для её получения.
+
+    total считается выбранной стратегией (см. app/services/counting.py)
+    с теми же фильтрами, что и страница.
+
+    С fields (см. app/services/projection.py) страница читает из БД только
+    эти колонки и служебные, а лиды в ответе — урезанные схемы.
+    """
+    leads_page, _ = get_leads_with_version(db, skip, limit, cursor, sort, order, total_strategy, filters, fields)
+    return leads_page
+
+
+def get_leads_with_version(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    total_strategy: CountStrategy = CountStrategy.EXACT,
+    filters: Optional[LeadFilters] = None,
+    fields: Fields = None,
+) -> tuple[LeadList, Version]:
+    """Страница списка (см. get_leads) и её версия для ETag — без лишних запросов."""
+    filters = filters or LeadFilters()
+    where = lead_filter_conditions(filters)
+    columns = None
+    if fields is not None:
+        # id и ключ сортировки нужны курсору, updated_at и version — версии страницы
+        columns = lead_columns(fields, extra=("id", sort.value, "updated_at", "version"))
+    items_stmt = _page_statement(where, skip, limit, cursor, sort, order, columns)
+
+    db_leads = db.scalars(items_stmt).all() if columns is None else db.execute(items_stmt).all()
+    total, total_strategy = count_leads(
+        db,
+        total_strategy,
+        where=where,
+        cache_key=lead_filters_cache_key(filters),
+    )
+    version = page_version_of(db_leads, total, total_strategy)
+
+    next_cursor = None
+    if len(db_leads) > limit:
+        db_leads = db_leads[:limit]
+        if db_leads:
+            next_cursor = cursor_for(db_leads[-1], sort, order)
+
+    model = lead_model(fields)
+    leads_out = [model.model_validate(l) for l in db_leads]
+    leads_page = lead_list_model(fields)(
+        leads=leads_out,
+        total=total,
+        total_strategy=total_strategy,
+        next_cursor=next_cursor,
+    )
+    return leads_page, version
+
+
+def get_leads_version(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    total_strategy: CountStrategy = CountStrategy.EXACT,
+    filters: Optional[LeadFilters] = None,
+) -> Version:
+    """
+    Версия страницы списка без чтения самих строк.
 
+    Один агрегат (count, max(updated_at), sum(id), sum(version)) по тому же окну, что выбирает
+    get_leads, и total той же стратегией (exact обычно берётся из кэша).
+    Нужна для If-None-Match: если версия совпала, страницу не читаю вовсе.
+    """
+    filters = filters or LeadFilters()
+    where = lead_filter_conditions(filters)
+    window = _page_statement(where, skip, limit, cursor, sort, order).subquery()
+    rows, max_updated_at, id_sum, version_sum = db.execute(
+        select(
+            func.count(),
+            func.max(window.c.updated_at),
+            func.sum(window.c.id),
+            func.sum(window.c.version),
+        )
+    ).one()
+    total, total_strategy = count_leads(
+        db,
+        total_strategy,
+        where=where,
+        cache_key=lead_filters_cache_key(filters),
+    )
+    return page_version(rows, max_updated_at, id_sum, version_sum, total, total_strategy)
 
-def get_leads(db: Session, skip: int = 0, limit: int = 100) -> LeadList:
-    """Получить список лидов с пагинацией."""
-    items_stmt = select(Lead).offset(skip).limit(limit)
-    count_stmt = select(func.count()).select_from(Lead)
 
-    db_leads = db.scalars(items_stmt).all()
-    total = db.scalar(count_stmt) or 0
+def _page_statement(
+    where: Sequence,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    sort: LeadSortField,
+    order: SortOrder,
+    columns: Optional[Sequence] = None,
+) -> Select:
+    """SELECT окна страницы: limit+1 строк после курсора или со сдвигом skip (columns — только эти колонки)."""
+    stmt = select(*columns) if columns else select(Lead)
+    items_stmt = apply_sort(stmt.where(*where), sort, order)
+    if cursor:
+        items_stmt = apply_cursor(items_stmt, cursor, sort, order)
+    else:
+        items_stmt = items_stmt.offset(skip)
+    return items_stmt.limit(limit + 1)
 
-    leads_out = [LeadOut.model_validate(l) for l in db_leads]
-    return LeadList(leads=leads_out, total=total)
 
+def get_leads_by_ids(db: Session, ids: Sequence[int], fields: Fields = None) -> LeadBatch:
+    """
+    Лиды по списку ID одним запросом WHERE id IN (...).
 
-def update_lead(db: Session, lead_id: int, lead_update: LeadUpdate) -> Optional[LeadOut]:
-    """Обновить данные лида по ID."""
-    stmt = select(Lead).where(Lead.id == lead_id)
-    db_lead = db.scalar(stmt)
-    if not db_lead:
+    Порядок ответа — порядок ids (повторы схлопываются до первого вхождения),
+    ненайденные ID перечислены в missing. lead_cache здесь не читаю: один
+    запрос на всю пачку дешевле, чем по обращению к Redis на каждый ID.
+    С fields читаются только эти колонки (см. app/services/projection.py).
+
+    Архивных лидов отдаю наравне с остальными, как и get_lead: тот же запрос
+    через UNION ALL читает и leads_archive (см. archive.leads_or_archived).
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    stmt = leads_or_archived(unique_ids, lead_columns(fields))
+    model = lead_model(fields)
+    found = {row.id: model.model_validate(row) for row in db.execute(stmt)}
+    return lead_batch_model(fields)(
+        leads=[found[lead_id] for lead_id in unique_ids if lead_id in found],
+        missing=[lead_id for lead_id in unique_ids if lead_id not in found],
+    )
+
+
+def get_lead_changes(
+    db: Session,
+    since: Optional[str] = None,
+    limit: int = 100,
+    settle_seconds: float = 0.0,
+) -> tuple[LeadChanges, bool]:
+    """
+    Порция ленты изменений: лиды, созданные или изменённые после курсора since,
+    в порядке (updated_at, id) — keyset по индексу ix_leads_updated_at_id,
+    и лиды, ушедшие из leads (удалённые и архивные, см. app/models/lead_tombstone.py), —
+    по (removed_at, id).
+
+    Время изменения и время ухода — одна шкала, поэтому курсор у них общий:
+    читаю обе таблицы keyset-запросом по limit + 1 строк и сливаю по (время, id).
+
+    updated_at ставится временем транзакции, а видна строка становится только
+    после коммита: транзакция, начатая раньше, может закоммитить строку «позади»
+    курсора, который клиент уже получил. Поэтому отдаю только строки старше
+    settle_seconds по часам БД. Второе значение результата — есть ли после
+    порции ещё не отстоявшиеся изменения (их стоит запросить через settle_seconds).
+
+    Курсор — тот же, что у списка с sort=updated_at&order=asc; пустая порция
+    возвращает since как есть, так что ленту можно продолжать с любого места.
+    """
+    sort, order = LeadSortField.UPDATED_AT, SortOrder.ASC
+    cutoff = _settle_cutoff(db, settle_seconds)
+    leads_stmt = apply_sort(select(Lead, (Lead.updated_at < cutoff).label("settled")), sort, order)
+    removed_stmt = select(LeadTombstone, (LeadTombstone.removed_at < cutoff).label("settled")).order_by(
+        LeadTombstone.removed_at, LeadTombstone.id
+    )
+    if since:
+        leads_stmt = apply_cursor(leads_stmt, since, sort, order)
+        value, lead_id = decode_cursor(since, sort, order)
+        removed_stmt = removed_stmt.where(tuple_(LeadTombstone.removed_at, LeadTombstone.id) > (value, lead_id))
+    changed = db.execute(leads_stmt.limit(limit + 1)).all()
+    removed = db.execute(removed_stmt.limit(limit + 1)).all()
+    # позиция в ленте: (время, id, строка, отстоялась ли)
+    positions = heapq.merge(
+        ((row.updated_at, row.id, row, is_settled) for row, is_settled in changed),
+        ((row.removed_at, row.id, row, is_settled) for row, is_settled in removed),
+        key=lambda position: position[:2],
+    )
+
+    batch, pending = [], False
+    for position in positions:
+        # позиции идут по времени, так что все отстоявшиеся — в начале
+        if not position[3]:
+            pending = True
+            break
+        batch.append(position)
+
+    has_more = len(batch) > limit
+    batch = batch[:limit]
+    changes = LeadChanges(
+        leads=[LeadOut.model_validate(row) for _, _, row, _ in batch if isinstance(row, Lead)],
+        removed=[
+            LeadRemoved(id=row.id, removed_at=row.removed_at, reason=row.reason)
+            for _, _, row, _ in batch
+            if isinstance(row, LeadTombstone)
+        ],
+        next_cursor=encode_cursor(sort, order, *batch[-1][:2]) if batch else since,
+        has_more=has_more,
+    )
+    return changes, pending and not has_more
+
+
+def _settle_cutoff(db: Session, seconds: float):
+    """Момент по часам БД, раньше которого изменения считаются отстоявшимися."""
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLite хранит время строкой в UTC, datetime('now') — в том же формате
+        return func.datetime("now", f"-{seconds:g} seconds")
+    return func.now() - timedelta(seconds=seconds)
+
+
+def update_lead(
+    db: Session,
+    lead_id: int,
+    lead_update: LeadUpdate,
+    if_match: Optional[Sequence[int]] = None,
+    use_cache: bool = True,
+) -> Optional[LeadOut]:
+    """
+    Обновить данные лида по ID одним UPDATE … RETURNING.
+
+    Раньше здесь было три обращения к БД (SELECT, UPDATE, SELECT из refresh).
+    Теперь несуществующий ID просто не вернёт строку — это и есть 404.
+    Пустой патч ничего не меняет (и не двигает updated_at и version), поэтому
+    для него я просто читаю лид. Любой другой UPDATE увеличивает version.
+
+    if_match — номера версий из If-Match (см. conditional.parse_lead_etags).
+    Условие уходит в WHERE того же UPDATE: если лид успели изменить (или его
+    нет), строка не вернётся и я бросаю LeadPreconditionFailed — без
+    отдельного чтения для проверки версии.
+
+    Лида, перенесённого в архив, UPDATE не находит; тогда я проверяю архив
+    и бросаю LeadArchived (409 в API) — вторым запросом, только на промахе.
+
+    use_cache=False — не трогать lead_cache: асинхронный путь читает и
+    сбрасывает его сам, вне event loop (см. leads_async).
+    """
+    data = lead_update.model_dump(exclude_unset=True)
+    if not data:
+        lead_out = get_lead(db, lead_id) if use_cache else fetch_lead(db, lead_id)
+        if if_match is not None and (lead_out is None or lead_out.version not in if_match):
+            raise LeadPreconditionFailed(lead_id)
+        return lead_out
+
+    stmt = update(Lead).where(Lead.id == lead_id)
+    if if_match is not None:
+        stmt = stmt.where(Lead.version.in_(if_match))
+    stmt = (
+        stmt.values(**data, version=Lead.version + 1)
+        .returning(*Lead.__table__.c)
+        .execution_options(synchronize_session=False)
+    )
+    row = db.execute(stmt).first()
+    if row is None:
+        if is_archived(db, lead_id):
+            raise LeadArchived(lead_id)
+        if if_match is not None:
+            raise LeadPreconditionFailed(lead_id)
         return None
+    lead_out = LeadOut.model_validate(row)
+    enqueue_lead_updated(db, lead_out, data)
+    db.commit()
+    if use_cache:
+        lead_cache.delete(lead_id)
+    # смена статуса/менеджера меняет total для отфильтрованных списков
+    lead_count_cache.invalidate()
+    return lead_out
+
 
+def bulk_update_leads(
+    db: Session,
+    lead_filter: LeadBulkFilter,
+    lead_update: LeadUpdate,
+    chunk_size: int = 1000,
+    dry_run: bool = False,
+) -> LeadBulkUpdateResult:
+    """
+    Массово изменить лидов под фильтром set-based UPDATE порциями.
+
+    Порция — до chunk_size лидов по возрастанию id после последнего
+    обработанного: один UPDATE … WHERE id IN (SELECT id … ORDER BY id LIMIT …
+    FOR UPDATE) RETURNING, события lead.updated одним INSERT и коммит.
+    Блокировки строк держатся только до коммита своей порции и берутся по
+    порядку id, так что PATCH и вебхуки не ждут всего обновления, а два
+    массовых обновления не ловят друг друга в deadlock. updated_at двигает
+    onupdate колонки, version увеличивается, как в update_lead.
+
+    Лиды, которым патч ничего не меняет, не трогаю: у них не двигается
+    updated_at и не пишутся события. Поэтому после сбоя посередине
+    (закоммиченные порции останутся) повтор запроса доделает только остаток.
+
+    dry_run — только посчитать, сколько лидов изменилось бы.
+    """
     data = lead_update.model_dump(exclude_unset=True)
-    for field, value in data.items():
-        setattr(db_lead, field, value)
+    conditions = bulk_update_conditions(lead_filter, data)
 
-    db.add(db_lead)
+    if dry_run:
+        matched = db.scalar(select(func.count()).select_from(Lead).where(*conditions))
+        return LeadBulkUpdateResult(updated=matched, chunks=0, dry_run=True)
+
+    updated = chunks = 0
+    last_id = 0
+    while leads_out := bulk_update_chunk(db, conditions, data, chunk_size, last_id):
+        for lead_out in leads_out:
+            lead_cache.delete(lead_out.id)
+        updated += len(leads_out)
+        chunks += 1
+        last_id = max(lead_out.id for lead_out in leads_out)
+    return LeadBulkUpdateResult(updated=updated, chunks=chunks)
+
+
+def bulk_update_conditions(lead_filter: LeadBulkFilter, data: dict[str, Any]) -> list:
+    """WHERE массового изменения: фильтры, ID и «патч что-то меняет»."""
+    conditions = lead_filter_conditions(lead_filter)
+    if lead_filter.ids is not None:
+        conditions.append(Lead.id.in_(lead_filter.ids))
+    conditions.append(or_(*(getattr(Lead, name).is_distinct_from(value) for name, value in data.items())))
+    return conditions
+
+
+def bulk_update_chunk(
+    db: Session,
+    conditions: Sequence,
+    data: dict[str, Any],
+    chunk_size: int,
+    after_id: int,
+) -> list[LeadOut]:
+    """
+    Одна порция bulk_update_leads (лиды с id > after_id) со своим коммитом.
+
+    Возвращает изменённых лидов; lead_cache не трогает — их карточки
+    сбрасывает вызывающий (асинхронный путь — вне event loop).
+    """
+    chunk = (
+        select(Lead.id)
+        .where(*conditions, Lead.id > after_id)
+        .order_by(Lead.id)
+        .limit(chunk_size)
+        .with_for_update()
+    )
+    stmt = (
+        update(Lead)
+        .where(Lead.id.in_(chunk.scalar_subquery()))
+        .values(**data, version=Lead.version + 1)
+        .returning(*Lead.__table__.c)
+        .execution_options(synchronize_session=False)
+    )
+    leads_out = [LeadOut.model_validate(row) for row in db.execute(stmt)]
+    enqueue_leads_updated(db, leads_out, data)
     db.commit()
-    db.refresh(db_lead)
-    return LeadOut.model_validate(db_lead)
+    if leads_out:
+        lead_count_cache.invalidate()
+    return leads_out
+
 
+def delete_lead(db: Session, lead_id: int, use_cache: bool = True) -> bool:
+    """
+    Пока просто физически удаляем лида по ID (позже сделаем мягкое удаление).
 
-def delete_lead(db: Session, lead_id: int) -> bool:
-    """Пока просто физически удаляем лида по ID (позже сделаем мягкое удаление)."""
-    stmt = select(Lead).where(Lead.id == lead_id)
-    db_lead = db.scalar(stmt)
-    if not db_lead:
+    Один DELETE … RETURNING id: вернулась строка — лид был и удалён.
+    Если в leads лида нет, удаляю его из архива (archive.delete_archived):
+    GET архивного лида отдаёт, значит, и DELETE должен его находить.
+    use_cache=False — карточку в lead_cache сбросит вызывающий (см. update_lead).
+    """
+    stmt = (
+        delete(Lead)
+        .where(Lead.id == lead_id)
+        .returning(Lead.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted_id = db.execute(stmt).scalar()
+    if deleted_id is None:
+        deleted_id = delete_archived(db, lead_id)
+    if deleted_id is None:
         return False
 
-    db.delete(db_lead)
+    enqueue_lead_deleted(db, deleted_id)
     db.commit()
+    if use_cache:
+        lead_cache.delete(lead_id)
+    lead_count_cache.invalidate()
     return True
@@ -0,0 +1,276 @@
+# app/services/leads_async.py — асинхронные версии сервисов лидов (AsyncSession).
+
+"""
+Асинхронные сервисы для лидов.
+
+Бизнес-логику не дублирую: AsyncSession.run_sync выполняет синхронный сервис
+из app/services/leads.py в greenlet поверх асинхронного соединения — без потока
+из threadpool и без блокировки event loop на ожидании БД.
+Отдельно написана только выгрузка: генератор нельзя прокинуть через run_sync,
+поэтому она читает строки через AsyncSession.stream.
+
+Кэш карточек (lead_cache) синхронный, а run_sync выполняет сервис в потоке
+event loop — с LEAD_CACHE_BACKEND=redis каждый вызов кэша останавливал бы
+все запросы воркера. Поэтому карточку, её изменение и удаление я вызываю
+здесь по частям: работа с БД — через run_sync с use_cache=False, а обращения
+к кэшу — через _cache_call (для Redis — в потоке через asyncio.to_thread).
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Callable, Optional, Sequence, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.leads import (
+    CountStrategy,
+    ExportFormat,
+    LeadBatch,
+    LeadBulkFilter,
+    LeadBulkUpdateResult,
+    LeadChanges,
+    LeadCreate,
+    LeadFilters,
+    LeadList,
+    LeadOut,
+    LeadSortField,
+    LeadStats,
+    LeadUpdate,
+    SortOrder,
+)
+from app.db.replicas import is_replica_session
+from app.services import idempotency, leads, search, stats
+from app.services.conditional import Version
+from app.services.lead_cache import lead_cache
+from app.services.idempotency import IdempotencyClaim
+from app.services.export import encode_chunk, export_statement, header_chunk
+from app.services.projection import Fields
+
+
+async def _cache_call(method: Callable, *args) -> Any:
+    """Вызвать метод lead_cache, не блокируя event loop сетевым бэкендом."""
+    if lead_cache.blocking:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+
+async def _forget_leads(lead_ids: Sequence[int]) -> None:
+    """Сбросить карточки лидов в lead_cache после коммита их изменения."""
+    for lead_id in lead_ids:
+        await _cache_call(lead_cache.delete, lead_id)
+
+
+async def create_lead(
+    db: AsyncSession,
+    lead_in: LeadCreate,
+    before_commit: Optional[leads.BeforeCommit] = None,
+) -> LeadOut:
+    """Создать новый лид (before_commit получает синхронную сессию, см. leads.create_lead)."""
+    return await db.run_sync(leads.create_lead, lead_in, before_commit)
+
+
+async def bulk_create_leads(
+    db: AsyncSession,
+    leads_in: Sequence[LeadCreate],
+    chunk_size: int = 500,
+    before_commit: Optional[leads.BeforeCommit] = None,
+) -> list[Union[LeadOut, str]]:
+    """Пакетно создать лидов (см. leads.bulk_create_leads)."""
+    return await db.run_sync(leads.bulk_create_leads, leads_in, chunk_size, before_commit)
+
+
+async def claim_idempotency_key(
+    db: AsyncSession,
+    scope: str,
+    key: str,
+    request_hash: str,
+) -> IdempotencyClaim:
+    """Занять ключ идемпотентности (см. idempotency.claim_idempotency_key)."""
+    return await db.run_sync(idempotency.claim_idempotency_key, scope, key, request_hash)
+
+
+async def get_lead(db: AsyncSession, lead_id: int) -> Optional[LeadOut]:
+    """Получить лид по ID (read-through через lead_cache, как leads.get_lead)."""
+    cached = await _cache_call(lead_cache.get, lead_id)
+    if cached is not None:
+        return cached
+
+    token = lead_cache.begin_fill()
+    lead_out = await db.run_sync(leads.fetch_lead, lead_id)
+    if lead_out is not None and not is_replica_session(db):
+        await _cache_call(lead_cache.set, lead_id, lead_out, token)
+    return lead_out
+
+
+async def get_leads(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    total_strategy: CountStrategy = CountStrategy.EXACT,
+    filters: Optional[LeadFilters] = None,
+    fields: Fields = None,
+) -> LeadList:
+    """Получить список лидов с пагинацией (см. leads.get_leads)."""
+    return await db.run_sync(
+        leads.get_leads,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        order=order,
+        total_strategy=total_strategy,
+        filters=filters,
+        fields=fields,
+    )
+
+
+async def get_leads_with_version(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    total_strategy: CountStrategy = CountStrategy.EXACT,
+    filters: Optional[LeadFilters] = None,
+    fields: Fields = None,
+) -> tuple[LeadList, Version]:
+    """Страница списка и её версия для ETag (см. leads.get_leads_with_version)."""
+    return await db.run_sync(
+        leads.get_leads_with_version,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        order=order,
+        total_strategy=total_strategy,
+        filters=filters,
+        fields=fields,
+    )
+
+
+async def get_leads_version(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    total_strategy: CountStrategy = CountStrategy.EXACT,
+    filters: Optional[LeadFilters] = None,
+) -> Version:
+    """Версия страницы списка без чтения строк (см. leads.get_leads_version)."""
+    return await db.run_sync(
+        leads.get_leads_version,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        order=order,
+        total_strategy=total_strategy,
+        filters=filters,
+    )
+
+
+async def get_leads_by_ids(db: AsyncSession, ids: Sequence[int], fields: Fields = None) -> LeadBatch:
+    """Лиды по списку ID одним запросом (см. leads.get_leads_by_ids)."""
+    return await db.run_sync(leads.get_leads_by_ids, ids, fields)
+
+
+async def get_lead_changes(
+    db: AsyncSession,
+    since: Optional[str] = None,
+    limit: int = 100,
+    settle_seconds: float = 0.0,
+) -> tuple[LeadChanges, bool]:
+    """Порция ленты изменений лидов (см. leads.get_lead_changes)."""
+    return await db.run_sync(leads.get_lead_changes, since, limit, settle_seconds)
+
+
+async def search_leads(
+    db: AsyncSession,
+    q: str,
+    limit: int = 20,
+    budget_ms: Optional[int] = None,
+) -> list[LeadOut]:
+    """Найти лидов по фрагменту имени или email (см. search.search_leads)."""
+    return await db.run_sync(search.search_leads, q, limit, budget_ms)
+
+
+async def get_lead_stats(db: AsyncSession) -> LeadStats:
+    """Сводка по лидам для дашборда (см. stats.get_lead_stats)."""
+    return await db.run_sync(stats.get_lead_stats)
+
+
+async def update_lead(
+    db: AsyncSession,
+    lead_id: int,
+    lead_update: LeadUpdate,
+    if_match: Optional[Sequence[int]] = None,
+) -> Optional[LeadOut]:
+    """Обновить данные лида по ID (с if_match — только из версии клиента)."""
+    if not lead_update.model_fields_set and if_match is None:
+        return await get_lead(db, lead_id)  # пустой патч — только чтение
+    lead_out = await db.run_sync(leads.update_lead, lead_id, lead_update, if_match, False)
+    if lead_out is not None and lead_update.model_fields_set:
+        await _forget_leads([lead_id])
+    return lead_out
+
+
+async def bulk_update_leads(
+    db: AsyncSession,
+    lead_filter: LeadBulkFilter,
+    lead_update: LeadUpdate,
+    chunk_size: int = 1000,
+    dry_run: bool = False,
+) -> LeadBulkUpdateResult:
+    """
+    Массово изменить лидов под фильтром порциями (см. leads.bulk_update_leads).
+
+    Цикл по порциям здесь, а не в run_sync: карточки порции сбрасываются
+    в кэше сразу после её коммита, но вне event loop.
+    """
+    if dry_run:
+        return await db.run_sync(leads.bulk_update_leads, lead_filter, lead_update, chunk_size, True)
+
+    data = lead_update.model_dump(exclude_unset=True)
+    conditions = leads.bulk_update_conditions(lead_filter, data)
+    updated = chunks = 0
+    last_id = 0
+    while leads_out := await db.run_sync(leads.bulk_update_chunk, conditions, data, chunk_size, last_id):
+        await _forget_leads([lead_out.id for lead_out in leads_out])
+        updated += len(leads_out)
+        chunks += 1
+        last_id = max(lead_out.id for lead_out in leads_out)
+    return LeadBulkUpdateResult(updated=updated, chunks=chunks)
+
+
+async def delete_lead(db: AsyncSession, lead_id: int) -> bool:
+    """Удалить лида по ID."""
+    deleted = await db.run_sync(leads.delete_lead, lead_id, False)
+    if deleted:
+        await _forget_leads([lead_id])
+    return deleted
+
+
+async def iter_leads_export(
+    db: AsyncSession,
+    export_format: ExportFormat,
+    sort: LeadSortField = LeadSortField.ID,
+    order: SortOrder = SortOrder.ASC,
+    batch_size: int = 1000,
+    filters: Optional[LeadFilters] = None,
+) -> AsyncIterator[bytes]:
+    """Асинхронный генератор кусков выгрузки (см. export.iter_leads_export)."""
+    header = header_chunk(export_format)
+    if header is not None:
+        yield header
+
+    result = await db.stream(export_statement(sort, order, batch_size, filters))
+    try:
+        async for partition in result.partitions():
+            yield encode_chunk(export_format, partition)
+    finally:
+        await result.close()
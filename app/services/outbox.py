@@ -0,0 +1,59 @@
+# app/services/outbox.py — запись событий по лидам в outbox (в транзакции записи).
+
+"""
+Запись событий lead.created / lead.updated / lead.deleted в таблицу outbox.
+
+Функции только добавляют INSERT в текущую транзакцию сессии — коммитит
+вызывающий сервис вместе с самим лидом. Отправкой в брокер занимается
+диспетчер (app/services/outbox_dispatcher.py).
+
+Тело события:
+- created/updated — карточка лида (как LeadOut), для updated ещё и список
+  изменённых полей changed;
+- deleted — только id.
+"""
+
+from typing import Iterable
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.outbox import LEAD_CREATED, LEAD_DELETED, LEAD_UPDATED, OutboxEvent
+from app.schemas.leads import LeadOut
+
+
+def enqueue_lead_created(db: Session, leads: Iterable[LeadOut]) -> None:
+    """Событие lead.created для каждого созданного лида (один многострочный INSERT)."""
+    _enqueue(db, [(LEAD_CREATED, lead.id, lead.model_dump(mode="json")) for lead in leads])
+
+
+def enqueue_lead_updated(db: Session, lead: LeadOut, changed: Iterable[str]) -> None:
+    """Событие lead.updated с новой карточкой лида и списком изменённых полей."""
+    enqueue_leads_updated(db, [lead], changed)
+
+
+def enqueue_leads_updated(db: Session, leads: Iterable[LeadOut], changed: Iterable[str]) -> None:
+    """События lead.updated для пачки лидов с одним набором изменённых полей (один INSERT)."""
+    changed = sorted(changed)
+    events = []
+    for lead in leads:
+        payload = lead.model_dump(mode="json")
+        payload["changed"] = changed
+        events.append((LEAD_UPDATED, lead.id, payload))
+    _enqueue(db, events)
+
+
+def enqueue_lead_deleted(db: Session, lead_id: int) -> None:
+    """Событие lead.deleted."""
+    _enqueue(db, [(LEAD_DELETED, lead_id, {"id": lead_id})])
+
+
+def _enqueue(db: Session, events: list[tuple[str, int, dict]]) -> None:
+    if not settings.outbox_enabled or not events:
+        return
+    rows = [
+        {"event_type": event_type, "aggregate_id": lead_id, "payload": payload, "attempts": 0}
+        for event_type, lead_id, payload in events
+    ]
+    db.execute(insert(OutboxEvent), rows)
@@ -0,0 +1,193 @@
+# app/services/outbox_dispatcher.py — отправка событий из outbox в брокер.
+
+"""
+Диспетчер outbox: читает ожидающие события пачками и публикует их в брокер.
+
+Один проход (drain_once):
+1. берёт до batch_size событий по порядку id, пропуская лидов, у которых
+   есть событие в ожидании повтора (next_attempt_at в будущем) — иначе более
+   позднее событие лида ушло бы раньше неотправленного;
+2. публикует их «волнами»: в волне не больше одного события на лида, события
+   волны уходят конкурентно и ждут подтверждений брокера. Если событие лида
+   не подтвердилось, его следующие события в этом проходе не отправляются;
+3. одной транзакцией удаляет опубликованные события, а неудачным
+   увеличивает attempts и назначает повтор с экспоненциальной задержкой.
+
+Доставка «как минимум один раз»: если процесс упадёт между подтверждением
+брокера и удалением строки, событие уйдёт повторно с тем же message_id.
+
+На Postgres проход держит advisory-блокировку транзакции: несколько
+диспетчеров (например, по одному в каждом поде) не публикуют одно и то же
+и не нарушают порядок — работает тот, кто взял блокировку.
+"""
+
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.outbox import OutboxEvent
+from app.services.broker import Broker, EventMessage
+
+
+logger = logging.getLogger("skatinov_leadlab.outbox")
+
+# Ключ pg_try_advisory_xact_lock для диспетчера outbox
+OUTBOX_LOCK_KEY = 7_482_301
+
+
+class OutboxDispatcher:
+    """Публикация событий outbox в брокер пачками, с повторами и порядком по лиду."""
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        broker: Broker,
+        batch_size: int = 500,
+        retry_base: float = 1.0,
+        retry_max: float = 300.0,
+        poll_interval: float = 1.0,
+    ):
+        self.session_factory = session_factory
+        self.broker = broker
+        self.batch_size = batch_size
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_interval = poll_interval
+        self.published = 0
+        self.failed = 0
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Работать, пока не выставлен stop: пустой проход — пауза poll_interval."""
+        while not stop.is_set():
+            try:
+                fetched, published = await self.drain_once()
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+                fetched, published = 0, 0
+            if fetched < self.batch_size or not published:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def drain(self) -> int:
+        """Отправить всё, что готово к отправке сейчас; число опубликованных событий."""
+        total = 0
+        while True:
+            fetched, published = await self.drain_once()
+            total += published
+            if fetched < self.batch_size or not published:
+                return total
+
+    async def drain_once(self) -> tuple[int, int]:
+        """Один проход: (сколько событий прочитано, сколько опубликовано)."""
+        db = self.session_factory()
+        try:
+            events = await asyncio.to_thread(self._fetch, db)
+            if not events:
+                await asyncio.to_thread(db.rollback)
+                return 0, 0
+            published, failures = await self._publish(events)
+            await asyncio.to_thread(self._finish, db, published, failures)
+        finally:
+            await asyncio.to_thread(db.close)
+
+        self.published += len(published)
+        self.failed += len(failures)
+        if failures:
+            logger.warning(
+                "Outbox: %d published, %d failed (first error: %s)",
+                len(published),
+                len(failures),
+                next(iter(failures.values())),
+            )
+        return len(events), len(published)
+
+    def _fetch(self, db: Session) -> list[OutboxEvent]:
+        """Взять блокировку (Postgres) и прочитать пачку готовых событий."""
+        if db.get_bind().dialect.name == "postgresql":
+            if not db.scalar(select(func.pg_try_advisory_xact_lock(OUTBOX_LOCK_KEY))):
+                return []
+        # лиды с событием в ожидании повтора: их события ждут, чтобы не нарушить порядок
+        waiting = select(OutboxEvent.aggregate_id).where(OutboxEvent.next_attempt_at > _utcnow())
+        stmt = (
+            select(OutboxEvent)
+            .where(OutboxEvent.aggregate_id.not_in(waiting))
+            .order_by(OutboxEvent.id)
+            .limit(self.batch_size)
+        )
+        return list(db.scalars(stmt))
+
+    async def _publish(self, events: list[OutboxEvent]) -> tuple[list[int], dict[OutboxEvent, Exception]]:
+        """Опубликовать события волнами; id опубликованных и ошибки неудачных."""
+        waves: list[list[OutboxEvent]] = []
+        depth: dict[int, int] = {}
+        for event in events:
+            level = depth.get(event.aggregate_id, 0)
+            depth[event.aggregate_id] = level + 1
+            if level == len(waves):
+                waves.append([])
+            waves[level].append(event)
+
+        published: list[int] = []
+        failures: dict[OutboxEvent, Exception] = {}
+        failed_leads: set[int] = set()
+        for wave in waves:
+            wave = [event for event in wave if event.aggregate_id not in failed_leads]
+            results = await asyncio.gather(
+                *(self.broker.publish(_message(event)) for event in wave),
+                return_exceptions=True,
+            )
+            for event, result in zip(wave, results):
+                if isinstance(result, Exception):
+                    failures[event] = result
+                    failed_leads.add(event.aggregate_id)
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    published.append(event.id)
+        return published, failures
+
+    def _finish(self, db: Session, published: list[int], failures: dict[OutboxEvent, Exception]) -> None:
+        """Удалить опубликованные события и запланировать повтор неудачных."""
+        if published:
+            db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(published)))
+        now = _utcnow()
+        for event, error in failures.items():
+            event.attempts += 1
+            event.next_attempt_at = now + timedelta(seconds=self.retry_delay(event.attempts))
+            event.last_error = str(error)[:500]
+        db.commit()
+
+    def retry_delay(self, attempts: int) -> float:
+        """Экспоненциальная задержка с джиттером: base * 2^(attempts-1), не больше retry_max."""
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+
+def _message(event: OutboxEvent) -> EventMessage:
+    return EventMessage(
+        event_id=event.id,
+        event_type=event.event_type,
+        aggregate_id=event.aggregate_id,
+        payload=event.payload,
+        created_at=_isoformat(event.created_at),
+    )
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        # SQLite возвращает время без зоны, пишет его func.now() в UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
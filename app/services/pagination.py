@@ -0,0 +1,101 @@
+# app/services/pagination.py — keyset-пагинация (непрозрачные курсоры) для списков.
+
+"""
+Keyset-пагинация для списка лидов.
+
+Вместо OFFSET я запоминаю в курсоре значение ключа сортировки и id последней
+строки страницы, а следующую страницу выбираю условием «строго после этой пары».
+Так Postgres идёт по индексу сразу с нужного места и не перебирает пропущенные строки:
+страница 10 000 стоит столько же, сколько первая.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Select, tuple_
+
+from app.models.lead import Lead
+from app.schemas.leads import LeadSortField, SortOrder
+
+
+class InvalidCursorError(ValueError):
+    """Курсор повреждён или не подходит к текущей сортировке."""
+
+
+def sort_column(sort: LeadSortField):
+    """Колонка модели Lead, соответствующая полю сортировки."""
+    return getattr(Lead, sort.value)
+
+
+def encode_cursor(sort: LeadSortField, order: SortOrder, value: Any, lead_id: int) -> str:
+    """Собрать непрозрачный курсор из ключа сортировки и id последней строки."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = {"s": sort.value, "o": order.value, "v": value, "id": lead_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str, sort: LeadSortField, order: SortOrder) -> tuple[Any, int]:
+    """
+    Разобрать курсор и вернуть пару (значение ключа сортировки, id).
+
+    Курсор привязан к сортировке, с которой он был выдан: продолжать
+    его с другой сортировкой нельзя — порядок строк будет другим.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        cursor_sort = LeadSortField(payload["s"])
+        cursor_order = SortOrder(payload["o"])
+        value = payload["v"]
+        lead_id = int(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursorError("Некорректный курсор") from exc
+
+    if cursor_sort != sort or cursor_order != order:
+        raise InvalidCursorError("Курсор выдан для другой сортировки")
+
+    if sort == LeadSortField.ID:
+        return lead_id, lead_id
+    try:
+        return datetime.fromisoformat(value), lead_id
+    except (TypeError, ValueError) as exc:
+        raise InvalidCursorError("Некорректный курсор") from exc
+
+
+def apply_sort(stmt: Select, sort: LeadSortField, order: SortOrder) -> Select:
+    """Добавить стабильную сортировку: ключ сортировки + id как тай-брейкер."""
+    column = sort_column(sort)
+    if order == SortOrder.DESC:
+        if sort == LeadSortField.ID:
+            return stmt.order_by(Lead.id.desc())
+        return stmt.order_by(column.desc(), Lead.id.desc())
+    if sort == LeadSortField.ID:
+        return stmt.order_by(Lead.id.asc())
+    return stmt.order_by(column.asc(), Lead.id.asc())
+
+
+def apply_cursor(stmt: Select, cursor: str, sort: LeadSortField, order: SortOrder) -> Select:
+    """Отфильтровать строки, идущие строго после позиции курсора."""
+    value, lead_id = decode_cursor(cursor, sort, order)
+
+    if sort == LeadSortField.ID:
+        if order == SortOrder.DESC:
+            return stmt.where(Lead.id < lead_id)
+        return stmt.where(Lead.id > lead_id)
+
+    # Сравнение кортежей (row values) Postgres и SQLite умеют обслуживать
+    # составным индексом (created_at, id) / (updated_at, id)
+    key = tuple_(sort_column(sort), Lead.id)
+    if order == SortOrder.DESC:
+        return stmt.where(key < (value, lead_id))
+    return stmt.where(key > (value, lead_id))
+
+
+def cursor_for(lead: Lead, sort: LeadSortField, order: SortOrder) -> str:
+    """Курсор, указывающий на позицию сразу после переданного лида."""
+    return encode_cursor(sort, order, getattr(lead, sort.value), lead.id)
@@ -0,0 +1,98 @@
+# app/services/projection.py — выборка части полей лида (параметр fields=).
+
+"""
+Проекция полей лида: fields=name,status.
+
+Канбан и списки в интерфейсе показывают два-три поля лида, а LeadOut несёт
+все. С fields= я выбираю в SQL только нужные колонки (плюс служебные: id,
+ключ сортировки для курсора, updated_at для ETag) и отдаю ответ по урезанной
+схеме — в JSON нет ни лишних полей, ни null вместо них.
+
+id в ответе есть всегда: без него клиент не сопоставит строку с карточкой.
+Урезанные схемы создаются один раз на набор полей (lru_cache), поэтому
+TypeAdapter ответа (см. app/api/v1/utils.py) тоже компилируется один раз.
+"""
+
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy.sql import ColumnElement
+
+from app.models.lead import Lead
+from app.schemas.leads import LeadBatch, LeadList, LeadOut
+
+
+# Поля в порядке LeadOut — в нём же колонки идут в SELECT и поля в ответе
+LEAD_FIELDS: tuple[str, ...] = tuple(LeadOut.model_fields)
+
+# Набор полей проекции; None — все поля (обычный LeadOut)
+Fields = Optional[tuple[str, ...]]
+
+
+class InvalidFieldsError(ValueError):
+    """В fields= есть поле, которого нет у лида."""
+
+
+def parse_fields(value: Optional[str]) -> Fields:
+    """
+    Разобрать fields= (имена через запятую) в набор полей в порядке LeadOut.
+
+    Пустое значение или все поля сразу — None: проекция не нужна.
+    """
+    if value is None:
+        return None
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    if not names:
+        return None
+    unknown = sorted(names.difference(LEAD_FIELDS))
+    if unknown:
+        raise InvalidFieldsError(
+            f"Неизвестные поля: {', '.join(unknown)}; доступны: {', '.join(LEAD_FIELDS)}"
+        )
+    names.add("id")
+    if len(names) == len(LEAD_FIELDS):
+        return None
+    return tuple(name for name in LEAD_FIELDS if name in names)
+
+
+def lead_columns(fields: Fields, extra: Iterable[str] = ()) -> list[ColumnElement]:
+    """Колонки Lead для SELECT: поля проекции и служебные extra (без повторов)."""
+    names = set(fields or LEAD_FIELDS).union(extra)
+    return [getattr(Lead, name) for name in LEAD_FIELDS if name in names]
+
+
+@lru_cache(maxsize=None)
+def lead_model(fields: Fields) -> type[BaseModel]:
+    """Схема лида только с полями fields (None — LeadOut)."""
+    if fields is None:
+        return LeadOut
+    return create_model(
+        "LeadPartial_" + "_".join(fields),
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (LeadOut.model_fields[name].annotation, ...) for name in fields},
+    )
+
+
+@lru_cache(maxsize=None)
+def lead_list_model(fields: Fields) -> type[LeadList]:
+    """LeadList, в котором leads — урезанные схемы lead_model(fields)."""
+    if fields is None:
+        return LeadList
+    return create_model(
+        "LeadListPartial_" + "_".join(fields),
+        __base__=LeadList,
+        leads=(list[lead_model(fields)], ...),
+    )
+
+
+@lru_cache(maxsize=None)
+def lead_batch_model(fields: Fields) -> type[LeadBatch]:
+    """LeadBatch, в котором leads — урезанные схемы lead_model(fields)."""
+    if fields is None:
+        return LeadBatch
+    return create_model(
+        "LeadBatchPartial_" + "_".join(fields),
+        __base__=LeadBatch,
+        leads=(list[lead_model(fields)], ...),
+    )
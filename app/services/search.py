@@ -0,0 +1,200 @@
+# app/services/search.py — подстрочный/нечёткий поиск лидов по имени и email.
+
+"""
+Поиск лидов по фрагменту имени или email.
+
+Запрос выбирается по диалекту (структуры описаны в app/models/lead_search.py):
+- Postgres + pg_trgm — ILIKE '%q%' или триграммное сходство (оператор %),
+  ранжирование по similarity(); оба условия обслуживают GIN-индексы;
+- Postgres без pg_trgm — ILIKE без индекса, сначала совпадения с начала строки;
+- SQLite — MATCH по FTS5-таблице leads_fts (trigram), ранжирование bm25.
+
+Поиск ограничен бюджетом времени: если запрос не уложился, он прерывается
+на стороне БД и сервис поднимает SearchTimeoutError, а не держит соединение.
+
+Запрос обрезается по краям; если после этого он короче MIN_QUERY_LENGTH,
+сервис поднимает SearchQueryTooShortError (422 в API).
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from time import monotonic
+from typing import Callable, Optional
+
+from sqlalchemy import case, column, func, literal_column, or_, select, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from app.models.lead import Lead
+from app.models.lead_search import LEADS_FTS_TABLE
+from app.schemas.leads import LeadOut
+
+# Триграммам нужно хотя бы три символа: более короткий фрагмент не попадёт в индекс
+MIN_QUERY_LENGTH = 3
+
+# SQLSTATE query_canceled: так Postgres сообщает о превышении statement_timeout
+PG_QUERY_CANCELED = "57014"
+
+leads_fts = table(LEADS_FTS_TABLE, column("rowid"), column("rank"))
+
+# Есть ли pg_trgm в базе — проверяю один раз на engine
+_pg_trgm_available: dict[Engine, bool] = {}
+
+
+class SearchTimeoutError(Exception):
+    """Поиск не уложился в бюджет времени."""
+
+
+class SearchQueryTooShortError(ValueError):
+    """Поисковый запрос без пробелов по краям короче MIN_QUERY_LENGTH."""
+
+
+def search_leads(
+    db: Session,
+    q: str,
+    limit: int = 20,
+    budget_ms: Optional[int] = None,
+) -> list[LeadOut]:
+    """
+    Найти лидов, у которых name или email содержит q (лучшие совпадения первыми).
+
+    budget_ms — предельное время запроса в БД; None или 0 — без ограничения.
+    """
+    q = q.strip()
+    if len(q) < MIN_QUERY_LENGTH:
+        raise SearchQueryTooShortError(f"Поисковый запрос короче {MIN_QUERY_LENGTH} символов")
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        stmt = _sqlite_statement(q)
+    elif dialect == "postgresql" and _has_pg_trgm(db):
+        stmt = _trigram_statement(q)
+    else:
+        stmt = _ilike_statement(q)
+
+    with _latency_budget(db, budget_ms):
+        rows = db.scalars(stmt.limit(limit)).all()
+    return [LeadOut.model_validate(row) for row in rows]
+
+
+def _like_pattern(q: str) -> str:
+    """Шаблон '%q%' с экранированием спецсимволов LIKE."""
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _trigram_statement(q: str):
+    """Postgres + pg_trgm: подстрока или похожая строка, ранжирование по similarity."""
+    pattern = _like_pattern(q)
+    score = func.greatest(func.similarity(Lead.name, q), func.similarity(Lead.email, q))
+    return (
+        select(Lead)
+        .where(
+            or_(
+                Lead.name.ilike(pattern, escape="\\"),
+                Lead.email.ilike(pattern, escape="\\"),
+                Lead.name.bool_op("%")(q),
+                Lead.email.bool_op("%")(q),
+            )
+        )
+        .order_by(score.desc(), Lead.id)
+    )
+
+
+def _ilike_statement(q: str):
+    """Запасной вариант без индексов: ILIKE, совпадения с начала строки выше."""
+    pattern = _like_pattern(q)
+    prefix = pattern[1:]
+    rank = case(
+        (or_(Lead.name.ilike(prefix, escape="\\"), Lead.email.ilike(prefix, escape="\\")), 0),
+        else_=1,
+    )
+    return (
+        select(Lead)
+        .where(or_(Lead.name.ilike(pattern, escape="\\"), Lead.email.ilike(pattern, escape="\\")))
+        .order_by(rank, Lead.id)
+    )
+
+
+def _sqlite_statement(q: str):
+    """SQLite: MATCH по триграммной FTS5-таблице, ранжирование bm25 (колонка rank)."""
+    # Фраза в двойных кавычках: q ищется целиком, спецсимволы FTS5 не работают
+    phrase = '"' + q.replace('"', '""') + '"'
+    return (
+        select(Lead)
+        .join(leads_fts, leads_fts.c.rowid == Lead.id)
+        .where(literal_column(LEADS_FTS_TABLE).op("MATCH")(phrase))
+        .order_by(leads_fts.c.rank, Lead.id)
+    )
+
+
+def _has_pg_trgm(db: Session) -> bool:
+    """Установлено ли в базе расширение pg_trgm (результат кэшируется на engine)."""
+    engine = db.get_bind()
+    if engine not in _pg_trgm_available:
+        _pg_trgm_available[engine] = bool(
+            db.scalar(text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"))
+        )
+    return _pg_trgm_available[engine]
+
+
+@contextmanager
+def _latency_budget(db: Session, budget_ms: Optional[int]):
+    """
+    Ограничить время запросов внутри блока.
+
+    Postgres — SET LOCAL statement_timeout (действует до конца транзакции).
+    SQLite — progress handler, который прерывает запрос по дедлайну
+    (и для sqlite3, и для aiosqlite, см. _progress_handler_setter).
+    """
+    if not budget_ms:
+        yield
+        return
+
+    connection = db.connection()
+    dialect = connection.dialect.name
+    set_progress_handler = _progress_handler_setter(connection) if dialect == "sqlite" else None
+
+    if dialect == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(budget_ms)}")
+    elif set_progress_handler is not None:
+        deadline = monotonic() + budget_ms / 1000
+        # ненулевой ответ обработчика прерывает текущий запрос SQLite
+        set_progress_handler(lambda: int(monotonic() > deadline), 10_000)
+
+    try:
+        yield
+    except DBAPIError as exc:
+        if _is_timeout(exc):
+            raise SearchTimeoutError(f"Поиск не уложился в {budget_ms} мс") from exc
+        raise
+    finally:
+        if set_progress_handler is not None:
+            set_progress_handler(None, 0)
+
+
+def _progress_handler_setter(connection) -> Optional[Callable[[Optional[Callable[[], int]], int], None]]:
+    """
+    set_progress_handler соединения SQLite под синхронный вызов.
+
+    У aiosqlite это корутина: асинхронная сессия зовёт сервис через run_sync,
+    то есть в greenlet, и await_only дожидается её прямо здесь. Обработчик
+    aiosqlite ставит в своём потоке — там же, где выполняются запросы.
+    """
+    raw = connection.connection.driver_connection
+    if isinstance(raw, sqlite3.Connection):
+        return raw.set_progress_handler
+    if connection.dialect.driver == "aiosqlite":
+        return lambda handler, n: await_only(raw.set_progress_handler(handler, n))
+    return None
+
+
+def _is_timeout(exc: DBAPIError) -> bool:
+    """Ошибка БД означает прерывание запроса по таймауту."""
+    orig = exc.orig
+    if isinstance(orig, sqlite3.OperationalError):
+        return "interrupted" in str(orig)
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    return code == PG_QUERY_CANCELED
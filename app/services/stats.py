@@ -0,0 +1,34 @@
+# app/services/stats.py — сводная статистика лидов (счётчики из lead_stats).
+
+"""
+Статистика лидов для дашборда воронки.
+
+Счётчики не считаются GROUP BY по leads: их заранее поддерживают триггеры
+в таблице lead_stats (см. app/models/lead_stat.py), поэтому запрос сводки
+читает несколько десятков строк независимо от размера таблицы лидов.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.lead_stat import EMPTY_VALUE, STATS_DIMENSIONS, LeadStat
+from app.schemas.leads import LeadStats, LeadStatsBucket
+
+
+def get_lead_stats(db: Session) -> LeadStats:
+    """Сводка по всем измерениям; значения отсортированы по убыванию числа лидов."""
+    stmt = (
+        select(LeadStat.dimension, LeadStat.value, LeadStat.count)
+        .where(LeadStat.count > 0)
+        .order_by(LeadStat.dimension, LeadStat.count.desc(), LeadStat.value)
+    )
+    buckets: dict[str, list[LeadStatsBucket]] = {dim: [] for dim in STATS_DIMENSIONS}
+    for dimension, value, count in db.execute(stmt):
+        if dimension in buckets:
+            buckets[dimension].append(
+                LeadStatsBucket(value=None if value == EMPTY_VALUE else value, count=count)
+            )
+
+    # у каждого лида ровно один статус, поэтому сумма по статусам — общее число лидов
+    total = sum(bucket.count for bucket in buckets["status"])
+    return LeadStats(total=total, **buckets)
@@ -0,0 +1,170 @@
+"""
+Нагрузочный тест контроля допуска: задержка допущенных запросов при перегрузке.
+
+Стенд моделирует медленную БД без самой БД: синхронный эндпоинт /slow
+берёт «соединение» из пула на --pool мест и держит его --service-ms мс,
+поэтому пропускная способность — pool / service секунд. Запросы подаются
+открытой нагрузкой (по расписанию, не дожидаясь ответов) в --overload раз
+больше этой пропускной способности в течение --duration секунд; параллельно
+раз в 50 мс опрашивается /api/v1/health.
+
+Прогон идёт дважды — без контроля допуска и с AdmissionControlMiddleware
+(лимит = pool, очередь = pool, таймаут очереди --queue-timeout-ms).
+Печатается p50/p99 допущенных (200) запросов по секундам и за весь прогон,
+число отказов 503 и p99 health. Без контроля допуска очередь в threadpool
+растёт весь прогон, и p99 растёт вместе с ней; с ним p99 допущенных
+ограничен временем обслуживания плюс таймаутом очереди.
+
+Запуск (из корня проекта):
+    python -m benchmarks.bench_admission --overload 5 --duration 5
+"""
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.admission import AdmissionControlMiddleware
+from benchmarks.common import report, summarize
+
+
+def build_app(admission: bool, pool: int, service: float, queue_timeout: float) -> FastAPI:
+    app = FastAPI()
+    connections = threading.BoundedSemaphore(pool)
+
+    @app.get("/slow")
+    def slow():
+        with connections:
+            time.sleep(service)
+        return {"ok": True}
+
+    @app.get("/api/v1/health")
+    async def health():
+        return {"status": "ok"}
+
+    if admission:
+        app.add_middleware(
+            AdmissionControlMiddleware,
+            max_concurrency=pool,
+            max_queue=pool,
+            queue_timeout=queue_timeout,
+            exempt_paths="/api/v1/health",
+        )
+    return app
+
+
+async def run(app: FastAPI, rate: float, duration: float) -> dict:
+    """Открытая нагрузка на /slow и опрос health; сырые результаты."""
+    transport = httpx.ASGITransport(app=app)
+    results: list[tuple[float, int, float]] = []  # (секунда от старта, статус, задержка мс)
+    health: list[float] = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+
+        async def one() -> None:
+            sent = time.perf_counter()
+            response = await client.get("/slow")
+            results.append((sent - started, response.status_code, (time.perf_counter() - sent) * 1000))
+
+        async def probe_health() -> None:
+            while time.perf_counter() - started < duration:
+                sent = time.perf_counter()
+                await client.get("/api/v1/health")
+                health.append((time.perf_counter() - sent) * 1000)
+                await asyncio.sleep(0.05)
+
+        prober = asyncio.create_task(probe_health())
+        tasks = []
+        total = int(rate * duration)
+        for i in range(total):
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one()))
+        await asyncio.gather(*tasks)
+        await prober
+        elapsed = time.perf_counter() - started
+    return {"results": results, "health": health, "elapsed": elapsed}
+
+
+def describe(name: str, raw: dict, duration: float) -> dict:
+    admitted = [latency for _, status, latency in raw["results"] if status == 200]
+    shed = sum(1 for _, status, _ in raw["results"] if status == 503)
+    per_second = defaultdict(list)
+    for second, status, latency in raw["results"]:
+        if status == 200:
+            per_second[int(second)].append(latency)
+
+    stats = summarize(admitted) if admitted else {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    health = summarize(raw["health"]) if raw["health"] else {"p99": 0.0}
+    print(
+        f"{name:<10} admitted={len(admitted):6d} shed(503)={shed:6d}  "
+        f"p50={stats['p50']:8.1f} ms  p99={stats['p99']:8.1f} ms  health p99={health['p99']:7.1f} ms  "
+        f"({raw['elapsed']:.1f} s)"
+    )
+    windows = "  ".join(
+        f"{second}s:{summarize(per_second[second])['p99']:.0f}"
+        for second in sorted(per_second)
+        if second < duration
+    )
+    print(f"{'':<10} p99 допущенных по секундам, мс: {windows}")
+    return {
+        "mean": stats["mean"],
+        "p50": stats["p50"],
+        "p99": stats["p99"],
+        "admitted": len(admitted),
+        "shed": shed,
+        "health_p99": health["p99"],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool", type=int, default=10, help="мест в пуле «соединений»")
+    parser.add_argument("--service-ms", type=float, default=50.0, help="время обслуживания запроса")
+    parser.add_argument("--overload", type=float, default=5.0, help="во сколько раз нагрузка больше пропускной способности")
+    parser.add_argument("--duration", type=float, default=5.0, help="длительность подачи нагрузки, с")
+    parser.add_argument("--queue-timeout-ms", type=float, default=100.0)
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON базового прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="допустимое ухудшение, %%")
+    args = parser.parse_args()
+
+    service = args.service_ms / 1000
+    capacity = args.pool / service
+    rate = capacity * args.overload
+    print("=" * 72)
+    print(
+        f"пропускная способность {capacity:.0f} rps, нагрузка {rate:.0f} rps "
+        f"(x{args.overload:g}) в течение {args.duration:g} s"
+    )
+    print("=" * 72)
+
+    results = {}
+    for name, admission in (("without", False), ("admission", True)):
+        app = build_app(admission, args.pool, service, args.queue_timeout_ms / 1000)
+        raw = asyncio.run(run(app, rate, args.duration))
+        results[name] = describe(name, raw, args.duration)
+
+    return report(
+        "admission",
+        {"admission": results["admission"]},
+        args.output,
+        args.baseline,
+        args.tolerance,
+        pool=args.pool,
+        service_ms=args.service_ms,
+        overload=args.overload,
+        duration=args.duration,
+        without_admission=results["without"],
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Нагрузочный бенчмарк CRUD и списка лидов через ASGI-клиент.
+
+Приложение собирается той же фабрикой create_app, что и в проде (middleware,
+метрики, Server-Timing), и нагружается в этом же процессе через
+httpx.ASGITransport — без сети и uvicorn, поэтому цифры сравнимы между прогонами
+на одной машине. Сценарии идут по очереди, каждый — --requests запросов
+с конкурентностью --concurrency:
+    create  POST   /leads
+    get     GET    /leads/{id}
+    list    GET    /leads?limit=20
+    update  PATCH  /leads/{id}
+    delete  DELETE /leads/{id}   (удаляет лидов, созданных сценарием create)
+
+Для каждого сценария печатаются rps и p50/p95/p99. GET по ID идёт через кэш
+карточек из настроек — чтобы мерить чтение из БД, задайте LEAD_CACHE_BACKEND=none.
+
+База — временный SQLite-файл или BENCH_DATABASE_URL (например, Postgres).
+
+Запуск (из корня проекта):
+    python -m benchmarks.bench_api_load --rows 10000 --requests 2000 --concurrency 50
+    python -m benchmarks.bench_api_load --output current.json --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+
+import httpx
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import get_db
+from app.main import create_app
+from benchmarks.common import bench_database_url, make_session_factory, report, seed_leads, summarize
+
+BASE_PATH = "/api/v1/leads/leads"
+SCENARIOS = ("create", "get", "list", "update", "delete")
+
+
+def build_app(session_factory: sessionmaker):
+    """Приложение из create_app, у которого сессии БД смотрят в базу бенчмарка."""
+    app = create_app()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+def requests_for(scenario: str, total: int, rows: int, created: list[int], rng: random.Random):
+    """Список (метод, путь, json) для сценария."""
+    if scenario == "create":
+        return [
+            ("POST", BASE_PATH, {"name": f"Bench {i}", "email": f"bench{i}@example.com", "source": "website"})
+            for i in range(total)
+        ]
+    if scenario == "get":
+        return [("GET", f"{BASE_PATH}/{rng.randint(1, rows)}", None) for _ in range(total)]
+    if scenario == "list":
+        return [("GET", f"{BASE_PATH}?skip={rng.randrange(0, max(rows - 20, 1))}&limit=20", None) for _ in range(total)]
+    if scenario == "update":
+        return [
+            ("PATCH", f"{BASE_PATH}/{lead_id}", {"status": rng.choice(("in_progress", "won", "lost"))})
+            for lead_id in rng.choices(created, k=total)
+        ]
+    if scenario == "delete":
+        return [("DELETE", f"{BASE_PATH}/{lead_id}", None) for lead_id in created[:total]]
+    raise ValueError(scenario)
+
+
+async def run_scenario(client: httpx.AsyncClient, requests: list, concurrency: int) -> tuple[dict, list]:
+    """Выполнить запросы с заданной конкурентностью; сводка и JSON успешных ответов."""
+    latencies: list[float] = []
+    bodies: list = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(method: str, path: str, body) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                failed = response.status_code >= 400
+            except Exception:
+                response, failed = None, True
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += failed
+            if not failed and method == "POST":
+                bodies.append(response.json())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*request) for request in requests))
+    elapsed = time.perf_counter() - started
+
+    stats = summarize(latencies)
+    stats["rps"] = len(requests) / elapsed if elapsed else 0.0
+    stats["errors"] = errors
+    return stats, bodies
+
+
+async def run_load(app, rows: int, total: int, concurrency: int, scenarios: list[str]) -> dict[str, dict]:
+    rng = random.Random(42)
+    created: list[int] = []
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for scenario in scenarios:
+            if scenario in ("update", "delete") and not created:
+                # без create обновляю/удаляю засеянных лидов
+                created = list(range(1, min(rows, total) + 1))
+            requests = requests_for(scenario, total, rows, created, rng)
+            stats, bodies = await run_scenario(client, requests, concurrency)
+            if scenario == "create":
+                created = [body["id"] for body in bodies]
+            results[scenario] = stats
+            print(
+                f"{scenario:<8} rps={stats['rps']:8.0f}  p50={stats['p50']:7.1f} ms  "
+                f"p95={stats['p95']:7.1f} ms  p99={stats['p99']:7.1f} ms  errors={stats['errors']}"
+            )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=2_000, help="запросов на сценарий")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="через запятую")
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON базового прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="допустимое ухудшение, %%")
+    args = parser.parse_args()
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    # конкурентные записи в SQLite ждут блокировку файла — лог медленных запросов
+    # забил бы вывод; сами замеры при этом не меняются
+    logging.getLogger("skatinov_leadlab.slow_query").setLevel(logging.ERROR)
+
+    engine, session_factory = make_session_factory(bench_database_url("api_load"))
+    seed_leads(engine, args.rows)
+
+    print("=" * 72)
+    print(f"{engine.dialect.name}: rows={args.rows} requests={args.requests} concurrency={args.concurrency}")
+    print("=" * 72)
+    results = asyncio.run(
+        run_load(build_app(session_factory), args.rows, args.requests, args.concurrency, scenarios)
+    )
+    engine.dispose()
+
+    return report(
+        "api_load",
+        results,
+        args.output,
+        args.baseline,
+        args.tolerance,
+        dialect=engine.dialect.name,
+        rows=args.rows,
+        requests=args.requests,
+        concurrency=args.concurrency,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Бенчмарк архивации: чтения лидов до и после переноса закрытых в leads_archive.
+
+Половина синтетических лидов — won/lost (см. benchmarks/common.py), и после
+архивации в leads остаётся вдвое меньше строк. Меряются:
+    get_leads            первая страница (limit=20) с точным total
+    get_leads_filtered   страница с фильтром assigned_to + status=in_progress
+    get_lead_hot         карточка живого лида
+    get_lead_archived    карточка архивного лида (после переноса — через архив)
+Кэши счётчиков и карточек сбрасываются перед каждым вызовом, чтобы мерить
+сами запросы к базе.
+Отдельно печатается время переноса (archive_batch порциями по --batch-size).
+
+Запуск (из корня проекта):
+    python -m benchmarks.bench_archive --rows 100000
+    python -m benchmarks.bench_archive --output current.json --baseline baseline.json
+"""
+
+import argparse
+import sys
+import time
+
+from sqlalchemy import text
+
+from app.schemas.leads import CountStrategy, LeadFilters
+from app.services.archive import archive_batch, archive_cutoff
+from app.services.counting import lead_count_cache
+from app.services.lead_cache import lead_cache
+from app.services.leads import get_lead, get_leads
+from benchmarks.common import (
+    bench_database_url,
+    make_session_factory,
+    measure,
+    report,
+    seed_leads,
+    summarize,
+)
+
+# В seed_leads статус лида i — STATUSES[i % 4]: id 1 — new, id 3 — won
+HOT_LEAD_ID = 1
+ARCHIVED_LEAD_ID = 3
+
+
+def run_cases(db, repeat: int, phase: str) -> dict[str, dict]:
+    """Замерить чтения в текущем состоянии базы; ключи — '<phase>/<сценарий>'."""
+    filters = LeadFilters(assigned_to="anna", status="in_progress")
+
+    def uncached(fn):
+        def call():
+            lead_count_cache.invalidate()
+            lead_cache.clear()
+            return fn()
+        return call
+
+    cases = {
+        "get_leads": uncached(lambda: get_leads(db, limit=20, total_strategy=CountStrategy.EXACT)),
+        "get_leads_filtered": uncached(lambda: get_leads(db, limit=20, filters=filters)),
+        "get_lead_hot": uncached(lambda: get_lead(db, HOT_LEAD_ID)),
+        "get_lead_archived": uncached(lambda: get_lead(db, ARCHIVED_LEAD_ID)),
+    }
+    results = {}
+    for name, fn in cases.items():
+        stats = summarize(measure(fn, repeat))
+        results[f"{phase}/{name}"] = stats
+        print(
+            f"{phase + '/' + name:<28} mean={stats['mean']:7.3f} ms  p50={stats['p50']:7.3f} ms  "
+            f"p95={stats['p95']:7.3f} ms  p99={stats['p99']:7.3f} ms"
+        )
+    db.rollback()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON базового прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="допустимое ухудшение, %%")
+    args = parser.parse_args()
+
+    engine, session_factory = make_session_factory(bench_database_url("archive"))
+    seed_leads(engine, args.rows)
+
+    print("=" * 72)
+    print(f"{engine.dialect.name}: rows={args.rows} repeat={args.repeat} batch={args.batch_size}")
+    print("=" * 72)
+    with session_factory() as db:
+        results = run_cases(db, args.repeat, "before")
+
+        start = time.perf_counter()
+        moved, last_id = 0, 0
+        # синтетические лиды датированы 2024 годом — все закрытые уже «старые»
+        cutoff = archive_cutoff(after_days=0)
+        while batch := archive_batch(db, ("won", "lost"), cutoff, args.batch_size, last_id):
+            moved += len(batch)
+            last_id = batch[-1]
+        elapsed = time.perf_counter() - start
+        print(f"archived {moved} leads in {elapsed:.3f} s ({moved / elapsed:.0f} leads/s)")
+
+    # освободить место удалённых строк и обновить статистику планировщика
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE leads" if engine.dialect.name == "postgresql" else "VACUUM"))
+
+    with session_factory() as db:
+        results.update(run_cases(db, args.repeat, "after"))
+
+    engine.dispose()
+    return report(
+        "archive",
+        results,
+        args.output,
+        args.baseline,
+        args.tolerance,
+        dialect=engine.dialect.name,
+        rows=args.rows,
+        repeat=args.repeat,
+        batch_size=args.batch_size,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
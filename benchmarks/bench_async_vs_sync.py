@@ -0,0 +1,139 @@
+"""
+Нагрузочный тест: синхронные маршруты лидов (threadpool) против асинхронных (AsyncSession).
+
+Оба варианта поднимаются в этом же процессе и нагружаются через ASGI-клиент
+с заданной конкурентностью; смесь запросов — чтение лида по ID и страница списка.
+Синхронные обработчики упираются в threadpool (40 потоков по умолчанию),
+асинхронные ждут БД в event loop. Разница заметнее всего на сетевой базе:
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_async_vs_sync
+
+Пул соединений по умолчанию равен конкурентности. С пулом меньше конкурентности
+синхронный путь может встать намертво: потоки threadpool ждут соединение, а уже
+отработавшие запросы держат свои соединения, пока ждут свободный поток для
+валидации ответа по response_model. Это видно, если задать --pool-size поменьше.
+
+Запуск (из корня проекта):
+    python -m benchmarks.bench_async_vs_sync --rows 10000 --concurrency 200 --requests 5000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.api.v1.leads import router as leads_router
+from app.api.v1.leads_async import router as leads_async_router
+from app.db.database import create_async_db_engine, get_async_db, get_db
+from benchmarks.common import bench_database_url, make_session_factory, seed_leads, summarize
+
+
+def build_app(url: str, async_mode: bool, pool_size: int, pool_timeout: float):
+    """Отдельное приложение только с маршрутами лидов нужного режима и его engine."""
+    app = FastAPI()
+    if async_mode:
+        async_engine = create_async_db_engine(
+            url, pool_size=pool_size, max_overflow=0, pool_timeout=pool_timeout
+        )
+        session_factory = async_sessionmaker(bind=async_engine, autoflush=False)
+
+        async def override_get_async_db():
+            async with session_factory() as db:
+                yield db
+
+        app.include_router(leads_async_router, prefix="/api/v1/leads")
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        return app, async_engine
+    else:
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+
+        engine = create_engine(url, pool_size=pool_size, max_overflow=0, pool_timeout=pool_timeout)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+
+        def override_get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.include_router(leads_router, prefix="/api/v1/leads")
+        app.dependency_overrides[get_db] = override_get_db
+        return app, engine
+
+
+async def run_load(app: FastAPI, engine, rows: int, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    rng = random.Random(42)
+    paths = [
+        f"/api/v1/leads/leads/{rng.randint(1, rows)}" if i % 2 else "/api/v1/leads/leads?limit=20&total_strategy=none"
+        for i in range(total)
+    ]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one(path: str) -> None:
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    failed = response.status_code != 200
+                except Exception:
+                    failed = True
+                latencies.append((time.perf_counter() - start) * 1000)
+                errors += failed
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(path) for path in paths))
+        elapsed = time.perf_counter() - started
+
+    # Закрываю соединения режима, чтобы они не занимали лимит подключений базы
+    disposed = engine.dispose()
+    if asyncio.iscoroutine(disposed):
+        await disposed
+
+    stats = summarize(latencies)
+    stats["rps"] = total / elapsed
+    stats["errors"] = errors
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=None, help="по умолчанию = --concurrency")
+    parser.add_argument("--pool-timeout", type=float, default=10.0)
+    args = parser.parse_args()
+    pool_size = args.pool_size or args.concurrency
+
+    url = bench_database_url("async_vs_sync")
+    engine, _ = make_session_factory(url)
+    seed_leads(engine, args.rows)
+    engine.dispose()
+
+    print("=" * 72)
+    print(f"rows={args.rows} requests={args.requests} concurrency={args.concurrency} pool={pool_size}")
+    print("=" * 72)
+    for async_mode in (False, True):
+        app, engine = build_app(url, async_mode, pool_size, args.pool_timeout)
+        stats = asyncio.run(run_load(app, engine, args.rows, args.requests, args.concurrency))
+        name = "async (AsyncSession)" if async_mode else "sync (threadpool)"
+        print(
+            f"{name:<22} rps={stats['rps']:8.0f}  p50={stats['p50']:7.1f} ms  "
+            f"p95={stats['p95']:7.1f} ms  p99={stats['p99']:7.1f} ms  errors={stats['errors']}"
+        )
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Бенчмарк загрузки лидов: построчный create_lead против bulk_create_leads.
+
+create_lead делает INSERT + COMMIT + SELECT (refresh) на каждый лид,
+bulk_create_leads — один многострочный INSERT … RETURNING на порцию и один COMMIT.
+
+Запуск (из корня проекта):
+    python -m benchmarks.bench_bulk_insert --rows 5000 --chunk-size 500
+"""
+
+import argparse
+import time
+
+from app.schemas.leads import LeadCreate
+from app.services.leads import bulk_create_leads, create_lead
+from benchmarks.common import bench_database_url, make_session_factory
+
+
+def make_leads(count: int) -> list[LeadCreate]:
+    return [
+        LeadCreate(name=f"Bulk lead {i}", email=f"bulk{i}@example.com", source="partner_feed")
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    leads_in = make_leads(args.rows)
+    results = {}
+
+    _, session_factory = make_session_factory(bench_database_url("bulk_per_row"))
+    with session_factory() as db:
+        start = time.perf_counter()
+        for lead_in in leads_in:
+            create_lead(db, lead_in)
+        results["per-row create_lead"] = time.perf_counter() - start
+
+    _, session_factory = make_session_factory(bench_database_url("bulk_chunked"))
+    with session_factory() as db:
+        start = time.perf_counter()
+        outcomes = bulk_create_leads(db, leads_in, chunk_size=args.chunk_size)
+        results[f"bulk chunk={args.chunk_size}"] = time.perf_counter() - start
+        assert all(not isinstance(outcome, str) for outcome in outcomes)
+
+    print("=" * 60)
+    print(f"rows={args.rows}")
+    print("=" * 60)
+    for name, elapsed in results.items():
+        print(f"{name:<24} {elapsed:8.3f} s  {args.rows / elapsed:12.0f} leads/s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
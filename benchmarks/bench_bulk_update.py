@@ -0,0 +1,66 @@
+"""
+Бенчмарк массового переназначения лидов: цикл update_lead против bulk_update_leads.
+
+Сценарий — менеджер уходит, и его лидов передают другому. update_lead делает
+UPDATE … RETURNING + INSERT события + COMMIT на каждый лид (как цикл PATCH),
+bulk_update_leads — один UPDATE на порцию, один INSERT событий и один COMMIT.
+
+Запуск (из корня проекта):
+    python -m benchmarks.bench_bulk_update --rows 20000 --chunk-size 1000
+"""
+
+import argparse
+import time
+
+from sqlalchemy import select
+
+from app.models.lead import Lead
+from app.schemas.leads import LeadBulkFilter, LeadUpdate
+from app.services.leads import bulk_update_leads, update_lead
+from benchmarks.common import MANAGERS, bench_database_url, make_session_factory, seed_leads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    manager = MANAGERS[0]
+    patch = LeadUpdate(assigned_to="successor")
+    results = {}
+
+    engine, session_factory = make_session_factory(bench_database_url("update_per_row"))
+    seed_leads(engine, args.rows)
+    with session_factory() as db:
+        lead_ids = db.scalars(select(Lead.id).where(Lead.assigned_to == manager)).all()
+        db.rollback()
+        start = time.perf_counter()
+        for lead_id in lead_ids:
+            update_lead(db, lead_id, patch)
+        results["per-row update_lead"] = (time.perf_counter() - start, len(lead_ids))
+    engine.dispose()
+
+    engine, session_factory = make_session_factory(bench_database_url("update_chunked"))
+    seed_leads(engine, args.rows)
+    with session_factory() as db:
+        start = time.perf_counter()
+        result = bulk_update_leads(
+            db,
+            LeadBulkFilter(assigned_to=manager),
+            patch,
+            chunk_size=args.chunk_size,
+        )
+        results[f"bulk chunk={args.chunk_size}"] = (time.perf_counter() - start, result.updated)
+    engine.dispose()
+
+    print("=" * 60)
+    print(f"rows={args.rows}, reassigned from {manager!r}")
+    print("=" * 60)
+    for name, (elapsed, updated) in results.items():
+        print(f"{name:<24} {updated:6d} leads {elapsed:8.3f} s  {updated / elapsed:10.0f} leads/s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Бенчмарк потоковой выгрузки: пиковая память не должна зависеть от числа строк.
+
+Для каждого размера таблицы прогоняю iter_leads_export целиком и меряю
+пик выделенной памяти через tracemalloc.
+
+Запуск (из корня проекта):
+    python -m benchmarks.bench_export_memory --sizes 20000 200000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from app.schemas.leads import ExportFormat
+from app.services.export import iter_leads_export
+from benchmarks.common import bench_database_url, make_session_factory, seed_leads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20_000, 200_000])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    for rows in args.sizes:
+        engine, session_factory = make_session_factory(bench_database_url(f"export_{rows}"))
+        seed_leads(engine, rows)
+        for export_format in ExportFormat:
+            with session_factory() as db:
+                tracemalloc.start()
+                start = time.perf_counter()
+                size = 0
+                for chunk in iter_leads_export(db, export_format, batch_size=args.batch_size):
+                    size += len(chunk)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            print(
+                f"rows={rows:<8} {export_format.value:<6} {size / 2**20:8.1f} MiB out "
+                f"{elapsed:6.2f} s  peak={peak / 2**20:6.2f} MiB"
+            )
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Бенчмарк пагинации списка лидов: OFFSET против keyset-курсора.
+
+Показывает, что в keyset-режиме страница 10 000 стоит столько же, сколько первая,
+а OFFSET-страница дорожает линейно с номером.
+
+Запуск (из корня проекта):
+    python -m benchmarks.bench_keyset_pagination --rows 200000 --limit 20 --page 10000
+"""
+
+import argparse
+
+from sqlalchemy import select
+
+from app.models.lead import Lead
+from app.schemas.leads import LeadSortField, SortOrder
+from app.services.leads import get_leads
+from app.services.pagination import apply_sort, cursor_for
+from benchmarks.common import (
+    bench_database_url,
+    make_session_factory,
+    measure,
+    seed_leads,
+    summarize,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--page", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--sort", choices=[f.value for f in LeadSortField], default="created_at")
+    args = parser.parse_args()
+
+    sort = LeadSortField(args.sort)
+    order = SortOrder.ASC
+    skip = (args.page - 1) * args.limit
+    if skip >= args.rows:
+        parser.error("страница выходит за пределы таблицы: увеличь --rows")
+
+    engine, session_factory = make_session_factory(bench_database_url("keyset"))
+    print(f"Seeding {args.rows} leads into {engine.url.render_as_string(hide_password=True)} ...")
+    seed_leads(engine, args.rows)
+
+    with session_factory() as db:
+        # Курсор, указывающий на конец страницы page-1 — как если бы клиент
+        # честно пролистал все предыдущие страницы
+        anchor = db.scalars(apply_sort(select(Lead), sort, order).offset(skip - 1).limit(1)).one()
+        deep_cursor = cursor_for(anchor, sort, order)
+
+        scenarios = {
+            "offset page 1": lambda: get_leads(db, skip=0, limit=args.limit, sort=sort, order=order),
+            f"offset page {args.page}": lambda: get_leads(
+                db, skip=skip, limit=args.limit, sort=sort, order=order
+            ),
+            f"cursor page {args.page}": lambda: get_leads(
+                db, limit=args.limit, cursor=deep_cursor, sort=sort, order=order
+            ),
+        }
+
+        print("=" * 60)
+        print(f"rows={args.rows} limit={args.limit} sort={sort.value} repeat={args.repeat}")
+        print("=" * 60)
+        for name, fn in scenarios.items():
+            stats = summarize(measure(fn, args.repeat))
+            print(f"{name:<24} p50={stats['p50']:8.2f} ms  p95={stats['p95']:8.2f} ms")
+        print("=" * 60)
+        print("NB: в обоих режимах ещё выполняется COUNT(*) по таблице")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Бенчмарк outbox: пропускная способность диспетчера (событий/с) и цена записи события.
+
+1. В outbox кладётся --events событий по --leads лидам (вперемешку, как при
+   реальной нагрузке), затем OutboxDispatcher разбирает таблицу в брокер
+   в памяти процесса. --confirm-delay-ms имитирует задержку publisher confirm
+   RabbitMQ: события одной волны ждут подтверждения конкурентно, поэтому
+   пропускная способность растёт с размером пачки. После прогона проверяется,
+   что события каждого лида пришли в брокер строго по порядку id.
+2. create_lead с записью события и без неё (OUTBOX_ENABLED) — сколько стоит
+   лишний INSERT в той же транзакции.
+
+База — временный SQLite-файл или BENCH_DATABASE_URL.
+
+Запуск (из корня проекта):
+    python -m benchmarks.bench_outbox --events 50000 --batch-size 500 --confirm-delay-ms 2
+"""
+
+import argparse
+import asyncio
+import itertools
+import sys
+import time
+
+from sqlalchemy import insert
+
+from app.config import settings
+from app.models.outbox import LEAD_UPDATED, OutboxEvent
+from app.schemas.leads import LeadCreate
+from app.services.broker import InMemoryBroker
+from app.services.leads import create_lead
+from app.services.outbox_dispatcher import OutboxDispatcher
+from benchmarks.common import bench_database_url, make_session_factory, measure, report, summarize
+
+
+def seed_events(engine, events: int, leads: int, batch_size: int = 10_000) -> None:
+    """Наполнить outbox событиями lead.updated по кругу лидов 1..leads."""
+    with engine.begin() as conn:
+        for start in range(0, events, batch_size):
+            conn.execute(
+                insert(OutboxEvent),
+                [
+                    {
+                        "aggregate_id": i % leads + 1,
+                        "event_type": LEAD_UPDATED,
+                        "payload": {"id": i % leads + 1, "status": "in_progress", "seq": i},
+                        "attempts": 0,
+                    }
+                    for i in range(start, min(start + batch_size, events))
+                ],
+            )
+
+
+def check_order(broker: InMemoryBroker) -> int:
+    """Число лидов, чьи события пришли не по порядку id."""
+    last: dict[int, int] = {}
+    broken = set()
+    for message in broker.messages:
+        if message.event_id < last.get(message.aggregate_id, 0):
+            broken.add(message.aggregate_id)
+        last[message.aggregate_id] = message.event_id
+    return len(broken)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=50_000)
+    parser.add_argument("--leads", type=int, default=5_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--confirm-delay-ms", type=float, default=2.0)
+    parser.add_argument("--repeat", type=int, default=300, help="замеров create_lead")
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON базового прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="допустимое ухудшение, %%")
+    args = parser.parse_args()
+
+    engine, session_factory = make_session_factory(bench_database_url("outbox"))
+    seed_events(engine, args.events, args.leads)
+
+    broker = InMemoryBroker(confirm_delay=args.confirm_delay_ms / 1000)
+    dispatcher = OutboxDispatcher(session_factory, broker, batch_size=args.batch_size)
+    started = time.perf_counter()
+    published = asyncio.run(dispatcher.drain())
+    elapsed = time.perf_counter() - started
+    out_of_order = check_order(broker)
+
+    print("=" * 72)
+    print(
+        f"{engine.dialect.name}: events={args.events} leads={args.leads} "
+        f"batch={args.batch_size} confirm={args.confirm_delay_ms} ms"
+    )
+    print("=" * 72)
+    print(f"dispatch     {published / elapsed:10.0f} events/s  ({published} за {elapsed:.2f} s)")
+    print(f"порядок      {'ok' if not out_of_order else f'нарушен у {out_of_order} лидов'}")
+
+    results = {"dispatch": {"rps": published / elapsed, "published": published, "out_of_order": out_of_order}}
+    counter = itertools.count()
+    with session_factory() as db:
+
+        def create_one():
+            i = next(counter)
+            create_lead(db, LeadCreate(name=f"Bench {i}", email=f"bench{i}@example.com"))
+
+        for enabled in (False, True):
+            settings.outbox_enabled = enabled
+            name = "create_with_outbox" if enabled else "create_without_outbox"
+            stats = summarize(measure(create_one, args.repeat))
+            results[name] = stats
+            print(f"{name:<22} mean={stats['mean']:7.3f} ms  p50={stats['p50']:7.3f} ms  p95={stats['p95']:7.3f} ms")
+
+    engine.dispose()
+    code = report(
+        "outbox",
+        results,
+        args.output,
+        args.baseline,
+        args.tolerance,
+        dialect=engine.dialect.name,
+        events=args.events,
+        leads=args.leads,
+        batch_size=args.batch_size,
+        confirm_delay_ms=args.confirm_delay_ms,
+    )
+    return code or (1 if out_of_order or published != args.events else 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Бенчмарк поиска лидов по фрагменту имени/email (GET /leads/search).
+
+Наполняет таблицу (по умолчанию миллион лидов), затем ищет случайные
+фрагменты существующих имён и email и печатает p50/p95/p99 вызова search_leads.
+Цель — p95 меньше 50 мс на выборочных фрагментах. Отдельно меряется
+«широкий» запрос (совпадает почти со всей таблицей): на нём видно,
+срабатывает ли бюджет SEARCH_BUDGET_MS.
+
+Запуск (из корня проекта):
+    python -m benchmarks.bench_search --rows 1000000
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_search
+"""
+
+import argparse
+import random
+
+from sqlalchemy import text
+
+from app.services.search import SearchTimeoutError, search_leads
+from benchmarks.common import (
+    bench_database_url,
+    make_session_factory,
+    measure,
+    seed_leads,
+    summarize,
+)
+
+TARGET_P95_MS = 50.0
+
+
+def fragments(rows: int, count: int, seed: int = 42) -> list[str]:
+    """Случайные фрагменты имён и email существующих лидов (см. lead_row)."""
+    rng = random.Random(seed)
+    result = []
+    for _ in range(count):
+        i = rng.randrange(rows)
+        result.append(f"ead {i}" if rng.random() < 0.5 else f"d{i}@exa")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--budget-ms", type=int, default=300)
+    args = parser.parse_args()
+
+    engine, session_factory = make_session_factory(bench_database_url("search"))
+    print(f"Seeding {args.rows} leads into {engine.url.render_as_string(hide_password=True)} ...")
+    seed_leads(engine, args.rows)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+    queries = iter(fragments(args.rows, args.repeat + 2))
+
+    with session_factory() as db:
+        samples = measure(lambda: search_leads(db, next(queries), args.limit), repeat=args.repeat)
+        stats = summarize(samples)
+
+    broad_status = "ok"
+    with session_factory() as db:
+        try:
+            broad = measure(lambda: search_leads(db, "Lead", args.limit, args.budget_ms), repeat=5, warmup=0)
+            broad_ms = summarize(broad)["p50"]
+        except SearchTimeoutError:
+            broad_status, broad_ms = f"прерван бюджетом {args.budget_ms} мс", float(args.budget_ms)
+
+    print("=" * 60)
+    print(f"rows={args.rows} limit={args.limit} repeat={args.repeat}")
+    print("=" * 60)
+    print(
+        f"{'selective fragments':<24} p50={stats['p50']:8.2f} ms  "
+        f"p95={stats['p95']:8.2f} ms  p99={stats['p99']:8.2f} ms"
+    )
+    print(f"{'broad query (Lead)':<24} ~{broad_ms:.2f} ms ({broad_status})")
+    print("=" * 60)
+    verdict = "OK" if stats["p95"] < TARGET_P95_MS else "ВЫШЕ ЦЕЛИ"
+    print(f"Цель p95 < {TARGET_P95_MS:.0f} мс: {verdict}")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Бенчмарк сериализации ответа: response_model против ModelJSONResponse.
+
+Два маленьких приложения отдают одну и ту же готовую страницу LeadList
+(без БД, чтобы мерить только ответ). Запросы идут прямо в ASGI-приложение,
+без HTTP-клиента; эндпоинты синхронные, как в app/api/v1/leads.py:
+    response_model      эндпоинт возвращает схему, FastAPI ещё раз валидирует
+                        её по response_model (для sync-эндпоинта — отдельным
+                        заходом в threadpool) и сериализует (старый путь);
+    ModelJSONResponse   эндпоинт возвращает model_response(схема) — сразу
+                        байты из закэшированного TypeAdapter (текущий путь).
+Оба приложения гоняются по очереди --rounds раундов, в зачёт идёт медиана
+раундов: так фоновые колебания машины не достаются одному варианту.
+Для каждого размера страницы печатается CPU-время (process_time) и время
+по часам (perf_counter) на запрос; заодно проверяется, что тела совпадают.
+
+Запуск (из корня проекта):
+    python -m benchmarks.bench_serialization --sizes 20,100,500 --requests 500 --rounds 7
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+from fastapi import FastAPI
+
+from app.api.v1.utils import model_response
+from app.schemas.leads import CountStrategy, LeadList, LeadOut
+from benchmarks.common import lead_row, report
+
+
+def make_page(size: int) -> LeadList:
+    """Страница из size синтетических лидов, как её отдаёт get_leads."""
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    leads = [LeadOut(id=i + 1, version=1, **lead_row(i, base)) for i in range(size)]
+    return LeadList(
+        leads=leads,
+        total=size,
+        total_strategy=CountStrategy.EXACT,
+        next_cursor=None,
+    )
+
+
+def build_apps(page: LeadList) -> dict[str, FastAPI]:
+    old, new = FastAPI(), FastAPI()
+
+    @old.get("/leads", response_model=LeadList)
+    def list_old():
+        return page
+
+    @new.get("/leads", response_model=LeadList)
+    def list_new():
+        return model_response(page)
+
+    return {"response_model": old, "ModelJSONResponse": new}
+
+
+async def get(app: FastAPI) -> bytes:
+    """GET /leads напрямую через ASGI; тело ответа."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/leads",
+        "raw_path": b"/leads",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "server": ("bench", 80),
+        "client": ("bench", 1),
+    }
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+
+async def per_request(app: FastAPI, requests: int) -> tuple[float, float]:
+    """(CPU-время процесса, время по часам) на один запрос, мс."""
+    cpu, wall = time.process_time(), time.perf_counter()
+    for _ in range(requests):
+        await get(app)
+    return (time.process_time() - cpu) / requests * 1000, (time.perf_counter() - wall) / requests * 1000
+
+
+async def compare(apps: dict[str, FastAPI], requests: int, rounds: int) -> dict[str, tuple[float, float]]:
+    """Медианы (cpu, wall) по раундам; варианты чередуются внутри раунда."""
+    for app in apps.values():
+        for _ in range(20):
+            await get(app)
+    samples: dict[str, list[tuple[float, float]]] = {name: [] for name in apps}
+    for _ in range(rounds):
+        for name, app in apps.items():
+            samples[name].append(await per_request(app, requests))
+    return {
+        name: (statistics.median(s[0] for s in runs), statistics.median(s[1] for s in runs))
+        for name, runs in samples.items()
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="20,100,500", help="размеры страниц через запятую")
+    parser.add_argument("--requests", type=int, default=500, help="запросов в раунде")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON базового прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="допустимое ухудшение, %%")
+    args = parser.parse_args()
+
+    results = {}
+    mismatches = 0
+    print("=" * 72)
+    for size in (int(value) for value in args.sizes.split(",")):
+        apps = build_apps(make_page(size))
+        bodies = [json.loads(asyncio.run(get(app))) for app in apps.values()]
+        mismatches += bodies[0] != bodies[1]
+
+        timings = asyncio.run(compare(apps, args.requests, args.rounds))
+        (old_cpu, old_wall), (new_cpu, new_wall) = timings["response_model"], timings["ModelJSONResponse"]
+        results[f"page_{size}"] = {
+            "mean": new_cpu,
+            "wall_ms": new_wall,
+            "response_model_ms": old_cpu,
+            "response_model_wall_ms": old_wall,
+        }
+        print(
+            f"page={size:<5} cpu {old_cpu:6.3f} -> {new_cpu:6.3f} ms ({(1 - new_cpu / old_cpu) * 100:5.1f}%)  "
+            f"wall {old_wall:6.3f} -> {new_wall:6.3f} ms ({(1 - new_wall / old_wall) * 100:5.1f}%)"
+        )
+    print("=" * 72)
+    print("тела ответов совпадают" if not mismatches else f"тела различаются: {mismatches}")
+
+    code = report("serialization", results, args.output, args.baseline, args.tolerance, requests=args.requests, rounds=args.rounds)
+    return code or (1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
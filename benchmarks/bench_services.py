@@ -0,0 +1,96 @@
+"""
+Микробенчмарки сервисного слоя лидов (без HTTP).
+
+Меряются отдельные функции app/services/leads.py и схема LeadOut:
+    get_leads            первая страница (limit=20) с точным total
+    get_leads_filtered   страница с фильтром assigned_to + status
+    create_lead          один INSERT ... RETURNING с коммитом
+    leadout_validate     LeadOut.model_validate для 100 ORM-объектов
+    leadout_dump_json    LeadOut.model_dump_json для 100 схем
+
+Для каждого замера печатаются mean/p50/p95/p99 в миллисекундах.
+База — временный SQLite-файл или BENCH_DATABASE_URL.
+
+Запуск (из корня проекта):
+    python -m benchmarks.bench_services --rows 100000
+    python -m benchmarks.bench_services --output current.json --baseline baseline.json
+"""
+
+import argparse
+import itertools
+import sys
+
+from sqlalchemy import select
+
+from app.models.lead import Lead
+from app.schemas.leads import CountStrategy, LeadCreate, LeadFilters, LeadOut
+from app.services.leads import create_lead, get_leads
+from benchmarks.common import (
+    bench_database_url,
+    make_session_factory,
+    measure,
+    report,
+    seed_leads,
+    summarize,
+)
+
+SERIALIZATION_BATCH = 100
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON базового прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="допустимое ухудшение, %%")
+    args = parser.parse_args()
+
+    engine, session_factory = make_session_factory(bench_database_url("services"))
+    seed_leads(engine, args.rows)
+    counter = itertools.count()
+    filters = LeadFilters(assigned_to="anna", status="in_progress")
+
+    with session_factory() as db:
+        rows = db.scalars(select(Lead).limit(SERIALIZATION_BATCH)).all()
+        schemas = [LeadOut.model_validate(row) for row in rows]
+
+        def create_one():
+            i = next(counter)
+            create_lead(db, LeadCreate(name=f"Bench {i}", email=f"bench{i}@example.com"))
+
+        cases = {
+            "get_leads": lambda: get_leads(db, limit=20, total_strategy=CountStrategy.EXACT),
+            "get_leads_filtered": lambda: get_leads(db, limit=20, filters=filters),
+            "create_lead": create_one,
+            "leadout_validate": lambda: [LeadOut.model_validate(row) for row in rows],
+            "leadout_dump_json": lambda: [schema.model_dump_json() for schema in schemas],
+        }
+
+        print("=" * 72)
+        print(f"{engine.dialect.name}: rows={args.rows} repeat={args.repeat}")
+        print("=" * 72)
+        results = {}
+        for name, fn in cases.items():
+            stats = summarize(measure(fn, args.repeat))
+            results[name] = stats
+            print(
+                f"{name:<20} mean={stats['mean']:7.3f} ms  p50={stats['p50']:7.3f} ms  "
+                f"p95={stats['p95']:7.3f} ms  p99={stats['p99']:7.3f} ms"
+            )
+
+    engine.dispose()
+    return report(
+        "services",
+        results,
+        args.output,
+        args.baseline,
+        args.tolerance,
+        dialect=engine.dialect.name,
+        rows=args.rows,
+        repeat=args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
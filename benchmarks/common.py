@@ -0,0 +1,179 @@
+# benchmarks/common.py — общие помощники для бенчмарков.
+
+"""
+Общие помощники для бенчмарков.
+
+Бенчмарки не трогают рабочую базу из настроек: по умолчанию каждый сценарий
+создаёт свой временный SQLite-файл, а если задан BENCH_DATABASE_URL
+(например, отдельная Postgres-база) — пересоздаёт таблицы в ней.
+
+Результаты можно сохранить в JSON (save_results) и сравнить с базовым
+прогоном (compare_results, python -m benchmarks.compare).
+"""
+
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models.lead import Lead
+
+
+STATUSES = ("new", "in_progress", "won", "lost")
+SOURCES = ("website", "facebook", "referral", "google_ads", None)
+MANAGERS = ("anna", "boris", "olga", "pavel", None)
+
+
+def bench_database_url(name: str) -> str:
+    """URL базы для бенчмарка: BENCH_DATABASE_URL или свежий временный SQLite-файл."""
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        return url
+    path = os.path.join(tempfile.gettempdir(), f"leadlab_bench_{name}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    return f"sqlite:///{path}"
+
+
+def make_session_factory(url: str) -> tuple[Engine, sessionmaker]:
+    """Создать engine, пересоздать схему и вернуть фабрику сессий."""
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+def lead_row(i: int, base: datetime) -> dict:
+    """Синтетический лид номер i (детерминированный, чтобы прогоны были сравнимы)."""
+    created_at = base + timedelta(seconds=i)
+    return {
+        "name": f"Lead {i}",
+        "email": f"lead{i}@example.com",
+        "status": STATUSES[i % len(STATUSES)],
+        "source": SOURCES[i % len(SOURCES)],
+        "assigned_to": MANAGERS[i % len(MANAGERS)],
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def seed_leads(engine: Engine, count: int, batch_size: int = 10_000) -> None:
+    """Наполнить таблицу leads count синтетическими лидами пачками по batch_size."""
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        for start in range(0, count, batch_size):
+            rows = [lead_row(i, base) for i in range(start, min(start + batch_size, count))]
+            conn.execute(insert(Lead), rows)
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 2) -> list[float]:
+    """Выполнить fn repeat раз (после прогрева) и вернуть длительности в миллисекундах."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Сводка по замерам: среднее и перцентили p50/p95/p99 в миллисекундах."""
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {"mean": value, "p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": cuts[49],
+        "p95": cuts[94],
+        "p99": cuts[98],
+    }
+
+
+# Метрики, для которых рост значения — это регрессия (у rps наоборот)
+LOWER_IS_BETTER = ("mean", "p50", "p95", "p99")
+HIGHER_IS_BETTER = ("rps",)
+
+
+def save_results(path: str, benchmark: str, results: dict[str, dict], **meta) -> dict:
+    """Сохранить результаты прогона в JSON вместе с условиями запуска."""
+    document = {
+        "benchmark": benchmark,
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **meta,
+        },
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(document, fh, ensure_ascii=False, indent=2)
+    return document
+
+
+def load_results(path: str) -> dict:
+    """Прочитать JSON с результатами прогона."""
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def compare_results(current: dict, baseline: dict, tolerance: float = 10.0) -> list[str]:
+    """
+    Сравнить прогон с базовым и напечатать таблицу изменений.
+
+    tolerance — допустимое ухудшение в процентах. Возвращает список регрессий
+    (пустой — всё в пределах допуска). Сценарии, которых нет в одном из
+    прогонов, пропускаются.
+    """
+    regressions = []
+    for name, metrics in current["results"].items():
+        base_metrics = baseline["results"].get(name)
+        if base_metrics is None:
+            continue
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            if metric not in metrics or not base_metrics.get(metric):
+                continue
+            change = (metrics[metric] - base_metrics[metric]) / base_metrics[metric] * 100
+            worse = change if metric in LOWER_IS_BETTER else -change
+            flag = "REGRESSION" if worse > tolerance else ""
+            print(
+                f"{name:<32} {metric:<5} {base_metrics[metric]:10.2f} -> {metrics[metric]:10.2f} "
+                f"({change:+6.1f}%) {flag}"
+            )
+            if flag:
+                regressions.append(f"{name} {metric} {change:+.1f}%")
+    return regressions
+
+
+def report(
+    benchmark: str,
+    results: dict[str, dict],
+    output: Optional[str],
+    baseline: Optional[str],
+    tolerance: float,
+    **meta,
+) -> int:
+    """Сохранить результаты (если задан output) и сравнить с baseline; код выхода."""
+    document = {"benchmark": benchmark, "results": results}
+    if output:
+        document = save_results(output, benchmark, results, **meta)
+        print(f"Результаты сохранены в {output}")
+    if not baseline:
+        return 0
+    print(f"Сравнение с {baseline} (допуск {tolerance:.0f}%):")
+    regressions = compare_results(document, load_results(baseline), tolerance)
+    for regression in regressions:
+        print(f"  регрессия: {regression}")
+    return 1 if regressions else 0
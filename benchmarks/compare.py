@@ -0,0 +1,35 @@
+"""
+Сравнение двух JSON-результатов бенчмарка (bench_api_load, bench_services).
+
+Печатает изменение каждой метрики и завершается с кодом 1, если хоть одна
+ухудшилась больше допуска: p50/p95/p99/mean выросли или rps упал.
+
+Запуск (из корня проекта):
+    python -m benchmarks.compare current.json baseline.json --tolerance 10
+"""
+
+import argparse
+import sys
+
+from benchmarks.common import compare_results, load_results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("current")
+    parser.add_argument("baseline")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="допустимое ухудшение, %%")
+    args = parser.parse_args()
+
+    current, baseline = load_results(args.current), load_results(args.baseline)
+    if current["benchmark"] != baseline["benchmark"]:
+        print(f"Разные бенчмарки: {current['benchmark']} и {baseline['benchmark']}")
+        return 2
+    regressions = compare_results(current, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"  регрессия: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,6 +20,13 @@ from app.db.database import Base
 
 # Импортируем модели, чтобы Alembic "увидел" их при автогенерации
 from app.models import lead  # noqa: F401  # импорт нужен только для регистрации моделей
+from app.models import lead_counter  # noqa: F401
+from app.models import lead_stat  # noqa: F401
+from app.models import outbox  # noqa: F401
+from app.models import idempotency  # noqa: F401
+from app.models import lead_archive  # noqa: F401
+from app.models import lead_tombstone  # noqa: F401
+from app.models.lead_search import is_search_object
 
 
 # Подменяем sqlalchemy.url значением из настроек приложения
@@ -29,6 +36,19 @@ config.set_main_option("sqlalchemy.url", settings.database_url)
 target_metadata = Base.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Фильтр объектов для автогенерации.
+
+    Поисковые структуры (FTS5-таблица leads_fts на SQLite, trgm-индексы на Postgres)
+    создаются сырым DDL и в metadata не описаны — без фильтра Alembic
+    предлагал бы их удалить.
+    """
+    if reflected and name and is_search_object(name):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     """
     Запуск миграций в офлайн-режиме.
@@ -41,6 +61,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -65,6 +86,7 @@ def run_migrations_online() -> None:
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,31 @@
+"""Индексы под keyset-пагинацию списка лидов.
+
+Сортировка списка по created_at/updated_at с id в качестве тай-брейкера
+обслуживается составными индексами (created_at, id) и (updated_at, id):
+условие «после позиции курсора» превращается в range scan по индексу.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "4b7e2c91a0f3"
+
+# Предыдущая миграция — создание таблицы leads
+down_revision: Union[str, Sequence[str], None] = "d88f5dc1c6e0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Применить миграцию: создать составные индексы для keyset-пагинации."""
+    op.create_index("ix_leads_created_at_id", "leads", ["created_at", "id"], unique=False)
+    op.create_index("ix_leads_updated_at_id", "leads", ["updated_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Откатить миграцию: удалить индексы keyset-пагинации."""
+    op.drop_index("ix_leads_updated_at_id", table_name="leads")
+    op.drop_index("ix_leads_created_at_id", table_name="leads")
@@ -0,0 +1,54 @@
+"""Составные индексы под фильтры списка лидов.
+
+Одноколоночные индексы из первой миграции не покрывают реальные запросы
+вида «мои лиды в работе, сначала новые»: Postgres выбирает один индекс
+по равенству, а потом фильтрует и сортирует остаток.
+Составные индексы начинаются с колонок равенства, дальше идёт дата
+сортировки и id (тай-брейкер keyset-курсора), поэтому страница читается
+прямо из индекса в нужном порядке, без Sort.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "5e1a7c3b9d42"
+
+# Предыдущая миграция — таблица счётчиков lead_counters
+down_revision: Union[str, Sequence[str], None] = "9c3d5e7f1a24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Применить миграцию: создать составные индексы для фильтров."""
+    # «мои лиды со статусом X, сначала новые»
+    op.create_index(
+        "ix_leads_assigned_status_created",
+        "leads",
+        ["assigned_to", "status", "created_at", "id"],
+        unique=False,
+    )
+    # «все лиды со статусом X, недавно изменённые»
+    op.create_index(
+        "ix_leads_status_updated",
+        "leads",
+        ["status", "updated_at", "id"],
+        unique=False,
+    )
+    # «лиды из источника X за период»
+    op.create_index(
+        "ix_leads_source_created",
+        "leads",
+        ["source", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Откатить миграцию: удалить составные индексы фильтров."""
+    op.drop_index("ix_leads_source_created", table_name="leads")
+    op.drop_index("ix_leads_status_updated", table_name="leads")
+    op.drop_index("ix_leads_assigned_status_created", table_name="leads")
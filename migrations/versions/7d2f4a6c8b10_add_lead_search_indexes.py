@@ -0,0 +1,81 @@
+"""Триграммный поиск лидов по имени и email.
+
+Postgres: расширение pg_trgm и GIN-индексы (name gin_trgm_ops),
+(email gin_trgm_ops) — они обслуживают ILIKE '%фрагмент%' и оператор %.
+Если pg_trgm на сервере недоступно, миграция не падает, а пишет NOTICE:
+поиск при этом работает, но без индекса.
+
+SQLite: FTS5-таблица leads_fts (tokenize='trigram') с внешним содержимым
+из leads и триггеры, которые держат её в актуальном состоянии.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "7d2f4a6c8b10"
+
+# Предыдущая миграция — составные индексы фильтров
+down_revision: Union[str, Sequence[str], None] = "5e1a7c3b9d42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Применить миграцию: создать триграммные индексы (Postgres) или FTS5-таблицу (SQLite)."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute(
+            """
+            DO $$
+            BEGIN
+                IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+                    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                    CREATE INDEX IF NOT EXISTS ix_leads_name_trgm ON leads USING gin (name gin_trgm_ops);
+                    CREATE INDEX IF NOT EXISTS ix_leads_email_trgm ON leads USING gin (email gin_trgm_ops);
+                ELSE
+                    RAISE NOTICE 'pg_trgm недоступно: поиск лидов будет работать без индекса';
+                END IF;
+            END
+            $$
+            """
+        )
+    elif dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE leads_fts USING fts5("
+            "name, email, content='leads', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER trg_leads_fts_insert AFTER INSERT ON leads BEGIN "
+            "INSERT INTO leads_fts (rowid, name, email) VALUES (new.id, new.name, new.email); END"
+        )
+        op.execute(
+            "CREATE TRIGGER trg_leads_fts_delete AFTER DELETE ON leads BEGIN "
+            "INSERT INTO leads_fts (leads_fts, rowid, name, email) "
+            "VALUES ('delete', old.id, old.name, old.email); END"
+        )
+        op.execute(
+            "CREATE TRIGGER trg_leads_fts_update AFTER UPDATE OF name, email ON leads BEGIN "
+            "INSERT INTO leads_fts (leads_fts, rowid, name, email) "
+            "VALUES ('delete', old.id, old.name, old.email); "
+            "INSERT INTO leads_fts (rowid, name, email) VALUES (new.id, new.name, new.email); END"
+        )
+        # Индексирую лидов, которые уже есть в таблице
+        op.execute("INSERT INTO leads_fts (leads_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Откатить миграцию: удалить поисковые индексы (расширение pg_trgm оставляю)."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_leads_email_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_leads_name_trgm")
+    elif dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS trg_leads_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS trg_leads_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS trg_leads_fts_insert")
+        op.execute("DROP TABLE IF EXISTS leads_fts")
@@ -0,0 +1,145 @@
+"""Таблица lead_stats — инкрементальные счётчики лидов по статусу, источнику и менеджеру.
+
+Счётчики поддерживаются триггерами на leads в той же транзакции, что и запись:
+- SQLite — построчные триггеры с UPSERT;
+- Postgres — триггеры на уровне оператора с transition-таблицами и функция
+  lead_stats_apply(), которая сворачивает дельты оператора в одну вставку
+  ON CONFLICT и обновляет строки счётчиков в порядке (dimension, value).
+
+Начальные значения считаются одним GROUP BY по текущим лидам.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "8a3c5e7b9d21"
+
+# Предыдущая миграция — поисковые индексы
+down_revision: Union[str, Sequence[str], None] = "7d2f4a6c8b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _pg_apply(changed: str) -> str:
+    """Вставка свёрнутых дельт изменённых строк в lead_stats (тело ветки функции)."""
+    return f"""
+        INSERT INTO lead_stats (dimension, value, count)
+        SELECT d.dimension, d.value, sum(changed.delta)
+        FROM ({changed}) AS changed
+        CROSS JOIN LATERAL (VALUES
+            ('status', coalesce(changed.status, '')),
+            ('source', coalesce(changed.source, '')),
+            ('assigned_to', coalesce(changed.assigned_to, ''))
+        ) AS d(dimension, value)
+        GROUP BY d.dimension, d.value
+        HAVING sum(changed.delta) <> 0
+        ORDER BY d.dimension, d.value
+        ON CONFLICT (dimension, value) DO UPDATE SET count = lead_stats.count + EXCLUDED.count;
+    """
+
+
+NEW_ROWS = "SELECT status, source, assigned_to, 1 AS delta FROM new_rows"
+OLD_ROWS = "SELECT status, source, assigned_to, -1 AS delta FROM old_rows"
+
+
+def _sqlite_upsert(row: str, delta: int) -> str:
+    """UPSERT дельты по всем измерениям для строки new/old в триггере SQLite."""
+    return (
+        "INSERT INTO lead_stats (dimension, value, count) VALUES "
+        f"('status', coalesce({row}.status, ''), {delta}), "
+        f"('source', coalesce({row}.source, ''), {delta}), "
+        f"('assigned_to', coalesce({row}.assigned_to, ''), {delta}) "
+        "ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count;"
+    )
+
+
+def upgrade() -> None:
+    """Применить миграцию: создать lead_stats, заполнить её и повесить триггеры."""
+    op.create_table(
+        "lead_stats",
+        sa.Column("dimension", sa.String(length=20), nullable=False),
+        sa.Column("value", sa.String(length=100), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("dimension", "value"),
+    )
+
+    # Стартовые значения по текущим лидам
+    op.execute(
+        """
+        INSERT INTO lead_stats (dimension, value, count)
+        SELECT 'status', status, count(*) FROM leads GROUP BY status
+        UNION ALL
+        SELECT 'source', coalesce(source, ''), count(*) FROM leads GROUP BY coalesce(source, '')
+        UNION ALL
+        SELECT 'assigned_to', coalesce(assigned_to, ''), count(*) FROM leads
+        GROUP BY coalesce(assigned_to, '')
+        """
+    )
+
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION lead_stats_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    {_pg_apply(NEW_ROWS)}
+                ELSIF TG_OP = 'DELETE' THEN
+                    {_pg_apply(OLD_ROWS)}
+                ELSE
+                    {_pg_apply(NEW_ROWS + " UNION ALL " + OLD_ROWS)}
+                END IF;
+                RETURN NULL;
+            END $$
+            """
+        )
+        op.execute(
+            "CREATE TRIGGER trg_lead_stats_insert AFTER INSERT ON leads "
+            "REFERENCING NEW TABLE AS new_rows "
+            "FOR EACH STATEMENT EXECUTE FUNCTION lead_stats_apply()"
+        )
+        op.execute(
+            "CREATE TRIGGER trg_lead_stats_update AFTER UPDATE ON leads "
+            "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+            "FOR EACH STATEMENT EXECUTE FUNCTION lead_stats_apply()"
+        )
+        op.execute(
+            "CREATE TRIGGER trg_lead_stats_delete AFTER DELETE ON leads "
+            "REFERENCING OLD TABLE AS old_rows "
+            "FOR EACH STATEMENT EXECUTE FUNCTION lead_stats_apply()"
+        )
+    elif dialect == "sqlite":
+        op.execute(
+            "CREATE TRIGGER trg_lead_stats_insert AFTER INSERT ON leads "
+            f"BEGIN {_sqlite_upsert('new', 1)} END"
+        )
+        op.execute(
+            "CREATE TRIGGER trg_lead_stats_delete AFTER DELETE ON leads "
+            f"BEGIN {_sqlite_upsert('old', -1)} END"
+        )
+        op.execute(
+            "CREATE TRIGGER trg_lead_stats_update AFTER UPDATE OF status, source, assigned_to ON leads "
+            f"BEGIN {_sqlite_upsert('old', -1)} {_sqlite_upsert('new', 1)} END"
+        )
+
+
+def downgrade() -> None:
+    """Откатить миграцию: удалить триггеры, функцию и таблицу lead_stats."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_stats_delete ON leads")
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_stats_update ON leads")
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_stats_insert ON leads")
+        op.execute("DROP FUNCTION IF EXISTS lead_stats_apply()")
+    elif dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_stats_update")
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_stats_delete")
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_stats_insert")
+
+    op.drop_table("lead_stats")
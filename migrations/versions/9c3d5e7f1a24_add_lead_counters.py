@@ -0,0 +1,53 @@
+"""Таблица lead_counters — поддерживаемый счётчик лидов для SQLite.
+
+Оценка total (total_strategy=estimated) на SQLite читается из этой таблицы,
+а не считается COUNT(*). Значение обновляют триггеры на leads, поэтому
+триггеры создаются только на SQLite; на Postgres оценку даёт планировщик.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "9c3d5e7f1a24"
+
+# Предыдущая миграция — индексы keyset-пагинации
+down_revision: Union[str, Sequence[str], None] = "4b7e2c91a0f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Применить миграцию: создать lead_counters и (на SQLite) триггеры счётчика."""
+    op.create_table(
+        "lead_counters",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("value", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    # Стартовое значение — текущее число лидов
+    op.execute("INSERT INTO lead_counters (name, value) SELECT 'leads', count(*) FROM leads")
+    op.execute(
+        "CREATE TRIGGER trg_leads_counter_insert AFTER INSERT ON leads "
+        "BEGIN UPDATE lead_counters SET value = value + 1 WHERE name = 'leads'; END"
+    )
+    op.execute(
+        "CREATE TRIGGER trg_leads_counter_delete AFTER DELETE ON leads "
+        "BEGIN UPDATE lead_counters SET value = value - 1 WHERE name = 'leads'; END"
+    )
+
+
+def downgrade() -> None:
+    """Откатить миграцию: удалить триггеры и таблицу lead_counters."""
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS trg_leads_counter_delete")
+        op.execute("DROP TRIGGER IF EXISTS trg_leads_counter_insert")
+
+    op.drop_table("lead_counters")
@@ -0,0 +1,89 @@
+"""Таблица lead_tombstones — удалённые и архивные лиды для ленты изменений.
+
+Лента /leads/changes читала только leads и не сообщала об удалении лида
+или переносе его в архив. Триггер AFTER DELETE на leads оставляет в
+lead_tombstones запись с причиной (deleted/archived), и лента отдаёт её
+потребителям. На Postgres вставка надгробий будит слушателей ленты NOTIFY.
+
+Для лидов, удалённых или перенесённых в архив до этой миграции, надгробий нет.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "a9b1d3f5c7e9"
+
+# Предыдущая миграция — номер версии лида
+down_revision: Union[str, Sequence[str], None] = "f8a0c2e4b6d8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Причина: лид есть в архиве — перенесён, нет — удалён
+def _reason(row: str) -> str:
+    return (
+        f"CASE WHEN EXISTS (SELECT 1 FROM leads_archive WHERE leads_archive.id = {row}.id) "
+        "THEN 'archived' ELSE 'deleted' END"
+    )
+
+
+def upgrade() -> None:
+    """Применить миграцию: создать lead_tombstones и триггер на удаление из leads."""
+    op.create_table(
+        "lead_tombstones",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column(
+            "removed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.Column("reason", sa.String(length=20), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_lead_tombstones_removed_at_id", "lead_tombstones", ["removed_at", "id"], unique=False)
+
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute(
+            "CREATE OR REPLACE FUNCTION lead_tombstones_add() RETURNS trigger LANGUAGE plpgsql AS $$ "
+            "BEGIN "
+            f"INSERT INTO lead_tombstones (id, reason) SELECT old_rows.id, {_reason('old_rows')} "
+            "FROM old_rows ORDER BY old_rows.id "
+            "ON CONFLICT (id) DO UPDATE SET removed_at = EXCLUDED.removed_at, reason = EXCLUDED.reason; "
+            "RETURN NULL; "
+            "END $$"
+        )
+        op.execute(
+            "CREATE TRIGGER trg_lead_tombstones AFTER DELETE ON leads "
+            "REFERENCING OLD TABLE AS old_rows "
+            "FOR EACH STATEMENT EXECUTE FUNCTION lead_tombstones_add()"
+        )
+        # функция lead_changes_notify() создана миграцией d5a7b9c1e3f4
+        op.execute(
+            "CREATE TRIGGER trg_lead_tombstones_notify AFTER INSERT OR UPDATE ON lead_tombstones "
+            "FOR EACH STATEMENT EXECUTE FUNCTION lead_changes_notify()"
+        )
+    elif dialect == "sqlite":
+        op.execute(
+            "CREATE TRIGGER trg_lead_tombstones AFTER DELETE ON leads "
+            f"BEGIN INSERT OR REPLACE INTO lead_tombstones (id, reason) VALUES (old.id, {_reason('old')}); END"
+        )
+
+
+def downgrade() -> None:
+    """Откатить миграцию: удалить триггеры и таблицу lead_tombstones."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_tombstones_notify ON lead_tombstones")
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_tombstones ON leads")
+        op.execute("DROP FUNCTION IF EXISTS lead_tombstones_add()")
+    elif dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_tombstones")
+    op.drop_index("ix_lead_tombstones_removed_at_id", table_name="lead_tombstones")
+    op.drop_table("lead_tombstones")
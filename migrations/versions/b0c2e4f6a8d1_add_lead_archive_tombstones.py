@@ -0,0 +1,48 @@
+"""Надгробия лидов, удалённых из архива.
+
+DELETE /leads/{id} теперь удаляет и архивного лида (раньше отвечал 404, хотя
+GET его отдавал). Триггер AFTER DELETE на leads_archive пишет в lead_tombstones
+надгробие с причиной deleted поверх прежнего archived — так лента изменений
+узнаёт об удалении. На Postgres он вызывает ту же функцию lead_tombstones_add().
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "b0c2e4f6a8d1"
+
+# Предыдущая миграция — надгробия лидов
+down_revision: Union[str, Sequence[str], None] = "a9b1d3f5c7e9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Применить миграцию: триггер надгробий на удаление из leads_archive."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        # функция lead_tombstones_add() создана миграцией a9b1d3f5c7e9; удалённых
+        # строк архива она в leads_archive уже не видит и пишет причину deleted
+        op.execute(
+            "CREATE TRIGGER trg_lead_archive_tombstones AFTER DELETE ON leads_archive "
+            "REFERENCING OLD TABLE AS old_rows "
+            "FOR EACH STATEMENT EXECUTE FUNCTION lead_tombstones_add()"
+        )
+    elif dialect == "sqlite":
+        op.execute(
+            "CREATE TRIGGER trg_lead_archive_tombstones AFTER DELETE ON leads_archive "
+            "BEGIN INSERT OR REPLACE INTO lead_tombstones (id, reason) VALUES (old.id, 'deleted'); END"
+        )
+
+
+def downgrade() -> None:
+    """Откатить миграцию: удалить триггер надгробий с leads_archive."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_archive_tombstones ON leads_archive")
+    elif dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_archive_tombstones")
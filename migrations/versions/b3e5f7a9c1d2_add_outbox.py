@@ -0,0 +1,51 @@
+"""Таблица outbox — события по лидам, ожидающие публикации в RabbitMQ.
+
+Сервисы лидов пишут событие в той же транзакции, что и сам лид,
+а диспетчер (python -m app.jobs.outbox_dispatcher) публикует события
+по порядку id и удаляет отправленные строки.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "b3e5f7a9c1d2"
+
+# Предыдущая миграция — lead_stats
+down_revision: Union[str, Sequence[str], None] = "8a3c5e7b9d21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Применить миграцию: создать таблицу outbox."""
+    op.create_table(
+        "outbox",
+        sa.Column(
+            "id",
+            sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+            autoincrement=True,
+            nullable=False,
+        ),
+        sa.Column("aggregate_id", sa.Integer(), nullable=False),
+        sa.Column("event_type", sa.String(length=50), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Откатить миграцию: удалить таблицу outbox."""
+    op.drop_table("outbox")
@@ -0,0 +1,72 @@
+"""AUTOINCREMENT для leads на SQLite — id лидов больше не выдаются повторно.
+
+Без AUTOINCREMENT SQLite выдаёт новому лиду max(id) + 1, то есть id самого
+нового лида после его удаления или переноса в архив достаётся следующему.
+Повторный id ломал джобу архивации (UNIQUE на leads_archive.id) и путал
+чтение из архива, надгробия и события outbox.
+
+SQLite не умеет добавить AUTOINCREMENT к существующей таблице, поэтому leads
+пересоздаётся (batch-режим Alembic). Триггеры на leads при этом пропадают
+вместе со старой таблицей, поэтому я сохраняю их DDL из sqlite_master и
+создаю заново. Счётчик sqlite_sequence стартует с наибольшего id, который
+уже где-либо встречался: в leads, архиве, надгробиях или outbox.
+
+На Postgres id и так берутся из последовательности — миграция ничего не делает.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "c1d3e5f7a9b2"
+
+# Предыдущая миграция — надгробия лидов, удалённых из архива
+down_revision: Union[str, Sequence[str], None] = "b0c2e4f6a8d1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Все id лидов, которые уже были выданы
+USED_IDS = (
+    "SELECT MAX(id) FROM ("
+    "SELECT MAX(id) AS id FROM leads "
+    "UNION ALL SELECT MAX(id) FROM leads_archive "
+    "UNION ALL SELECT MAX(id) FROM lead_tombstones "
+    "UNION ALL SELECT MAX(aggregate_id) FROM outbox"
+    ")"
+)
+
+
+def _rebuild_leads(autoincrement: bool) -> None:
+    """Пересоздать leads на SQLite с AUTOINCREMENT или без, сохранив триггеры."""
+    bind = op.get_bind()
+    triggers = bind.execute(
+        sa.text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'leads' ORDER BY name")
+    ).scalars().all()
+
+    with op.batch_alter_table(
+        "leads", recreate="always", table_kwargs={"sqlite_autoincrement": autoincrement}
+    ):
+        pass
+
+    for ddl in triggers:
+        op.execute(ddl)
+
+    if autoincrement:
+        op.execute("DELETE FROM sqlite_sequence WHERE name = 'leads'")
+        op.execute(f"INSERT INTO sqlite_sequence (name, seq) SELECT 'leads', COALESCE(({USED_IDS}), 0)")
+
+
+def upgrade() -> None:
+    """Применить миграцию: объявить leads.id с AUTOINCREMENT на SQLite."""
+    if op.get_bind().dialect.name == "sqlite":
+        _rebuild_leads(autoincrement=True)
+
+
+def downgrade() -> None:
+    """Откатить миграцию: пересоздать leads без AUTOINCREMENT на SQLite."""
+    if op.get_bind().dialect.name == "sqlite":
+        _rebuild_leads(autoincrement=False)
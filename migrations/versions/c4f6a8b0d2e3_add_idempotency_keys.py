@@ -0,0 +1,55 @@
+"""Таблица idempotency_keys — ключи Idempotency-Key и сохранённые ответы.
+
+Первый POST /leads (или /leads/bulk) с ключом пишет строку в той же
+транзакции, что и лидов; повтор с тем же ключом получает сохранённый ответ.
+Уникальное ограничение (scope, key) сериализует одновременные дубли,
+индекс по expires_at нужен джобе чистки (python -m app.jobs.prune_idempotency_keys).
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "c4f6a8b0d2e3"
+
+# Предыдущая миграция — outbox
+down_revision: Union[str, Sequence[str], None] = "b3e5f7a9c1d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Применить миграцию: создать таблицу idempotency_keys."""
+    op.create_table(
+        "idempotency_keys",
+        sa.Column(
+            "id",
+            sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+            autoincrement=True,
+            nullable=False,
+        ),
+        sa.Column("scope", sa.String(length=50), nullable=False),
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("request_hash", sa.String(length=64), nullable=False),
+        sa.Column("status_code", sa.Integer(), nullable=True),
+        sa.Column("response_body", sa.LargeBinary(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+    )
+    op.create_index("ix_idempotency_keys_expires_at", "idempotency_keys", ["expires_at"])
+
+
+def downgrade() -> None:
+    """Откатить миграцию: удалить таблицу idempotency_keys."""
+    op.drop_index("ix_idempotency_keys_expires_at", table_name="idempotency_keys")
+    op.drop_table("idempotency_keys")
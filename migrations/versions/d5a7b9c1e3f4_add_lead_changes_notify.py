@@ -0,0 +1,48 @@
+"""Триггер NOTIFY lead_changes на leads — уведомления для ленты изменений.
+
+Лента /leads/changes ждёт изменений через LISTEN lead_changes на одном
+соединении на процесс, а не опрашивает БД. Триггер уровня оператора шлёт
+пустое уведомление на вставку и изменение лидов; одинаковые уведомления
+одной транзакции Postgres доставляет один раз.
+На SQLite LISTEN/NOTIFY нет, лента там опрашивает БД — миграция ничего не делает.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "d5a7b9c1e3f4"
+
+# Предыдущая миграция — idempotency_keys
+down_revision: Union[str, Sequence[str], None] = "c4f6a8b0d2e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Применить миграцию: функция lead_changes_notify() и триггер на leads (Postgres)."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION lead_changes_notify() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_notify('lead_changes', '');
+            RETURN NULL;
+        END $$
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER trg_lead_changes_notify AFTER INSERT OR UPDATE ON leads "
+        "FOR EACH STATEMENT EXECUTE FUNCTION lead_changes_notify()"
+    )
+
+
+def downgrade() -> None:
+    """Откатить миграцию: удалить триггер и функцию."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP TRIGGER IF EXISTS trg_lead_changes_notify ON leads")
+    op.execute("DROP FUNCTION IF EXISTS lead_changes_notify()")
@@ -0,0 +1,102 @@
+"""Таблица leads_archive — архив закрытых лидов (won/lost).
+
+Джоба python -m app.jobs.archive_leads переносит сюда закрытые лиды старше
+ARCHIVE_AFTER_DAYS, чтобы они не раздували leads и её индексы.
+На архиве висят те же триггеры lead_stats, что и на leads: счётчики воронки
+считают лидов в обеих таблицах, и перенос их не меняет.
+
+Откат возвращает архивных лидов в leads, а не теряет их вместе с таблицей.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "e7c9d1f3a5b6"
+
+# Предыдущая миграция — триггер NOTIFY ленты изменений
+down_revision: Union[str, Sequence[str], None] = "d5a7b9c1e3f4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+LEAD_COLUMNS = "id, name, email, status, source, assigned_to, created_at, updated_at"
+
+
+def _sqlite_upsert(row: str, delta: int) -> str:
+    """UPSERT дельты по всем измерениям для строки new/old в триггере SQLite."""
+    return (
+        "INSERT INTO lead_stats (dimension, value, count) VALUES "
+        f"('status', coalesce({row}.status, ''), {delta}), "
+        f"('source', coalesce({row}.source, ''), {delta}), "
+        f"('assigned_to', coalesce({row}.assigned_to, ''), {delta}) "
+        "ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count;"
+    )
+
+
+def upgrade() -> None:
+    """Применить миграцию: создать leads_archive и триггеры lead_stats на ней."""
+    op.create_table(
+        "leads_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("name", sa.String(length=200), nullable=False),
+        sa.Column("email", sa.String(length=255), nullable=False),
+        sa.Column("status", sa.String(length=50), nullable=False),
+        sa.Column("source", sa.String(length=100), nullable=True),
+        sa.Column("assigned_to", sa.String(length=100), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "archived_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        # функция lead_stats_apply() создана миграцией 8a3c5e7b9d21
+        op.execute(
+            "CREATE TRIGGER trg_lead_archive_stats_insert AFTER INSERT ON leads_archive "
+            "REFERENCING NEW TABLE AS new_rows "
+            "FOR EACH STATEMENT EXECUTE FUNCTION lead_stats_apply()"
+        )
+        op.execute(
+            "CREATE TRIGGER trg_lead_archive_stats_delete AFTER DELETE ON leads_archive "
+            "REFERENCING OLD TABLE AS old_rows "
+            "FOR EACH STATEMENT EXECUTE FUNCTION lead_stats_apply()"
+        )
+    elif dialect == "sqlite":
+        op.execute(
+            "CREATE TRIGGER trg_lead_archive_stats_insert AFTER INSERT ON leads_archive "
+            f"BEGIN {_sqlite_upsert('new', 1)} END"
+        )
+        op.execute(
+            "CREATE TRIGGER trg_lead_archive_stats_delete AFTER DELETE ON leads_archive "
+            f"BEGIN {_sqlite_upsert('old', -1)} END"
+        )
+
+
+def downgrade() -> None:
+    """Откатить миграцию: вернуть архивных лидов в leads, удалить триггеры и таблицу."""
+    # Пока триггеры архива на месте, вставка в leads и удаление из архива
+    # взаимно гасят дельты lead_stats
+    op.execute(f"INSERT INTO leads ({LEAD_COLUMNS}) SELECT {LEAD_COLUMNS} FROM leads_archive")
+    op.execute("DELETE FROM leads_archive")
+
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_archive_stats_delete ON leads_archive")
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_archive_stats_insert ON leads_archive")
+    elif dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_archive_stats_delete")
+        op.execute("DROP TRIGGER IF EXISTS trg_lead_archive_stats_insert")
+
+    op.drop_table("leads_archive")
@@ -0,0 +1,41 @@
+"""Колонка version у leads и leads_archive — номер версии лида для ETag.
+
+ETag и If-Match раньше строились из updated_at, а на SQLite у него точность
+до секунды: два изменения за секунду давали один ETag. version начинается
+с 1 и растёт на каждом UPDATE лида (см. app/services/leads.py).
+У существующих лидов версия — 1.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# Уникальный идентификатор этой миграции
+revision: str = "f8a0c2e4b6d8"
+
+# Предыдущая миграция — архив закрытых лидов
+down_revision: Union[str, Sequence[str], None] = "e7c9d1f3a5b6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ("leads", "leads_archive")
+
+
+def upgrade() -> None:
+    """Применить миграцию: добавить version (по умолчанию 1) в обе таблицы лидов."""
+    for table in TABLES:
+        op.add_column(table, sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    """
+    Откатить миграцию: удалить колонку version.
+
+    Обычный ALTER TABLE … DROP COLUMN (SQLite умеет его с 3.35), а не
+    batch-режим: пересоздание таблицы на SQLite потеряло бы её триггеры.
+    """
+    for table in reversed(TABLES):
+        op.drop_column(table, "version")
@@ -0,0 +1,88 @@
+# tests/conftest.py — общие фикстуры тестов.
+
+"""
+Общие фикстуры тестов.
+
+Настройки и engine создаются при импорте app, поэтому окружение для тестов
+выставляю здесь, до первого импорта: отдельная база (временный SQLite-файл
+или TEST_DATABASE_URL), брокер и Redis в памяти процесса, без реплик.
+Настройки окружения test читаются из .env.test; если его нет, он создаётся
+из .env.test.example (секретов там нет).
+
+Схема создаётся один раз на сессию через Base.metadata (с триггерами
+lead_stats), а после каждого теста таблицы и кэши лидов очищаются.
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+os.environ["ENVIRONMENT"] = "test"
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or "sqlite:///" + os.path.join(
+    tempfile.gettempdir(), f"leadlab_test_{os.getpid()}.db"
+)
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["DB_ASYNC"] = "false"
+os.environ["RABBITMQ_URL"] = "memory://"
+os.environ["LEAD_CACHE_BACKEND"] = "memory"
+os.environ["LEAD_CACHE_REDIS_URL"] = "memory://"
+os.environ["SLOW_QUERY_MS"] = "0"
+
+if not Path(".env.test").exists() and Path(".env.test.example").exists():
+    shutil.copyfile(".env.test.example", ".env.test")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+
+from app.db.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import idempotency, lead, lead_archive, lead_counter, lead_stat, lead_tombstone, outbox  # noqa: E402,F401
+from app.services.counting import lead_count_cache  # noqa: E402
+from app.services.lead_cache import lead_cache  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    """Пустая схема тестовой базы на всю сессию."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+    if engine.dialect.name == "sqlite" and engine.url.database:
+        Path(engine.url.database).unlink(missing_ok=True)
+
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    """После теста — пустые таблицы и кэши лидов."""
+    yield
+    # lead_counters не трогаю: строку счётчика засевает create_all, а удаление
+    # лидов триггерами вернёт её к нулю. lead_stats и lead_tombstones чищу
+    # последними: их пишут триггеры на удаление лидов
+    last = [lead_tombstone.LeadTombstone.__table__, lead_stat.LeadStat.__table__]
+    skip = (*last, lead_counter.LeadCounter.__table__)
+    tables = [table for table in reversed(Base.metadata.sorted_tables) if table not in skip]
+    with engine.begin() as conn:
+        for table in tables + last:
+            conn.execute(delete(table))
+    lead_cache.clear()
+    lead_count_cache.invalidate()
+
+
+@pytest.fixture
+def db():
+    """Сессия тестовой базы."""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    """HTTP-клиент приложения (без lifespan: фоновые проверки тестам не нужны)."""
+    return TestClient(app)
@@ -0,0 +1,112 @@
+# tests/test_admission.py — контроль допуска запросов.
+
+"""
+AdmissionControlMiddleware (app/core/admission.py) поверх крошечного
+ASGI-приложения: первый запрос держит место, пока тест не отпустит его,
+и по ответам следующих видно, что middleware сделало с ними.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi.responses import PlainTextResponse
+
+from app.core.admission import AdmissionControlMiddleware
+
+
+class HeldApp:
+    """ASGI-приложение: запрос к /slow ждёт release, остальные отвечают сразу."""
+
+    def __init__(self):
+        self.entered = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self, scope, receive, send):
+        if scope["path"] == "/slow":
+            self.entered.set()
+            await self.release.wait()
+        await PlainTextResponse("ok")(scope, receive, send)
+
+
+def run(scenario, **options):
+    async def main():
+        app = HeldApp()
+        middleware = AdmissionControlMiddleware(app, **options)
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await scenario(app, client)
+
+    return asyncio.run(main())
+
+
+async def while_held(app, client, request):
+    """Ответ на request, пока /slow занимает единственное место."""
+    slow = asyncio.create_task(client.get("/slow"))
+    await app.entered.wait()
+    try:
+        return await request()
+    finally:
+        app.release.set()
+        assert (await slow).status_code == 200
+
+
+def test_saturated_limiter_returns_503():
+    async def scenario(app, client):
+        return await while_held(app, client, lambda: client.get("/leads"))
+
+    response = run(scenario, max_concurrency=1, max_queue=0, queue_timeout=0.1, retry_after=7)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "7"
+
+
+def test_queued_request_times_out():
+    async def scenario(app, client):
+        return await while_held(app, client, lambda: client.get("/leads"))
+
+    response = run(scenario, max_concurrency=1, max_queue=4, queue_timeout=0.05)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_queued_request_is_admitted_when_slot_frees():
+    async def scenario(app, client):
+        slow = asyncio.create_task(client.get("/slow"))
+        await app.entered.wait()
+        queued = asyncio.create_task(client.get("/leads"))
+        await asyncio.sleep(0.05)
+        app.release.set()
+        return (await slow).status_code, (await queued).status_code
+
+    assert run(scenario, max_concurrency=1, max_queue=4, queue_timeout=5) == (200, 200)
+
+
+def test_exempt_paths_skip_the_limit():
+    async def scenario(app, client):
+        return await while_held(app, client, lambda: client.get("/health/live"))
+
+    response = run(scenario, max_concurrency=1, max_queue=0, exempt_paths="/health,/metrics")
+    assert response.status_code == 200
+
+
+def test_route_limit_is_separate_from_default():
+    async def scenario(app, client):
+        return await while_held(app, client, lambda: client.get("/leads"))
+
+    # /slow упирается в свой лимит, а общий для /leads свободен
+    response = run(scenario, max_concurrency=1, max_queue=0, route_limits="GET /slow=1")
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("headers, limited", [({"X-API-Key": "partner"}, True), ({"X-API-Key": "other"}, False)])
+def test_rate_limit_per_client(headers, limited):
+    async def scenario(app, client):
+        await client.get("/leads", headers={"X-API-Key": "partner"})
+        return await client.get("/leads", headers=headers)
+
+    response = run(scenario, rate_limit=0.5, rate_burst=1, max_concurrency=0)
+    if limited:
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "2"
+    else:
+        assert response.status_code == 200
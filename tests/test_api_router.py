@@ -0,0 +1,91 @@
+# tests/test_api_router.py — выбор роутера лидов по DB_ASYNC.
+
+"""
+build_api_router (app/api/v1/api.py) подключает ровно один роутер лидов:
+async-версию при DB_ASYNC или синхронную.
+
+Тестам DB_ASYNC выключен, поэтому async-приложение собираю здесь же, а его
+сессии открываю на тестовой базе через aiosqlite (или asyncpg). Синхронная
+зависимость get_db подменена на падающую: запрос, дошедший до синхронного
+роутера, провалит тест.
+"""
+
+from collections import Counter
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+try:
+    from fastapi.routing import iter_route_contexts
+except ImportError:  # старые FastAPI копируют маршруты роутера прямо в app.routes
+    iter_route_contexts = iter
+
+from app.api.v1 import leads as leads_api
+from app.api.v1 import leads_async as leads_async_api
+from app.api.v1.api import build_api_router
+from app.db.database import DATABASE_URL, create_async_db_engine, get_async_db, get_db
+
+LEADS = "/api/v1/leads/leads"
+
+
+def build_app(db_async: bool) -> FastAPI:
+    app = FastAPI()
+    app.include_router(build_api_router(db_async), prefix="/api/v1")
+    return app
+
+
+def lead_routes(app: FastAPI) -> Counter:
+    """Маршруты под /api/v1/leads: (метод, путь, модуль эндпоинта) -> сколько раз подключён."""
+    return Counter(
+        (method, route.path, route.endpoint.__module__)
+        for route in iter_route_contexts(app.routes)
+        if route.path.startswith("/api/v1/leads")
+        for method in route.methods
+    )
+
+
+@pytest.mark.parametrize("db_async, module", [(True, leads_async_api), (False, leads_api)])
+def test_exactly_one_leads_router(db_async, module):
+    app = build_app(db_async)
+    routes = lead_routes(app)
+    assert {endpoint_module for _, _, endpoint_module in routes} == {module.__name__}
+    assert set(routes.values()) == {1}
+    assert ("GET", LEADS, module.__name__) in routes
+
+    paths = app.openapi()["paths"]
+    operations = [method for path, item in paths.items() if path.startswith("/api/v1/leads") for method in item]
+    assert len(operations) == len(routes)
+
+
+@pytest.fixture
+def async_client():
+    # NullPool: соединения aiosqlite/asyncpg не переживают event loop TestClient
+    engine = create_async_db_engine(DATABASE_URL, poolclass=NullPool)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False)
+
+    async def async_db():
+        async with session_factory() as db:
+            yield db
+
+    def sync_db():
+        raise AssertionError("запрос дошёл до синхронного роутера")
+
+    app = build_app(db_async=True)
+    app.dependency_overrides[get_async_db] = async_db
+    app.dependency_overrides[get_db] = sync_db
+    with TestClient(app) as client:
+        yield client
+
+
+def test_async_app_serves_leads(async_client):
+    created = async_client.post(LEADS, json={"name": "Anna", "email": "anna@example.com"})
+    assert created.status_code == 201
+    lead_id = created.json()["id"]
+
+    page = async_client.get(LEADS)
+    assert page.status_code == 200
+    assert [lead["id"] for lead in page.json()["leads"]] == [lead_id]
+    assert async_client.get(f"{LEADS}/{lead_id}").json()["email"] == "anna@example.com"
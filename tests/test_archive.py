@@ -0,0 +1,68 @@
+# tests/test_archive.py — изменения и удаление архивных лидов.
+
+"""
+Лид из leads_archive (app/services/archive.py) читается по id, но не
+меняется: PATCH/PUT отвечают 409. DELETE удаляет его из архива с событием
+lead.deleted и надгробием deleted в ленте изменений.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.models.lead_archive import LeadArchive
+from app.models.lead_tombstone import LeadTombstone
+from app.models.outbox import OutboxEvent
+from app.services.archive import archive_batch
+
+LEADS = "/api/v1/leads/leads"
+
+
+@pytest.fixture
+def archived(client, db) -> int:
+    """id лида, перенесённого в архив."""
+    lead_id = client.post(LEADS, json={"name": "Anna", "email": "anna@example.com", "status": "won"}).json()["id"]
+    assert archive_batch(db, ["won"], datetime.now(timezone.utc) + timedelta(days=1)) == [lead_id]
+    assert client.get(f"{LEADS}/{lead_id}").status_code == 200
+    return lead_id
+
+
+@pytest.mark.parametrize(
+    "method, body, headers",
+    [
+        ("patch", {"status": "lost"}, {}),
+        ("put", {"name": "Anna", "email": "anna@example.com", "status": "lost"}, {}),
+        # архив важнее If-Match: версия тут ни при чём
+        ("patch", {"status": "lost"}, {"If-Match": '"1.1"'}),
+    ],
+)
+def test_archived_lead_is_read_only(client, archived, method, body, headers):
+    response = getattr(client, method)(f"{LEADS}/{archived}", json=body, headers=headers)
+    assert response.status_code == 409
+    assert client.get(f"{LEADS}/{archived}").json()["status"] == "won"
+
+
+def test_missing_lead_is_still_404(client):
+    assert client.patch(f"{LEADS}/999999", json={"status": "won"}).status_code == 404
+
+
+def test_delete_removes_lead_from_archive(client, db, archived):
+    assert client.delete(f"{LEADS}/{archived}").status_code == 204
+    assert client.get(f"{LEADS}/{archived}").status_code == 404
+    assert db.get(LeadArchive, archived) is None
+    assert db.get(LeadTombstone, archived).reason == "deleted"
+    events = select(OutboxEvent.event_type).where(OutboxEvent.aggregate_id == archived).order_by(OutboxEvent.id)
+    assert db.scalars(events).all()[-1] == "lead.deleted"
+
+    assert client.delete(f"{LEADS}/{archived}").status_code == 404
+
+
+def test_archived_id_is_not_reused(client, db, archived):
+    # на SQLite без AUTOINCREMENT новый лид получил бы id архивного,
+    # и следующий перенос упал бы на UNIQUE leads_archive.id
+    lead_id = client.post(LEADS, json={"name": "Boris", "email": "boris@example.com", "status": "won"}).json()["id"]
+    assert lead_id > archived
+    assert archive_batch(db, ["won"], datetime.now(timezone.utc) + timedelta(days=1)) == [lead_id]
+    assert client.get(f"{LEADS}/{archived}").json()["name"] == "Anna"
+    assert client.get(f"{LEADS}/{lead_id}").json()["name"] == "Boris"
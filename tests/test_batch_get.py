@@ -0,0 +1,66 @@
+# tests/test_batch_get.py — пакетное чтение лидов по списку ID.
+
+"""
+POST /leads/batch-get (leads.get_leads_by_ids): порядок запроса, повторы,
+ненайденные ID, архивные лиды и проекция fields=.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.services.archive import archive_batch
+
+LEADS = "/api/v1/leads/leads"
+BATCH_GET = f"{LEADS}/batch-get"
+
+
+def create(client, name: str, status: str = "new") -> int:
+    response = client.post(LEADS, json={"name": name, "email": f"{name.lower()}@example.com", "status": status})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def batch_get(client, ids: list[int], **params) -> dict:
+    response = client.post(BATCH_GET, json={"ids": ids}, params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_leads_in_request_order(client):
+    anna, boris, olga = create(client, "Anna"), create(client, "Boris"), create(client, "Olga")
+    body = batch_get(client, [olga, anna, boris])
+    assert [lead["id"] for lead in body["leads"]] == [olga, anna, boris]
+    assert body["missing"] == []
+
+
+def test_duplicates_collapse_to_first(client):
+    anna, boris = create(client, "Anna"), create(client, "Boris")
+    body = batch_get(client, [boris, anna, boris, anna])
+    assert [lead["id"] for lead in body["leads"]] == [boris, anna]
+
+
+def test_missing_ids_in_request_order(client):
+    anna = create(client, "Anna")
+    body = batch_get(client, [999_999, anna, 999_998, 999_999])
+    assert [lead["id"] for lead in body["leads"]] == [anna]
+    assert body["missing"] == [999_999, 999_998]
+
+
+def test_archived_leads_are_found(client, db):
+    won = create(client, "Anna", status="won")
+    kept = create(client, "Boris")
+    assert archive_batch(db, ["won"], datetime.now(timezone.utc) + timedelta(days=1)) == [won]
+
+    body = batch_get(client, [won, kept])
+    assert [lead["id"] for lead in body["leads"]] == [won, kept]
+    assert body["missing"] == []
+    # карточка совпадает с той, что отдаёт GET /leads/{id}
+    assert body["leads"][0] == client.get(f"{LEADS}/{won}").json()
+
+    body = batch_get(client, [won], fields="status")
+    assert body["leads"] == [{"id": won, "status": "won"}]
+
+
+def test_too_many_ids(client):
+    response = client.post(BATCH_GET, json={"ids": list(range(1, settings.batch_get_max_ids + 2))})
+    assert response.status_code == 413
@@ -0,0 +1,83 @@
+# tests/test_bulk_create.py — пакетная загрузка лидов POST /leads/bulk.
+
+"""
+Пакетная загрузка (leads.bulk_create_leads и parse_bulk_body в
+app/api/v1/utils.py): частичные ошибки валидации и БД, построчный повтор
+порции после отката её SAVEPOINT, порядок результатов и разбор NDJSON.
+
+Ошибку БД даёт "status": null: схема LeadCreate его пропускает, а колонка
+leads.status — NOT NULL.
+"""
+
+from sqlalchemy import select
+
+from app.models.lead import Lead
+from app.models.outbox import OutboxEvent
+
+BULK = "/api/v1/leads/leads/bulk"
+
+
+def lead(name: str, **fields) -> dict:
+    return {"name": name, "email": f"{name.lower()}@example.com", **fields}
+
+
+def stored_names(db) -> list[str]:
+    return db.scalars(select(Lead.name).order_by(Lead.id)).all()
+
+
+def test_partial_failures_are_reported_per_item(client, db):
+    items = [
+        lead("Anna"),
+        {"email": "nameless@example.com"},  # ошибка валидации
+        lead("Boris"),
+        lead("Broken", status=None),  # ошибка БД: валится вся порция
+        lead("Vera"),
+    ]
+    response = client.post(BULK, json=items, params={"chunk_size": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["failed"]) == (3, 2)
+    assert [result["index"] for result in body["results"]] == [0, 1, 2, 3, 4]
+    assert [result["ok"] for result in body["results"]] == [True, False, True, False, True]
+    assert body["results"][1]["errors"][0]["type"] == "missing"
+    assert body["results"][3]["errors"][0]["type"] == "db_error"
+    assert body["results"][3]["lead"] is None
+
+    # Boris из упавшей порции вставлен построчным повтором, Broken — нет
+    assert stored_names(db) == ["Anna", "Boris", "Vera"]
+    events = db.scalars(select(OutboxEvent.event_type)).all()
+    assert events == ["lead.created"] * 3
+
+
+def test_results_line_up_with_input(client, db):
+    names = [f"Lead{i}" for i in range(7)]
+    body = client.post(BULK, json=[lead(name) for name in names], params={"chunk_size": 3}).json()
+    assert [result["lead"]["name"] for result in body["results"]] == names
+    ids = [result["lead"]["id"] for result in body["results"]]
+    assert ids == sorted(ids)
+    assert {name: lead_id for lead_id, name in db.execute(select(Lead.id, Lead.name))} == dict(zip(names, ids))
+
+
+def test_ndjson_with_broken_line(client, db):
+    body = "\n".join(
+        [
+            '{"name": "Anna", "email": "anna@example.com"}',
+            '{"name": "Boris", "email":',
+            "",
+            '{"name": "Vera", "email": "vera@example.com"}',
+        ]
+    )
+    response = client.post(BULK, content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["failed"]) == (2, 1)
+    # пустые строки не считаются элементами
+    assert [item["ok"] for item in result["results"]] == [True, False, True]
+    assert result["results"][1]["errors"][0]["type"] == "json_invalid"
+    assert stored_names(db) == ["Anna", "Vera"]
+
+
+def test_body_must_be_array(client):
+    assert client.post(BULK, json={"name": "Anna"}).status_code == 400
+    response = client.post(BULK, content=b"[{", headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
@@ -0,0 +1,105 @@
+# tests/test_bulk_update.py — массовое изменение лидов POST /leads/bulk-update.
+
+"""
+Массовое изменение (leads.bulk_update_leads): dry_run, порции со своим
+коммитом, пропуск лидов, которым патч ничего не меняет, рост version и
+отказ на пустой фильтр или патч (LeadBulkUpdate.check_not_empty).
+"""
+
+import pytest
+from sqlalchemy import select
+
+from app.models.lead import Lead
+from app.models.outbox import OutboxEvent
+from app.schemas.leads import LeadBulkFilter, LeadUpdate
+from app.services import leads
+
+LEADS = "/api/v1/leads/leads"
+BULK_UPDATE = f"{LEADS}/bulk-update"
+
+
+@pytest.fixture
+def team(client) -> dict[str, list[int]]:
+    """Лиды по менеджерам: у anna пять, у boris два."""
+    ids: dict[str, list[int]] = {"anna": [], "boris": []}
+    for manager, count in (("anna", 5), ("boris", 2)):
+        for i in range(count):
+            body = {"name": f"{manager}{i}", "email": f"{manager}{i}@example.com", "assigned_to": manager}
+            ids[manager].append(client.post(LEADS, json=body).json()["id"])
+    return ids
+
+
+def versions(db, ids: list[int]) -> list[int]:
+    db.expire_all()
+    return db.scalars(select(Lead.version).where(Lead.id.in_(ids)).order_by(Lead.id)).all()
+
+
+def bulk_update(client, body: dict, **params):
+    response = client.post(BULK_UPDATE, json=body, params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_chunks_bump_version_and_write_events(client, db, team):
+    body = {"filter": {"assigned_to": "anna"}, "patch": {"assigned_to": "olga", "status": "in_progress"}}
+    assert bulk_update(client, body, chunk_size=2) == {"updated": 5, "chunks": 3, "dry_run": False}
+
+    assert versions(db, team["anna"]) == [2] * 5
+    assert versions(db, team["boris"]) == [1] * 2
+    assert client.get(f"{LEADS}/{team['anna'][0]}").json()["assigned_to"] == "olga"
+    events = db.scalars(select(OutboxEvent.aggregate_id).where(OutboxEvent.event_type == "lead.updated")).all()
+    assert sorted(events) == team["anna"]
+
+
+def test_dry_run_only_counts(client, db, team):
+    body = {"filter": {"assigned_to": "anna"}, "patch": {"status": "won"}}
+    assert bulk_update(client, body, dry_run="true") == {"updated": 5, "chunks": 0, "dry_run": True}
+    assert versions(db, team["anna"]) == [1] * 5
+
+
+def test_unchanged_leads_are_skipped(client, db, team):
+    client.patch(f"{LEADS}/{team['anna'][0]}", json={"status": "won"})
+    body = {"filter": {"assigned_to": "anna"}, "patch": {"status": "won"}}
+    assert bulk_update(client, body, dry_run="true")["updated"] == 4
+    assert bulk_update(client, body)["updated"] == 4
+    # у уже выигранного лида версия выросла только от PATCH
+    assert versions(db, team["anna"]) == [2] * 5
+    # повтор ничего не меняет
+    assert bulk_update(client, body) == {"updated": 0, "chunks": 0, "dry_run": False}
+
+
+def test_failed_chunk_keeps_committed_ones(db, team, monkeypatch):
+    enqueue = leads.enqueue_leads_updated
+    calls = []
+
+    def fail_second_chunk(session, leads_out, data):
+        calls.append(len(leads_out))
+        if len(calls) == 2:
+            raise RuntimeError("broker outage")
+        enqueue(session, leads_out, data)
+
+    monkeypatch.setattr(leads, "enqueue_leads_updated", fail_second_chunk)
+    lead_filter, patch = LeadBulkFilter(assigned_to="anna"), LeadUpdate(status="lost")
+    with pytest.raises(RuntimeError):
+        leads.bulk_update_leads(db, lead_filter, patch, chunk_size=2)
+    db.rollback()
+    # первая порция закоммичена, вторая откатилась
+    assert versions(db, team["anna"]) == [2, 2, 1, 1, 1]
+
+    monkeypatch.setattr(leads, "enqueue_leads_updated", enqueue)
+    result = leads.bulk_update_leads(db, lead_filter, patch, chunk_size=2)
+    assert (result.updated, result.chunks) == (3, 2)
+    assert versions(db, team["anna"]) == [2] * 5
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"filter": {}, "patch": {"status": "won"}},
+        {"filter": {"assigned_to": None}, "patch": {"status": "won"}},
+        {"filter": {"assigned_to": "anna"}, "patch": {}},
+    ],
+)
+def test_empty_filter_or_patch_is_rejected(client, db, team, body):
+    assert client.post(BULK_UPDATE, json=body).status_code == 422
+    assert versions(db, team["anna"] + team["boris"]) == [1] * 7
@@ -0,0 +1,97 @@
+# tests/test_conditional.py — ETag, 304 и If-Match для лидов.
+
+"""
+Условные запросы к карточке и списку лидов (app/services/conditional.py).
+
+Все изменения в тестах идут подряд, в пределах одной секунды: на SQLite
+updated_at хранится с точностью до секунды, и версия должна меняться
+без его участия.
+"""
+
+LEADS = "/api/v1/leads/leads"
+
+
+def create(client, name: str = "Anna", **headers):
+    response = client.post(LEADS, json={"name": name, "email": f"{name.lower()}@example.com"}, headers=headers)
+    assert response.status_code == 201
+    return response
+
+
+def test_etag_follows_version(client):
+    lead = create(client).json()
+    assert lead["version"] == 1
+    response = client.get(f"{LEADS}/{lead['id']}")
+    assert response.headers["etag"] == f'"{lead["id"]}.1"'
+    assert "last-modified" in response.headers
+
+    patched = client.patch(f"{LEADS}/{lead['id']}", json={"status": "in_progress"})
+    assert patched.json()["version"] == 2
+    assert patched.headers["etag"] == f'"{lead["id"]}.2"'
+
+
+def test_if_none_match_after_change_in_same_second(client):
+    lead_id = create(client).json()["id"]
+    etag = client.get(f"{LEADS}/{lead_id}").headers["etag"]
+    assert client.get(f"{LEADS}/{lead_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    client.patch(f"{LEADS}/{lead_id}", json={"status": "won"})
+    response = client.get(f"{LEADS}/{lead_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["status"] == "won"
+    assert response.headers["etag"] != etag
+
+
+def test_stale_if_match_is_rejected(client):
+    lead_id = create(client).json()["id"]
+    etag = client.get(f"{LEADS}/{lead_id}").headers["etag"]
+
+    first = client.patch(f"{LEADS}/{lead_id}", json={"status": "won"}, headers={"If-Match": etag})
+    assert first.status_code == 200
+    second = client.patch(f"{LEADS}/{lead_id}", json={"status": "lost"}, headers={"If-Match": etag})
+    assert second.status_code == 412
+    assert client.get(f"{LEADS}/{lead_id}").json()["status"] == "won"
+
+    put = client.put(
+        f"{LEADS}/{lead_id}",
+        json={"name": "Anna", "email": "anna@example.com", "status": "lost"},
+        headers={"If-Match": etag},
+    )
+    assert put.status_code == 412
+
+    current = first.headers["etag"]
+    assert client.patch(f"{LEADS}/{lead_id}", json={}, headers={"If-Match": current}).status_code == 200
+    assert client.patch(f"{LEADS}/{lead_id}", json={}, headers={"If-Match": etag}).status_code == 412
+    assert client.patch(f"{LEADS}/{lead_id}", json={"status": "lost"}, headers={"If-Match": "*"}).status_code == 200
+
+
+def test_bulk_update_bumps_version(client):
+    ids = [create(client, name).json()["id"] for name in ("Anna", "Boris")]
+    etags = [client.get(f"{LEADS}/{lead_id}").headers["etag"] for lead_id in ids]
+    response = client.post(f"{LEADS}/bulk-update", json={"filter": {"ids": ids}, "patch": {"assigned_to": "olga"}})
+    assert response.status_code == 200
+    for lead_id, etag in zip(ids, etags):
+        lead = client.get(f"{LEADS}/{lead_id}")
+        assert lead.json()["version"] == 2
+        assert lead.headers["etag"] != etag
+
+
+def test_page_etag_changes_with_lead(client):
+    lead_id = create(client).json()["id"]
+    create(client, "Boris")
+    etag = client.get(LEADS).headers["etag"]
+    assert client.get(LEADS, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(LEADS, params={"fields": "name"}).headers["etag"] == etag
+
+    client.patch(f"{LEADS}/{lead_id}", json={"assigned_to": "olga"})
+    response = client.get(LEADS, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_idempotent_replay_keeps_validators(client):
+    first = create(client, **{"Idempotency-Key": "webhook-1"})
+    replay = create(client, **{"Idempotency-Key": "webhook-1"})
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert replay.content == first.content
+    assert replay.headers["etag"] == first.headers["etag"]
+    assert replay.headers["last-modified"] == first.headers["last-modified"]
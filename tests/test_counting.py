@@ -0,0 +1,87 @@
+# tests/test_counting.py — total списка лидов по стратегиям подсчёта.
+
+"""
+Стратегии total_strategy (app/services/counting.py): exact, estimated, none,
+счётчик lead_counters на SQLite и сброс кэша точных COUNT(*) после записи.
+"""
+
+import pytest
+from sqlalchemy import insert, text
+
+from app.models.lead import Lead
+from app.services.counting import CountCache
+
+LEADS = "/api/v1/leads/leads"
+
+
+def create(client, name: str, status: str = "new") -> int:
+    body = {"name": name, "email": f"{name.lower()}@example.com", "status": status}
+    return client.post(LEADS, json=body).json()["id"]
+
+
+def total(client, **params) -> tuple:
+    body = client.get(LEADS, params={"limit": 1, **params}).json()
+    return body["total"], body["total_strategy"]
+
+
+@pytest.fixture
+def seeded(client) -> list[int]:
+    return [create(client, "Anna"), create(client, "Boris", "won"), create(client, "Vera", "won")]
+
+
+def test_exact(client, seeded):
+    assert total(client) == (3, "exact")
+    assert total(client, status="won") == (2, "exact")
+
+
+def test_none(client, seeded):
+    assert total(client, total_strategy="none") == (None, "none")
+
+
+def test_estimated(client, db, seeded):
+    if db.get_bind().dialect.name == "postgresql":
+        # без ANALYZE у таблицы нет статистики — честный exact
+        db.execute(text("ANALYZE leads"))
+        db.commit()
+        assert total(client, total_strategy="estimated") == (3, "estimated")
+        estimate, strategy = total(client, total_strategy="estimated", status="won")
+        assert strategy == "estimated" and estimate >= 0
+    else:
+        assert total(client, total_strategy="estimated") == (3, "estimated")
+        # по фильтру счётчика нет — считаю точно
+        assert total(client, total_strategy="estimated", status="won") == (2, "exact")
+
+
+def test_sqlite_counter_follows_writes(client, db, seeded):
+    if db.get_bind().dialect.name != "sqlite":
+        pytest.skip("счётчик lead_counters ведут триггеры только на SQLite")
+    client.delete(f"{LEADS}/{seeded[0]}")
+    client.post(f"{LEADS}/bulk", json=[{"name": f"L{i}", "email": f"l{i}@example.com"} for i in range(4)])
+    assert total(client, total_strategy="estimated") == (6, "estimated")
+
+
+def test_exact_count_is_cached_until_write(client, db, seeded):
+    assert total(client, status="won") == (2, "exact")
+    # запись в обход сервиса кэш не сбрасывает — видно, что total из кэша
+    db.execute(insert(Lead).values(name="Ghost", email="ghost@example.com", status="won"))
+    db.commit()
+    assert total(client, status="won") == (2, "exact")
+
+    # любая запись через сервис сбрасывает кэш
+    client.patch(f"{LEADS}/{seeded[0]}", json={"status": "won"})
+    assert total(client, status="won") == (4, "exact")
+    client.delete(f"{LEADS}/{seeded[1]}")
+    assert total(client, status="won") == (3, "exact")
+    create(client, "Olga", "won")
+    assert total(client, status="won") == (4, "exact")
+
+
+def test_count_cache_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.services.counting.time.monotonic", lambda: now[0])
+    cache = CountCache(ttl=5)
+    cache.set(("won",), 2)
+    assert cache.get(("won",)) == 2
+    now[0] += 6
+    assert cache.get(("won",)) is None
+    assert CountCache(ttl=0).get(("won",)) is None
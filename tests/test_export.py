@@ -0,0 +1,93 @@
+# tests/test_export.py — потоковая выгрузка лидов.
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from app.api.v1.utils import accepts_gzip
+
+EXPORT = "/api/v1/leads/leads/export"
+
+
+@pytest.fixture
+def leads(client):
+    rows = [
+        ("Anna", "won", "anna"),
+        ("Boris", "new", "anna"),
+        ("Olga", "won", "olga"),
+        ("Pavel", "lost", None),
+    ]
+    for name, status, manager in rows:
+        body = {"name": name, "email": f"{name.lower()}@example.com", "status": status}
+        if manager:
+            body["assigned_to"] = manager
+        assert client.post("/api/v1/leads/leads", json=body).status_code == 201
+
+
+def csv_rows(response) -> list[dict]:
+    return list(csv.DictReader(io.StringIO(response.text)))
+
+
+def test_export_all(client, leads):
+    response = client.get(EXPORT, params={"format": "csv"}, headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert [row["name"] for row in csv_rows(response)] == ["Anna", "Boris", "Olga", "Pavel"]
+
+
+def test_export_uses_list_filters(client, leads):
+    response = client.get(
+        EXPORT,
+        params={"format": "csv", "status": "won", "sort": "id", "order": "desc"},
+        headers={"Accept-Encoding": "identity"},
+    )
+    assert [row["name"] for row in csv_rows(response)] == ["Olga", "Anna"]
+
+    response = client.get(
+        EXPORT,
+        params={"format": "ndjson", "status": "won", "assigned_to": "anna"},
+        headers={"Accept-Encoding": "identity"},
+    )
+    assert [json.loads(line)["name"] for line in response.text.splitlines()] == ["Anna"]
+
+
+def test_export_invalid_filter(client):
+    response = client.get(EXPORT, params={"created_from": "not-a-date"})
+    assert response.status_code == 422
+
+
+def test_export_gzip_negotiation(client, leads):
+    # httpx сам распаковывает gzip, поэтому проверяю заголовок и сырые байты
+    with client.stream("GET", EXPORT, params={"format": "csv"}, headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        body = gzip.decompress(b"".join(response.iter_raw()))
+    assert body.decode().splitlines()[0].startswith("id,name,email")
+
+    response = client.get(EXPORT, params={"format": "csv"}, headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in response.headers
+    assert len(csv_rows(response)) == 4
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip", True),
+        ("gzip, deflate, br", True),
+        ("GZIP;q=0.5", True),
+        ("x-gzip", True),
+        ("*", True),
+        ("", False),
+        ("identity", False),
+        ("deflate, br", False),
+        ("gzip;q=0", False),
+        ("gzip; q=0.000", False),
+        ("br, gzip;q=0", False),
+        ("gzip;q=0, *", False),
+        ("*;q=0", False),
+        ("gzip;q=oops", False),
+    ],
+)
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
@@ -0,0 +1,138 @@
+# tests/test_filter_indexes.py — фильтры списка лидов идут по составным индексам (EXPLAIN).
+
+"""
+Планы запросов страницы списка с фильтрами.
+
+Для каждой типичной комбинации фильтров строится тот же запрос страницы, что
+и в get_leads (lead_filter_conditions + _page_statement), и в его плане
+(EXPLAIN на Postgres, EXPLAIN QUERY PLAN на SQLite) ищется имя составного
+индекса. Выбрал планировщик другой индекс или Seq Scan + Sort — тест падает.
+
+Таблица наполняется так, что каждое отфильтрованное значение встречается
+редко, как в рабочей базе (лиды одного менеджера, один источник): тогда
+обход индекса по дате сортировки с фильтром заметно дороже составного
+индекса, и планы не зависят от размера таблицы.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Connection
+
+from app.db.database import engine
+from app.models.lead import Lead
+from app.models.lead_stat import LeadStat
+from app.models.lead_tombstone import LeadTombstone
+from app.schemas.leads import LeadFilters, LeadSortField, SortOrder
+from app.services.filters import lead_filter_conditions
+from app.services.leads import _page_statement
+
+ROWS = 20_000
+PAGE_SIZE = 50
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# (фильтры, сортировка, порядок, ожидаемый индекс)
+SCENARIOS = {
+    "мои лиды в работе, сначала новые": (
+        LeadFilters(assigned_to="anna", status="in_progress"),
+        LeadSortField.CREATED_AT,
+        SortOrder.DESC,
+        "ix_leads_assigned_status_created",
+    ),
+    "мои лиды в работе, сначала старые": (
+        LeadFilters(assigned_to="anna", status="in_progress"),
+        LeadSortField.CREATED_AT,
+        SortOrder.ASC,
+        "ix_leads_assigned_status_created",
+    ),
+    "мои лиды в работе за январь": (
+        LeadFilters(
+            assigned_to="anna",
+            status="in_progress",
+            created_from=BASE,
+            created_to=BASE + timedelta(days=31),
+        ),
+        LeadSortField.CREATED_AT,
+        SortOrder.DESC,
+        "ix_leads_assigned_status_created",
+    ),
+    "проигранные лиды, недавно изменённые": (
+        LeadFilters(status="lost"),
+        LeadSortField.UPDATED_AT,
+        SortOrder.DESC,
+        "ix_leads_status_updated",
+    ),
+    "проигранные лиды, изменённые с 1 января 12:00": (
+        LeadFilters(status="lost", updated_from=BASE + timedelta(hours=12)),
+        LeadSortField.UPDATED_AT,
+        SortOrder.DESC,
+        "ix_leads_status_updated",
+    ),
+    "лиды с сайта": (
+        LeadFilters(source="website"),
+        LeadSortField.CREATED_AT,
+        SortOrder.ASC,
+        "ix_leads_source_created",
+    ),
+    "лиды с сайта за январь": (
+        LeadFilters(source="website", created_from=BASE, created_to=BASE + timedelta(days=31)),
+        LeadSortField.CREATED_AT,
+        SortOrder.ASC,
+        "ix_leads_source_created",
+    ),
+}
+
+
+def lead_row(i: int) -> dict:
+    """Синтетический лид: искомые значения фильтров — у 1–2% строк."""
+    created_at = BASE + timedelta(minutes=i)
+    return {
+        "name": f"Lead {i}",
+        "email": f"lead{i}@example.com",
+        "status": "lost" if i % 50 == 0 else ("in_progress" if i % 2 else "new"),
+        "source": "website" if i % 50 == 1 else "facebook",
+        "assigned_to": "anna" if i % 25 == 3 else f"manager{i % 20}",
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def explain(conn: Connection, stmt) -> str:
+    """Текст плана запроса для текущего диалекта."""
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = compiled.params
+    if compiled.positiontup:
+        params = tuple(params[name] for name in compiled.positiontup)
+    prefix = "EXPLAIN QUERY PLAN" if conn.dialect.name == "sqlite" else "EXPLAIN"
+    rows = conn.exec_driver_sql(f"{prefix} {compiled}", params).all()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    """Таблица leads на ROWS строк со свежей статистикой планировщика (на весь модуль)."""
+    with engine.begin() as conn:
+        conn.execute(insert(Lead), [lead_row(i) for i in range(ROWS)])
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    yield
+    with engine.begin() as conn:
+        conn.execute(Lead.__table__.delete())
+        conn.execute(LeadStat.__table__.delete())
+        conn.execute(LeadTombstone.__table__.delete())
+
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    """Таблицу наполняет и чистит seeded один раз на модуль, а не каждый тест."""
+    yield
+
+
+@pytest.mark.parametrize("title", SCENARIOS)
+def test_filters_use_composite_index(seeded, title):
+    filters, sort, order, index = SCENARIOS[title]
+    stmt = _page_statement(lead_filter_conditions(filters), 0, PAGE_SIZE, None, sort, order)
+    with engine.connect() as conn:
+        plan = explain(conn, stmt)
+    assert index in plan, f"{title}: ожидался {index}, план:\n{plan}"
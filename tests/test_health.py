@@ -0,0 +1,68 @@
+# tests/test_health.py — liveness и readiness пробы.
+
+"""
+/health/live и /health/ready (app/api/v1/health.py, app/services/health.py).
+
+Монитор в тестах свой: без фоновой задачи проверки выполняет сама проба.
+«Упавшую» БД изображает engine на файл SQLite в несуществующем каталоге —
+соединение с ним не открывается.
+"""
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.api.v1 import health as health_api
+from app.services import health
+
+LIVE = "/api/v1/health/live"
+READY = "/api/v1/health/ready"
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    # схему тестам создаёт create_all, alembic_version в ней нет — миграции не проверяю
+    monitor = health.HealthMonitor(interval=60, timeout=1, required=("database", "pool"), broker_url="memory://")
+    monkeypatch.setattr(health_api, "health_monitor", monitor)
+    return monitor
+
+
+@pytest.fixture
+def database_down(monkeypatch, tmp_path):
+    down = create_engine(f"sqlite:///{tmp_path}/missing/leads.db")
+    monkeypatch.setattr(health, "engine", down)
+    yield
+    down.dispose()
+
+
+def test_ready_when_database_is_up(client, monitor):
+    response = client.get(READY)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["checks"]["database"]["status"] == "ok"
+    assert body["checks"]["broker"]["status"] == "skipped"
+    assert "latency_ms" in body["checks"]["database"]
+
+
+def test_database_down(client, monitor, database_down):
+    response = client.get(READY)
+    assert response.status_code == 503
+    body = response.json()
+    assert body["status"] == "not_ready"
+    assert body["failed"] == ["database"]
+    assert body["checks"]["database"]["status"] == "fail"
+    assert "OperationalError" in body["checks"]["database"]["detail"]
+
+    # liveness от БД не зависит: перезапуск процесса её не поднимет
+    live = client.get(LIVE)
+    assert live.status_code == 200
+    assert live.json()["status"] == "alive"
+
+
+def test_result_is_cached_between_probes(client, monitor, monkeypatch, tmp_path):
+    assert client.get(READY).status_code == 200
+    monkeypatch.setattr(health, "engine", create_engine(f"sqlite:///{tmp_path}/missing/leads.db"))
+    # до следующей проверки проба отдаёт прошлый результат
+    assert client.get(READY).status_code == 200
+    monitor.updated_at -= monitor.interval + 1
+    assert client.get(READY).status_code == 503
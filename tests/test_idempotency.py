@@ -0,0 +1,126 @@
+# tests/test_idempotency.py — Idempotency-Key на создании лидов.
+
+"""
+Повторы POST /leads и POST /leads/bulk с заголовком Idempotency-Key
+(app/services/idempotency.py) и джоба чистки просроченных ключей.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, func, insert, select, update
+
+from app.jobs.prune_idempotency_keys import prune_idempotency_keys
+from app.models.idempotency import SCOPE_LEAD_CREATE, IdempotencyKey
+from app.models.lead import Lead
+from app.services.idempotency import prune_expired_keys
+
+LEADS = "/api/v1/leads/leads"
+
+
+@pytest.fixture
+def statements(db):
+    """SQL всех запросов, ушедших в драйвер через engine сессии."""
+    executed: list[str] = []
+
+    def on_execute(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", on_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", on_execute)
+
+
+def lead_inserts(statements: list[str]) -> list[str]:
+    return [sql for sql in statements if sql.lstrip().upper().startswith("INSERT INTO LEADS")]
+
+
+def lead_count(db) -> int:
+    return db.scalar(select(func.count()).select_from(Lead))
+
+
+def post(client, body: dict, key: str = "webhook-1"):
+    return client.post(LEADS, json=body, headers={"Idempotency-Key": key})
+
+
+def test_replay_returns_stored_response(client, db, statements):
+    body = {"name": "Anna", "email": "anna@example.com"}
+    first = post(client, body)
+    assert first.status_code == 201
+    assert "idempotent-replayed" not in first.headers
+    assert lead_inserts(statements)
+
+    statements.clear()
+    replay = post(client, body)
+    assert replay.status_code == 201
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert replay.content == first.content
+    assert not lead_inserts(statements)
+    assert lead_count(db) == 1
+
+
+def test_same_key_with_other_body(client, db):
+    assert post(client, {"name": "Anna", "email": "anna@example.com"}).status_code == 201
+    response = post(client, {"name": "Anna", "email": "other@example.com"})
+    assert response.status_code == 422
+    assert lead_count(db) == 1
+
+
+def test_keys_are_scoped_per_endpoint(client, db):
+    assert post(client, {"name": "Anna", "email": "anna@example.com"}).status_code == 201
+    bulk = [{"name": "Boris", "email": "boris@example.com"}]
+    first = client.post(f"{LEADS}/bulk", json=bulk, headers={"Idempotency-Key": "webhook-1"})
+    assert first.status_code == 200
+    replay = client.post(f"{LEADS}/bulk", json=bulk, headers={"Idempotency-Key": "webhook-1"})
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert replay.content == first.content
+    assert lead_count(db) == 2
+
+
+def test_invalid_key(client):
+    response = client.post(LEADS, json={"name": "Anna", "email": "anna@example.com"}, headers={"Idempotency-Key": " "})
+    assert response.status_code == 400
+
+
+def test_expired_key_is_reclaimed(client, db):
+    assert post(client, {"name": "Anna", "email": "anna@example.com"}).status_code == 201
+    db.execute(update(IdempotencyKey).values(expires_at=datetime.now(timezone.utc) - timedelta(minutes=1)))
+    db.commit()
+
+    # после истечения ключ свободен: и для нового тела, и для повтора
+    response = post(client, {"name": "Anna", "email": "other@example.com"})
+    assert response.status_code == 201
+    assert "idempotent-replayed" not in response.headers
+    assert lead_count(db) == 2
+    assert db.scalar(select(func.count()).select_from(IdempotencyKey)) == 1
+
+
+def seed_keys(db, expired: int, live: int) -> None:
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "scope": SCOPE_LEAD_CREATE,
+            "key": f"key-{i}",
+            "request_hash": "0" * 64,
+            "expires_at": now - timedelta(hours=1) if i < expired else now + timedelta(hours=1),
+        }
+        for i in range(expired + live)
+    ]
+    db.execute(insert(IdempotencyKey), rows)
+    db.commit()
+
+
+def test_prune_deletes_one_batch(db):
+    seed_keys(db, expired=5, live=2)
+    assert prune_expired_keys(db, batch_size=3) == 3
+    assert prune_expired_keys(db, batch_size=3) == 2
+    assert prune_expired_keys(db, batch_size=3) == 0
+    keys = db.scalars(select(IdempotencyKey.key).order_by(IdempotencyKey.key)).all()
+    assert keys == ["key-5", "key-6"]
+
+
+def test_prune_job_runs_batches_until_done(db):
+    seed_keys(db, expired=7, live=1)
+    assert prune_idempotency_keys(batch_size=3) == 7
+    assert db.scalars(select(IdempotencyKey.key)).all() == ["key-7"]
@@ -0,0 +1,135 @@
+# tests/test_lead_cache.py — read-through кэш карточек лидов.
+
+"""
+Кэш карточек лидов (app/services/lead_cache.py) на обоих бэкендах:
+LRUTTLCache в памяти и RedisCache поверх FakeRedis.
+"""
+
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app.schemas.leads import LeadBulkFilter, LeadCreate, LeadOut, LeadUpdate
+from app.services import leads
+from app.services.cache import FakeRedis, LRUTTLCache, RedisCache
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request, monkeypatch):
+    if request.param == "memory":
+        backend = LRUTTLCache(max_entries=100, ttl=30)
+    else:
+        backend = RedisCache(
+            FakeRedis(),
+            dumps=LeadOut.model_dump_json,
+            loads=LeadOut.model_validate_json,
+            prefix="test:lead:",
+        )
+    monkeypatch.setattr(leads, "lead_cache", backend)
+    return backend
+
+
+@pytest.fixture
+def lead(db):
+    return leads.create_lead(db, LeadCreate(name="Anna", email="anna@example.com"))
+
+
+@pytest.fixture
+def statements(db):
+    """Счётчик запросов, ушедших в драйвер через engine сессии."""
+    counter = {"count": 0}
+
+    def on_execute(*args):
+        counter["count"] += 1
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", on_execute)
+    yield counter
+    event.remove(engine, "before_cursor_execute", on_execute)
+
+
+def test_read_through_miss_then_hit(db, cache, lead, statements):
+    assert leads.get_lead(db, lead.id) == lead
+    assert statements["count"] == 1
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    assert leads.get_lead(db, lead.id) == lead
+    assert statements["count"] == 1  # второе чтение — без БД
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_missing_lead_is_not_cached(db, cache, statements):
+    assert leads.get_lead(db, 999_999) is None
+    assert leads.get_lead(db, 999_999) is None
+    assert statements["count"] == 2
+    assert cache.hits == 0
+
+
+def test_update_invalidates(db, cache, lead):
+    leads.get_lead(db, lead.id)
+    leads.update_lead(db, lead.id, LeadUpdate(status="won"))
+    assert cache.get(lead.id) is None
+    assert leads.get_lead(db, lead.id).status == "won"
+
+
+def test_empty_patch_keeps_card(db, cache, lead):
+    leads.get_lead(db, lead.id)
+    invalidations = cache.invalidations
+    assert leads.update_lead(db, lead.id, LeadUpdate()) == lead
+    assert cache.invalidations == invalidations
+    assert cache.get(lead.id) == lead
+
+
+def test_delete_invalidates(db, cache, lead):
+    leads.get_lead(db, lead.id)
+    assert leads.delete_lead(db, lead.id) is True
+    assert cache.get(lead.id) is None
+    assert leads.get_lead(db, lead.id) is None
+
+
+def test_bulk_update_invalidates(db, cache):
+    created = [leads.create_lead(db, LeadCreate(name=f"L{i}", email=f"l{i}@example.com")) for i in range(3)]
+    for lead_out in created:
+        leads.get_lead(db, lead_out.id)
+    leads.bulk_update_leads(db, LeadBulkFilter(), LeadUpdate(assigned_to="olga"), chunk_size=2)
+    assert all(cache.get(lead_out.id) is None for lead_out in created)
+    assert {leads.get_lead(db, lead_out.id).assigned_to for lead_out in created} == {"olga"}
+
+
+def test_fill_after_invalidation_is_skipped(db, cache, lead):
+    # читатель взял токен и прочитал старую версию, затем запись её сбросила
+    token = cache.begin_fill()
+    stale = leads.fetch_lead(db, lead.id)
+    leads.update_lead(db, lead.id, LeadUpdate(status="lost"))
+
+    cache.set(lead.id, stale, token)
+    assert cache.get(lead.id) is None
+    assert cache.skipped_fills == 1
+    assert leads.get_lead(db, lead.id).status == "lost"
+
+
+def test_fill_with_current_token_is_stored(cache, lead):
+    token = cache.begin_fill()
+    cache.set(lead.id, lead, token)
+    assert cache.get(lead.id) == lead
+    assert cache.skipped_fills == 0
+
+
+def test_ttl_expiry(lead):
+    cache = LRUTTLCache(max_entries=10, ttl=0.05)
+    cache.set(lead.id, lead)
+    assert cache.get(lead.id) == lead
+    time.sleep(0.06)
+    assert cache.get(lead.id) is None
+
+
+def test_lru_eviction(lead):
+    cache = LRUTTLCache(max_entries=2, ttl=30)
+    for key in (1, 2):
+        cache.set(key, lead)
+    cache.get(1)  # 1 — недавно использованный, вытеснится 2
+    cache.set(3, lead)
+    assert cache.get(2) is None
+    assert cache.get(1) == cache.get(3) == lead
+    assert cache.evictions == 1
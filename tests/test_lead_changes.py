@@ -0,0 +1,112 @@
+# tests/test_lead_changes.py — лента изменений лидов с удалениями и архивом.
+
+"""
+Лента /leads/changes (leads.get_lead_changes): изменённые лиды и надгробия
+удалённых и архивных (app/models/lead_tombstone.py) в общем порядке курсора.
+
+На SQLite время хранится с точностью до секунды, и строки текущей секунды
+ещё не «отстоялись». Чтобы не ждать, граница отстоя в большинстве тестов
+сдвинута в будущее (фикстура settled), а лидов, прочитанных до курсора,
+я «старю» на час (backdate): иначе удаление в ту же секунду встало бы
+в ленте перед курсором. С настоящей границей так не бывает — курсор
+не заходит в ещё не отстоявшуюся секунду.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.models.lead import Lead
+from app.schemas.leads import LeadCreate, LeadUpdate
+from app.services import leads
+from app.services.archive import archive_batch
+
+CHANGES = "/api/v1/leads/leads/changes"
+
+
+@pytest.fixture
+def settled(monkeypatch):
+    """Все закоммиченные изменения считаются отстоявшимися."""
+    monkeypatch.setattr(leads, "_settle_cutoff", lambda db, seconds: datetime(2100, 1, 1, tzinfo=timezone.utc))
+
+
+def backdate(db) -> None:
+    db.execute(update(Lead).values(updated_at=datetime.now(timezone.utc) - timedelta(hours=1)))
+    db.commit()
+
+
+def create(db, name: str, status: str = "new"):
+    return leads.create_lead(db, LeadCreate(name=name, email=f"{name.lower()}@example.com", status=status))
+
+
+def read_feed(db, limit: int = 100):
+    """Вся лента порциями по limit: [(id, 'lead' | причина ухода)] в порядке ленты."""
+    feed, cursor = [], None
+    while True:
+        changes, _ = leads.get_lead_changes(db, cursor, limit)
+        positions = [(lead.updated_at, lead.id, "lead") for lead in changes.leads]
+        positions += [(removed.removed_at, removed.id, removed.reason) for removed in changes.removed]
+        feed += [(lead_id, kind) for _, lead_id, kind in sorted(positions)]
+        cursor = changes.next_cursor
+        if not changes.has_more:
+            return feed, cursor
+
+
+def test_deleted_lead_leaves_tombstone(db, settled):
+    anna, boris = create(db, "Anna"), create(db, "Boris")
+    backdate(db)
+    feed, cursor = read_feed(db)
+    assert feed == [(anna.id, "lead"), (boris.id, "lead")]
+
+    leads.delete_lead(db, anna.id)
+    changes, _ = leads.get_lead_changes(db, cursor)
+    assert changes.leads == []
+    assert [(removed.id, removed.reason) for removed in changes.removed] == [(anna.id, "deleted")]
+    assert changes.next_cursor != cursor
+
+    # курсор ушёл за надгробие — повторно оно не приходит
+    changes, _ = leads.get_lead_changes(db, changes.next_cursor)
+    assert (changes.leads, changes.removed) == ([], [])
+
+
+def test_archived_lead_leaves_tombstone(db, client, settled):
+    won = create(db, "Anna", status="won")
+    kept = create(db, "Boris")
+    backdate(db)
+    _, cursor = read_feed(db)
+
+    assert archive_batch(db, ["won", "lost"], datetime.now(timezone.utc) + timedelta(days=1)) == [won.id]
+    changes, _ = leads.get_lead_changes(db, cursor)
+    assert [(removed.id, removed.reason) for removed in changes.removed] == [(won.id, "archived")]
+    assert kept.id not in [removed.id for removed in changes.removed]
+    # архивный лид по-прежнему читается по id
+    assert client.get(f"/api/v1/leads/leads/{won.id}").status_code == 200
+
+
+def test_small_batches_walk_leads_and_tombstones(db, settled):
+    ids = [create(db, name).id for name in ("Anna", "Boris", "Olga", "Pavel")]
+    leads.update_lead(db, ids[0], LeadUpdate(status="in_progress"))
+    leads.delete_lead(db, ids[1])
+    leads.delete_lead(db, ids[3])
+
+    feed, _ = read_feed(db, limit=1)
+    full, _ = read_feed(db)
+    assert feed == full
+    assert sorted(feed) == [(ids[0], "lead"), (ids[1], "deleted"), (ids[2], "lead"), (ids[3], "deleted")]
+
+
+def test_recent_changes_wait_to_settle(db):
+    anna = create(db, "Anna")
+    leads.delete_lead(db, anna.id)
+    changes, pending = leads.get_lead_changes(db, None, settle_seconds=3600)
+    assert (changes.leads, changes.removed, changes.next_cursor) == ([], [], None)
+    assert pending is True
+
+
+def test_endpoint_returns_removed(client, settled):
+    lead_id = client.post("/api/v1/leads/leads", json={"name": "Anna", "email": "anna@example.com"}).json()["id"]
+    assert client.delete(f"/api/v1/leads/leads/{lead_id}").status_code == 204
+    body = client.get(CHANGES).json()
+    assert body["leads"] == []
+    assert [(removed["id"], removed["reason"]) for removed in body["removed"]] == [(lead_id, "deleted")]
@@ -0,0 +1,134 @@
+# tests/test_lead_stats.py — счётчики lead_stats и джоба их пересборки.
+
+"""
+Счётчики lead_stats (app/models/lead_stat.py) поддерживают триггеры на leads
+и leads_archive. После каждой операции сравниваю их с GROUP BY по обеим
+таблицам: архивные лиды тоже входят в воронку.
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, func, select, update
+
+from app.db.database import SessionLocal
+from app.jobs.rebuild_lead_stats import rebuild_lead_stats
+from app.models.lead import Lead
+from app.models.lead_archive import LeadArchive
+from app.models.lead_stat import EMPTY_VALUE, STATS_DIMENSIONS, LeadStat
+from app.schemas.leads import LeadUpdate
+from app.services import leads
+from app.services.archive import archive_batch
+
+LEADS = "/api/v1/leads/leads"
+
+
+def grouped(db) -> dict:
+    """Счётчики, посчитанные GROUP BY по leads и leads_archive."""
+    counts: Counter = Counter()
+    for model in (Lead, LeadArchive):
+        for dimension in STATS_DIMENSIONS:
+            column = getattr(model, dimension)
+            for value, count in db.execute(select(column, func.count()).group_by(column)):
+                counts[(dimension, EMPTY_VALUE if value is None else value)] += count
+    return dict(counts)
+
+
+def stored(db) -> dict:
+    """Ненулевые счётчики из lead_stats."""
+    db.expire_all()
+    rows = db.execute(select(LeadStat.dimension, LeadStat.value, LeadStat.count).where(LeadStat.count != 0))
+    return {(dimension, value): count for dimension, value, count in rows}
+
+
+def assert_consistent(db) -> None:
+    db.rollback()
+    assert stored(db) == grouped(db)
+
+
+def create(client, name: str, **fields) -> int:
+    response = client.post(LEADS, json={"name": name, "email": f"{name.lower()}@example.com", **fields})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+@pytest.fixture
+def seeded(client, db) -> list[int]:
+    ids = [
+        create(client, "Anna", source="website", assigned_to="olga"),
+        create(client, "Boris", source="website"),
+        create(client, "Vera", status="in_progress", assigned_to="pavel"),
+    ]
+    assert_consistent(db)
+    return ids
+
+
+def test_create_update_delete(client, db, seeded):
+    anna, boris, vera = seeded
+    client.patch(f"{LEADS}/{anna}", json={"status": "won"})
+    assert_consistent(db)
+    client.patch(f"{LEADS}/{boris}", json={"assigned_to": "olga", "source": None})
+    assert_consistent(db)
+    client.put(f"{LEADS}/{vera}", json={"name": "Vera", "email": "vera@example.com", "status": "lost"})
+    assert_consistent(db)
+    client.delete(f"{LEADS}/{anna}")
+    assert_consistent(db)
+
+    assert client.get(f"{LEADS}/stats").json()["total"] == 2
+
+
+def test_bulk_create_and_update(client, db, seeded):
+    bulk = [{"name": f"Lead {i}", "email": f"lead{i}@example.com", "source": "fair"} for i in range(5)]
+    assert client.post(f"{LEADS}/bulk", json=bulk).status_code == 200
+    assert_consistent(db)
+
+    body = {"filter": {"source": "fair"}, "patch": {"status": "in_progress", "assigned_to": "pavel"}}
+    assert client.post(f"{LEADS}/bulk-update", json=body).status_code == 200
+    assert_consistent(db)
+
+
+def test_archive_keeps_funnel(client, db, seeded):
+    anna = seeded[0]
+    client.patch(f"{LEADS}/{anna}", json={"status": "won"})
+    before = stored(db)
+    assert archive_batch(db, ["won"], datetime.now(timezone.utc) + timedelta(days=1)) == [anna]
+    assert stored(db) == before
+    assert_consistent(db)
+
+    # удаление из архива вычитает лида из счётчиков
+    client.delete(f"{LEADS}/{anna}")
+    assert_consistent(db)
+
+
+def test_concurrent_writers(client, db, seeded):
+    ids = [create(client, f"Lead{i}") for i in range(8)]
+    statuses = ["in_progress", "won", "lost"]
+
+    def write(number: int) -> None:
+        with SessionLocal() as session:
+            for step, lead_id in enumerate(ids):
+                patch = {"status": statuses[(number + step) % 3], "assigned_to": f"manager{number}"}
+                leads.update_lead(session, lead_id, LeadUpdate(**patch))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(write, range(4)))
+    assert_consistent(db)
+
+
+def test_rebuild_reports_and_fixes_drift(client, db, seeded):
+    client.patch(f"{LEADS}/{seeded[0]}", json={"status": "won"})
+    archive_batch(db, ["won"], datetime.now(timezone.utc) + timedelta(days=1))
+    assert rebuild_lead_stats(db, batch_size=2) == 0
+
+    # правки в обход триггеров: лишний счётчик, неверное число и пропавшая строка
+    db.add(LeadStat(dimension="status", value="ghost", count=3))
+    db.execute(update(LeadStat).where(LeadStat.dimension == "source", LeadStat.value == "website").values(count=10))
+    db.execute(delete(LeadStat).where(LeadStat.dimension == "assigned_to", LeadStat.value == "pavel"))
+    db.commit()
+    assert stored(db) != grouped(db)
+
+    assert rebuild_lead_stats(db, batch_size=2) == 3
+    assert_consistent(db)
+    assert rebuild_lead_stats(db, batch_size=2) == 0
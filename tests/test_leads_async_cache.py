@@ -0,0 +1,109 @@
+# tests/test_leads_async_cache.py — кэш карточек в асинхронных сервисах лидов.
+
+"""
+Асинхронные сервисы не должны звать сетевой кэш (Redis) из event loop.
+
+Кэш — RedisCache поверх FakeRedis, который запоминает, в каком потоке его
+вызвали. AsyncSession открывается на той же тестовой базе через aiosqlite
+(или asyncpg для TEST_DATABASE_URL на Postgres).
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.db.database import DATABASE_URL, create_async_db_engine
+from app.schemas.leads import LeadBulkFilter, LeadCreate, LeadOut, LeadUpdate
+from app.services import leads, leads_async
+from app.services.cache import FakeRedis, RedisCache
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+
+class ThreadRecordingRedis(FakeRedis):
+    """FakeRedis, который запоминает потоки своих вызовов."""
+
+    def __init__(self):
+        super().__init__()
+        self.threads: list[int] = []
+
+    def get(self, name):
+        self.threads.append(threading.get_ident())
+        return super().get(name)
+
+    def set(self, name, value, ex=None):
+        self.threads.append(threading.get_ident())
+        return super().set(name, value, ex=ex)
+
+    def delete(self, *names):
+        self.threads.append(threading.get_ident())
+        return super().delete(*names)
+
+
+@pytest.fixture
+def redis_cache(monkeypatch):
+    cache = RedisCache(
+        ThreadRecordingRedis(),
+        dumps=LeadOut.model_dump_json,
+        loads=LeadOut.model_validate_json,
+        prefix="test:lead:",
+    )
+    monkeypatch.setattr(leads, "lead_cache", cache)
+    monkeypatch.setattr(leads_async, "lead_cache", cache)
+    return cache
+
+
+def run_async(scenario):
+    """Выполнить сценарий с AsyncSession; вернуть (результат, id потока event loop)."""
+
+    async def main():
+        engine = create_async_db_engine(DATABASE_URL)
+        try:
+            async with async_sessionmaker(bind=engine, autoflush=False)() as db:
+                return await scenario(db), threading.get_ident()
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_card_cache_calls_leave_event_loop(redis_cache):
+    async def scenario(db):
+        lead = await leads_async.create_lead(db, LeadCreate(name="Anna", email="anna@example.com"))
+        first = await leads_async.get_lead(db, lead.id)  # промах и наполнение
+        second = await leads_async.get_lead(db, lead.id)  # попадание
+        updated = await leads_async.update_lead(db, lead.id, LeadUpdate(status="won"))
+        after_update = await leads_async.get_lead(db, lead.id)
+        deleted = await leads_async.delete_lead(db, lead.id)
+        after_delete = await leads_async.get_lead(db, lead.id)
+        return lead, first, second, updated, after_update, deleted, after_delete
+
+    (lead, first, second, updated, after_update, deleted, after_delete), loop_thread = run_async(scenario)
+
+    assert first == second == lead
+    assert updated.status == after_update.status == "won"
+    assert deleted is True and after_delete is None
+    assert redis_cache.hits == 1
+    assert redis_cache.client.threads, "кэш не вызывался"
+    assert loop_thread not in redis_cache.client.threads
+
+
+def test_bulk_update_invalidates_off_loop(redis_cache):
+    async def scenario(db):
+        created = [
+            await leads_async.create_lead(db, LeadCreate(name=f"L{i}", email=f"l{i}@example.com"))
+            for i in range(5)
+        ]
+        for lead in created:
+            await leads_async.get_lead(db, lead.id)
+        result = await leads_async.bulk_update_leads(
+            db, LeadBulkFilter(status="new"), LeadUpdate(assigned_to="olga"), chunk_size=2
+        )
+        cards = [await leads_async.get_lead(db, lead.id) for lead in created]
+        return result, cards
+
+    (result, cards), loop_thread = run_async(scenario)
+
+    assert (result.updated, result.chunks) == (5, 3)
+    assert {card.assigned_to for card in cards} == {"olga"}
+    assert loop_thread not in redis_cache.client.threads
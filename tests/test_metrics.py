@@ -0,0 +1,57 @@
+# tests/test_metrics.py — метрики Prometheus на /metrics.
+
+"""
+RequestMetricsMiddleware и /metrics (app/core/middleware.py, app/core/metrics.py):
+гистограмма задержки по шаблону маршрута и счётчик запросов по коду ответа.
+"""
+
+from prometheus_client.parser import text_string_to_metric_families
+
+LEADS = "/api/v1/leads/leads"
+ROUTE = "/api/v1/leads/leads/{lead_id}"
+
+
+def scrape(client) -> dict[tuple, float]:
+    """Все сэмплы /metrics: (имя, метки) -> значение."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def sample(metrics: dict, name: str, **labels) -> float:
+    return metrics.get((name, tuple(sorted(labels.items()))), 0.0)
+
+
+def test_request_histogram_by_route_template(client):
+    before = scrape(client)
+    lead_id = client.post(LEADS, json={"name": "Anna", "email": "anna@example.com"}).json()["id"]
+    client.get(f"{LEADS}/{lead_id}")
+    client.get(f"{LEADS}/999999")
+    after = scrape(client)
+
+    count = "leadlab_http_request_duration_seconds_count"
+    assert sample(after, count, method="GET", route=ROUTE) - sample(before, count, method="GET", route=ROUTE) == 2
+    bucket = "leadlab_http_request_duration_seconds_bucket"
+    assert sample(after, bucket, method="GET", route=ROUTE, le="+Inf") >= 2
+
+    requests = "leadlab_http_requests_total"
+    for status in ("200", "404"):
+        labels = dict(method="GET", route=ROUTE, status=status)
+        assert sample(after, requests, **labels) - sample(before, requests, **labels) == 1
+    # id не попадает в метки: ряд один на шаблон маршрута
+    assert not any("999999" in dict(labels).get("route", "") for _, labels in after)
+
+
+def test_unmatched_paths_share_one_series(client):
+    before = scrape(client)
+    client.get("/no/such/path/1")
+    client.get("/no/such/path/2")
+    after = scrape(client)
+    labels = dict(method="GET", route="unmatched", status="404")
+    name = "leadlab_http_requests_total"
+    assert sample(after, name, **labels) - sample(before, name, **labels) == 2
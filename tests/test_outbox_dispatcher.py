@@ -0,0 +1,162 @@
+# tests/test_outbox_dispatcher.py — публикация событий outbox в брокер.
+
+"""
+Диспетчер outbox (app/services/outbox_dispatcher.py) против InMemoryBroker.
+
+События пишут сами сервисы лидов, поэтому в outbox они лежат так же, как
+в работе: created, затем updated/deleted того же лида по порядку id.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from app.db.database import SessionLocal
+from app.models.outbox import LEAD_CREATED, LEAD_DELETED, LEAD_UPDATED, OutboxEvent
+from app.schemas.leads import LeadCreate, LeadUpdate
+from app.services import leads
+from app.services.broker import InMemoryBroker
+from app.services.outbox_dispatcher import OutboxDispatcher
+
+
+class ReorderingBroker(InMemoryBroker):
+    """
+    Брокер, который подтверждает более поздние события быстрее ранних.
+
+    Если диспетчер отправит два события одного лида конкурентно, второе
+    окажется в messages раньше первого — порядок будет нарушен.
+    """
+
+    async def publish(self, message):
+        await asyncio.sleep(max(0.0, 0.02 - message.event_id * 0.001))
+        await super().publish(message)
+
+
+def drain_once(dispatcher: OutboxDispatcher) -> tuple[int, int]:
+    return asyncio.run(dispatcher.drain_once())
+
+
+def pending(db) -> list[OutboxEvent]:
+    db.expire_all()
+    return list(db.scalars(select(OutboxEvent).order_by(OutboxEvent.id)))
+
+
+def per_lead(messages) -> dict[int, list[int]]:
+    """id событий каждого лида в порядке публикации."""
+    order: dict[int, list[int]] = {}
+    for message in messages:
+        order.setdefault(message.aggregate_id, []).append(message.event_id)
+    return order
+
+
+@pytest.fixture
+def history(db):
+    """Два лида: у первого created, два updated и deleted, у второго created и updated."""
+    anna = leads.create_lead(db, LeadCreate(name="Anna", email="anna@example.com"))
+    boris = leads.create_lead(db, LeadCreate(name="Boris", email="boris@example.com"))
+    leads.update_lead(db, anna.id, LeadUpdate(status="in_progress"))
+    leads.update_lead(db, boris.id, LeadUpdate(status="won"))
+    leads.update_lead(db, anna.id, LeadUpdate(assigned_to="olga"))
+    leads.delete_lead(db, anna.id)
+    return anna.id, boris.id
+
+
+def test_publishes_in_order_and_deletes_rows(db, history):
+    anna, boris = history
+    events = pending(db)
+    assert [event.event_type for event in events if event.aggregate_id == anna] == [
+        LEAD_CREATED,
+        LEAD_UPDATED,
+        LEAD_UPDATED,
+        LEAD_DELETED,
+    ]
+
+    broker = ReorderingBroker()
+    dispatcher = OutboxDispatcher(SessionLocal, broker, batch_size=100)
+    assert drain_once(dispatcher) == (6, 6)
+
+    expected = {}
+    for event in events:
+        expected.setdefault(event.aggregate_id, []).append(event.id)
+    assert per_lead(broker.messages) == expected
+    assert pending(db) == []
+    assert dispatcher.published == 6
+
+
+def test_message_carries_event(db, history):
+    anna, _ = history
+    broker = InMemoryBroker()
+    asyncio.run(OutboxDispatcher(SessionLocal, broker).drain())
+    created = next(m for m in broker.messages if m.aggregate_id == anna and m.event_type == LEAD_CREATED)
+    assert created.payload["email"] == "anna@example.com"
+    assert datetime.fromisoformat(created.created_at).tzinfo is not None
+
+
+def test_small_batches_keep_order(db, history):
+    events = pending(db)
+    broker = ReorderingBroker()
+    dispatcher = OutboxDispatcher(SessionLocal, broker, batch_size=2)
+    assert asyncio.run(dispatcher.drain()) == 6
+    expected = {}
+    for event in events:
+        expected.setdefault(event.aggregate_id, []).append(event.id)
+    assert per_lead(broker.messages) == expected
+
+
+def test_failure_blocks_later_events_of_that_lead(db, history):
+    anna, boris = history
+    events = pending(db)
+    anna_events = [event.id for event in events if event.aggregate_id == anna]
+    boris_events = [event.id for event in events if event.aggregate_id == boris]
+    failing = anna_events[1]  # первое lead.updated Анны
+
+    broker = ReorderingBroker(fail=lambda message: message.event_id == failing)
+    dispatcher = OutboxDispatcher(SessionLocal, broker, batch_size=100, retry_base=60, retry_max=600)
+    before = datetime.now(timezone.utc)
+    assert drain_once(dispatcher) == (6, 3)
+
+    # у Анны ушло только событие до неудачного, у Бориса — все
+    assert per_lead(broker.messages) == {anna: anna_events[:1], boris: boris_events}
+    left = pending(db)
+    assert [event.id for event in left] == anna_events[1:]
+    failed = left[0]
+    assert failed.attempts == 1
+    assert "отвергнуто" in failed.last_error
+    next_attempt = failed.next_attempt_at.replace(tzinfo=failed.next_attempt_at.tzinfo or timezone.utc)
+    # на SQLite Timestamp хранится без микросекунд — нижняя граница с запасом в секунду
+    assert before + timedelta(seconds=29) <= next_attempt <= before + timedelta(seconds=61)
+    assert all(event.attempts == 0 and event.next_attempt_at is None for event in left[1:])
+
+    # пока повтор не наступил, события Анны не отправляются — даже готовые
+    assert drain_once(dispatcher) == (0, 0)
+
+    # повтор наступил, брокер снова принимает: всё уходит по порядку
+    db.execute(update(OutboxEvent).where(OutboxEvent.id == failing).values(next_attempt_at=before))
+    db.commit()
+    broker.fail = None
+    assert drain_once(dispatcher) == (3, 3)
+    assert per_lead(broker.messages)[anna] == anna_events
+    assert pending(db) == []
+
+
+def test_repeated_failures_back_off(db, history):
+    events = pending(db)
+    failing = events[0].id
+    broker = InMemoryBroker(fail=lambda message: message.event_id == failing)
+    dispatcher = OutboxDispatcher(SessionLocal, broker, retry_base=1, retry_max=300)
+
+    for attempt in range(1, 4):
+        db.execute(update(OutboxEvent).where(OutboxEvent.id == failing).values(next_attempt_at=None))
+        db.commit()
+        drain_once(dispatcher)
+        assert db.get(OutboxEvent, failing, populate_existing=True).attempts == attempt
+    assert dispatcher.failed == 3
+
+
+@pytest.mark.parametrize("attempts, low, high", [(1, 0.5, 1), (2, 1, 2), (4, 4, 8), (10, 150, 300), (30, 150, 300)])
+def test_retry_delay(attempts, low, high):
+    dispatcher = OutboxDispatcher(SessionLocal, InMemoryBroker(), retry_base=1, retry_max=300)
+    for _ in range(20):
+        assert low <= dispatcher.retry_delay(attempts) <= high
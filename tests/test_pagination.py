@@ -0,0 +1,97 @@
+# tests/test_pagination.py — keyset-курсоры списка лидов.
+
+"""
+Постраничный обход GET /leads по next_cursor (app/services/pagination.py):
+все сортировки в обе стороны, одинаковые created_at (порядок решает id)
+и ошибки 400 на чужой или повреждённый курсор.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.models.lead import Lead
+from app.schemas.leads import LeadSortField, SortOrder
+from app.services.pagination import encode_cursor
+
+LEADS = "/api/v1/leads/leads"
+
+
+@pytest.fixture
+def lead_ids(client, db) -> list[int]:
+    """Шесть лидов: у трёх средних created_at совпадает, порядок по времени — не по id."""
+    ids = [
+        client.post(LEADS, json={"name": f"Lead{i}", "email": f"lead{i}@example.com"}).json()["id"]
+        for i in range(6)
+    ]
+    base = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+    offsets = [3, 0, 1, 1, 1, 2]  # часы: Lead1 раньше всех, Lead0 позже всех
+    for lead_id, hours in zip(ids, offsets):
+        db.execute(update(Lead).where(Lead.id == lead_id).values(created_at=base + timedelta(hours=hours)))
+    db.commit()
+    return ids
+
+
+def walk(client, limit: int = 2, **params) -> list[int]:
+    """id лидов всех страниц по next_cursor."""
+    seen, cursor = [], None
+    while True:
+        query = {**params, "limit": limit}
+        if cursor:
+            query["cursor"] = cursor
+        body = client.get(LEADS, params=query).json()
+        seen += [lead["id"] for lead in body["leads"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("limit", [1, 2, 4, 10])
+def test_walk_by_id(client, lead_ids, order, limit):
+    expected = sorted(lead_ids, reverse=order == "desc")
+    assert walk(client, limit=limit, sort="id", order=order) == expected
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("limit", [1, 2, 4])
+def test_walk_by_created_at_breaks_ties_by_id(client, lead_ids, order, limit):
+    first, ties, last = [lead_ids[1]], lead_ids[2:5], [lead_ids[5], lead_ids[0]]
+    expected = first + ties + last
+    if order == "desc":
+        expected = expected[::-1]
+    assert walk(client, limit=limit, sort="created_at", order=order) == expected
+
+
+def test_walk_with_filter(client, lead_ids):
+    for lead_id in lead_ids[::2]:
+        client.patch(f"{LEADS}/{lead_id}", json={"status": "won"})
+    assert walk(client, limit=1, status="won", sort="created_at", order="desc") == [
+        lead_ids[0],
+        lead_ids[4],
+        lead_ids[2],
+    ]
+
+
+def test_cursor_from_other_sort_is_rejected(client, lead_ids):
+    cursor = client.get(LEADS, params={"limit": 2, "sort": "created_at"}).json()["next_cursor"]
+    for params in ({"sort": "id"}, {"sort": "created_at", "order": "desc"}, {"sort": "updated_at"}):
+        response = client.get(LEADS, params={**params, "cursor": cursor})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Курсор выдан для другой сортировки"
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-a-cursor",
+        "!!!",
+        encode_cursor(LeadSortField.CREATED_AT, SortOrder.ASC, "yesterday", 1),
+        encode_cursor(LeadSortField.CREATED_AT, SortOrder.ASC, None, 1),
+        "eyJzIjoiaWQifQ",  # {"s":"id"} без остальных полей
+    ],
+)
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = client.get(LEADS, params={"sort": "created_at", "cursor": cursor})
+    assert response.status_code == 400
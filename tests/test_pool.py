@@ -0,0 +1,55 @@
+# tests/test_pool.py — статистика пула соединений и /internal/pool.
+
+"""
+Инструментированный пул (app/db/pool.py): счётчики выдач и таймаутов
+и их отдача через GET /api/v1/internal/pool.
+"""
+
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.config import settings
+from app.db.pool import InstrumentedQueuePool, pool_status
+
+POOL = "/api/v1/internal/pool"
+LEADS = "/api/v1/leads/leads"
+
+
+def test_endpoint_reports_pool_counters(client):
+    before = client.get(POOL).json()["sync"]
+    assert before["pool_class"] == "InstrumentedQueuePool"
+    assert before["size"] == settings.db_pool_size
+    assert before["max_overflow"] == settings.db_max_overflow
+    for counter in ("checked_in", "checked_out", "checkouts", "timeouts", "wait_ms_p95", "max_in_use"):
+        assert counter in before
+
+    client.get(f"{LEADS}/999999")
+    after = client.get(POOL).json()
+    assert after["sync"]["checkouts"] > before["checkouts"]
+    assert after["sizing"]["max_connections_per_worker"] == settings.db_pool_size + settings.db_max_overflow
+
+
+def test_checkout_timeout_is_counted(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/pool.db",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    try:
+        with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+            status = pool_status(engine)
+            assert (status["checked_out"], status["checkouts"], status["timeouts"]) == (1, 1, 1)
+            assert status["wait_ms_max"] >= 50
+
+        # dispose пересоздаёт пул, а статистика остаётся
+        engine.dispose()
+        with engine.connect():
+            pass
+        status = pool_status(engine)
+        assert (status["checkouts"], status["timeouts"], status["max_in_use"]) == (2, 1, 1)
+    finally:
+        engine.dispose()
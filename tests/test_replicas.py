@@ -0,0 +1,158 @@
+# tests/test_replicas.py — чтение лидов с реплик.
+
+"""
+Маршрутизация чтений (app/db/replicas.py) на двух «репликах» — отдельных
+SQLite-файлах со своей копией схемы. В каждой лежит лид с одним и тем же id
+и разным именем, а на primary (тестовая база) его нет: по ответу GET видно,
+какая база его отдала.
+
+Приложение в тестах собрано без реплик, поэтому replica_set подменяю,
+а ReadYourWritesMiddleware навешиваю на app сам.
+"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.config import settings
+from app.db import replicas
+from app.db.database import Base
+from app.main import app
+from app.models.lead import Lead
+from app.services.lead_cache import lead_cache
+
+LEADS = "/api/v1/leads/leads"
+LEAD_ID = 1_000_001
+
+
+@pytest.fixture
+def replica_set(tmp_path, monkeypatch):
+    members = []
+    for number in (1, 2):
+        replica = replicas.Replica(f"replica-{number}", f"sqlite:///{tmp_path}/replica{number}.db")
+        Base.metadata.create_all(replica.engine)
+        with replica.engine.begin() as conn:
+            conn.execute(insert(Lead).values(id=LEAD_ID, name=replica.name, email="lead@example.com"))
+        members.append(replica)
+    replica_set = replicas.ReplicaSet(members, max_lag=5.0, check_interval=3600)
+    monkeypatch.setattr(replicas, "replica_set", replica_set)
+    yield replica_set
+    for replica in members:
+        replica.engine.dispose()
+
+
+@pytest.fixture
+def lags(monkeypatch):
+    """Отставание каждой реплики по имени файла базы; исключение — реплика не отвечает."""
+    lags: dict[str, object] = {}
+
+    def measure_lag(connection):
+        lag = lags.get(connection.engine.url.database.rsplit("/", 1)[-1], 0.0)
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+    monkeypatch.setattr(replicas, "measure_lag", measure_lag)
+    return lags
+
+
+@pytest.fixture
+def sticky_client():
+    return TestClient(replicas.ReadYourWritesMiddleware(app, sticky_seconds=settings.replica_sticky_seconds))
+
+
+def read_from(client) -> str:
+    """Какая база отдала лида: имя реплики или primary (там его нет — 404)."""
+    response = client.get(f"{LEADS}/{LEAD_ID}")
+    if response.status_code == 404:
+        return "primary"
+    assert response.status_code == 200
+    return response.json()["name"]
+
+
+def test_reads_go_round_robin(client, replica_set):
+    first, second = read_from(client), read_from(client)
+    assert {first, second} == {"replica-1", "replica-2"}
+    assert [read_from(client) for _ in range(4)] == [first, second, first, second]
+
+
+def test_writes_go_to_primary(client, db, replica_set):
+    response = client.post(LEADS, json={"name": "Anna", "email": "anna@example.com"})
+    assert response.status_code == 201
+    assert db.get(Lead, response.json()["id"]) is not None
+    for replica in replica_set.replicas:
+        with replica.session_factory() as replica_db:
+            assert replica_db.get(Lead, response.json()["id"]) is None
+
+
+def test_replica_reads_are_not_cached(client, replica_set):
+    read_from(client)
+    assert lead_cache.get(LEAD_ID) is None
+
+
+def test_no_replicas_available_reads_primary(client, replica_set, lags):
+    lags["replica1.db"] = lags["replica2.db"] = 60.0
+    assert read_from(client) == "primary"
+
+
+def test_lagging_replica_leaves_rotation(client, replica_set, lags):
+    lags["replica2.db"] = 60.0
+    assert {read_from(client) for _ in range(4)} == {"replica-1"}
+    lagging = replica_set.replicas[1]
+    assert not lagging.available
+    assert lagging.status()["error"] == "lag 60.0 s > 5 s"
+
+    # отставание ушло — после следующей проверки реплика снова в ротации
+    lags["replica2.db"] = 0.5
+    replica_set.check_lag()
+    assert lagging.available
+    assert {read_from(client) for _ in range(4)} == {"replica-1", "replica-2"}
+
+
+def test_unreachable_replica_leaves_rotation(client, replica_set, lags):
+    lags["replica1.db"] = ConnectionError("replica is down")
+    assert {read_from(client) for _ in range(4)} == {"replica-2"}
+    assert "replica is down" in replica_set.replicas[0].error
+
+
+def test_lag_is_checked_when_interval_passes(client, replica_set, lags):
+    replica_set.check_interval = 0
+    read_from(client)
+    lags["replica1.db"] = 60.0
+    time.sleep(0.01)
+    assert {read_from(client) for _ in range(4)} == {"replica-2"}
+
+
+def test_write_makes_reads_sticky_to_primary(sticky_client, replica_set):
+    assert read_from(sticky_client) != "primary"
+    assert replicas.STICKY_COOKIE not in sticky_client.cookies
+
+    created = sticky_client.post(LEADS, json={"name": "Anna", "email": "anna@example.com"})
+    assert replicas.STICKY_COOKIE in created.headers["set-cookie"]
+    # только что созданный лид читается сразу: реплики его ещё не видели
+    assert sticky_client.get(f"{LEADS}/{created.json()['id']}").status_code == 200
+    assert read_from(sticky_client) == "primary"
+
+    sticky_client.cookies.clear()
+    assert read_from(sticky_client) != "primary"
+
+
+def test_reads_do_not_set_sticky_cookie(sticky_client, replica_set):
+    response = sticky_client.get(f"{LEADS}/{LEAD_ID}")
+    assert "set-cookie" not in response.headers
+
+
+@pytest.mark.parametrize(
+    "until, sticky",
+    [
+        (lambda now: now + 1, True),
+        (lambda now: now - 1, False),
+        (lambda now: now + settings.replica_sticky_seconds + 3600, False),  # подделка из будущего
+        (lambda now: "oops", False),
+    ],
+)
+def test_sticky_cookie_window(client, replica_set, until, sticky):
+    client.cookies.set(replicas.STICKY_COOKIE, str(until(time.time())))
+    assert (read_from(client) == "primary") is sticky
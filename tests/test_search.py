@@ -0,0 +1,103 @@
+# tests/test_search.py — поиск лидов по фрагменту имени или email.
+
+"""
+GET /leads/search (app/services/search.py): ранжирование, синхронизация
+поисковых структур с leads (на SQLite — триггеры FTS5), проверка длины
+запроса и бюджет времени для синхронного и асинхронного драйвера.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.database import DATABASE_URL, create_async_db_engine
+from app.services import search
+
+LEADS = "/api/v1/leads/leads"
+SEARCH = f"{LEADS}/search"
+
+# Запрос, который заведомо дольше бюджета в 50 мс
+SLOW_QUERY = {
+    "sqlite": (
+        "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+        "SELECT count(*) FROM (SELECT x FROM c LIMIT 100000000)"
+    ),
+    "postgresql": "SELECT pg_sleep(5)",
+}
+
+
+def create(client, name: str, email: str) -> int:
+    response = client.post(LEADS, json={"name": name, "email": email})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def found(client, q: str) -> list[int]:
+    response = client.get(SEARCH, params={"q": q})
+    assert response.status_code == 200
+    return [lead["id"] for lead in response.json()["leads"]]
+
+
+def test_best_match_first(client):
+    create(client, "Joanna Petrova", "jp@example.com")
+    create(client, "Boris", "boris@example.com")
+    anna = create(client, "Anna", "anna@example.com")
+    result = found(client, "anna")
+    assert result[0] == anna
+    assert len(result) == 2
+
+
+def test_search_follows_updates_and_deletes(client):
+    lead_id = create(client, "Anna", "anna@example.com")
+    assert client.patch(f"{LEADS}/{lead_id}", json={"name": "Olga", "email": "olga@example.com"}).status_code == 200
+    assert found(client, "anna") == []
+    assert found(client, "olga") == [lead_id]
+
+    assert client.delete(f"{LEADS}/{lead_id}").status_code == 204
+    assert found(client, "olga") == []
+
+
+def test_query_is_matched_as_text(client):
+    lead_id = create(client, "Anna", "anna_100%@example.com")
+    # спецсимволы LIKE и FTS5 ищутся как обычные символы
+    assert found(client, "_100%") == [lead_id]
+    assert found(client, '"anna') == []
+
+
+@pytest.mark.parametrize("q", ["an", "  a", "a  ", "   "])
+def test_short_query_is_rejected(client, q):
+    assert client.get(SEARCH, params={"q": q}).status_code == 422
+
+
+def test_query_is_stripped(client):
+    lead_id = create(client, "Anna", "anna@example.com")
+    assert found(client, "  anna  ") == [lead_id]
+
+
+def test_budget_interrupts_slow_query(db):
+    slow = text(SLOW_QUERY[db.get_bind().dialect.name])
+    with pytest.raises(search.SearchTimeoutError):
+        with search._latency_budget(db, 50):
+            db.execute(slow)
+    db.rollback()
+    # после бюджета соединение снова работает без ограничения
+    assert db.scalar(text("SELECT 1")) == 1
+
+
+def test_budget_interrupts_slow_query_async():
+    def scenario(db):
+        with pytest.raises(search.SearchTimeoutError):
+            with search._latency_budget(db, 50):
+                db.execute(text(SLOW_QUERY[db.get_bind().dialect.name]))
+
+    async def main():
+        engine = create_async_db_engine(DATABASE_URL)
+        try:
+            async with async_sessionmaker(bind=engine, autoflush=False)() as db:
+                await db.run_sync(scenario)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+# tests/test_serialization.py — быстрый JSON-ответ из схемы.
+
+"""
+ModelJSONResponse (app/api/v1/utils.py) сериализует LeadOut и LeadList
+через TypeAdapter.dump_json. Клиенты не должны заметить смены пути:
+байты тела совпадают с прежним JSONResponse(jsonable_encoder(схема)).
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.v1.utils import model_response
+from app.schemas.leads import CountStrategy, LeadList, LeadOut
+
+LEADS = "/api/v1/leads/leads"
+
+NAMES = [
+    "Anna",
+    "Анна Петрова",
+    'O\'Brien "quoted" \\ back/slash',
+    "line\nbreak\ttab\x01control",
+    "emoji 🚀 и разделитель",
+]
+
+
+def make_lead(lead_id: int, name: str, **overrides) -> LeadOut:
+    values = dict(
+        id=lead_id,
+        name=name,
+        email=f"lead{lead_id}@example.com",
+        status="new",
+        source=None,
+        assigned_to=None,
+        created_at=datetime(2024, 1, 2, 3, 4, 5, 123456),
+        updated_at=datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=3))),
+        version=1,
+    )
+    values.update(overrides)
+    return LeadOut(**values)
+
+
+def legacy_body(content) -> bytes:
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_lead_out_matches_jsonable_encoder(name):
+    lead = make_lead(1, name, source="ads", assigned_to="Иван", created_at=datetime(2024, 1, 2, tzinfo=timezone.utc))
+    assert model_response(lead).body == legacy_body(lead)
+
+
+@pytest.mark.parametrize(
+    "total, strategy, next_cursor",
+    [
+        (5, CountStrategy.EXACT, "eyJpZCI6IDJ9"),
+        (None, CountStrategy.NONE, None),
+        (1000, CountStrategy.ESTIMATED, None),
+    ],
+)
+def test_lead_list_matches_jsonable_encoder(total, strategy, next_cursor):
+    page = LeadList(
+        leads=[make_lead(lead_id, name) for lead_id, name in enumerate(NAMES, start=1)],
+        total=total,
+        total_strategy=strategy,
+        next_cursor=next_cursor,
+    )
+    assert model_response(page).body == legacy_body(page)
+    assert model_response(LeadList(leads=[], total=0)).body == legacy_body(LeadList(leads=[], total=0))
+
+
+def test_api_responses_match_jsonable_encoder(client):
+    for name in NAMES:
+        client.post(LEADS, json={"name": name, "email": f"{len(name)}@example.com", "source": "ads"})
+
+    response = client.get(LEADS, params={"limit": 2})
+    assert response.headers["content-type"] == "application/json"
+    page = LeadList.model_validate_json(response.content)
+    assert page.next_cursor is not None
+    assert response.content == legacy_body(page)
+
+    lead = page.leads[0]
+    response = client.get(f"{LEADS}/{lead.id}")
+    assert response.content == legacy_body(LeadOut.model_validate_json(response.content))
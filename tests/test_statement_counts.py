@@ -0,0 +1,69 @@
+# tests/test_statement_counts.py — сколько SQL-запросов делают эндпоинты одиночного лида.
+
+"""
+Число SQL-запросов эндпоинтов одиночного лида.
+
+Считает QueryStats (app/db/database.py): RequestMetricsMiddleware заводит
+счётчик на HTTP-запрос и по его окончании передаёт в observe_request — там
+тест его и забирает (для ответов-ошибок тоже, в отличие от Server-Timing).
+Если изменение добавит лишний запрос (например, вернёт SELECT перед UPDATE),
+тест упадёт.
+"""
+
+import pytest
+
+from app.core import middleware
+
+BASE = "/api/v1/leads/leads"
+
+# (метод, путь, тело, ожидаемый статус, ожидаемое число запросов) — по порядку
+EXPECTED = [
+    ("GET", "/{id}", None, 200, 1),  # промах кэша: один SELECT
+    ("GET", "/{id}", None, 200, 0),  # попадание в кэш
+    # UPDATE … RETURNING + INSERT события в outbox
+    ("PATCH", "/{id}", {"status": "in_progress"}, 200, 2),
+    ("PUT", "/{id}", {"name": "Renamed", "email": "renamed@example.com"}, 200, 2),
+    ("PATCH", "/{id}", {}, 200, 1),  # пустой патч — только чтение
+    # промах UPDATE — ещё проверка архива (архивному лиду 409, а не 404)
+    ("PATCH", "/999999", {"status": "won"}, 404, 2),
+    ("DELETE", "/{id}", None, 204, 2),  # DELETE … RETURNING id + событие в outbox
+    ("DELETE", "/{id}", None, 404, 2),  # промах в leads — DELETE из архива
+    ("GET", "/{id}", None, 404, 1),
+]
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    """Функция: число SQL-запросов последнего HTTP-запроса по его QueryStats."""
+    recorded = []
+    observe_request = middleware.observe_request
+
+    def record(method, route, status_code, duration, query_stats):
+        recorded.append(query_stats.statements)
+        observe_request(method, route, status_code, duration, query_stats)
+
+    monkeypatch.setattr(middleware, "observe_request", record)
+    return lambda: recorded[-1]
+
+
+@pytest.fixture
+def lead_id(client):
+    return client.post(BASE, json={"name": "Count me", "email": "count@example.com"}).json()["id"]
+
+
+def test_single_lead_statement_counts(client, lead_id, statements):
+    for method, path, body, status, expected in EXPECTED:
+        response = client.request(method, BASE + path.format(id=lead_id), json=body)
+        assert (method, path, response.status_code, statements()) == (
+            method,
+            path,
+            status,
+            expected,
+        )
+
+
+def test_create_statement_count(client, statements):
+    # INSERT … RETURNING + INSERT события в outbox
+    response = client.post(BASE, json={"name": "New", "email": "new@example.com"})
+    assert response.status_code == 201
+    assert statements() == 2
@@ -0,0 +1,46 @@
+# tests/test_timing.py — заголовок Server-Timing маршрутов API.
+
+"""
+Server-Timing от TimedRoute (app/core/timing.py): фазы validation, app,
+db (время и число SQL-запросов) и serialization, предупреждение о бюджете SQL.
+"""
+
+import re
+
+from app.config import settings
+
+LEADS = "/api/v1/leads/leads"
+
+METRIC = re.compile(r'^(?P<name>[\w-]+)(?:;dur=(?P<dur>[\d.]+))?(?:;desc="(?P<desc>[^"]*)")?$')
+
+
+def server_timing(response) -> dict[str, dict]:
+    """Метрики Server-Timing: имя -> {dur, desc}."""
+    metrics = {}
+    for item in response.headers["server-timing"].split(", "):
+        match = METRIC.match(item)
+        assert match, item
+        metrics[match["name"]] = {"dur": match["dur"] and float(match["dur"]), "desc": match["desc"]}
+    return metrics
+
+
+def test_phases_of_lead_request(client):
+    lead_id = client.post(LEADS, json={"name": "Anna", "email": "anna@example.com"}).json()["id"]
+    metrics = server_timing(client.get(f"{LEADS}/{lead_id}"))
+    assert list(metrics) == ["validation", "app", "db", "serialization"]
+    assert all(metric["dur"] >= 0 for metric in metrics.values())
+    assert metrics["db"]["desc"] == "1 stmt"
+
+    # карточка из кэша — без SQL
+    assert server_timing(client.get(f"{LEADS}/{lead_id}"))["db"]["desc"] == "0 stmt"
+
+
+def test_statement_budget_is_flagged(client, monkeypatch):
+    lead_id = client.post(LEADS, json={"name": "Anna", "email": "anna@example.com"}).json()["id"]
+    monkeypatch.setattr(settings, "sql_statement_budget", 1)
+    metrics = server_timing(client.patch(f"{LEADS}/{lead_id}", json={"status": "won"}))
+    assert metrics["sql-budget"]["desc"] == "exceeded 2>1"
+
+
+def test_routes_outside_api_are_not_timed(client):
+    assert "server-timing" not in client.get("/api/v1/health/live").headers